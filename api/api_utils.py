@@ -8,23 +8,31 @@ import logging
 import requests
 from typing import Dict, Any, Optional
 from config import config
+from utils.http_transport import HTTPTransport, TransportError, get_transport
 
 
 class APIClient:
     """Client for making API requests"""
 
-    def __init__(self, base_url: Optional[str] = None, port: Optional[int] = None):
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        port: Optional[int] = None,
+        transport: Optional[HTTPTransport] = None,
+    ):
         """
         Initialize the API client
 
         Args:
             base_url: Base URL for API requests (default from config)
             port: Port for API requests (default from config)
+            transport: Pooled HTTP transport (default: the shared process-wide one)
         """
         self.logger = logging.getLogger(__name__)
         self.base_url = base_url or config.get("api.host", "localhost")
         self.port = port or config.get("api.port", 5000)
         self.timeout = config.get("api.timeout", 10)
+        self.transport = transport or get_transport()
 
         # Construct the API URL
         self.api_url = f"http://{self.base_url}:{self.port}"
@@ -47,10 +55,11 @@ class APIClient:
 
         try:
             self.logger.debug(f"Making GET request to {url}")
-            response = requests.get(url, params=params, timeout=self.timeout)
+            response = self.transport.request(
+                "GET", url, provider=self.api_url, params=params, timeout=self.timeout)
             response.raise_for_status()  # Raise exception for error status codes
             return response.json()
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, TransportError) as e:
             self.logger.error(f"API request failed: {e}")
             return {"error": str(e)}
 
@@ -59,6 +68,7 @@ class APIClient:
         endpoint: str,
         data: Optional[Dict[str, Any]] = None,
         json: Optional[Dict[str, Any]] = None,
+        retry: bool = False,
     ) -> Dict[str, Any]:
         """
         Make a POST request to the API
@@ -67,6 +77,8 @@ class APIClient:
             endpoint: API endpoint path
             data: Form data
             json: JSON data
+            retry: Retry on connection errors and retryable statuses; only safe
+                when repeating the request has no extra side effects
 
         Returns:
             Response data as dictionary
@@ -75,11 +87,12 @@ class APIClient:
 
         try:
             self.logger.debug(f"Making POST request to {url}")
-            response = requests.post(
-                url, data=data, json=json, timeout=self.timeout)
+            response = self.transport.request(
+                "POST", url, provider=self.api_url, data=data, json=json, timeout=self.timeout,
+                retry_non_idempotent=retry)
             response.raise_for_status()
             return response.json()
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, TransportError) as e:
             self.logger.error(f"API request failed: {e}")
             return {"error": str(e)}
 
@@ -88,6 +101,7 @@ class APIClient:
         endpoint: str,
         data: Optional[Dict[str, Any]] = None,
         json: Optional[Dict[str, Any]] = None,
+        retry: bool = False,
     ) -> Dict[str, Any]:
         """
         Make a PUT request to the API
@@ -96,6 +110,7 @@ class APIClient:
             endpoint: API endpoint path
             data: Form data
             json: JSON data
+            retry: Retry on connection errors and retryable statuses
 
         Returns:
             Response data as dictionary
@@ -104,16 +119,17 @@ class APIClient:
 
         try:
             self.logger.debug(f"Making PUT request to {url}")
-            response = requests.put(
-                url, data=data, json=json, timeout=self.timeout)
+            response = self.transport.request(
+                "PUT", url, provider=self.api_url, data=data, json=json, timeout=self.timeout,
+                retry_non_idempotent=retry)
             response.raise_for_status()
             return response.json()
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, TransportError) as e:
             self.logger.error(f"API request failed: {e}")
             return {"error": str(e)}
 
     def delete(
-        self, endpoint: str, params: Optional[Dict[str, Any]] = None
+        self, endpoint: str, params: Optional[Dict[str, Any]] = None, retry: bool = False
     ) -> Dict[str, Any]:
         """
         Make a DELETE request to the API
@@ -121,6 +137,7 @@ class APIClient:
         Args:
             endpoint: API endpoint path
             params: Query parameters
+            retry: Retry on connection errors and retryable statuses
 
         Returns:
             Response data as dictionary
@@ -129,10 +146,11 @@ class APIClient:
 
         try:
             self.logger.debug(f"Making DELETE request to {url}")
-            response = requests.delete(
-                url, params=params, timeout=self.timeout)
+            response = self.transport.request(
+                "DELETE", url, provider=self.api_url, params=params, timeout=self.timeout,
+                retry_non_idempotent=retry)
             response.raise_for_status()
             return response.json()
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, TransportError) as e:
             self.logger.error(f"API request failed: {e}")
             return {"error": str(e)}
\ No newline at end of file
@@ -7,22 +7,28 @@ GPT-Claude协作桥接模块
 import os
 import json
 import time
-import requests
 from typing import Dict, List, Any, Optional, Union
 
+from utils.http_transport import get_transport
+from utils.response_cache import ResponseCache
+
 
 class GPTClaudeBridge:
     """GPT与Claude协作的桥接模块"""
 
-    def __init__(self, config_path=None):
+    def __init__(self, config_path=None, response_cache=None, transport=None):
         """
         初始化GPT-Claude桥接
 
         参数:
             config_path (str, optional): 配置文件路径
+            response_cache (ResponseCache, optional): 模型响应缓存，默认按配置文件中的
+                response_cache项创建
+            transport (HTTPTransport, optional): HTTP传输，默认使用进程共享的连接池
         """
         self.gpt_api_key = os.environ.get("GPT_API_KEY", "")
         self.claude_api_key = os.environ.get("CLAUDE_API_KEY", "")
+        cache_config = {}
 
         # 从配置文件加载（如果提供）
         if config_path and os.path.exists(config_path):
@@ -41,6 +47,7 @@ class GPTClaudeBridge:
                 self.claude_model = config.get(
                     "claude_model", "claude-3-sonnet-20240229"
                 )
+                cache_config = config.get("response_cache", {})
         else:
             # 默认设置
             self.gpt_endpoint = "https://api.openai.com/v1/chat/completions"
@@ -49,6 +56,12 @@ class GPTClaudeBridge:
             self.claude_model = "claude-3-sonnet-20240229"
 
         self.conversation_history = []
+
+        # 相同的提示词(同一模型和参数)直接返回缓存的模型响应
+        self.response_cache = response_cache or ResponseCache(**cache_config)
+
+        # 模型请求走共享的连接池，由传输层负责限速、重试和熔断
+        self.transport = transport or get_transport()
         print("GPT-Claude桥接初始化成功")
 
     def process_prompt(self, prompt: str) -> str:
@@ -118,12 +131,22 @@ class GPTClaudeBridge:
                 "temperature": 0.7,
             }
 
-            response = requests.post(
-                self.gpt_endpoint, headers=headers, json=data, timeout=30
+            context = {key: value for key, value in data.items() if key != "messages"}
+            context["system"] = data["messages"][0]["content"]
+            cached = self.response_cache.get(prompt, context)
+            if cached is not None:
+                return cached
+
+            # 推理请求没有副作用，可以安全重试
+            response = self.transport.post(
+                self.gpt_endpoint, provider="gpt", headers=headers, json=data, timeout=30,
+                retry_non_idempotent=True,
             )
 
             if response.status_code == 200:
-                return response.json()["choices"][0]["message"]["content"]
+                content = response.json()["choices"][0]["message"]["content"]
+                self.response_cache.set(prompt, content, context)
+                return content
             else:
                 print(f"GPT API错误: {response.status_code} - {response.text}")
                 return f"GPT API返回错误: {response.status_code}"
@@ -168,12 +191,20 @@ class GPTClaudeBridge:
                 "max_tokens": 4000,
             }
 
-            response = requests.post(
-                self.claude_endpoint, headers=headers, json=data, timeout=30
+            context = {key: value for key, value in data.items() if key != "messages"}
+            cached = self.response_cache.get(data["messages"][0]["content"], context)
+            if cached is not None:
+                return cached
+
+            response = self.transport.post(
+                self.claude_endpoint, provider="claude", headers=headers, json=data, timeout=30,
+                retry_non_idempotent=True,
             )
 
             if response.status_code == 200:
-                return response.json()["content"][0]["text"]
+                content = response.json()["content"][0]["text"]
+                self.response_cache.set(data["messages"][0]["content"], content, context)
+                return content
             else:
                 print(
                     f"Claude API错误: {response.status_code} - {response.text}")
@@ -246,6 +277,23 @@ class GPTClaudeBridge:
         # 直接使用Claude来生成代码
         return self._call_claude(code_prompt)
 
+    def get_bridge_status(self) -> Dict[str, Any]:
+        """
+        获取桥接状态
+
+        返回:
+            dict: 模型配置、API密钥是否配置、响应缓存统计(含命中率)和传输层统计(含延迟直方图)
+        """
+        return {
+            "gpt_model": self.gpt_model,
+            "claude_model": self.claude_model,
+            "gpt_configured": bool(self.gpt_api_key),
+            "claude_configured": bool(self.claude_api_key),
+            "conversation_length": len(self.conversation_history),
+            "response_cache": self.response_cache.get_stats(),
+            "transport": self.transport.get_stats(),
+        }
+
     def test_connection(self, test_message="测试连接") -> str:
         """
         测试与API的连接
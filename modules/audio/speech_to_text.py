@@ -7,8 +7,6 @@
 创建日期: 2025-04-17
 """
 
-from .. config.config_loader import ConfigLoader
-import modules.audio
 import os
 import io
 import wave
@@ -16,9 +14,11 @@ import json
 import logging
 import tempfile
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Union, BinaryIO
+from typing import Dict, List, Any, Optional, Union, BinaryIO, Iterator
 from dataclasses import dataclass
 
+from .streaming import StreamingTranscriber, read_pcm
+
 # 尝试导入可选依赖
 try:
     import speech_recognition as sr
@@ -27,15 +27,17 @@ except ImportError:
     SR_AVAILABLE = False
 
 try:
-import modules.nlp as np
-NUMPY_AVAILABLE = True
+    import numpy as np
+    NUMPY_AVAILABLE = True
 except ImportError:
     NUMPY_AVAILABLE = False
 
 # 从配置加载器获取配置
 try:
-config_loader = ConfigLoader()
-STT_CONFIG = config_loader.load("modules.audio.speech_to_text")
+    from config.config_loader import ConfigLoader
+
+    config_loader = ConfigLoader()
+    STT_CONFIG = config_loader.load("modules.audio.speech_to_text")
 except ImportError:
     STT_CONFIG = {
         "default_language": "en-US",
@@ -105,6 +107,9 @@ class SpeechToText:
         # 初始化识别器
         self.recognizer = sr.Recognizer() if SR_AVAILABLE else None
 
+        # Whisper模型在首次使用时加载一次
+        self._whisper_model = None
+
         # 设置引擎特定参数
         self._setup_engine()
 
@@ -197,10 +202,10 @@ class SpeechToText:
         识别音频字节数据中的语音
 
         参数:
-            audio_bytes: 音频字节数据
-            sample_rate: 采样率
-            sample_width: 样本宽度（字节数）
-            channels: 通道数
+            audio_bytes: PCM字节数据，或完整的WAV文件内容（此时采样参数从文件头读取）
+            sample_rate: PCM数据的采样率
+            sample_width: PCM数据的样本宽度（字节数）
+            channels: PCM数据的通道数，多声道数据混合为单声道后识别
             language: 语言代码，如果为None则使用配置中的默认值
 
         返回:
@@ -215,20 +220,14 @@ class SpeechToText:
             if language is None:
                 language = self.config.language
 
-            # 将原始音频转换为WAV格式
-            with io.BytesIO() as wav_io:
-                with wave.open(wav_io, 'wb') as wav_file:
-                    wav_file.setnchannels(channels)
-                    wav_file.setsampwidth(sample_width)
-                    wav_file.setframerate(sample_rate)
-                    wav_file.writeframes(audio_bytes)
-
-                wav_io.seek(0)
-                audio_data = sr.AudioData(
-                    wav_io.read(),
-                    sample_rate=sample_rate,
-                    sample_width=sample_width
-                )
+            # AudioData 需要单声道的原始PCM帧数据，不含WAV文件头
+            frames, sample_rate, sample_width = read_pcm(
+                audio_bytes, sample_rate, sample_width, channels)
+            audio_data = sr.AudioData(
+                frames,
+                sample_rate=sample_rate,
+                sample_width=sample_width
+            )
 
             # 执行语音识别
             return self._perform_recognition(audio_data, language)
@@ -290,7 +289,7 @@ class SpeechToText:
             logger.error(f"麦克风录音或识别失败: {str(e)}")
             return {"error": str(e), "text": "", "success": False}
 
-    def _load_audio(self, audio_file: Union[str, Path, BinaryIO]) -> Optional[sr.AudioData]:
+    def _load_audio(self, audio_file: Union[str, Path, BinaryIO]) -> Optional["sr.AudioData"]:
         """
         加载音频文件
 
@@ -333,7 +332,7 @@ class SpeechToText:
             return None
 
     def _perform_recognition(self,
-                             audio_data: sr.AudioData,
+                             audio_data: "sr.AudioData",
                              language: str) -> Dict[str, Any]:
         """
         执行语音识别
@@ -447,30 +446,24 @@ class SpeechToText:
                     return {"error": "Whisper库未安装", "text": "", "success": False}
 
                 try:
-                    # 将AudioData转换为临时wav文件
-                    temp_file = tempfile.NamedTemporaryFile(
-                        delete=False, suffix='.wav')
-                    temp_file.write(audio_data.get_wav_data())
-                    temp_file.close()
-
-                    try:
-                        # 加载Whisper模型
+                    # 加载Whisper模型（每个识别器只加载一次）
+                    if self._whisper_model is None:
                         model_name = self.config.model if self.config.model != "default" else "tiny"
-                        model = whisper.load_model(model_name)
+                        self._whisper_model = whisper.load_model(model_name)
 
-                        # 执行转录
-                        result = model.transcribe(
-                            temp_file.name,
-                            language=language[:2] if language else None,
-                            verbose=False
-                        )
+                    # Whisper直接接受16kHz单声道float32数组，无需写入临时文件
+                    pcm = audio_data.get_raw_data(convert_rate=16000, convert_width=2)
+                    samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
 
-                        text = result["text"]
-                        details = {"whisper_response": result}
+                    # 执行转录
+                    result = self._whisper_model.transcribe(
+                        samples,
+                        language=language[:2] if language else None,
+                        verbose=False
+                    )
 
-                    finally:
-                        # 删除临时文件
-                        os.unlink(temp_file.name)
+                    text = result["text"]
+                    details = {"whisper_response": result}
 
                 except Exception as e:
                     return {"error": f"Whisper识别失败: {str(e)}", "text": "", "success": False}
@@ -520,7 +513,8 @@ def list_available_microphones() -> Dict[int, str]:
         return {}
 
     try:
-        
+        import pyaudio
+
         pa = pyaudio.PyAudio()
         devices = {}
 
@@ -591,81 +585,66 @@ def convert_audio_format(input_file: str,
 def transcribe_long_audio(audio_file: str,
                           config: Optional[SpeechRecognitionConfig] = None,
                           segment_duration: int = 60,
-                          overlap: int = 5) -> Dict[str, Any]:
+                          overlap: int = 5,
+                          n_workers: int = 4,
+                          executor: str = "thread") -> Dict[str, Any]:
     """
     转录长音频文件，通过分段处理
-    
+
+    音频增量读取（WAV直接读取，其他格式经ffmpeg解码），分段以内存中的PCM数据
+    并行识别，重叠部分去重后拼接。需要逐段结果时使用 iter_transcribe_long_audio。
+
     参数:
         audio_file: 音频文件路径
         config: 识别配置
         segment_duration: 每段的持续时间（秒）
         overlap: 重叠部分的持续时间（秒）
-        
+        n_workers: 并行识别的工作数
+        executor: thread 或 process，离线引擎（sphinx、whisper）建议使用 process
+
     返回:
         包含转录结果的字典
     """
     try:
-        # 尝试使用 pydub 加载音频
-        from pydub import AudioSegment
-
-        # 加载音频文件
-        audio = AudioSegment.from_file(audio_file)
-
-        # 创建识别器
-        recognizer = SpeechToText(config)
-
-        if not recognizer.is_available():
+        if not SR_AVAILABLE:
             return {"error": "语音识别不可用", "text": "", "success": False}
 
-        # 计算分段
-        audio_duration = len(audio) / 1000.0  # 毫秒转秒
-        segments = []
+        with StreamingTranscriber(
+            config=config,
+            n_workers=n_workers,
+            executor=executor,
+            segment_duration=segment_duration,
+            overlap=overlap
+        ) as transcriber:
+            result = transcriber.transcribe(audio_file)
 
-        # 创建分段
-        start_time = 0
-        while start_time < audio_duration:
-            end_time = min(start_time + segment_duration, audio_duration)
-            segments.append((start_time, end_time))
-            start_time = end_time - overlap
+        logger.info(f"将音频分成 {result['segments']} 段处理")
+        return result
 
-        logger.info(f"将音频分成 {len(segments)} 段处理")
-
-        # 处理每一段
-        results = []
-
-        for i, (start, end) in enumerate(segments):
-            logger.info(
-                f"处理音频段 {i+1}/{len(segments)}: {start:.1f}s - {end:.1f}s")
-
-            # 创建临时文件
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-                # 提取音频段
-                segment = audio[int(start * 1000):int(end * 1000)]
-                segment.export(temp_file.name, format='wav')
-
-                # 识别
-                try:
-                    result = recognizer.recognize_file(temp_file.name)
-                    if result["success"]:
-                        results.append(result["text"])
-                finally:
-                    # 删除临时文件
-                    os.unlink(temp_file.name)
+    except Exception as e:
+        logger.error(f"处理长音频失败: {str(e)}")
+        return {"error": str(e), "text": "", "success": False}
 
-        # 合并结果
-        full_text = " ".join(results)
 
-        return {
-            "text": full_text,
-            "segments": len(segments),
-            "audio_duration": audio_duration,
-            "success": True
-        }
+def iter_transcribe_long_audio(audio_file: str,
+                               config: Optional[SpeechRecognitionConfig] = None,
+                               segment_duration: int = 60,
+                               overlap: int = 5,
+                               n_workers: int = 4,
+                               executor: str = "thread") -> Iterator[Dict[str, Any]]:
+    """
+    流式转录长音频文件，按分段顺序产出部分结果
 
-    except ImportError:
-        logger.error("pydub库未安装，无法处理长音频")
-        return {"error": "pydub库未安装", "text": "", "success": False}
+    参数同 transcribe_long_audio。异步场景使用 StreamingTranscriber.aiter_transcribe。
 
-    except Exception as e:
-        logger.error(f"处理长音频失败: {str(e)}")
-        return {"error": str(e), "text": "", "success": False}
\ No newline at end of file
+    返回:
+        部分结果迭代器，每项的 new_text 为去重后新增的文本
+    """
+    with StreamingTranscriber(
+        config=config,
+        n_workers=n_workers,
+        executor=executor,
+        segment_duration=segment_duration,
+        overlap=overlap
+    ) as transcriber:
+        yield from transcriber.iter_transcribe(audio_file)
@@ -0,0 +1,573 @@
+# -*- coding: utf-8 -*-
+"""
+音频模块: 流式长音频转录
+功能描述: 增量读取音频（WAV直接读取，其他格式经ffmpeg解码为PCM流），
+         按重叠分段后直接以内存中的PCM数据提交给有界工作池识别，
+         按顺序拼接结果并对重叠部分确定性去重，同时提供同步和异步的部分结果迭代接口
+版本: 1.0.0
+作者: 窗口6开发人员
+创建日期: 2026-10-18
+"""
+
+import io
+import re
+import time
+import wave
+import shutil
+import asyncio
+import logging
+import threading
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Tuple, Any, Optional, Union, BinaryIO, Callable, Iterator, AsyncIterator
+
+# 尝试导入可选依赖
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# 初始化日志记录器
+logger = logging.getLogger(__name__)
+
+# 工作进程内的识别器，由 _init_worker 在进程启动时创建一次
+_WORKER_RECOGNIZER = None
+
+# 去重时比较用的单词规范化：忽略大小写和首尾标点
+_PUNCTUATION = re.compile(r"^\W+|\W+$")
+
+
+def _default_recognizer_factory(config: Any = None) -> Any:
+    """创建 SpeechToText 识别器"""
+    from .speech_to_text import SpeechToText
+
+    return SpeechToText(config)
+
+
+def _init_worker(factory: Callable[[], Any]):
+    """工作进程初始化：创建识别器（加载模型）"""
+    global _WORKER_RECOGNIZER
+    _WORKER_RECOGNIZER = factory()
+
+
+def _recognize_in_worker(audio_bytes: bytes, sample_rate: int, sample_width: int,
+                         channels: int, language: Optional[str]) -> Dict[str, Any]:
+    """在工作进程内识别一段PCM数据"""
+    return _WORKER_RECOGNIZER.recognize_bytes(
+        audio_bytes, sample_rate=sample_rate, sample_width=sample_width,
+        channels=channels, language=language
+    )
+
+
+def pcm_to_mono(audio_bytes: bytes, sample_width: int, channels: int) -> bytes:
+    """
+    将交错存储的多声道PCM数据混合为单声道（各声道取平均）
+
+    参数:
+        audio_bytes: PCM字节数据，末尾不完整的帧会被丢弃
+        sample_width: 样本宽度（字节数），1字节为无符号，其余为有符号小端
+        channels: 通道数
+
+    返回:
+        单声道PCM字节数据
+    """
+    if channels <= 1:
+        return audio_bytes
+    frame_bytes = sample_width * channels
+    audio_bytes = audio_bytes[:len(audio_bytes) - len(audio_bytes) % frame_bytes]
+
+    if not NUMPY_AVAILABLE:
+        logger.warning("numpy未安装，多声道音频只保留第一个声道")
+        view = memoryview(audio_bytes)
+        return b"".join(view[i:i + sample_width] for i in range(0, len(view), frame_bytes))
+
+    if sample_width == 3:
+        # 24位样本补一个低位字节后按32位整数处理
+        padded = np.zeros((len(audio_bytes) // 3, 4), dtype=np.uint8)
+        padded[:, 1:] = np.frombuffer(audio_bytes, dtype=np.uint8).reshape(-1, 3)
+        samples = padded.view("<i4").reshape(-1, channels) >> 8
+        mono = np.rint(samples.mean(axis=1)).astype("<i4") << 8
+        return mono.view(np.uint8).reshape(-1, 4)[:, 1:].tobytes()
+
+    dtype = {1: np.uint8, 2: "<i2", 4: "<i4"}[sample_width]
+    samples = np.frombuffer(audio_bytes, dtype=dtype).reshape(-1, channels)
+    return np.rint(samples.mean(axis=1)).astype(dtype).tobytes()
+
+
+def read_pcm(audio_bytes: bytes,
+             sample_rate: int,
+             sample_width: int,
+             channels: int) -> Tuple[bytes, int, int]:
+    """
+    将音频字节数据整理为单声道PCM
+
+    完整的WAV文件内容按文件头读取采样参数并只取音频帧，原始PCM数据按给定参数解释；
+    多声道数据混合为单声道
+
+    参数:
+        audio_bytes: PCM字节数据或WAV文件内容
+        sample_rate: PCM数据的采样率
+        sample_width: PCM数据的样本宽度（字节数）
+        channels: PCM数据的通道数
+
+    返回:
+        (单声道PCM字节数据, 采样率, 样本宽度)
+    """
+    if audio_bytes[:4] == b"RIFF" and audio_bytes[8:12] == b"WAVE":
+        with wave.open(io.BytesIO(audio_bytes), "rb") as wav_file:
+            sample_rate = wav_file.getframerate()
+            sample_width = wav_file.getsampwidth()
+            channels = wav_file.getnchannels()
+            audio_bytes = wav_file.readframes(wav_file.getnframes())
+    return pcm_to_mono(audio_bytes, sample_width, channels), sample_rate, sample_width
+
+
+class PCMStream:
+    """
+    增量读取音频的PCM流
+
+    WAV文件（路径或文件对象）使用 wave 模块按需读取，保持原始采样率和样本宽度，多声道混合为单声道；
+    其他格式通过 ffmpeg 子进程解码为 16位单声道PCM 逐块读取，整个文件不会一次性解码到内存。
+    """
+
+    def __init__(self,
+                 audio_file: Union[str, Path, BinaryIO],
+                 sample_rate: int = 16000,
+                 channels: int = 1):
+        """
+        打开音频流
+
+        参数:
+            audio_file: 音频文件路径或WAV文件对象
+            sample_rate: 非WAV格式解码的目标采样率
+            channels: 非WAV格式解码的目标通道数
+        """
+        self._wave = None
+        self._process = None
+        self._wave_channels = 1
+
+        try:
+            source = str(audio_file) if isinstance(audio_file, Path) else audio_file
+            self._wave = wave.open(source, "rb")
+            self.sample_rate = self._wave.getframerate()
+            self.sample_width = self._wave.getsampwidth()
+            self._wave_channels = self._wave.getnchannels()
+            self.channels = 1
+        except (wave.Error, EOFError):
+            if self._wave is not None:
+                self._wave.close()
+                self._wave = None
+            if not isinstance(audio_file, (str, Path)):
+                raise ValueError("非WAV格式的音频流只支持文件路径输入")
+
+            ffmpeg = shutil.which("ffmpeg")
+            if ffmpeg is None:
+                raise RuntimeError("解码非WAV音频需要ffmpeg")
+
+            self.sample_rate = sample_rate
+            self.channels = channels
+            self.sample_width = 2
+            self._process = subprocess.Popen(
+                [ffmpeg, "-nostdin", "-loglevel", "error", "-i", str(audio_file),
+                 "-f", "s16le", "-acodec", "pcm_s16le",
+                 "-ac", str(channels), "-ar", str(sample_rate), "-"],
+                stdout=subprocess.PIPE,
+            )
+
+    @property
+    def frame_bytes(self) -> int:
+        """每帧（所有通道的一个采样）的字节数"""
+        return self.channels * self.sample_width
+
+    def read(self, n_frames: int) -> bytes:
+        """
+        读取最多 n_frames 帧
+
+        返回:
+            PCM字节数据，流结束时返回空字节串
+        """
+        if self._wave is not None:
+            return pcm_to_mono(self._wave.readframes(n_frames), self.sample_width, self._wave_channels)
+
+        # 管道读取可能返回不足的数据，循环直到读满或结束
+        size = n_frames * self.frame_bytes
+        chunks = []
+        while size > 0:
+            chunk = self._process.stdout.read(size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    def close(self):
+        """关闭音频流"""
+        if self._wave is not None:
+            self._wave.close()
+            self._wave = None
+        if self._process is not None:
+            self._process.stdout.close()
+            self._process.kill()
+            self._process.wait()
+            self._process = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def iter_segments(stream: PCMStream,
+                  segment_duration: float = 60,
+                  overlap: float = 5,
+                  read_frames: Optional[int] = None) -> Iterator[Tuple[int, float, float, bytes]]:
+    """
+    将PCM流切分为重叠的分段，内存中只保留当前一段
+
+    参数:
+        stream: PCM流
+        segment_duration: 每段的持续时间（秒）
+        overlap: 相邻分段重叠的持续时间（秒）
+        read_frames: 每次从流中读取的帧数，默认为1秒
+
+    返回:
+        (分段序号, 开始时间, 结束时间, PCM字节数据) 迭代器
+    """
+    if not 0 <= overlap < segment_duration:
+        raise ValueError(f"重叠时间必须小于分段时间: overlap={overlap}, segment_duration={segment_duration}")
+
+    rate = stream.sample_rate
+    frame_bytes = stream.frame_bytes
+    segment_size = int(segment_duration * rate) * frame_bytes
+    step_size = segment_size - int(overlap * rate) * frame_bytes
+    read_frames = read_frames or rate
+
+    buffer = bytearray()
+    offset = 0  # 缓冲区起点对应的字节位置
+    index = 0
+    finished = False
+    while not finished:
+        while len(buffer) < segment_size:
+            chunk = stream.read(read_frames)
+            if not chunk:
+                finished = True
+                break
+            buffer += chunk
+
+        # 最后剩余的数据如果只是上一段的重叠部分则不再识别
+        if not buffer or (finished and index > 0 and len(buffer) <= segment_size - step_size):
+            break
+
+        data = bytes(buffer[:segment_size])
+        start = offset / frame_bytes / rate
+        yield index, start, start + len(data) / frame_bytes / rate, data
+
+        index += 1
+        del buffer[:step_size]
+        offset += step_size
+
+
+def _normalize_word(word: str) -> str:
+    return _PUNCTUATION.sub("", word.lower())
+
+
+def merge_overlap(previous: List[str],
+                  following: List[str],
+                  max_overlap_words: int = 50,
+                  min_match_words: int = 2) -> Tuple[int, List[str]]:
+    """
+    去掉后一段开头与前一段结尾重复的单词
+
+    在前一段末尾 max_overlap_words 个词中寻找与后一段开头相同的最长词序列（忽略大小写和标点）。
+    分段边界可能切断单词，因此允许前一段末尾或后一段开头各有一个被切断的词不参与匹配，
+    前一段末尾被切断的词会被删除（后一段中有完整的词）。
+    匹配长度相同时选择偏移最小的方案，结果是确定的。
+
+    参数:
+        previous: 已拼接的单词
+        following: 后一段的单词
+        max_overlap_words: 最多比较的单词数
+        min_match_words: 认定为重叠的最少匹配单词数
+
+    返回:
+        (需要从previous末尾删除的单词数, 需要追加的单词)
+    """
+    tail = [_normalize_word(w) for w in previous[-max_overlap_words:]]
+    head = [_normalize_word(w) for w in following[:max_overlap_words + 1]]
+
+    best = None  # (匹配长度, 前一段偏移, 后一段偏移)
+    for prev_skip in (0, 1):
+        end = len(tail) - prev_skip
+        for next_skip in (0, 1):
+            limit = min(end, len(head) - next_skip)
+            for k in range(limit, min_match_words - 1, -1):
+                if tail[end - k:end] == head[next_skip:next_skip + k]:
+                    if best is None or k > best[0]:
+                        best = (k, prev_skip, next_skip)
+                    break
+
+    if best is None:
+        return 0, list(following)
+
+    k, prev_skip, next_skip = best
+    return prev_skip, list(following[next_skip + k:])
+
+
+def stitch_transcripts(texts: List[str], max_overlap_words: int = 50, min_match_words: int = 2) -> str:
+    """
+    按顺序拼接重叠分段的识别文本
+
+    参数:
+        texts: 各分段的识别文本
+        max_overlap_words: 最多比较的单词数
+        min_match_words: 认定为重叠的最少匹配单词数
+
+    返回:
+        拼接后的文本
+    """
+    words = []
+    for text in texts:
+        drop, added = merge_overlap(words, text.split(), max_overlap_words, min_match_words)
+        del words[len(words) - drop:]
+        words += added
+    return " ".join(words)
+
+
+class StreamingTranscriber:
+    """
+    流式长音频转录器
+
+    读取线程按需从音频流切出分段，直接将PCM数据提交到工作池识别，在途分段数有上限，
+    结果按分段顺序产出。每个工作线程/进程只创建一次识别器。
+    离线识别引擎（sphinx、whisper）为CPU密集型，使用 executor="process" 可随工作进程数扩展；
+    在线API使用 executor="thread" 即可。
+    """
+
+    def __init__(self,
+                 config: Any = None,
+                 n_workers: int = 4,
+                 executor: str = "thread",
+                 segment_duration: float = 60,
+                 overlap: float = 5,
+                 max_pending: Optional[int] = None,
+                 language: Optional[str] = None,
+                 recognizer_factory: Optional[Callable[[], Any]] = None,
+                 max_overlap_words: int = 50,
+                 min_match_words: int = 2):
+        """
+        初始化转录器
+
+        参数:
+            config: 识别配置，传给 SpeechToText
+            n_workers: 工作线程/进程数
+            executor: thread 或 process
+            segment_duration: 每段的持续时间（秒）
+            overlap: 相邻分段重叠的持续时间（秒）
+            max_pending: 最大在途分段数，默认为工作数的2倍
+            language: 语言代码，None表示使用配置中的默认值
+            recognizer_factory: 创建识别器的无参函数，识别器需提供 recognize_bytes 方法。
+                                process 模式下必须可被pickle
+            max_overlap_words: 去重时最多比较的单词数
+            min_match_words: 认定为重叠的最少匹配单词数
+        """
+        if executor not in ("thread", "process"):
+            raise ValueError(f"不支持的执行器类型: {executor}")
+
+        self.n_workers = max(1, int(n_workers))
+        self.executor_type = executor
+        self.segment_duration = segment_duration
+        self.overlap = overlap
+        self.max_pending = max_pending or 2 * self.n_workers
+        self.language = language
+        self.recognizer_factory = recognizer_factory or partial(_default_recognizer_factory, config)
+        self.max_overlap_words = max_overlap_words
+        self.min_match_words = min_match_words
+        self.stats = {}
+
+        self._executor = None
+        self._local = threading.local()
+
+    def _ensure_executor(self):
+        """按需启动工作池"""
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.n_workers,
+                    initializer=_init_worker,
+                    initargs=(self.recognizer_factory,),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.n_workers, thread_name_prefix="transcribe"
+                )
+            logger.info(f"启动转录工作池: {self.n_workers} 个{self.executor_type}工作单元")
+        return self._executor
+
+    def _recognize_in_thread(self, audio_bytes: bytes, sample_rate: int, sample_width: int,
+                             channels: int, language: Optional[str]) -> Dict[str, Any]:
+        """在工作线程内识别，每个线程使用自己的识别器"""
+        recognizer = getattr(self._local, "recognizer", None)
+        if recognizer is None:
+            recognizer = self._local.recognizer = self.recognizer_factory()
+        return recognizer.recognize_bytes(
+            audio_bytes, sample_rate=sample_rate, sample_width=sample_width,
+            channels=channels, language=language
+        )
+
+    def _submit(self, stream: PCMStream, data: bytes):
+        """提交一个分段"""
+        executor = self._ensure_executor()
+        recognize = _recognize_in_worker if self.executor_type == "process" else self._recognize_in_thread
+        return executor.submit(recognize, data, stream.sample_rate, stream.sample_width,
+                               stream.channels, self.language)
+
+    def iter_transcribe(self, audio_file: Union[str, Path, BinaryIO]) -> Iterator[Dict[str, Any]]:
+        """
+        流式转录，按分段顺序产出部分结果
+
+        参数:
+            audio_file: 音频文件路径或WAV文件对象
+
+        返回:
+            部分结果迭代器，每项包含 index, start, end, text（该段识别文本）,
+            new_text（去重后新增的文本）, retracted_words（从之前结果末尾删除的被切断单词数）,
+            success，失败时包含 error
+        """
+        start_time = time.perf_counter()
+        words = []
+        segments = 0
+        audio_duration = 0.0
+
+        def finish(future, index, start, end):
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"识别音频段 {index} 失败: {str(e)}")
+                result = {"error": str(e), "text": "", "success": False}
+
+            item = {
+                "index": index,
+                "start": start,
+                "end": end,
+                "text": result.get("text", "") if result.get("success") else "",
+                "new_text": "",
+                "retracted_words": 0,
+                "success": bool(result.get("success")),
+            }
+            if item["success"]:
+                drop, added = merge_overlap(words, item["text"].split(),
+                                            self.max_overlap_words, self.min_match_words)
+                del words[len(words) - drop:]
+                words.extend(added)
+                item["new_text"] = " ".join(added)
+                item["retracted_words"] = drop
+            else:
+                item["error"] = result.get("error", "")
+            return item
+
+        with PCMStream(audio_file) as stream:
+            pending = deque()
+            for index, start, end, data in iter_segments(stream, self.segment_duration, self.overlap):
+                pending.append((self._submit(stream, data), index, start, end))
+                segments += 1
+                audio_duration = end
+                if len(pending) >= self.max_pending:
+                    yield finish(*pending.popleft())
+
+            while pending:
+                yield finish(*pending.popleft())
+
+        wall_time = time.perf_counter() - start_time
+        self.stats = {
+            "text": " ".join(words),
+            "segments": segments,
+            "audio_duration": audio_duration,
+            "wall_time": wall_time,
+            "realtime_factor": audio_duration / wall_time if wall_time > 0 else 0.0,
+        }
+        logger.info(f"转录 {audio_duration:.1f}s 音频, {segments} 段, "
+                    f"速度为实时的 {self.stats['realtime_factor']:.1f} 倍")
+
+    async def aiter_transcribe(self, audio_file: Union[str, Path, BinaryIO]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        异步流式转录，读取和识别在线程中进行，不阻塞事件循环
+
+        参数:
+            audio_file: 音频文件路径或WAV文件对象
+
+        返回:
+            部分结果异步迭代器，内容同 iter_transcribe
+        """
+        loop = asyncio.get_running_loop()
+        iterator = self.iter_transcribe(audio_file)
+        done = object()
+        while True:
+            item = await loop.run_in_executor(None, next, iterator, done)
+            if item is done:
+                break
+            yield item
+
+    def transcribe(self, audio_file: Union[str, Path, BinaryIO]) -> Dict[str, Any]:
+        """
+        转录整个音频
+
+        参数:
+            audio_file: 音频文件路径或WAV文件对象
+
+        返回:
+            包含 text, segments, audio_duration, failed_segments, success 的字典
+        """
+        failed = [item["index"] for item in self.iter_transcribe(audio_file) if not item["success"]]
+        return {
+            "text": self.stats["text"],
+            "segments": self.stats["segments"],
+            "audio_duration": self.stats["audio_duration"],
+            "failed_segments": failed,
+            "success": True,
+        }
+
+    def close(self):
+        """关闭工作池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def benchmark_transcription(audio_file: Union[str, Path],
+                            worker_counts: Tuple[int, ...] = (1, 2, 4),
+                            **transcriber_kwargs) -> Dict[int, Dict[str, Any]]:
+    """
+    测试不同工作数下的转录速度
+
+    参数:
+        audio_file: 音频文件路径
+        worker_counts: 需要测试的工作数
+        **transcriber_kwargs: 传给 StreamingTranscriber 的其他参数，
+                              离线引擎建议 executor="process"
+
+    返回:
+        工作数到 耗时/实时倍数 的映射
+    """
+    results = {}
+    for n_workers in worker_counts:
+        with StreamingTranscriber(n_workers=n_workers, **transcriber_kwargs) as transcriber:
+            transcriber.transcribe(audio_file)
+        results[n_workers] = {
+            "wall_time": transcriber.stats["wall_time"],
+            "realtime_factor": transcriber.stats["realtime_factor"],
+            "segments": transcriber.stats["segments"],
+        }
+        logger.info(f"{n_workers} 个工作单元: 实时的 {results[n_workers]['realtime_factor']:.1f} 倍")
+
+    return results
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+音频模块: 语音合成结果缓存
+功能描述: 按内容寻址缓存合成后的音频（键由引擎、语音、语速等参数和文本/SSML哈希组成），
+         内存中按字节预算做LRU淘汰，并可持久化到磁盘目录，重复短语的合成只需一次读取
+版本: 1.0.0
+作者: 窗口6开发人员
+创建日期: 2026-10-18
+"""
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional, Union
+
+# 初始化日志记录器
+logger = logging.getLogger(__name__)
+
+
+def synthesis_cache_key(text: str, **params: Any) -> str:
+    """
+    计算合成结果的缓存键
+
+    参数:
+        text: 要合成的文本或SSML
+        params: 影响合成结果的参数，如引擎、语音、语速、音频格式
+
+    返回:
+        十六进制的SHA-256摘要
+    """
+    text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    payload = json.dumps({"params": params, "text": text_hash}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SynthesisCache:
+    """
+    合成结果缓存
+
+    内存层是按字节数限制的LRU；设置了 cache_dir 时每个结果同时写入 <cache_dir>/<键>.<格式>，
+    进程重启后仍可命中，磁盘层按文件修改时间淘汰最久未使用的结果。
+    """
+
+    def __init__(self,
+                 cache_dir: Optional[Union[str, Path]] = None,
+                 max_bytes: int = 32 * 1024 * 1024,
+                 max_disk_bytes: int = 256 * 1024 * 1024):
+        """
+        初始化缓存
+
+        参数:
+            cache_dir: 磁盘缓存目录，None表示只使用内存
+            max_bytes: 内存缓存的字节预算
+            max_disk_bytes: 磁盘缓存的字节预算
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self.disk_bytes = sum(path.stat().st_size for path in self._disk_files())
+
+    def _disk_files(self):
+        return [path for path in self.cache_dir.iterdir()
+                if path.is_file() and not path.name.startswith(".")]
+
+    def _disk_path(self, key: str, audio_format: str) -> Path:
+        return self.cache_dir / f"{key}.{audio_format}"
+
+    def _remember(self, key: str, data: bytes):
+        """放入内存层并按字节预算淘汰（调用方持有锁）"""
+        if len(data) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.memory_bytes -= len(previous)
+        self._entries[key] = data
+        self.memory_bytes += len(data)
+        while self.memory_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.memory_bytes -= len(evicted)
+
+    def get(self, key: str, audio_format: str = "wav") -> Optional[bytes]:
+        """
+        查找缓存
+
+        参数:
+            key: 缓存键
+            audio_format: 音频格式（磁盘文件扩展名）
+
+        返回:
+            音频字节数据，未命中时返回None
+        """
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+
+        if self.cache_dir is not None:
+            path = self._disk_path(key, audio_format)
+            try:
+                data = path.read_bytes()
+                os.utime(path)
+            except OSError:
+                data = None
+            if data is not None:
+                with self._lock:
+                    self._remember(key, data)
+                    self.hits += 1
+                    self.disk_hits += 1
+                return data
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, data: bytes, audio_format: str = "wav"):
+        """
+        存入缓存
+
+        参数:
+            key: 缓存键
+            data: 音频字节数据
+            audio_format: 音频格式（磁盘文件扩展名）
+        """
+        with self._lock:
+            self._remember(key, data)
+
+        if self.cache_dir is None:
+            return
+
+        path = self._disk_path(key, audio_format)
+        try:
+            existing = path.stat().st_size if path.exists() else 0
+            # 先写临时文件再原子替换，其他进程不会读到写了一半的文件
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"写入合成缓存失败: {str(e)}")
+            return
+
+        with self._lock:
+            self.disk_bytes += len(data) - existing
+            if self.disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _evict_disk(self):
+        """按修改时间淘汰磁盘缓存直到低于预算（调用方持有锁）"""
+        files = sorted(self._disk_files(), key=lambda path: path.stat().st_mtime)
+        self.disk_bytes = sum(path.stat().st_size for path in files)
+        for path in files:
+            if self.disk_bytes <= self.max_disk_bytes:
+                break
+            size = path.stat().st_size
+            try:
+                path.unlink()
+                self.disk_bytes -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        """清空内存和磁盘缓存"""
+        with self._lock:
+            self._entries.clear()
+            self.memory_bytes = 0
+            if self.cache_dir is not None:
+                for path in self._disk_files():
+                    try:
+                        path.unlink()
+                    except OSError:
+                        pass
+                self.disk_bytes = 0
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+
+        返回:
+            命中次数、未命中次数、命中率和占用字节数
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "memory_bytes": self.memory_bytes,
+                "disk_bytes": self.disk_bytes,
+            }
@@ -7,22 +7,25 @@
 创建日期: 2025-04-17
 """
 
-from .. config.config_loader import ConfigLoader
-import ui.utils.color
 import os
 import io
 import json
 import logging
+import time
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Union, BinaryIO
-from dataclasses import dataclass
+from typing import Dict, List, Tuple, Any, Optional, Union, BinaryIO, Iterable
+from dataclasses import dataclass, replace
+
+from .synthesis_cache import SynthesisCache, synthesis_cache_key
 
 # 尝试导入可选依赖
 try:
-import config.paths
-from config.paths import gTTS
-GTTS_AVAILABLE = True
+    import gtts
+    from gtts import gTTS
+    GTTS_AVAILABLE = True
 except ImportError:
     GTTS_AVAILABLE = False
 
@@ -34,18 +37,38 @@ except ImportError:
 
 # 从配置加载器获取配置
 try:
-config_loader = ConfigLoader()
-TTS_CONFIG = config_loader.load("modules.audio.text_to_speech")
+    from config.config_loader import ConfigLoader
+
+    config_loader = ConfigLoader()
+    TTS_CONFIG = config_loader.load("modules.audio.text_to_speech")
 except ImportError:
     TTS_CONFIG = {
-        "default_voice": "default",
-        "default_language": "en-US",
+        "voice": "default",
+        "language": "en-US",
         "audio_format": "wav"
     }
 
 # 初始化日志记录器
 logger = logging.getLogger(__name__)
 
+# 工作进程内的合成器，由 _init_synthesis_worker 在进程启动时创建一次
+_WORKER_SYNTHESIZER = None
+
+
+def _init_synthesis_worker(synthesizer_class: type, config: "SpeechSynthesisConfig"):
+    """工作进程初始化：创建合成器（初始化离线引擎）"""
+    global _WORKER_SYNTHESIZER
+    _WORKER_SYNTHESIZER = synthesizer_class(config)
+
+
+def _synthesize_in_worker(text: str) -> Optional[bytes]:
+    """在工作进程内合成一段文本"""
+    try:
+        return _WORKER_SYNTHESIZER._synthesize_engine(text)
+    except Exception as e:
+        logger.error(f"合成语音失败: {str(e)}")
+        return None
+
 
 @dataclass
 class SpeechSynthesisConfig:
@@ -61,6 +84,9 @@ class SpeechSynthesisConfig:
     audio_format: str = "wav"  # 音频格式: wav, mp3, ogg
     api_key: Optional[str] = None  # API密钥
     endpoint: Optional[str] = None  # 服务端点
+    cache_enabled: bool = True  # 是否缓存合成结果
+    cache_dir: Optional[str] = None  # 合成结果的磁盘缓存目录，None表示只缓存在内存
+    cache_max_bytes: int = 32 * 1024 * 1024  # 内存缓存的字节预算
 
     def __post_init__(self):
         """数据校验和默认值设置"""
@@ -98,12 +124,15 @@ class SpeechSynthesisConfig:
 class TextToSpeech:
     """文本转语音类"""
 
-    def __init__(self, config: Optional[Union[Dict[str, Any], SpeechSynthesisConfig]] = None):
+    def __init__(self,
+                 config: Optional[Union[Dict[str, Any], SpeechSynthesisConfig]] = None,
+                 cache: Optional[SynthesisCache] = None):
         """
         初始化语音合成器
 
         参数:
             config: 合成配置，可以是SpeechSynthesisConfig实例或字典
+            cache: 合成结果缓存，None时按配置创建；多个合成器可共享同一个缓存
         """
         if config is None:
             self.config = SpeechSynthesisConfig(**TTS_CONFIG)
@@ -112,6 +141,15 @@ class TextToSpeech:
         else:
             self.config = config
 
+        # 合成结果缓存
+        if cache is not None:
+            self.cache = cache
+        elif self.config.cache_enabled:
+            self.cache = SynthesisCache(self.config.cache_dir, max_bytes=self.config.cache_max_bytes)
+        else:
+            self.cache = None
+        self.last_batch_stats: Dict[str, Any] = {}
+
         # 检查依赖可用性
         if not GTTS_AVAILABLE and not PYTTSX3_AVAILABLE:
             logger.warning("gTTS和pyttsx3库都未安装，文本转语音功能将受限")
@@ -200,7 +238,8 @@ class TextToSpeech:
 
         elif self.config.engine == "aws":
             try:
-                
+                import boto3
+
                 # 检查API密钥
                 if not self.config.api_key:
                     logger.warning("未提供AWS访问密钥，回退到系统引擎")
@@ -230,11 +269,35 @@ class TextToSpeech:
             else:
                 logger.error("没有可用的文本转语音引擎")
 
+    def cache_key(self, text: str) -> str:
+        """
+        计算文本在当前合成参数下的缓存键
+
+        参数:
+            text: 要合成的文本或SSML
+
+        返回:
+            缓存键
+        """
+        return synthesis_cache_key(
+            text,
+            engine=self.config.engine,
+            voice=self.config.voice,
+            language=self.config.language,
+            gender=self.config.gender,
+            rate=self.config.rate,
+            pitch=self.config.pitch,
+            volume=self.config.volume,
+            audio_format=self.config.audio_format,
+        )
+
     def synthesize(self,
                    text: str,
                    output_file: Optional[str] = None) -> Optional[bytes]:
         """
         合成语音
+
+        启用缓存时相同参数下的相同文本只合成一次，之后直接从内存或磁盘缓存读取
         
         参数:
             text: 要合成的文本
@@ -248,23 +311,166 @@ class TextToSpeech:
             return None
 
         try:
-            # 根据引擎合成语音
-            if self.config.engine == "gtts":
-                return self._synthesize_gtts(text, output_file)
-            elif self.config.engine == "pyttsx3":
-                return self._synthesize_pyttsx3(text, output_file)
-            elif self.config.engine == "azure":
-                return self._synthesize_azure(text, output_file)
-            elif self.config.engine == "aws":
-                return self._synthesize_aws(text, output_file)
-            else:
-                logger.error(f"不支持的合成引擎: {self.config.engine}")
+            if self.cache is None:
+                return self._synthesize_engine(text, output_file)
+
+            key = self.cache_key(text)
+            audio_data = self.cache.get(key, self.config.audio_format)
+            if audio_data is None:
+                audio_data = self._synthesize_engine(text)
+                if audio_data is None:
+                    return None
+                self.cache.put(key, audio_data, self.config.audio_format)
+
+            if output_file:
+                self._write_output(output_file, audio_data)
                 return None
+            return audio_data
+
+        except Exception as e:
+            logger.error(f"合成语音失败: {str(e)}")
+            return None
+
+    def synthesize_batch(self,
+                         texts: Iterable[str],
+                         n_workers: int = 4,
+                         executor: str = "auto") -> List[Optional[bytes]]:
+        """
+        批量合成语音
+
+        输入先去重并查缓存，只有未命中的文本才会合成；离线的pyttsx3引擎不是线程安全的，
+        在进程池中合成（每个工作进程初始化一次引擎），在线引擎使用线程池并发请求
+
+        参数:
+            texts: 要合成的文本列表
+            n_workers: 工作进程/线程数
+            executor: 执行方式: auto, process, thread
+
+        返回:
+            与输入顺序一致的音频字节数据列表，合成失败的位置为None
+        """
+        if executor not in ("auto", "process", "thread"):
+            raise ValueError(f"不支持的执行方式: {executor}")
+
+        start_time = time.time()
+        texts = list(texts)
+        unique = list(dict.fromkeys(text for text in texts if text))
+        keys = {text: self.cache_key(text) for text in unique}
+
+        results: Dict[str, Optional[bytes]] = {}
+        missing = []
+        for text in unique:
+            audio_data = self.cache.get(keys[text], self.config.audio_format) if self.cache else None
+            if audio_data is None:
+                missing.append(text)
+            else:
+                results[text] = audio_data
+
+        if missing:
+            if executor == "auto":
+                executor = "process" if self.config.engine == "pyttsx3" else "thread"
+            n_workers = max(1, min(n_workers, len(missing)))
+
+            if n_workers == 1:
+                rendered = [self._synthesize_in_batch(text) for text in missing]
+            elif executor == "process":
+                worker_config = replace(self.config, cache_enabled=False)
+                with ProcessPoolExecutor(max_workers=n_workers,
+                                         initializer=_init_synthesis_worker,
+                                         initargs=(type(self), worker_config)) as pool:
+                    rendered = list(pool.map(_synthesize_in_worker, missing))
+            else:
+                with ThreadPoolExecutor(max_workers=n_workers) as pool:
+                    rendered = list(pool.map(self._synthesize_in_batch, missing))
+
+            for text, audio_data in zip(missing, rendered):
+                results[text] = audio_data
+                if audio_data is not None and self.cache is not None:
+                    self.cache.put(keys[text], audio_data, self.config.audio_format)
+
+        self.last_batch_stats = {
+            "requested": len(texts),
+            "unique": len(unique),
+            "cached": len(unique) - len(missing),
+            "rendered": sum(1 for text in missing if results[text] is not None),
+            "failed": [text for text in missing if results[text] is None],
+            "wall_time": time.time() - start_time,
+        }
+        return [results.get(text) for text in texts]
+
+    def prerender(self,
+                  phrases: Iterable[str],
+                  n_workers: int = 4,
+                  background: bool = False) -> Union[Dict[str, Any], threading.Thread]:
+        """
+        预先合成常用短语（如"订单已成交"、"止损已触发"），通常在启动时调用
 
+        参数:
+            phrases: 短语列表
+            n_workers: 工作进程/线程数
+            background: 是否在后台线程中合成
+
+        返回:
+            前台合成时返回批量合成统计，后台合成时返回已启动的线程
+        """
+        if self.cache is None:
+            logger.warning("未启用合成缓存，预合成结果不会被保留")
+
+        phrases = list(phrases)
+        if background:
+            thread = threading.Thread(target=self.synthesize_batch, args=(phrases, n_workers),
+                                      name="tts-prerender", daemon=True)
+            thread.start()
+            return thread
+
+        self.synthesize_batch(phrases, n_workers=n_workers)
+        logger.info(f"预合成完成: {self.last_batch_stats['rendered']} 条新合成，"
+                    f"{self.last_batch_stats['cached']} 条已缓存")
+        return self.last_batch_stats
+
+    def _synthesize_in_batch(self, text: str) -> Optional[bytes]:
+        """批量合成中的单条合成，失败时返回None"""
+        try:
+            return self._synthesize_engine(text)
         except Exception as e:
             logger.error(f"合成语音失败: {str(e)}")
             return None
 
+    def _synthesize_engine(self,
+                           text: str,
+                           output_file: Optional[str] = None) -> Optional[bytes]:
+        """
+        调用当前引擎合成语音（不经过缓存）
+
+        参数:
+            text: 要合成的文本
+            output_file: 输出文件路径
+
+        返回:
+            如果output_file为None，则返回音频字节数据，否则返回None
+        """
+        if self.config.engine == "gtts":
+            return self._synthesize_gtts(text, output_file)
+        elif self.config.engine == "pyttsx3":
+            return self._synthesize_pyttsx3(text, output_file)
+        elif self.config.engine == "azure":
+            return self._synthesize_azure(text, output_file)
+        elif self.config.engine == "aws":
+            return self._synthesize_aws(text, output_file)
+        else:
+            logger.error(f"不支持的合成引擎: {self.config.engine}")
+            return None
+
+    def _write_output(self, output_file: str, audio_data: bytes):
+        """将音频数据写入输出文件"""
+        directory = os.path.dirname(output_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with open(output_file, "wb") as f:
+            f.write(audio_data)
+        logger.info(f"语音已保存到: {output_file}")
+
     def _synthesize_gtts(self,
                          text: str,
                          output_file: Optional[str] = None) -> Optional[bytes]:
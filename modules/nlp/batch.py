@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+NLP模块: 批处理引擎
+功能描述: 为情感分析和分词提供批量处理支持，包括编译词典的向量化打分、
+         按分片分发到进程池（每个工作进程只加载一次模型/词典）以及流式迭代接口
+版本: 1.0.0
+作者: 窗口6开发人员
+创建日期: 2026-10-18
+"""
+
+import os
+import re
+import time
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+from typing import Dict, List, Any, Optional, Callable, Iterable, Iterator
+
+import numpy as np
+
+# 初始化日志记录器
+logger = logging.getLogger(__name__)
+
+# 工作进程内的处理对象，由 _init_worker 在进程启动时创建一次
+_WORKER_INSTANCE = None
+
+
+def _init_worker(factory: Callable, factory_kwargs: Dict[str, Any]):
+    """工作进程初始化：创建处理对象（加载词典或模型）"""
+    global _WORKER_INSTANCE
+    _WORKER_INSTANCE = factory(**factory_kwargs)
+
+
+def _run_chunk(method: str, chunk: List[Any]) -> List[Any]:
+    """在工作进程内处理一个分片"""
+    return getattr(_WORKER_INSTANCE, method)(chunk)
+
+
+def iter_chunks(items: Iterable[Any], chunk_size: int) -> Iterator[List[Any]]:
+    """
+    将可迭代对象切分为固定大小的分片
+
+    参数:
+        items: 输入数据，可以是无界的迭代器
+        chunk_size: 分片大小
+
+    返回:
+        分片迭代器
+    """
+    iterator = iter(items)
+    chunk_size = max(1, int(chunk_size))
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class CompiledLexicon:
+    """
+    编译后的情感词典
+
+    将词典转换为 词→编号 映射和得分数组。整批文本只做一次正则分词，
+    词到编号的查找在C层完成，各文本的得分通过 np.bincount 一次汇总。
+    结果与逐词累加的基础分析器一致。
+    """
+
+    # 文本之间以换行分隔，换行本身作为分隔标记参与匹配
+    TOKEN_PATTERN = re.compile(r"\w+|\n")
+    SEPARATOR_ID = -1
+
+    def __init__(self, lexicon: Dict[str, float]):
+        """
+        编译情感词典
+
+        参数:
+            lexicon: 情感词典，词→得分
+        """
+        # 词典内容的快照，用于发现替换或原地修改(增删词条、修改得分)
+        self.source = dict(lexicon)
+        self.size = len(lexicon)
+        self._index = {word: i + 1 for i, word in enumerate(lexicon)}
+        self._index["\n"] = self.SEPARATOR_ID
+        # 第0项为未登录词
+        self.scores = np.zeros(self.size + 1)
+        self.scores[1:] = np.fromiter(lexicon.values(), dtype=float, count=self.size)
+
+    def is_stale(self, lexicon: Dict[str, float]) -> bool:
+        """检查编译结果是否与给定词典不一致，按内容比较(C层逐项比较，开销远小于重新编译)"""
+        return lexicon != self.source
+
+    def score_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        批量计算文本情感得分
+
+        参数:
+            texts: 文本列表
+
+        返回:
+            形状为 (len(texts), 4) 的矩阵，列依次为 positive, negative, neutral, compound
+        """
+        n = len(texts)
+        result = np.zeros((n, 4))
+        result[:, 2] = 1.0
+        if n == 0:
+            return result
+
+        # 换行不属于\w，替换为空格不影响分词结果
+        joined = "\n".join(text.replace("\n", " ") for text in texts).lower()
+        words = self.TOKEN_PATTERN.findall(joined)
+        ids = np.fromiter(
+            map(self._index.get, words, repeat(0)), dtype=np.int64, count=len(words)
+        )
+
+        doc = np.cumsum(ids == self.SEPARATOR_ID)
+        matched = ids > 0
+        doc, word_scores = doc[matched], self.scores[ids[matched]]
+
+        positive = word_scores > 0
+        total = np.bincount(doc, minlength=n)
+        positive_sum = np.bincount(
+            doc[positive], weights=word_scores[positive], minlength=n
+        )
+        negative_sum = np.bincount(
+            doc[~positive], weights=np.abs(word_scores[~positive]), minlength=n
+        )
+
+        has_match = total > 0
+        denominator = np.where(has_match, total, 1)
+        positive_avg = np.where(positive_sum > 0, positive_sum / denominator, 0.0)
+        negative_avg = np.where(negative_sum > 0, negative_sum / denominator, 0.0)
+
+        result[:, 0] = positive_avg
+        result[:, 1] = negative_avg
+        result[:, 2] = np.where(has_match, 1.0 - (positive_avg + negative_avg), 1.0)
+        result[:, 3] = positive_avg - negative_avg
+        return result
+
+
+class ProcessBatchRunner:
+    """
+    进程池批处理器
+
+    每个工作进程启动时通过 factory(**factory_kwargs) 创建一次处理对象，
+    之后按分片调用其 method 方法，结果按输入顺序返回。
+    """
+
+    def __init__(
+        self,
+        factory: Callable,
+        factory_kwargs: Optional[Dict[str, Any]] = None,
+        method: str = "process",
+        n_workers: Optional[int] = None,
+        chunk_size: int = 1000,
+        max_pending: Optional[int] = None,
+    ):
+        """
+        初始化进程池批处理器
+
+        参数:
+            factory: 处理对象的构造函数，必须可被pickle
+            factory_kwargs: 构造参数
+            method: 处理分片时调用的方法名，接收列表并返回等长列表
+            n_workers: 工作进程数，默认使用CPU核数
+            chunk_size: 每个分片的数据条数
+            max_pending: 同时在途的最大分片数，默认为工作进程数的2倍
+        """
+        self.factory = factory
+        self.factory_kwargs = factory_kwargs or {}
+        self.method = method
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.chunk_size = max(1, int(chunk_size))
+        self.max_pending = max_pending or self.n_workers * 2
+        self.executor = None
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        """按需启动进程池"""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.n_workers,
+                initializer=_init_worker,
+                initargs=(self.factory, self.factory_kwargs),
+            )
+            logger.info(f"启动批处理进程池: {self.n_workers} 个工作进程")
+        return self.executor
+
+    def imap(self, items: Iterable[Any]) -> Iterator[Any]:
+        """
+        流式处理，在途分片数有上限，适用于无界输入
+
+        参数:
+            items: 输入数据
+
+        返回:
+            按输入顺序排列的结果迭代器
+        """
+        executor = self._ensure_executor()
+        pending = deque()
+        for chunk in iter_chunks(items, self.chunk_size):
+            pending.append(executor.submit(_run_chunk, self.method, chunk))
+            if len(pending) >= self.max_pending:
+                yield from pending.popleft().result()
+
+        while pending:
+            yield from pending.popleft().result()
+
+    def map(self, items: Iterable[Any]) -> List[Any]:
+        """
+        批量处理
+
+        参数:
+            items: 输入数据
+
+        返回:
+            按输入顺序排列的结果列表
+        """
+        return list(self.imap(items))
+
+    def close(self):
+        """关闭进程池"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def benchmark_batch_throughput(
+    batch_fn: Callable[..., List[Any]],
+    texts: List[str],
+    worker_counts: Iterable[int] = (1, 2, 4),
+) -> Dict[int, float]:
+    """
+    测试不同工作进程数下的批处理吞吐量
+
+    参数:
+        batch_fn: 批处理函数，如 SentimentAnalyzer.analyze_batch，需接受 n_workers 参数
+        texts: 测试文本列表
+        worker_counts: 需要测试的工作进程数
+
+    返回:
+        工作进程数到每秒处理文本数的映射
+    """
+    results = {}
+    for n_workers in worker_counts:
+        start_time = time.perf_counter()
+        batch_fn(texts, n_workers=n_workers)
+        elapsed = time.perf_counter() - start_time
+
+        results[n_workers] = len(texts) / elapsed if elapsed > 0 else float("inf")
+        logger.info(f"{n_workers} 个工作进程: {results[n_workers]:.1f} 文本/秒")
+
+    return results
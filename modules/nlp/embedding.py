@@ -8,12 +8,17 @@ NLP模块: 词嵌入
 """
 
 import os
+import time
 import logging
 import pickle
+import hashlib
+from collections import OrderedDict
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Union, Tuple
 import numpy as np
 
+from .vector_index import VectorIndex
+
 # 尝试导入可选依赖
 try:
     from gensim.models import Word2Vec, KeyedVectors
@@ -66,6 +71,17 @@ class EmbeddingModel:
         self.tokenizer = None
         self.word_vectors = {}  # 词向量缓存
 
+        # 文本向量LRU缓存，键为文本内容哈希
+        self.cache_size = int(kwargs.get("cache_size", 10000))
+        self.text_cache = OrderedDict()
+
+        # 批量词向量平均使用的词表矩阵，第0行为填充用零向量；
+        # 词数超过vocab_cache_size时在下一批开始前清空重建
+        self.vocab_cache_size = int(kwargs.get("vocab_cache_size", 100000))
+        self._vocab_index = {}
+        self._vocab_matrix = None
+        self._vocab_size = 0
+
         # 验证模型类型
         if self.model_type not in self.SUPPORTED_TYPES:
             logger.warning(
@@ -79,6 +95,7 @@ class EmbeddingModel:
 
     def _initialize_model(self):
         """初始化词嵌入模型"""
+        self._reset_vocab()
         try:
             if self.model_path and os.path.exists(self.model_path):
                 if self.model_type == "word2vec" and GENSIM_AVAILABLE:
@@ -154,6 +171,198 @@ class EmbeddingModel:
         sentence_embedding = outputs.last_hidden_state[:, 0, :].cpu().numpy()
         return sentence_embedding[0]  # 返回第一个样本的嵌入
 
+    def _get_bert_embeddings(self, texts: List[str]) -> np.ndarray:
+        """
+        批量获取BERT模型的文本嵌入，按批内最长文本动态填充
+
+        参数:
+            texts: 输入文本列表
+
+        返回:
+            形状为 (len(texts), embedding_dim) 的嵌入矩阵
+        """
+        if not TRANSFORMERS_AVAILABLE or self.model is None:
+            return np.zeros((len(texts), self.embedding_dim))
+
+        # padding=True 只填充到本批次最长序列，而不是模型最大长度
+        inputs = self.tokenizer(
+            texts, return_tensors="pt", padding=True, truncation=True
+        )
+        if self.device == "cuda" and torch.cuda.is_available():
+            inputs = {k: v.to("cuda") for k, v in inputs.items()}
+
+        with torch.no_grad():
+            outputs = self.model(**inputs)
+
+        return outputs.last_hidden_state[:, 0, :].cpu().numpy()
+
+    def _text_cache_key(self, text: str, tokens: Optional[List[str]] = None) -> str:
+        """
+        生成文本向量缓存键（基于内容哈希）
+
+        参数:
+            text: 输入文本
+            tokens: 可选的分词列表
+
+        返回:
+            缓存键
+        """
+        content = text if tokens is None else "\x1f".join(tokens)
+        prefix = "t" if tokens is None else "k"
+        digest = hashlib.sha1(content.encode("utf-8")).hexdigest()
+        return f"{self.model_type}:{prefix}:{digest}"
+
+    def _add_to_cache(self, key: str, vector: np.ndarray):
+        """
+        将文本向量添加到LRU缓存
+
+        参数:
+            key: 缓存键
+            vector: 文本向量
+        """
+        if self.cache_size <= 0:
+            return
+
+        if key in self.text_cache:
+            self.text_cache.move_to_end(key)
+        elif len(self.text_cache) >= self.cache_size:
+            self.text_cache.popitem(last=False)  # 移除最久未使用的项
+
+        self.text_cache[key] = vector
+
+    def _get_from_cache(self, key: str) -> Optional[np.ndarray]:
+        """
+        从LRU缓存获取文本向量
+
+        参数:
+            key: 缓存键
+
+        返回:
+            缓存的文本向量，如果不存在则返回None
+        """
+        vector = self.text_cache.get(key)
+        if vector is not None:
+            self.text_cache.move_to_end(key)
+        return vector
+
+    def clear_cache(self):
+        """清空文本向量缓存和词表矩阵"""
+        self.text_cache.clear()
+        self._reset_vocab()
+        logger.debug("文本向量缓存已清空")
+
+    def _reset_vocab(self):
+        """清空批量词向量平均使用的词表矩阵"""
+        self._vocab_index = {}
+        self._vocab_matrix = None
+        self._vocab_size = 0
+
+    def _lookup_word_vector(self, word: str) -> Optional[np.ndarray]:
+        """
+        查找单词向量但不写入word_vectors缓存
+
+        参数:
+            word: 输入单词
+
+        返回:
+            词向量，如果单词不存在则返回None
+        """
+        if word in self.word_vectors:
+            return self.word_vectors[word]
+
+        try:
+            if (
+                self.model_type in ["word2vec", "fasttext", "glove"]
+                and GENSIM_AVAILABLE
+                and self.model is not None
+                and word in self.model
+            ):
+                return self.model[word]
+        except Exception as e:
+            logger.debug(f"获取词向量失败: {word}, 错误: {str(e)}")
+
+        return None
+
+    def _get_token_ids(self, tokens: List[str]) -> List[int]:
+        """
+        将分词映射为词表矩阵中的行号，新词会追加到词表矩阵
+
+        参数:
+            tokens: 分词列表
+
+        返回:
+            行号列表，未登录词映射到第0行（零向量）
+        """
+        ids = []
+        for token in tokens:
+            index = self._vocab_index.get(token)
+            if index is None:
+                vector = self._lookup_word_vector(token)
+                index = 0 if vector is None else self._append_vocab_vector(vector)
+                self._vocab_index[token] = index
+            ids.append(index)
+        return ids
+
+    def _append_vocab_vector(self, vector: np.ndarray) -> int:
+        """
+        向词表矩阵追加一个向量，容量不足时按倍数扩容
+
+        参数:
+            vector: 词向量
+
+        返回:
+            新向量所在行号
+        """
+        if self._vocab_matrix is None:
+            self._vocab_matrix = np.zeros((1024, self.embedding_dim))
+            self._vocab_size = 1
+
+        if self._vocab_size >= self._vocab_matrix.shape[0]:
+            grown = np.zeros((self._vocab_matrix.shape[0] * 2, self.embedding_dim))
+            grown[: self._vocab_size] = self._vocab_matrix[: self._vocab_size]
+            self._vocab_matrix = grown
+
+        index = self._vocab_size
+        self._vocab_matrix[index] = vector
+        self._vocab_size += 1
+        return index
+
+    def _average_word_vectors(self, token_lists: List[List[str]]) -> np.ndarray:
+        """
+        向量化计算多段文本的平均词向量
+
+        将分词转换为填充后的行号矩阵，通过一次NumPy索引取出全部词向量后求均值。
+        未登录词计为零向量并计入分母，与逐词求平均的结果一致。
+
+        参数:
+            token_lists: 每段文本的分词列表
+
+        返回:
+            形状为 (len(token_lists), embedding_dim) 的嵌入矩阵
+        """
+        result = np.zeros((len(token_lists), self.embedding_dim))
+        lengths = np.array([len(tokens) for tokens in token_lists])
+        if lengths.size == 0 or lengths.max() == 0:
+            return result
+
+        # 只在批开始前清空，保证同一批内的行号有效
+        if len(self._vocab_index) >= self.vocab_cache_size:
+            self._reset_vocab()
+
+        id_matrix = np.zeros((len(token_lists), lengths.max()), dtype=np.int64)
+        for row, tokens in enumerate(token_lists):
+            if tokens:
+                id_matrix[row, : len(tokens)] = self._get_token_ids(tokens)
+
+        if self._vocab_matrix is None:
+            return result  # 所有词均未登录
+
+        # 一次gather取出 (文本数, 最大长度, 维度) 的向量块，填充位为零向量
+        sums = self._vocab_matrix[id_matrix].sum(axis=1)
+        nonempty = lengths > 0
+        result[nonempty] = sums[nonempty] / lengths[nonempty, None]
+        return result
+
     def get_word_vector(self, word: str) -> np.ndarray:
         """
         获取单词的词向量
@@ -203,23 +412,78 @@ class EmbeddingModel:
         返回:
             文本嵌入向量
         """
-        if (
+        token_lists = None if tokens is None else [tokens]
+        return self.get_text_embeddings([text], tokens_list=token_lists)[0]
+
+    def _is_bert_ready(self) -> bool:
+        """检查BERT模型是否可用"""
+        return (
             self.model_type == "bert"
             and TRANSFORMERS_AVAILABLE
             and self.model is not None
-        ):
-            return self._get_bert_embedding(text)
+        )
 
-        # 如果没有提供分词，则将文本按空格分割
-        if tokens is None:
-            tokens = text.split()
+    def get_text_embeddings(
+        self,
+        texts: List[str],
+        batch_size: int = 32,
+        tokens_list: Optional[List[List[str]]] = None,
+    ) -> np.ndarray:
+        """
+        批量获取文本的嵌入向量
 
-        if not tokens:
-            return np.zeros(self.embedding_dim)
+        已缓存的文本直接返回缓存结果；未缓存的文本去重后按长度分桶排序，
+        再按batch_size切分批次计算，以减少动态填充带来的浪费。
 
-        # 获取每个词的向量，然后取平均
-        vectors = [self.get_word_vector(token) for token in tokens]
-        return np.mean(vectors, axis=0)
+        参数:
+            texts: 输入文本列表
+            batch_size: 每批次的文本数量
+            tokens_list: 可选的分词列表，与texts一一对应
+
+        返回:
+            形状为 (len(texts), embedding_dim) 的嵌入矩阵
+        """
+        if tokens_list is not None and len(tokens_list) != len(texts):
+            raise ValueError("tokens_list 长度必须与 texts 一致")
+
+        batch_size = max(1, int(batch_size))
+        use_bert = self._is_bert_ready()
+        result = np.zeros((len(texts), self.embedding_dim))
+
+        # 命中缓存的直接填入，未命中的按缓存键去重
+        pending = OrderedDict()
+        for i, text in enumerate(texts):
+            tokens = None if tokens_list is None else tokens_list[i]
+            key = self._text_cache_key(text, None if use_bert else tokens)
+            cached = self._get_from_cache(key)
+            if cached is not None:
+                result[i] = cached
+            elif key in pending:
+                pending[key][1].append(i)
+            else:
+                if not use_bert and tokens is None:
+                    tokens = text.split()
+                pending[key] = (text if use_bert else tokens, [i])
+
+        if not pending:
+            return result
+
+        # 按长度分桶，使同一批次内的序列长度相近
+        keys = sorted(pending, key=lambda k: len(pending[k][0]))
+        for start in range(0, len(keys), batch_size):
+            batch_keys = keys[start: start + batch_size]
+            items = [pending[k][0] for k in batch_keys]
+            if use_bert:
+                vectors = self._get_bert_embeddings(items)
+            else:
+                vectors = self._average_word_vectors(items)
+
+            for key, vector in zip(batch_keys, vectors):
+                vector = np.array(vector)
+                self._add_to_cache(key, vector)
+                result[pending[key][1]] = vector
+
+        return result
 
     def get_similarity(self, text1: str, text2: str) -> float:
         """
@@ -268,6 +532,54 @@ class EmbeddingModel:
 
         return []
 
+    def build_vector_index(
+        self,
+        texts: List[str],
+        ids: Optional[List[int]] = None,
+        index: Optional[VectorIndex] = None,
+        batch_size: int = 32,
+        **index_kwargs,
+    ) -> VectorIndex:
+        """
+        嵌入文本并写入向量索引
+
+        参数:
+            texts: 待索引的文本列表
+            ids: 可选的文本编号，为None时自动分配
+            index: 已有的向量索引，为None时新建
+            batch_size: 嵌入批大小
+            **index_kwargs: 新建索引时传给VectorIndex的参数
+
+        返回:
+            写入后的向量索引
+        """
+        if index is None:
+            index = VectorIndex(dim=self.embedding_dim, **index_kwargs)
+        if texts:
+            index.add(self.get_text_embeddings(texts, batch_size=batch_size), ids)
+        return index
+
+    def search_similar_texts(
+        self, text: str, index: VectorIndex, n: int = 10
+    ) -> List[Tuple[int, float]]:
+        """
+        在向量索引中查找与给定文本最相似的n条记录
+
+        参数:
+            text: 查询文本
+            index: 向量索引
+            n: 返回结果数量
+
+        返回:
+            (编号, 相似度) 列表，按相似度降序排序
+        """
+        scores, ids = index.search(self.get_text_embedding(text), k=n)
+        return [
+            (int(i), float(score))
+            for i, score in zip(ids[0], scores[0])
+            if i >= 0
+        ]
+
     def save_word_vectors(self, save_path: str):
         """
         保存词向量缓存到文件
@@ -287,6 +599,39 @@ class EmbeddingModel:
             logger.error(f"保存词向量失败: {str(e)}")
 
 
+def benchmark_embedding_throughput(
+    model: EmbeddingModel,
+    texts: List[str],
+    batch_sizes: Tuple[int, ...] = (1, 2, 4, 8, 16, 32, 64, 128, 256),
+    use_cache: bool = False,
+) -> Dict[int, float]:
+    """
+    在CPU上测试不同批大小下的批量嵌入吞吐量
+
+    参数:
+        model: 词嵌入模型
+        texts: 测试文本列表
+        batch_sizes: 需要测试的批大小
+        use_cache: 是否保留文本向量缓存，为False时每轮测试前清空缓存
+
+    返回:
+        批大小到每秒处理文本数的映射
+    """
+    results = {}
+    for batch_size in batch_sizes:
+        if not use_cache:
+            model.clear_cache()
+
+        start_time = time.perf_counter()
+        model.get_text_embeddings(texts, batch_size=batch_size)
+        elapsed = time.perf_counter() - start_time
+
+        results[batch_size] = len(texts) / elapsed if elapsed > 0 else float("inf")
+        logger.info(f"批大小 {batch_size}: {results[batch_size]:.1f} 文本/秒")
+
+    return results
+
+
 def load_embedding_model(model_config: Dict[str, Any]) -> EmbeddingModel:
     """
     根据配置加载词嵌入模型
@@ -7,33 +7,37 @@ NLP模块: 情感分析
 创建日期: 2025-04-17
 """
 
-from .. config.config_loader import ConfigLoader
-from transformers import pipeline
-import core
 import os
 import re
 import logging
 import pickle
-from typing import Dict, List, Any, Optional, Union, Tuple
-import modules.nlp as np
+from typing import Dict, List, Any, Optional, Union, Tuple, Iterable, Iterator
+
+from .batch import CompiledLexicon, ProcessBatchRunner, iter_chunks
 
 # 尝试导入可选依赖
 try:
-import modules.nlp
-from modules.nlp.sentiment import SentimentIntensityAnalyzer
-NLTK_AVAILABLE = True
+    import nltk
+    from nltk.sentiment import SentimentIntensityAnalyzer
+
+    NLTK_AVAILABLE = True
 except ImportError:
     NLTK_AVAILABLE = False
 
 try:
-TRANSFORMERS_AVAILABLE = True
+    import torch
+    from transformers import pipeline
+
+    TRANSFORMERS_AVAILABLE = True
 except ImportError:
     TRANSFORMERS_AVAILABLE = False
 
 # 从配置加载器获取配置
 try:
-config_loader = ConfigLoader()
-SENTIMENT_CONFIG = config_loader.load("modules.nlp.sentiment")
+    from config.config_loader import ConfigLoader
+
+    config_loader = ConfigLoader()
+    SENTIMENT_CONFIG = config_loader.load("modules.nlp.sentiment")
 except ImportError:
     SENTIMENT_CONFIG = {
         "default_analyzer": "basic",
@@ -76,6 +80,8 @@ class SentimentAnalyzer:
         self.language = language
         self.device = device
         self.analyzer = None
+        self._compiled_lexicon = None
+        self._batch_runner = None
 
         # 设置情感阈值
         if thresholds is None:
@@ -277,41 +283,104 @@ class SentimentAnalyzer:
 
             # 解析结果
             if result and isinstance(result, list) and len(result) > 0:
-                label = result[0]["label"].lower()
-                score = result[0]["score"]
-
-                # 转换为标准格式
-                if "positive" in label:
-                    return {
-                        "positive": score,
-                        "negative": 1.0 - score,
-                        "neutral": 0.0,
-                        "compound": 2 * score - 1.0  # 将[0,1]映射到[-1,1]
-                    }
-                elif "negative" in label:
-                    return {
-                        "positive": 1.0 - score,
-                        "negative": score,
-                        "neutral": 0.0,
-                        "compound": 1.0 - 2 * score  # 将[0,1]映射到[1,-1]
-                    }
-                elif "neutral" in label:
-                    neutral_score = score
-                    # 平分剩余概率
-                    remaining = 1.0 - neutral_score
-                    half_remaining = remaining / 2.0
-                    return {
-                        "positive": half_remaining,
-                        "negative": half_remaining,
-                        "neutral": neutral_score,
-                        "compound": 0.0  # 中性结果复合得分为0
-                    }
+                scores = self._convert_transformer_result(result[0])
+                if scores is not None:
+                    return scores
         except Exception as e:
             logger.error(f"Transformer情感分析错误: {str(e)}")
 
         # 失败时回退到基础分析
         return self._analyze_basic(text)
 
+    def _convert_transformer_result(self, result: Dict[str, Any]) -> Optional[Dict[str, float]]:
+        """
+        将pipeline的单条输出转换为标准情感得分格式
+
+        参数:
+            result: pipeline输出，包含 label 和 score
+
+        返回:
+            情感得分字典，无法识别标签时返回None
+        """
+        label = result["label"].lower()
+        score = result["score"]
+
+        # 转换为标准格式
+        if "positive" in label:
+            return {
+                "positive": score,
+                "negative": 1.0 - score,
+                "neutral": 0.0,
+                "compound": 2 * score - 1.0  # 将[0,1]映射到[-1,1]
+            }
+        elif "negative" in label:
+            return {
+                "positive": 1.0 - score,
+                "negative": score,
+                "neutral": 0.0,
+                "compound": 1.0 - 2 * score  # 将[0,1]映射到[1,-1]
+            }
+        elif "neutral" in label:
+            neutral_score = score
+            # 平分剩余概率
+            remaining = 1.0 - neutral_score
+            half_remaining = remaining / 2.0
+            return {
+                "positive": half_remaining,
+                "negative": half_remaining,
+                "neutral": neutral_score,
+                "compound": 0.0  # 中性结果复合得分为0
+            }
+        return None
+
+    def _analyze_transformer_batch(self, texts: List[str], batch_size: int = 32) -> List[Dict[str, float]]:
+        """
+        使用Transformer模型批量分析文本情感，一次前向计算处理batch_size条文本
+
+        参数:
+            texts: 文本列表
+            batch_size: 模型前向计算的批大小
+
+        返回:
+            情感得分字典列表
+        """
+        if not TRANSFORMERS_AVAILABLE or self.analyzer is None:
+            return self._analyze_basic_batch(texts)
+
+        try:
+            results = self.analyzer(texts, batch_size=batch_size, truncation=True)
+        except Exception as e:
+            logger.error(f"Transformer批量情感分析错误: {str(e)}")
+            return self._analyze_basic_batch(texts)
+
+        scores_list = []
+        for text, result in zip(texts, results):
+            scores = self._convert_transformer_result(result)
+            scores_list.append(scores if scores is not None else self._analyze_basic(text))
+        return scores_list
+
+    def _get_compiled_lexicon(self) -> CompiledLexicon:
+        """获取编译后的情感词典，词典被替换或修改后重新编译"""
+        if self._compiled_lexicon is None or self._compiled_lexicon.is_stale(self.sentiment_lexicon):
+            self._compiled_lexicon = CompiledLexicon(self.sentiment_lexicon)
+        return self._compiled_lexicon
+
+    def _analyze_basic_batch(self, texts: List[str]) -> List[Dict[str, float]]:
+        """
+        使用编译词典批量分析文本情感，结果与 _analyze_basic 一致
+
+        参数:
+            texts: 文本列表
+
+        返回:
+            情感得分字典列表
+        """
+        matrix = self._get_compiled_lexicon().score_batch(texts)
+        return [
+            {"positive": row[0], "negative": row[1], "neutral": row[2], "compound": row[3]}
+            for row in matrix.tolist()
+        ]
+
     def _analyze_custom(self, text: str) -> Dict[str, float]:
         """
         使用自定义模型分析文本情感
@@ -377,6 +446,18 @@ class SentimentAnalyzer:
         else:  # basic
             scores = self._analyze_basic(text)
 
+        return self._build_result(scores)
+
+    def _build_result(self, scores: Dict[str, float]) -> Dict[str, Any]:
+        """
+        根据情感得分确定标签和置信度
+
+        参数:
+            scores: 情感得分字典
+
+        返回:
+            情感分析结果，包含得分和标签
+        """
         # 根据阈值确定情感标签
         label = "neutral"
         if scores["positive"] >= self.thresholds["positive"] and scores["positive"] > scores["negative"]:
@@ -398,17 +479,119 @@ class SentimentAnalyzer:
             "confidence": confidence
         }
 
-    def analyze_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+    def analyze_batch(self,
+                      texts: List[str],
+                      n_workers: int = 1,
+                      batch_size: int = 32,
+                      chunk_size: int = 1000) -> List[Dict[str, Any]]:
         """
         批量分析文本情感
 
         参数:
             texts: 文本列表
+            n_workers: 工作进程数，大于1时按分片分发到进程池
+            batch_size: Transformer模型前向计算的批大小
+            chunk_size: 分发到工作进程的分片大小
 
         返回:
             情感分析结果列表
         """
-        return [self.analyze(text) for text in texts]
+        if n_workers > 1:
+            return self._get_batch_runner(n_workers, chunk_size).map(texts)
+        return self._analyze_batch_local(texts, batch_size=batch_size)
+
+    def iter_analyze(self,
+                     texts: Iterable[str],
+                     n_workers: int = 1,
+                     batch_size: int = 32,
+                     chunk_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """
+        流式分析文本情感，适用于无界的文本流
+
+        参数:
+            texts: 文本迭代器
+            n_workers: 工作进程数，大于1时按分片分发到进程池
+            batch_size: Transformer模型前向计算的批大小
+            chunk_size: 每次处理的分片大小
+
+        返回:
+            按输入顺序排列的情感分析结果迭代器
+        """
+        if n_workers > 1:
+            yield from self._get_batch_runner(n_workers, chunk_size).imap(texts)
+            return
+
+        for chunk in iter_chunks(texts, chunk_size):
+            yield from self._analyze_batch_local(chunk, batch_size=batch_size)
+
+    def _analyze_batch_local(self, texts: List[str], batch_size: int = 32) -> List[Dict[str, Any]]:
+        """
+        在当前进程内批量分析文本情感
+
+        basic类型使用编译词典的向量化路径，transformer类型使用批量前向计算，
+        其他类型逐条分析。
+
+        参数:
+            texts: 文本列表
+            batch_size: Transformer模型前向计算的批大小
+
+        返回:
+            情感分析结果列表
+        """
+        if self.analyzer_type in ("vader", "custom"):
+            return [self.analyze(text) for text in texts]
+
+        # 空文本直接返回中性结果，其余文本进入批量路径
+        results = [None] * len(texts)
+        indices = []
+        for i, text in enumerate(texts):
+            if text and text.strip():
+                indices.append(i)
+            else:
+                results[i] = self.analyze(text)
+
+        batch_texts = [texts[i] for i in indices]
+        if self.analyzer_type == "transformer":
+            scores_list = self._analyze_transformer_batch(batch_texts, batch_size=batch_size)
+        else:  # basic
+            scores_list = self._analyze_basic_batch(batch_texts)
+
+        for i, scores in zip(indices, scores_list):
+            results[i] = self._build_result(scores)
+        return results
+
+    def _get_batch_runner(self, n_workers: int, chunk_size: int) -> ProcessBatchRunner:
+        """获取进程池批处理器，工作进程内以相同配置创建分析器，词典变化后重建"""
+        runner = self._batch_runner
+        if (
+            runner is None
+            or runner.n_workers != n_workers
+            or runner.chunk_size != chunk_size
+            or runner.factory_kwargs["sentiment_lexicon"] != self.sentiment_lexicon
+        ):
+            self.close()
+            runner = ProcessBatchRunner(
+                factory=SentimentAnalyzer,
+                factory_kwargs={
+                    "analyzer_type": self.analyzer_type,
+                    "model_path": self.model_path,
+                    "sentiment_lexicon": dict(self.sentiment_lexicon),
+                    "thresholds": self.thresholds,
+                    "language": self.language,
+                    "device": self.device,
+                },
+                method="_analyze_batch_local",
+                n_workers=n_workers,
+                chunk_size=chunk_size,
+            )
+            self._batch_runner = runner
+        return runner
+
+    def close(self):
+        """关闭批处理进程池"""
+        if self._batch_runner is not None:
+            self._batch_runner.close()
+            self._batch_runner = None
 
     def extract_sentiment_aspects(self, text: str, aspects: List[str]) -> Dict[str, Dict[str, Any]]:
         """
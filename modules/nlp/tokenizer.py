@@ -7,21 +7,25 @@ NLP模块: 分词器
 创建日期: 2025-04-17
 """
 
-import start
 import re
 import logging
-from typing import List, Dict, Any, Optional, Union
-from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Union, Iterable, Iterator
+from dataclasses import asdict, dataclass
+
+from .batch import ProcessBatchRunner, iter_chunks
 
 # 尝试导入可选依赖
 try:
-import ui.views
-JIEBA_AVAILABLE = True
+    import jieba
+
+    JIEBA_AVAILABLE = True
 except ImportError:
     JIEBA_AVAILABLE = False
 
 try:
-SPACY_AVAILABLE = True
+    import spacy
+
+    SPACY_AVAILABLE = True
 except ImportError:
     SPACY_AVAILABLE = False
 
@@ -80,6 +84,8 @@ class Tokenizer:
         else:
             self.config = config
 
+        self._batch_runner = None
+
         # 加载和初始化分词资源
         self._initialize_tokenizer()
         logger.info(
@@ -174,6 +180,18 @@ class Tokenizer:
             # 基础分词，按空白字符分割
             tokens = text.split()
 
+        return self._postprocess_tokens(tokens)
+
+    def _postprocess_tokens(self, tokens: List[str]) -> List[str]:
+        """
+        移除停用词和空标记
+
+        参数:
+            tokens: 分词列表
+
+        返回:
+            处理后的分词列表
+        """
         # 移除停用词
         tokens = self._remove_stopwords(tokens)
 
@@ -182,17 +200,90 @@ class Tokenizer:
 
         return tokens
 
-    def tokenize_batch(self, texts: List[str]) -> List[List[str]]:
+    def tokenize_batch(self,
+                       texts: List[str],
+                       n_workers: int = 1,
+                       chunk_size: int = 1000) -> List[List[str]]:
         """
         批量分词
 
         参数:
             texts: 文本列表
+            n_workers: 工作进程数，大于1时按分片分发到进程池
+            chunk_size: 分发到工作进程的分片大小
 
         返回:
             分词结果列表，每个元素是一个标记列表
         """
-        return [self.tokenize(text) for text in texts]
+        if n_workers > 1:
+            return self._get_batch_runner(n_workers, chunk_size).map(texts)
+        return self._tokenize_batch_local(texts)
+
+    def iter_tokenize(self,
+                      texts: Iterable[str],
+                      n_workers: int = 1,
+                      chunk_size: int = 1000) -> Iterator[List[str]]:
+        """
+        流式分词，适用于无界的文本流
+
+        参数:
+            texts: 文本迭代器
+            n_workers: 工作进程数，大于1时按分片分发到进程池
+            chunk_size: 每次处理的分片大小
+
+        返回:
+            按输入顺序排列的分词结果迭代器
+        """
+        if n_workers > 1:
+            yield from self._get_batch_runner(n_workers, chunk_size).imap(texts)
+            return
+
+        for chunk in iter_chunks(texts, chunk_size):
+            yield from self._tokenize_batch_local(chunk)
+
+    def _tokenize_batch_local(self, texts: List[str]) -> List[List[str]]:
+        """
+        在当前进程内批量分词
+
+        basic类型将整批文本拼接后只做一次预处理；spacy类型使用 nlp.pipe 批量处理。
+
+        参数:
+            texts: 文本列表
+
+        返回:
+            分词结果列表
+        """
+        if self.config.tokenizer_type == "spacy" and SPACY_AVAILABLE:
+            docs = self.nlp.pipe(self._preprocess_text(text) for text in texts)
+            return [self._postprocess_tokens([token.text for token in doc]) for doc in docs]
+
+        if self.config.tokenizer_type == "jieba" and JIEBA_AVAILABLE:
+            return [self.tokenize(text) for text in texts]
+
+        # 换行属于空白字符，预处理不会改变它，可作为文本分隔符
+        joined = self._preprocess_text("\n".join(text.replace("\n", " ") for text in texts))
+        return [self._postprocess_tokens(part.split()) for part in joined.split("\n")]
+
+    def _get_batch_runner(self, n_workers: int, chunk_size: int) -> ProcessBatchRunner:
+        """获取进程池批处理器，工作进程内以相同配置创建分词器"""
+        runner = self._batch_runner
+        if runner is None or runner.n_workers != n_workers or runner.chunk_size != chunk_size:
+            self.close()
+            runner = ProcessBatchRunner(
+                factory=Tokenizer,
+                factory_kwargs={"config": asdict(self.config)},
+                method="_tokenize_batch_local",
+                n_workers=n_workers,
+                chunk_size=chunk_size,
+            )
+            self._batch_runner = runner
+        return runner
+
+    def close(self):
+        """关闭批处理进程池"""
+        if self._batch_runner is not None:
+            self._batch_runner.close()
+            self._batch_runner = None
 
 
 # 为配置加载器提供默认配置
@@ -0,0 +1,490 @@
+# -*- coding: utf-8 -*-
+"""
+NLP模块: 向量索引
+功能描述: 为文本嵌入提供相似度检索索引，小规模数据使用分块矩阵乘法精确检索，
+         大规模数据使用倒排文件(IVF)近似最近邻检索，支持增量插入和持久化
+版本: 1.0.0
+作者: 窗口6开发人员
+创建日期: 2026-10-18
+"""
+
+import os
+import json
+import time
+import logging
+from typing import List, Dict, Any, Optional, Tuple, Union
+
+import numpy as np
+
+# 初始化日志记录器
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+
+
+def normalize_vectors(vectors: np.ndarray) -> np.ndarray:
+    """
+    将向量按行L2归一化为float32，零向量保持为零
+
+    参数:
+        vectors: 形状为 (n, dim) 或 (dim,) 的向量
+
+    返回:
+        归一化后的float32矩阵，形状为 (n, dim)
+    """
+    matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _merge_top_k(
+    scores: np.ndarray, ids: np.ndarray, k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    从每行候选中选出得分最高的k个并按得分降序排列
+
+    参数:
+        scores: 形状为 (nq, m) 的得分矩阵
+        ids: 与scores同形的编号矩阵
+        k: 返回数量
+
+    返回:
+        (得分, 编号) 两个形状为 (nq, min(k, m)) 的矩阵
+    """
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return scores[:, :0], ids[:, :0]
+
+    if k < scores.shape[1]:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(scores, part, axis=1)
+        ids = np.take_along_axis(ids, part, axis=1)
+
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return (
+        np.take_along_axis(scores, order, axis=1),
+        np.take_along_axis(ids, order, axis=1),
+    )
+
+
+class VectorIndex:
+    """
+    余弦相似度向量索引
+
+    向量在插入时归一化为float32保存，检索时相似度即为内积。
+    向量数量达到ivf_threshold后首次检索会自动训练IVF聚类结构，
+    此后默认只在n_probe个最近的聚类中检索。
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        ivf_threshold: int = 50000,
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        block_size: int = 65536,
+        seed: int = 42,
+    ):
+        """
+        初始化向量索引
+
+        参数:
+            dim: 向量维度
+            ivf_threshold: 自动启用IVF近似检索的向量数量阈值
+            n_lists: IVF聚类数量，为None时按 4*sqrt(n) 自动确定
+            n_probe: 每次检索访问的聚类数量
+            block_size: 精确检索时每个分块的向量数量
+            seed: 聚类初始化随机种子
+        """
+        self.dim = int(dim)
+        self.ivf_threshold = ivf_threshold
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.block_size = max(1, int(block_size))
+        self.seed = seed
+
+        self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._size = 0
+        self._next_id = 0
+
+        # IVF结构
+        self.centroids = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._list_order = None
+        self._list_offsets = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """已插入的归一化向量（只读视图）"""
+        view = self._vectors[: self._size]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def ids(self) -> np.ndarray:
+        """已插入向量的编号（只读视图）"""
+        view = self._ids[: self._size]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def is_trained(self) -> bool:
+        """IVF结构是否已训练"""
+        return self.centroids is not None
+
+    def _reserve(self, count: int):
+        """
+        确保存储容量足够容纳count个向量，容量不足时按倍数扩容
+
+        内存映射加载的只读数组会在首次扩容时复制到内存。
+        """
+        capacity = self._vectors.shape[0]
+        if count <= capacity and self._vectors.flags.writeable:
+            return
+
+        new_capacity = max(count, capacity * 2, 1024)
+        vectors = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        ids = np.zeros(new_capacity, dtype=np.int64)
+        assignments = np.zeros(new_capacity, dtype=np.int32)
+        vectors[: self._size] = self._vectors[: self._size]
+        ids[: self._size] = self._ids[: self._size]
+        if self.is_trained:
+            assignments[: self._size] = self._assignments[: self._size]
+
+        self._vectors = vectors
+        self._ids = ids
+        self._assignments = assignments
+
+    def add(
+        self, vectors: np.ndarray, ids: Optional[Union[List[int], np.ndarray]] = None
+    ) -> np.ndarray:
+        """
+        增量插入向量
+
+        参数:
+            vectors: 形状为 (n, dim) 的向量
+            ids: 可选的编号列表，为None时自动分配递增编号
+
+        返回:
+            插入向量的编号
+        """
+        matrix = normalize_vectors(vectors)
+        if matrix.shape[1] != self.dim:
+            raise ValueError(f"向量维度不匹配: 期望 {self.dim}, 实际 {matrix.shape[1]}")
+
+        count = matrix.shape[0]
+        if ids is None:
+            new_ids = np.arange(self._next_id, self._next_id + count, dtype=np.int64)
+        else:
+            new_ids = np.asarray(ids, dtype=np.int64)
+            if new_ids.shape != (count,):
+                raise ValueError("ids 数量必须与向量数量一致")
+
+        self._reserve(self._size + count)
+        end = self._size + count
+        self._vectors[self._size: end] = matrix
+        self._ids[self._size: end] = new_ids
+
+        if self.is_trained:
+            self._assignments[self._size: end] = self._assign(matrix)
+            self._list_order = None  # 倒排表延迟重建
+
+        self._size = end
+        if count:
+            self._next_id = max(self._next_id, int(new_ids.max()) + 1)
+        return new_ids
+
+    def _assign(self, matrix: np.ndarray) -> np.ndarray:
+        """将向量分配到最近的聚类中心"""
+        assignments = np.empty(matrix.shape[0], dtype=np.int32)
+        for start in range(0, matrix.shape[0], self.block_size):
+            block = matrix[start: start + self.block_size]
+            assignments[start: start + len(block)] = np.argmax(
+                block @ self.centroids.T, axis=1
+            )
+        return assignments
+
+    def train(self, n_lists: Optional[int] = None, n_iter: int = 20, sample_size: int = 100000):
+        """
+        使用球面k-means训练IVF聚类中心并分配已有向量
+
+        参数:
+            n_lists: 聚类数量，为None时使用初始化参数或按数据量自动确定
+            n_iter: k-means迭代次数
+            sample_size: 参与训练的最大样本数
+        """
+        if self._size == 0:
+            raise ValueError("索引为空，无法训练")
+
+        n_lists = n_lists or self.n_lists or int(4 * np.sqrt(self._size))
+        n_lists = max(1, min(n_lists, self._size))
+
+        rng = np.random.default_rng(self.seed)
+        data = self._vectors[: self._size]
+        if self._size > sample_size:
+            data = data[np.sort(rng.choice(self._size, sample_size, replace=False))]
+
+        centroids = data[rng.choice(len(data), n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            labels = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, data)
+            counts = np.bincount(labels, minlength=n_lists)
+            empty = counts == 0
+            # 空聚类重新用随机样本初始化
+            if empty.any():
+                sums[empty] = data[rng.choice(len(data), int(empty.sum()))]
+            centroids = normalize_vectors(sums)
+
+        self.centroids = centroids
+        self.n_lists = n_lists
+        self._assignments = np.zeros(self._vectors.shape[0], dtype=np.int32)
+        self._assignments[: self._size] = self._assign(self._vectors[: self._size])
+        self._list_order = None
+        logger.info(f"IVF索引训练完成: {self._size} 个向量, {n_lists} 个聚类")
+
+    def _ensure_lists(self):
+        """按聚类重建倒排表（向量行号按所属聚类排序）"""
+        if self._list_order is not None:
+            return
+        assignments = self._assignments[: self._size]
+        self._list_order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=self.n_lists)
+        self._list_offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int = 10,
+        exact: Optional[bool] = None,
+        n_probe: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        检索与查询向量最相似的k个向量
+
+        参数:
+            queries: 形状为 (nq, dim) 或 (dim,) 的查询向量
+            k: 返回数量
+            exact: 是否强制精确检索，为None时按索引规模自动选择
+            n_probe: IVF检索访问的聚类数量
+
+        返回:
+            (相似度, 编号) 两个形状为 (nq, min(k, n)) 的矩阵，按相似度降序排列
+        """
+        matrix = normalize_vectors(queries)
+        if matrix.shape[1] != self.dim:
+            raise ValueError(f"查询向量维度不匹配: 期望 {self.dim}, 实际 {matrix.shape[1]}")
+
+        if exact is None:
+            if not self.is_trained and self._size >= self.ivf_threshold:
+                self.train()
+            exact = not self.is_trained
+
+        if exact or not self.is_trained:
+            return self._search_exact(matrix, k)
+        return self._search_ivf(matrix, k, n_probe or self.n_probe)
+
+    def _search_exact(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """分块矩阵乘法精确检索，每块只保留当前top-k"""
+        nq = queries.shape[0]
+        best_scores = np.full((nq, 0), -np.inf, dtype=np.float32)
+        best_ids = np.zeros((nq, 0), dtype=np.int64)
+
+        for start in range(0, self._size, self.block_size):
+            end = min(start + self.block_size, self._size)
+            scores = queries @ self._vectors[start:end].T
+            ids = np.broadcast_to(self._ids[start:end], scores.shape)
+            best_scores, best_ids = _merge_top_k(
+                np.concatenate((best_scores, scores), axis=1),
+                np.concatenate((best_ids, ids), axis=1),
+                k,
+            )
+
+        return best_scores, best_ids
+
+    def _search_ivf(
+        self, queries: np.ndarray, k: int, n_probe: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """在最近的n_probe个聚类内检索"""
+        self._ensure_lists()
+        n_probe = max(1, min(n_probe, self.n_lists))
+        probes = np.argpartition(-(queries @ self.centroids.T), n_probe - 1, axis=1)[
+            :, :n_probe
+        ]
+
+        k_out = min(k, self._size)
+        all_scores = np.full((queries.shape[0], k_out), -np.inf, dtype=np.float32)
+        all_ids = np.full((queries.shape[0], k_out), -1, dtype=np.int64)
+
+        for row, query in enumerate(queries):
+            rows = np.concatenate(
+                [
+                    self._list_order[self._list_offsets[c]: self._list_offsets[c + 1]]
+                    for c in probes[row]
+                ]
+            )
+            if rows.size == 0:
+                continue
+            scores = self._vectors[rows] @ query
+            top_scores, top_ids = _merge_top_k(
+                scores[None, :], self._ids[rows][None, :], k_out
+            )
+            count = top_scores.shape[1]
+            all_scores[row, :count] = top_scores[0]
+            all_ids[row, :count] = top_ids[0]
+
+        return all_scores, all_ids
+
+    def save(self, directory: str):
+        """
+        将索引保存到目录，向量以.npy格式保存以便内存映射加载
+
+        每个文件先写入临时文件再替换，保存回内存映射加载时的目录也不会破坏原文件
+
+        参数:
+            directory: 保存目录
+        """
+        os.makedirs(directory, exist_ok=True)
+        arrays = {
+            "vectors.npy": self._vectors[: self._size],
+            "ids.npy": self._ids[: self._size],
+        }
+        if self.is_trained:
+            arrays["centroids.npy"] = self.centroids
+            arrays["assignments.npy"] = self._assignments[: self._size]
+        for name, array in arrays.items():
+            path = os.path.join(directory, name)
+            with open(f"{path}.tmp", "wb") as f:
+                np.save(f, array)
+            os.replace(f"{path}.tmp", path)
+
+        meta = {
+            "version": INDEX_FORMAT_VERSION,
+            "dim": self.dim,
+            "size": self._size,
+            "next_id": self._next_id,
+            "ivf_threshold": self.ivf_threshold,
+            "n_lists": self.n_lists,
+            "n_probe": self.n_probe,
+            "block_size": self.block_size,
+            "seed": self.seed,
+            "trained": self.is_trained,
+        }
+        meta_path = os.path.join(directory, "meta.json")
+        with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(f"{meta_path}.tmp", meta_path)
+        logger.info(f"向量索引已保存到: {directory}")
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "VectorIndex":
+        """
+        从目录加载索引
+
+        参数:
+            directory: 索引目录
+            mmap: 是否以只读内存映射方式加载向量，插入新向量时会复制到内存
+
+        返回:
+            VectorIndex实例
+        """
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        index = cls(
+            dim=meta["dim"],
+            ivf_threshold=meta["ivf_threshold"],
+            n_lists=meta["n_lists"],
+            n_probe=meta["n_probe"],
+            block_size=meta["block_size"],
+            seed=meta["seed"],
+        )
+        mmap_mode = "r" if mmap else None
+        index._vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode=mmap_mode)
+        index._ids = np.load(os.path.join(directory, "ids.npy"), mmap_mode=mmap_mode)
+        index._size = meta["size"]
+        index._next_id = meta["next_id"]
+
+        if meta["trained"]:
+            index.centroids = np.load(os.path.join(directory, "centroids.npy"))
+            index._assignments = np.load(os.path.join(directory, "assignments.npy"))
+
+        logger.info(f"从 {directory} 加载向量索引: {index._size} 个向量")
+        return index
+
+
+def benchmark_vector_index(
+    vectors: Optional[np.ndarray] = None,
+    n_vectors: int = 100000,
+    dim: int = 128,
+    n_queries: int = 100,
+    k: int = 10,
+    n_probes: Tuple[int, ...] = (1, 4, 8, 16),
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    测试IVF近似检索相对精确检索的召回率和延迟
+
+    参数:
+        vectors: 测试向量，为None时生成带聚类结构的随机向量
+        n_vectors: 随机向量数量
+        dim: 随机向量维度
+        n_queries: 查询数量
+        k: 每次检索返回数量
+        n_probes: 需要测试的n_probe取值
+        seed: 随机种子
+
+    返回:
+        包含精确检索延迟以及各n_probe下召回率和延迟的字典
+    """
+    rng = np.random.default_rng(seed)
+    if vectors is None:
+        centers = rng.normal(size=(max(1, n_vectors // 500), dim))
+        labels = rng.integers(0, len(centers), n_vectors)
+        vectors = centers[labels] + 0.3 * rng.normal(size=(n_vectors, dim))
+
+    index = VectorIndex(dim=vectors.shape[1], ivf_threshold=len(vectors) + 1)
+    index.add(vectors)
+    queries = vectors[rng.choice(len(vectors), n_queries, replace=False)]
+    queries = queries + 0.1 * rng.normal(size=queries.shape)
+
+    start_time = time.perf_counter()
+    _, exact_ids = index.search(queries, k, exact=True)
+    exact_latency = (time.perf_counter() - start_time) / n_queries
+
+    start_time = time.perf_counter()
+    index.train()
+    train_time = time.perf_counter() - start_time
+
+    results = {
+        "n_vectors": len(vectors),
+        "dim": vectors.shape[1],
+        "n_lists": index.n_lists,
+        "train_time_s": train_time,
+        "exact_latency_ms": exact_latency * 1000,
+        "ivf": {},
+    }
+    for n_probe in n_probes:
+        start_time = time.perf_counter()
+        _, ivf_ids = index.search(queries, k, exact=False, n_probe=n_probe)
+        latency = (time.perf_counter() - start_time) / n_queries
+
+        hits = sum(
+            len(np.intersect1d(exact_row, ivf_row))
+            for exact_row, ivf_row in zip(exact_ids, ivf_ids)
+        )
+        results["ivf"][n_probe] = {
+            "recall": hits / exact_ids.size,
+            "latency_ms": latency * 1000,
+        }
+        logger.info(
+            f"n_probe={n_probe}: 召回率 {results['ivf'][n_probe]['recall']:.3f}, "
+            f"延迟 {latency * 1000:.2f}ms"
+        )
+
+    return results
@@ -0,0 +1,529 @@
+# -*- coding: utf-8 -*-
+"""
+视频模块: 帧总线
+功能描述: 视频只解码一次，帧写入共享内存环形缓冲区，多个消费者（不同帧率的采样器、
+         关键帧检测器、视频写入器等）以各自的步长订阅，慢消费者通过背压限制解码速度
+版本: 1.0.0
+作者: 窗口6开发人员
+创建日期: 2026-10-18
+"""
+
+import os
+import time
+import logging
+import threading
+from multiprocessing import shared_memory
+from typing import Dict, List, Tuple, Any, Optional, Callable
+
+import numpy as np
+
+# 尝试导入可选依赖
+try:
+    import cv2
+
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+# 初始化日志记录器
+logger = logging.getLogger(__name__)
+
+
+class FrameConsumer:
+    """
+    帧总线消费者基类
+
+    子类实现 on_frame 处理帧。传入的帧是环形缓冲区中的视图，
+    需要在回调返回后继续使用时必须自行复制。
+    设置 self.done = True 可提前结束订阅。
+    """
+
+    def __init__(self,
+                 name: str,
+                 stride: Optional[int] = None,
+                 fps: Optional[float] = None,
+                 blocking: bool = True):
+        """
+        初始化消费者
+
+        参数:
+            name: 消费者名称，用于区分结果
+            stride: 帧步长，每stride帧接收一帧
+            fps: 目标帧率，未指定stride时根据视频帧率换算为步长
+            blocking: 是否阻塞解码。为False时消费者落后超过缓冲区容量会丢帧
+        """
+        self.name = name
+        self.stride = stride
+        self.fps = fps
+        self.blocking = blocking
+        self.done = False
+        self.result = None
+
+        # 运行状态，由FrameBus维护
+        self.received = 0
+        self.dropped = 0
+        self.busy_time = 0.0
+
+    def resolve_stride(self, video_fps: float) -> int:
+        """根据视频帧率确定步长"""
+        if self.stride is None:
+            if self.fps and video_fps > 0:
+                self.stride = max(1, int(video_fps / self.fps))
+            else:
+                self.stride = 1
+        self.stride = max(1, int(self.stride))
+        return self.stride
+
+    def on_start(self, info: Dict[str, Any]):
+        """解码开始前调用，info 包含 fps, width, height, frame_count"""
+        pass
+
+    def on_frame(self, frame_index: int, timestamp: float, frame: np.ndarray):
+        """处理一帧"""
+        raise NotImplementedError
+
+    def on_end(self):
+        """订阅结束时调用"""
+        pass
+
+
+class CallbackConsumer(FrameConsumer):
+    """对每帧调用分析函数并收集结果的消费者"""
+
+    def __init__(self, name: str, callback: Callable[[np.ndarray], Any], **kwargs):
+        super().__init__(name, **kwargs)
+        self.callback = callback
+        self.result = []
+
+    def on_frame(self, frame_index: int, timestamp: float, frame: np.ndarray):
+        self.result.append({
+            "frame_index": frame_index,
+            "timestamp": timestamp,
+            "result": self.callback(frame)
+        })
+
+
+class FrameSamplerConsumer(FrameConsumer):
+    """按步长采样并保存帧图像的消费者，结果为帧文件路径列表"""
+
+    def __init__(self,
+                 name: str,
+                 output_dir: str,
+                 output_format: str = "jpg",
+                 frame_prefix: str = "frame",
+                 max_frames: Optional[int] = None,
+                 **kwargs):
+        super().__init__(name, **kwargs)
+        self.output_dir = output_dir
+        self.output_format = output_format
+        self.frame_prefix = frame_prefix
+        self.max_frames = max_frames
+        self.result = []
+
+    def on_start(self, info: Dict[str, Any]):
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def on_frame(self, frame_index: int, timestamp: float, frame: np.ndarray):
+        frame_filename = f"{self.frame_prefix}_{len(self.result):06d}_{timestamp:.2f}.{self.output_format}"
+        frame_path = os.path.join(self.output_dir, frame_filename)
+        cv2.imwrite(frame_path, frame)
+        self.result.append(frame_path)
+
+        if self.max_frames is not None and len(self.result) >= self.max_frames:
+            self.done = True
+
+
+class KeyFrameConsumer(FrameConsumer):
+    """基于相邻帧灰度差异的关键帧检测消费者，与 extract_key_frames 的判定一致"""
+
+    def __init__(self,
+                 name: str,
+                 output_dir: str,
+                 threshold: float = 0.5,
+                 max_frames: Optional[int] = None,
+                 **kwargs):
+        kwargs.setdefault("stride", 1)
+        super().__init__(name, **kwargs)
+        self.output_dir = output_dir
+        self.threshold = threshold
+        self.max_frames = max_frames
+        self.prev_gray = None
+        self.result = []
+
+    def on_start(self, info: Dict[str, Any]):
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def _save(self, frame: np.ndarray):
+        key_frame_path = os.path.join(self.output_dir, f"keyframe_{len(self.result):04d}.jpg")
+        cv2.imwrite(key_frame_path, frame)
+        self.result.append(key_frame_path)
+
+    def on_frame(self, frame_index: int, timestamp: float, frame: np.ndarray):
+        curr_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.prev_gray is None:
+            self.prev_gray = curr_gray
+            self._save(frame)
+            return
+
+        mean_diff = cv2.mean(cv2.absdiff(curr_gray, self.prev_gray))[0] / 255.0
+        if mean_diff > self.threshold:
+            self._save(frame)
+            self.prev_gray = curr_gray
+            if self.max_frames is not None and len(self.result) >= self.max_frames:
+                self.done = True
+
+
+class VideoWriterConsumer(FrameConsumer):
+    """将接收到的帧写入视频文件的消费者（如延时摄影），结果为是否成功"""
+
+    def __init__(self,
+                 name: str,
+                 output_path: str,
+                 out_fps: Optional[float] = None,
+                 resolution: Optional[Tuple[int, int]] = None,
+                 process_frame: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+                 **kwargs):
+        super().__init__(name, **kwargs)
+        self.output_path = output_path
+        self.out_fps = out_fps
+        self.resolution = resolution
+        self.process_frame = process_frame
+        self.writer = None
+        self.result = False
+
+    def on_start(self, info: Dict[str, Any]):
+        output_dir = os.path.dirname(self.output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        out_fps = self.out_fps if self.out_fps is not None else info["fps"]
+        self.resolution = self.resolution or (info["width"], info["height"])
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')  # 使用MP4编码
+        self.writer = cv2.VideoWriter(self.output_path, fourcc, out_fps, self.resolution)
+        if not self.writer.isOpened():
+            logger.error(f"无法创建输出视频: {self.output_path}")
+            self.done = True
+
+    def on_frame(self, frame_index: int, timestamp: float, frame: np.ndarray):
+        if self.process_frame is not None:
+            frame = self.process_frame(frame)
+        if frame.shape[1] != self.resolution[0] or frame.shape[0] != self.resolution[1]:
+            frame = cv2.resize(frame, self.resolution)
+        self.writer.write(frame)
+
+    def on_end(self):
+        if self.writer is not None and self.writer.isOpened():
+            self.writer.release()
+            self.result = True
+
+
+class FrameBus:
+    """
+    解码一次、多消费者共享的帧总线
+
+    解码在调用 run 的线程中进行，每个消费者在独立线程中按自己的步长读取帧。
+    只有至少一个消费者需要的帧才会完整解码，其余帧仅 grab() 跳过。
+    阻塞型消费者落后 capacity 帧时解码暂停（背压）；非阻塞型消费者落后过多时丢帧。
+    """
+
+    def __init__(self, capacity: int = 32, use_shared_memory: bool = True):
+        """
+        初始化帧总线
+
+        参数:
+            capacity: 环形缓冲区可容纳的帧数
+            use_shared_memory: 是否将环形缓冲区分配在共享内存中，
+                               以便其他进程通过 shm_name 附加读取
+        """
+        self.capacity = max(2, int(capacity))
+        self.use_shared_memory = use_shared_memory
+        self.consumers = []
+        self.stats = {}
+
+        self.shm = None
+        self.ring = None
+        self.slot_seq = np.full(self.capacity, -1, dtype=np.int64)
+        self._cond = threading.Condition()
+        self._produced = 0
+        self._finished = False
+        self._cursors = {}
+
+    @property
+    def shm_name(self) -> Optional[str]:
+        """共享内存块名称"""
+        return self.shm.name if self.shm is not None else None
+
+    def subscribe(self, consumer: FrameConsumer) -> FrameConsumer:
+        """
+        注册消费者
+
+        参数:
+            consumer: 帧消费者
+
+        返回:
+            注册的消费者
+        """
+        if any(c.name == consumer.name for c in self.consumers):
+            raise ValueError(f"消费者名称重复: {consumer.name}")
+        self.consumers.append(consumer)
+        return consumer
+
+    def _allocate(self, frame: np.ndarray):
+        """根据首帧尺寸分配环形缓冲区"""
+        shape = (self.capacity,) + frame.shape
+        if self.use_shared_memory:
+            size = int(np.prod(shape)) * frame.dtype.itemsize
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.ring = np.ndarray(shape, dtype=frame.dtype, buffer=self.shm.buf)
+        else:
+            self.ring = np.empty(shape, dtype=frame.dtype)
+
+    def _release(self):
+        """释放共享内存"""
+        self.ring = None
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def _read_slot(self, seq: int) -> Optional[np.ndarray]:
+        """
+        按seqlock协议复制槽位中的帧，供不受背压保护的非阻塞消费者使用
+
+        解码线程写帧前把槽位序号置为-1，写完后再设为帧号；复制前后序号都等于seq
+        才说明复制期间槽位没有被覆盖
+
+        参数:
+            seq: 帧号
+
+        返回:
+            帧的副本，槽位正在写入或已被覆盖时返回None
+        """
+        slot = seq % self.capacity
+        if self.slot_seq[slot] != seq:
+            return None
+        frame = self.ring[slot].copy()
+        if self.slot_seq[slot] != seq:
+            return None
+        return frame
+
+    def _consume(self, consumer: FrameConsumer, video_fps: float):
+        """消费者线程主循环"""
+        seq = 0
+        try:
+            while not consumer.done:
+                with self._cond:
+                    while seq >= self._produced and not self._finished:
+                        self._cond.wait()
+                    if seq >= self._produced:
+                        break
+
+                    # 非阻塞消费者落后超过缓冲区容量时跳到仍在缓冲区内的帧
+                    oldest = self._produced - self.capacity
+                    if not consumer.blocking and seq < oldest:
+                        skip = -(-(oldest - seq) // consumer.stride)
+                        consumer.dropped += skip
+                        seq += skip * consumer.stride
+                        continue
+
+                if consumer.blocking:
+                    frame = self.ring[seq % self.capacity]
+                else:
+                    frame = self._read_slot(seq)
+                    if frame is None:
+                        consumer.dropped += 1
+                        seq += consumer.stride
+                        continue
+
+                start = time.perf_counter()
+                try:
+                    consumer.on_frame(seq, seq / video_fps if video_fps > 0 else 0.0, frame)
+                    consumer.received += 1
+                except Exception as e:
+                    logger.error(f"消费者 {consumer.name} 处理帧 {seq} 失败: {str(e)}")
+                consumer.busy_time += time.perf_counter() - start
+
+                seq += consumer.stride
+                with self._cond:
+                    self._cursors[consumer.name] = seq
+                    self._cond.notify_all()
+        finally:
+            try:
+                consumer.on_end()
+            except Exception as e:
+                logger.error(f"消费者 {consumer.name} 结束处理失败: {str(e)}")
+            with self._cond:
+                self._cursors.pop(consumer.name, None)
+                self._cond.notify_all()
+
+    def _wait_for_space(self, seq: int):
+        """背压：等待所有阻塞型消费者读取到可覆盖的位置"""
+        with self._cond:
+            while True:
+                lagging = [
+                    cursor for name, cursor in self._cursors.items()
+                    if self._blocking[name] and seq - cursor >= self.capacity
+                ]
+                if not lagging:
+                    return
+                self._cond.wait()
+
+    def run(self, video: Any) -> Dict[str, Any]:
+        """
+        解码视频并分发给所有消费者，直到视频结束或所有消费者完成
+
+        参数:
+            video: 已打开的 OpenCV VideoCapture 对象
+
+        返回:
+            运行统计，包含解码帧数、跳过帧数、耗时和各消费者的接收/丢帧/利用率
+        """
+        if not self.consumers:
+            raise ValueError("帧总线没有消费者")
+
+        video_fps = video.get(cv2.CAP_PROP_FPS)
+        info = {
+            "fps": video_fps,
+            "width": int(video.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(video.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "frame_count": int(video.get(cv2.CAP_PROP_FRAME_COUNT)),
+        }
+
+        self._produced = 0
+        self._finished = False
+        self._blocking = {c.name: c.blocking for c in self.consumers}
+        self._cursors = {c.name: 0 for c in self.consumers}
+        for consumer in self.consumers:
+            consumer.resolve_stride(video_fps)
+            consumer.on_start(info)
+
+        threads = [
+            threading.Thread(target=self._consume, args=(c, video_fps),
+                             name=f"frame-bus-{c.name}", daemon=True)
+            for c in self.consumers
+        ]
+
+        decoded = grabbed = 0
+        decode_time = 0.0
+        wall_start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        try:
+            seq = 0
+            while True:
+                with self._cond:
+                    active = [c for c in self.consumers if c.name in self._cursors]
+                if not active:
+                    break
+
+                need = any(seq % c.stride == 0 for c in active)
+                start = time.perf_counter()
+                if need:
+                    self._wait_for_space(seq)
+                    start = time.perf_counter()
+                    success, frame = video.read()
+                    if success:
+                        if self.ring is None:
+                            self._allocate(frame)
+                        slot = seq % self.capacity
+                        # seqlock：写入期间槽位序号无效，读者据此丢弃可能撕裂的帧
+                        self.slot_seq[slot] = -1
+                        self.ring[slot] = frame
+                        self.slot_seq[slot] = seq
+                        decoded += 1
+                else:
+                    success = video.grab()
+                    grabbed += 1
+                decode_time += time.perf_counter() - start
+
+                if not success:
+                    break
+
+                seq += 1
+                with self._cond:
+                    self._produced = seq
+                    self._cond.notify_all()
+        finally:
+            with self._cond:
+                self._finished = True
+                self._cond.notify_all()
+            for thread in threads:
+                thread.join()
+            self._release()
+
+        wall_time = time.perf_counter() - wall_start
+        self.stats = {
+            "decoded_frames": decoded,
+            "grabbed_frames": grabbed,
+            "wall_time": wall_time,
+            "decode_time": decode_time,
+            "consumers": {
+                c.name: {
+                    "stride": c.stride,
+                    "received": c.received,
+                    "dropped": c.dropped,
+                    "utilization": c.busy_time / wall_time if wall_time > 0 else 0.0,
+                }
+                for c in self.consumers
+            },
+        }
+        logger.info(
+            f"帧总线完成: 解码 {decoded} 帧, 跳过 {grabbed} 帧, "
+            f"{len(self.consumers)} 个消费者, 耗时 {wall_time:.2f}s")
+        return self.stats
+
+    def results(self) -> Dict[str, Any]:
+        """各消费者的结果"""
+        return {c.name: c.result for c in self.consumers}
+
+
+def benchmark_frame_bus(processor: Any,
+                        video_path: str,
+                        output_dir: str,
+                        sample_fps: float = 1.0,
+                        key_frame_threshold: float = 0.3,
+                        speedup_factor: int = 10) -> Dict[str, Any]:
+    """
+    对比 采样 + 关键帧 + 延时摄影 分别解码三次与经帧总线解码一次的耗时
+
+    参数:
+        processor: VideoProcessor实例
+        video_path: 视频文件路径
+        output_dir: 输出目录
+        sample_fps: 采样帧率
+        key_frame_threshold: 关键帧阈值
+        speedup_factor: 延时摄影加速因子
+
+    返回:
+        两种方式的耗时、解码帧数和加速比
+    """
+    separate_dir = os.path.join(output_dir, "separate")
+    bus_dir = os.path.join(output_dir, "bus")
+
+    start_time = time.perf_counter()
+    processor.extract_frames(video_path, output_dir=separate_dir, fps=sample_fps)
+    processor.extract_key_frames(video_path, threshold=key_frame_threshold,
+                                 output_dir=os.path.join(separate_dir, "key"))
+    processor.create_timelapse(video_path, os.path.join(separate_dir, "timelapse.mp4"),
+                               speedup_factor=speedup_factor)
+    separate_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    processor.run_frame_bus(video_path, [
+        FrameSamplerConsumer("frames", bus_dir, fps=sample_fps),
+        KeyFrameConsumer("key_frames", os.path.join(bus_dir, "key"), threshold=key_frame_threshold),
+        VideoWriterConsumer("timelapse", os.path.join(bus_dir, "timelapse.mp4"), stride=speedup_factor),
+    ])
+    bus_time = time.perf_counter() - start_time
+    stats = processor.last_frame_bus_stats
+
+    frame_count = stats.get("decoded_frames", 0) + stats.get("grabbed_frames", 0)
+    return {
+        "separate_time": separate_time,
+        "bus_time": bus_time,
+        "speedup": separate_time / bus_time if bus_time > 0 else 0.0,
+        "separate_decode_passes": 3,
+        "bus_decoded_frames": stats.get("decoded_frames", 0),
+        "video_frames": frame_count,
+    }
@@ -0,0 +1,452 @@
+# -*- coding: utf-8 -*-
+"""
+视频模块: 快速关键帧提取
+功能描述: 在缩略图或灰度直方图上批量计算场景变化，支持粗到精两级判定
+         （每帧计算廉价指标，只对候选帧计算全分辨率差异），关键帧在后台线程编码写入
+版本: 1.0.0
+作者: 窗口6开发人员
+创建日期: 2026-10-18
+"""
+
+import os
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple, Any, Optional
+
+import numpy as np
+
+# 尝试导入可选依赖
+try:
+    import cv2
+
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+# 初始化日志记录器
+logger = logging.getLogger(__name__)
+
+
+class KeyFrameDetector:
+    """
+    批量场景变化检测器
+
+    与 VideoProcessor.extract_key_frames 相同，每帧与最近一个关键帧比较，差异超过阈值即为新关键帧。
+    一批帧先统一缩放为灰度缩略图并堆叠成数组，与参考帧的差异一次计算；
+    找到新关键帧后只对其后的帧重新计算，因此每批的计算次数为 关键帧数+1。
+
+    指标:
+        pixel: 缩略图平均绝对差 (0-1)，与全分辨率灰度差近似
+        histogram: 灰度直方图的总变差距离 (0-1)，对镜头移动不敏感，阈值需单独调整
+
+    coarse_to_fine 为True时，缩略图指标只用于筛选候选帧（阈值乘以 candidate_ratio），
+    候选帧再用全分辨率灰度平均绝对差判定。这是近似方法：选出的每个关键帧与其参考帧的
+    全分辨率差异都超过阈值，但粗筛可能漏掉真正的关键帧，漏检后参考帧不同，后续判定也会随之偏移。
+    缩略图每个像素是一块原图像素的平均，块内差异正负抵消后缩略图差异通常小于全分辨率差异，
+    纹理、噪声或小物体等高频变化可能在缩略图上低于粗筛阈值而被跳过，且这一差距没有上界。
+    candidate_ratio 越小召回越高、精判次数越多，设为0时只跳过缩略图完全相同的帧；
+    需要与 extract_key_frames 严格一致时应直接使用 extract_key_frames。
+    """
+
+    METRICS = ("pixel", "histogram")
+
+    def __init__(self,
+                 threshold: float = 0.5,
+                 metric: str = "pixel",
+                 thumbnail_size: Tuple[int, int] = (160, 90),
+                 hist_bins: int = 64,
+                 coarse_to_fine: bool = False,
+                 candidate_ratio: float = 0.5):
+        """
+        初始化检测器
+
+        参数:
+            threshold: 场景变化阈值 (0-1)
+            metric: 缩略图比较指标，pixel 或 histogram
+            thumbnail_size: 缩略图尺寸 (宽, 高)
+            hist_bins: 直方图分箱数，须为256的约数
+            coarse_to_fine: 是否启用粗到精两级判定
+            candidate_ratio: 粗筛阈值相对于threshold的比例，越小漏检越少、精判越多
+        """
+        if metric not in self.METRICS:
+            raise ValueError(f"不支持的指标: {metric}")
+        if 256 % hist_bins != 0:
+            raise ValueError(f"直方图分箱数必须为256的约数: {hist_bins}")
+
+        self.threshold = threshold
+        self.metric = metric
+        self.thumbnail_size = tuple(thumbnail_size)
+        self.hist_bins = hist_bins
+        self.coarse_to_fine = coarse_to_fine
+        self.candidate_ratio = candidate_ratio
+        self.reset()
+
+    def reset(self):
+        """清除参考帧"""
+        self.ref_feature = None
+        self.ref_gray = None
+        self.first_feature = None
+        self.fine_checks = 0
+
+    def thumbnails(self, frames: List[np.ndarray]) -> np.ndarray:
+        """
+        将一批BGR帧缩放为灰度缩略图
+
+        返回:
+            形状为 (len(frames), 高, 宽) 的uint8数组
+        """
+        width, height = self.thumbnail_size
+        thumbs = np.empty((len(frames), height, width), dtype=np.uint8)
+        for i, frame in enumerate(frames):
+            # 大图直接INTER_AREA缩放很慢，先双线性缩到缩略图的2倍再做区域平均
+            small = frame
+            if frame.shape[1] > 4 * width and frame.shape[0] > 4 * height:
+                small = cv2.resize(frame, (2 * width, 2 * height), interpolation=cv2.INTER_LINEAR)
+            # 先缩小再转灰度，颜色转换只作用于缩略图
+            small = cv2.resize(small, self.thumbnail_size, interpolation=cv2.INTER_AREA)
+            thumbs[i] = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return thumbs
+
+    def features(self, thumbs: np.ndarray) -> np.ndarray:
+        """
+        计算缩略图特征
+
+        返回:
+            pixel 指标为展平的像素 (n, 高*宽)；histogram 指标为归一化直方图 (n, hist_bins)
+        """
+        n = len(thumbs)
+        flat = thumbs.reshape(n, -1)
+        if self.metric == "pixel":
+            return flat.astype(np.int16)
+
+        # 所有缩略图的直方图通过一次 bincount 计算
+        shift = int(np.log2(256 // self.hist_bins))
+        bins = (flat >> shift).astype(np.int64) + (np.arange(n) * self.hist_bins)[:, None]
+        hist = np.bincount(bins.ravel(), minlength=n * self.hist_bins).reshape(n, self.hist_bins)
+        return hist / float(flat.shape[1])
+
+    def distances(self, features: np.ndarray, reference: Optional[np.ndarray] = None) -> np.ndarray:
+        """计算各帧特征与参考帧（默认为当前参考帧）的距离 (0-1)"""
+        diff = np.abs(features - (self.ref_feature if reference is None else reference))
+        if self.metric == "pixel":
+            return diff.mean(axis=1) / 255.0
+        return diff.sum(axis=1) * 0.5
+
+    def _fine_distance(self, frame: np.ndarray) -> float:
+        """全分辨率灰度平均绝对差"""
+        self.fine_checks += 1
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return cv2.mean(cv2.absdiff(gray, self.ref_gray))[0] / 255.0
+
+    def _set_reference(self, frame: np.ndarray, feature: np.ndarray):
+        """更新参考帧"""
+        self.ref_feature = feature
+        if self.coarse_to_fine:
+            self.ref_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    def process_batch(self, frames: List[np.ndarray]) -> List[int]:
+        """
+        处理一批连续帧
+
+        参数:
+            frames: BGR帧列表，需按时间顺序，且紧接上一批
+
+        返回:
+            本批中关键帧的位置列表
+        """
+        if not frames:
+            return []
+
+        features = self.features(self.thumbnails(frames))
+        key_positions = []
+        start = 0
+        if self.ref_feature is None:
+            # 第一帧总是关键帧
+            self.first_feature = features[0]
+            self._set_reference(frames[0], features[0])
+            key_positions.append(0)
+            start = 1
+
+        limit = self.threshold * self.candidate_ratio if self.coarse_to_fine else self.threshold
+        while start < len(frames):
+            candidates = np.flatnonzero(self.distances(features[start:]) > limit) + start
+
+            found = None
+            for pos in candidates:
+                if not self.coarse_to_fine or self._fine_distance(frames[pos]) > self.threshold:
+                    found = int(pos)
+                    break
+
+            if found is None:
+                break
+
+            key_positions.append(found)
+            self._set_reference(frames[found], features[found])
+            start = found + 1
+
+        return key_positions
+
+
+class AsyncFrameWriter:
+    """
+    后台线程图像写入器
+
+    cv2.imwrite 编码时释放GIL，写入与解码、检测并行。
+    在途写入数超过 max_pending 时等待最早的写入完成，限制内存占用。
+    """
+
+    def __init__(self, n_threads: int = 2, max_pending: int = 32, params: Optional[List[int]] = None):
+        """
+        初始化写入器
+
+        参数:
+            n_threads: 写入线程数
+            max_pending: 最大在途写入数
+            params: cv2.imwrite 参数，如 [cv2.IMWRITE_JPEG_QUALITY, 90]
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max(1, n_threads),
+                                           thread_name_prefix="frame-writer")
+        self.max_pending = max(1, max_pending)
+        self.params = params or []
+        self.pending = deque()
+        self.failed = []
+
+    def _collect(self):
+        """回收最早的一个写入任务"""
+        path, future = self.pending.popleft()
+        try:
+            if not future.result():
+                self.failed.append(path)
+        except Exception as e:
+            logger.error(f"写入图像失败 {path}: {str(e)}")
+            self.failed.append(path)
+
+    def write(self, path: str, frame: np.ndarray):
+        """
+        提交写入任务
+
+        参数:
+            path: 输出路径
+            frame: 图像，提交后调用方不应再修改
+        """
+        while len(self.pending) >= self.max_pending:
+            self._collect()
+        self.pending.append((path, self.executor.submit(cv2.imwrite, path, frame, self.params)))
+
+    def close(self) -> List[str]:
+        """
+        等待所有写入完成并关闭线程
+
+        返回:
+            写入失败的路径列表
+        """
+        while self.pending:
+            self._collect()
+        self.executor.shutdown(wait=True)
+        return self.failed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def extract_key_frames_batched(video: Any,
+                               output_dir: str,
+                               detector: KeyFrameDetector,
+                               max_frames: Optional[int] = None,
+                               batch_size: int = 16,
+                               frame_step: int = 1,
+                               writer_threads: int = 2,
+                               start_frame: int = 0,
+                               end_frame: Optional[int] = None,
+                               name_by_index: bool = False) -> Tuple[List[str], List[int]]:
+    """
+    从已打开的视频中批量提取关键帧
+
+    参数:
+        video: OpenCV VideoCapture对象，当前位置应为start_frame
+        output_dir: 输出目录
+        detector: 场景变化检测器
+        max_frames: 最大提取帧数
+        batch_size: 每批检测的帧数
+        frame_step: 每frame_step帧检测一帧，其余帧只grab()不解码为图像
+        writer_threads: 后台写入线程数
+        start_frame: 当前位置的帧索引
+        end_frame: 结束帧索引（不包含），None表示读到视频结尾
+        name_by_index: 是否以帧索引命名文件，否则按关键帧序号命名
+
+    返回:
+        (关键帧文件路径列表, 关键帧在视频中的帧索引列表)
+    """
+    batch_size = max(1, int(batch_size))
+    frame_step = max(1, int(frame_step))
+    key_frame_paths = []
+    key_frame_indices = []
+
+    with AsyncFrameWriter(n_threads=writer_threads, max_pending=2 * batch_size) as writer:
+        frames, indices = [], []
+        frame_idx = start_frame
+        done = False
+        while not done:
+            if end_frame is not None and frame_idx >= end_frame:
+                success = False
+            elif (frame_idx - start_frame) % frame_step != 0:
+                success = video.grab()
+                frame_idx += 1
+                if success:
+                    continue
+            else:
+                success, frame = video.read()
+                if success:
+                    frames.append(frame)
+                    indices.append(frame_idx)
+                frame_idx += 1
+
+            if frames and (len(frames) >= batch_size or not success):
+                for pos in detector.process_batch(frames):
+                    number = indices[pos] if name_by_index else len(key_frame_paths)
+                    key_frame_path = os.path.join(output_dir, f"keyframe_{number:04d}.jpg")
+                    writer.write(key_frame_path, frames[pos])
+                    key_frame_paths.append(key_frame_path)
+                    key_frame_indices.append(indices[pos])
+
+                    # 检查是否达到最大帧数
+                    if max_frames is not None and len(key_frame_paths) >= max_frames:
+                        done = True
+                        break
+                frames, indices = [], []
+
+            if not success:
+                break
+
+    return key_frame_paths, key_frame_indices
+
+
+def extract_key_frames_parallel(video_path: str,
+                                output_dir: str,
+                                detector_kwargs: Dict[str, Any],
+                                n_workers: int = 4,
+                                max_frames: Optional[int] = None,
+                                batch_size: int = 16,
+                                frame_step: int = 1) -> Tuple[List[str], List[int]]:
+    """
+    将视频分为 n_workers 段并行解码和检测，适用于长视频
+
+    每段在独立线程中打开视频并定位到段首（OpenCV解码时释放GIL），段首帧先作为该段的参考帧。
+    合并时段首帧与前一段最后的参考帧比较缩略图距离，未超过阈值则不作为关键帧。
+    段内的参考帧与顺序处理可能略有差异，选出的关键帧与顺序处理基本一致。
+    文件以帧索引命名，如 keyframe_0123.jpg。
+
+    参数:
+        video_path: 视频文件路径
+        output_dir: 输出目录
+        detector_kwargs: KeyFrameDetector 构造参数
+        n_workers: 分段数（线程数）
+        max_frames: 最大提取帧数
+        batch_size: 每批检测的帧数
+        frame_step: 每frame_step帧检测一帧
+
+    返回:
+        (关键帧文件路径列表, 关键帧在视频中的帧索引列表)
+    """
+    video = cv2.VideoCapture(video_path)
+    frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+    video.release()
+    if frame_count <= 0:
+        raise ValueError(f"无法获取视频帧数: {video_path}")
+
+    n_workers = max(1, min(int(n_workers), frame_count))
+    # 段首对齐到frame_step，保证与顺序处理检测相同的帧
+    segment = -(-frame_count // n_workers)
+    segment = -(-segment // frame_step) * frame_step
+    bounds = [(start, min(start + segment, frame_count))
+              for start in range(0, frame_count, segment)]
+
+    def run_segment(start: int, end: int):
+        detector = KeyFrameDetector(**detector_kwargs)
+        capture = cv2.VideoCapture(video_path)
+        try:
+            if start > 0:
+                capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+            paths, indices = extract_key_frames_batched(
+                capture, output_dir, detector, batch_size=batch_size, frame_step=frame_step,
+                writer_threads=1, start_frame=start, end_frame=end, name_by_index=True
+            )
+            return detector, paths, indices
+        finally:
+            capture.release()
+
+    with ThreadPoolExecutor(max_workers=len(bounds), thread_name_prefix="key-frame-segment") as executor:
+        segments = list(executor.map(lambda bound: run_segment(*bound), bounds))
+
+    key_frame_paths, key_frame_indices, discarded = [], [], []
+    reference = None
+    for detector, paths, indices in segments:
+        if not paths:
+            continue
+        # 段首帧只能用缩略图距离与前一段的参考帧比较
+        if reference is not None:
+            distance = detector.distances(detector.first_feature[None], reference)[0]
+            if distance <= detector.threshold:
+                discarded.append(paths[0])
+                paths, indices = paths[1:], indices[1:]
+        key_frame_paths += paths
+        key_frame_indices += indices
+        reference = detector.ref_feature
+
+    if max_frames is not None:
+        discarded += key_frame_paths[max_frames:]
+        key_frame_paths = key_frame_paths[:max_frames]
+        key_frame_indices = key_frame_indices[:max_frames]
+
+    for path in discarded:
+        if os.path.exists(path):
+            os.unlink(path)
+
+    return key_frame_paths, key_frame_indices
+
+
+def benchmark_key_frames(processor: Any,
+                         video_path: str,
+                         output_dir: str,
+                         threshold: float = 0.3,
+                         **fast_kwargs) -> Dict[str, Any]:
+    """
+    对比 extract_key_frames 与 extract_key_frames_fast 的耗时和关键帧数量
+
+    参数:
+        processor: VideoProcessor实例
+        video_path: 视频文件路径
+        output_dir: 输出目录
+        threshold: 场景变化阈值
+        fast_kwargs: 传给 extract_key_frames_fast 的其他参数
+
+    返回:
+        两种方式的耗时、关键帧数和加速比
+    """
+    start_time = time.perf_counter()
+    legacy = processor.extract_key_frames(video_path, threshold=threshold,
+                                          output_dir=os.path.join(output_dir, "legacy"))
+    legacy_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    fast = processor.extract_key_frames_fast(video_path, threshold=threshold,
+                                             output_dir=os.path.join(output_dir, "fast"),
+                                             **fast_kwargs)
+    fast_time = time.perf_counter() - start_time
+
+    result = {
+        "legacy_time": legacy_time,
+        "fast_time": fast_time,
+        "speedup": legacy_time / fast_time if fast_time > 0 else 0.0,
+        "legacy_key_frames": len(legacy),
+        "fast_key_frames": len(fast),
+    }
+    logger.info(
+        f"关键帧提取: 原方法 {legacy_time:.2f}s/{len(legacy)} 帧, "
+        f"快速方法 {fast_time:.2f}s/{len(fast)} 帧, 加速 {result['speedup']:.1f}x")
+    return result
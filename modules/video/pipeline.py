@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+视频模块: 帧分析流水线
+功能描述: 将视频帧分析拆分为 解码线程 → 有界队列 → 分析工作线程池 三个阶段，
+         按序号重组结果，并统计吞吐量和各阶段利用率
+版本: 1.0.0
+作者: 窗口6开发人员
+创建日期: 2026-10-18
+"""
+
+import time
+import queue
+import logging
+import threading
+from typing import Dict, List, Tuple, Any, Optional, Callable, Iterable
+
+# 初始化日志记录器
+logger = logging.getLogger(__name__)
+
+# 队列结束标记
+_STOP = object()
+
+
+class FrameAnalysisPipeline:
+    """
+    视频帧分析流水线
+
+    解码线程从帧源读取帧并按 batch_size 分组放入有界队列，队列满时解码线程阻塞，
+    从而限制内存中的帧数量。工作线程调用分析函数（OpenCV和NumPy运算会释放GIL），
+    结果按帧序号重组后返回。
+
+    analyzer 每次处理一帧；batch_analyzer 每次处理一批帧并返回等长结果列表，
+    适用于 ObjectDetector.detect_batch 这类批量推理接口。
+    """
+
+    def __init__(self,
+                 analyzer: Optional[Callable[[Any], Any]] = None,
+                 batch_analyzer: Optional[Callable[[List[Any]], List[Any]]] = None,
+                 n_workers: int = 4,
+                 queue_size: int = 32,
+                 batch_size: int = 1):
+        """
+        初始化帧分析流水线
+
+        参数:
+            analyzer: 单帧分析函数
+            batch_analyzer: 批量分析函数，优先于analyzer使用
+            n_workers: 分析工作线程数
+            queue_size: 解码队列可容纳的最大批次数
+            batch_size: 每批帧数
+        """
+        if analyzer is None and batch_analyzer is None:
+            raise ValueError("必须提供 analyzer 或 batch_analyzer")
+
+        self.analyzer = analyzer
+        self.batch_analyzer = batch_analyzer
+        self.n_workers = max(1, int(n_workers))
+        self.queue_size = max(1, int(queue_size))
+        self.batch_size = max(1, int(batch_size))
+        self.stats = {}
+
+    def _analyze_batch(self, frames: List[Any], indices: List[int]) -> List[Tuple[bool, Any]]:
+        """
+        分析一批帧
+
+        返回:
+            与输入等长的 (是否成功, 结果) 列表
+        """
+        if self.batch_analyzer is not None:
+            try:
+                results = self.batch_analyzer(frames)
+                if len(results) != len(frames):
+                    raise ValueError(f"批量分析返回 {len(results)} 个结果，期望 {len(frames)} 个")
+                return [(True, result) for result in results]
+            except Exception as e:
+                logger.error(f"分析帧 {indices[0]}-{indices[-1]} 失败: {str(e)}")
+                return [(False, None)] * len(frames)
+
+        outputs = []
+        for frame_idx, frame in zip(indices, frames):
+            try:
+                outputs.append((True, self.analyzer(frame)))
+            except Exception as e:
+                logger.error(f"分析帧 {frame_idx} 失败: {str(e)}")
+                outputs.append((False, None))
+        return outputs
+
+    def run(self, frames: Iterable[Tuple[int, float, Any]]) -> List[Dict[str, Any]]:
+        """
+        运行流水线
+
+        参数:
+            frames: 帧源，依次产生 (帧索引, 时间戳, 帧图像)，
+                    通常为 VideoProcessor.extract_frames_generator 的返回值
+
+        返回:
+            按帧索引排序的分析结果列表，每项包含 frame_index, timestamp, result
+        """
+        task_queue = queue.Queue(maxsize=self.queue_size)
+        results = {}
+        results_lock = threading.Lock()
+        worker_busy = [0.0] * self.n_workers
+        decoder_state = {"busy": 0.0, "frames": 0, "error": None}
+
+        def decode():
+            iterator = iter(frames)
+            batch = []
+            try:
+                while True:
+                    start = time.perf_counter()
+                    item = next(iterator, None)
+                    decoder_state["busy"] += time.perf_counter() - start
+                    if item is None:
+                        break
+
+                    batch.append(item)
+                    decoder_state["frames"] += 1
+                    if len(batch) >= self.batch_size:
+                        task_queue.put(batch)
+                        batch = []
+
+                if batch:
+                    task_queue.put(batch)
+            except Exception as e:
+                decoder_state["error"] = str(e)
+                logger.error(f"解码视频帧失败: {str(e)}")
+            finally:
+                for _ in range(self.n_workers):
+                    task_queue.put(_STOP)
+
+        def work(worker_id: int):
+            while True:
+                batch = task_queue.get()
+                if batch is _STOP:
+                    break
+
+                indices = [item[0] for item in batch]
+                start = time.perf_counter()
+                outputs = self._analyze_batch([item[2] for item in batch], indices)
+                worker_busy[worker_id] += time.perf_counter() - start
+
+                with results_lock:
+                    for (frame_idx, timestamp, _), (ok, result) in zip(batch, outputs):
+                        if ok:
+                            results[frame_idx] = {
+                                "frame_index": frame_idx,
+                                "timestamp": timestamp,
+                                "result": result
+                            }
+
+        wall_start = time.perf_counter()
+        threads = [threading.Thread(target=decode, name="frame-decoder", daemon=True)]
+        threads += [
+            threading.Thread(target=work, args=(i,), name=f"frame-worker-{i}", daemon=True)
+            for i in range(self.n_workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_time = time.perf_counter() - wall_start
+
+        ordered = [results[idx] for idx in sorted(results)]
+        self.stats = {
+            "frames": decoder_state["frames"],
+            "analyzed_frames": len(ordered),
+            "wall_time": wall_time,
+            "frames_per_sec": decoder_state["frames"] / wall_time if wall_time > 0 else 0.0,
+            "decoder_utilization": decoder_state["busy"] / wall_time if wall_time > 0 else 0.0,
+            "worker_utilization": [
+                busy / wall_time if wall_time > 0 else 0.0 for busy in worker_busy
+            ],
+            "n_workers": self.n_workers,
+            "batch_size": self.batch_size,
+            "decoder_error": decoder_state["error"],
+        }
+        logger.info(
+            f"流水线分析 {len(ordered)} 帧, {self.stats['frames_per_sec']:.1f} 帧/秒, "
+            f"解码利用率 {self.stats['decoder_utilization']:.0%}")
+        return ordered
+
+
+def benchmark_pipeline(frame_source: Callable[[], Iterable[Tuple[int, float, Any]]],
+                       analyzer: Optional[Callable[[Any], Any]] = None,
+                       batch_analyzer: Optional[Callable[[List[Any]], List[Any]]] = None,
+                       worker_counts: Iterable[int] = (1, 2, 4),
+                       batch_size: int = 1) -> Dict[int, Dict[str, Any]]:
+    """
+    测试不同工作线程数下流水线的帧率和各阶段利用率
+
+    参数:
+        frame_source: 每次调用返回一个新的帧源，如
+                      lambda: processor.extract_frames_generator(path, fps=5)
+        analyzer: 单帧分析函数
+        batch_analyzer: 批量分析函数
+        worker_counts: 需要测试的工作线程数
+        batch_size: 每批帧数
+
+    返回:
+        工作线程数到运行统计的映射
+    """
+    results = {}
+    for n_workers in worker_counts:
+        pipeline = FrameAnalysisPipeline(
+            analyzer=analyzer,
+            batch_analyzer=batch_analyzer,
+            n_workers=n_workers,
+            queue_size=2 * n_workers,
+            batch_size=batch_size
+        )
+        pipeline.run(frame_source())
+        results[n_workers] = pipeline.stats
+
+    return results
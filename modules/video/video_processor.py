@@ -7,8 +7,6 @@
 创建日期: 2025-04-18
 """
 
-from .. config.config_loader import ConfigLoader
-import modules.nlp as np
 import os
 import io
 import logging
@@ -20,20 +18,25 @@ from collections import OrderedDict
 
 # 尝试导入可选依赖
 try:
-import ui.cli
-CV2_AVAILABLE = True
+    import cv2
+
+    CV2_AVAILABLE = True
 except ImportError:
     CV2_AVAILABLE = False
 
 try:
-NUMPY_AVAILABLE = True
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
 except ImportError:
     NUMPY_AVAILABLE = False
 
 # 从配置加载器获取配置
 try:
-config_loader = ConfigLoader()
-VIDEO_CONFIG = config_loader.load("modules.video.video_processor")
+    from config.config_loader import ConfigLoader
+
+    config_loader = ConfigLoader()
+    VIDEO_CONFIG = config_loader.load("modules.video.video_processor")
 except ImportError:
     VIDEO_CONFIG = {
         "default_fps": 1,
@@ -51,6 +54,10 @@ try:
 except ImportError:
     VISION_AVAILABLE = False
 
+from .pipeline import FrameAnalysisPipeline
+from .frame_bus import FrameBus, FrameConsumer
+from .key_frames import KeyFrameDetector, extract_key_frames_batched, extract_key_frames_parallel
+
 # 初始化日志记录器
 logger = logging.getLogger(__name__)
 
@@ -84,6 +91,13 @@ class VideoProcessor:
             self.temp_dir = tempfile.mkdtemp(prefix="video_processor_")
             logger.info(f"创建视频处理临时目录: {self.temp_dir}")
 
+        # 最近一次帧分析流水线的运行统计
+        self.last_pipeline_stats = {}
+        # 最近一次帧总线的运行统计
+        self.last_frame_bus_stats = {}
+        # 最近一次快速关键帧提取得到的关键帧帧索引
+        self.last_key_frame_indices = []
+
         # 初始化图像处理器和对象检测器（如果可用）
         self.image_processor = None
         self.object_detector = None
@@ -157,7 +171,7 @@ class VideoProcessor:
 
                 # 检查缓存
                 cached_video = self._get_from_cache(cache_key)
-                if cached_video is not None:
+                if cached_video is not None and cached_video.isOpened():
                     return cached_video
 
                 # 加载视频
@@ -318,14 +332,17 @@ class VideoProcessor:
             extracted_count = 0
 
             while frame_number < end_frame:
-                # 读取一帧
-                success, frame = video.read()
+                # 检查是否应提取此帧，跳过的帧只抓取不解码
+                keep = (frame_number - start_frame) % interval == 0
+                if keep:
+                    success, frame = video.read()
+                else:
+                    success = video.grab()
 
                 if not success:
                     break
 
-                # 检查是否应提取此帧
-                if (frame_number - start_frame) % interval == 0:
+                if keep:
                     # 处理帧（如果提供了处理函数）
                     if process_frame is not None:
                         try:
@@ -433,14 +450,17 @@ class VideoProcessor:
             extracted_count = 0
 
             while frame_number < end_frame:
-                # 读取一帧
-                success, frame = video.read()
+                # 检查是否应提取此帧，跳过的帧只抓取不解码
+                keep = (frame_number - start_frame) % interval == 0
+                if keep:
+                    success, frame = video.read()
+                else:
+                    success = video.grab()
 
                 if not success:
                     break
 
-                # 检查是否应提取此帧
-                if (frame_number - start_frame) % interval == 0:
+                if keep:
                     # 计算时间戳
                     timestamp = frame_number / video_fps
 
@@ -472,21 +492,30 @@ class VideoProcessor:
 
     def analyze_video_frames(self,
                              video_source: Union[str, Path, BinaryIO, Any],
-                             analyzer: Callable[[np.ndarray], Any],
+                             analyzer: Optional[Callable[[np.ndarray], Any]] = None,
                              fps: Optional[float] = None,
                              batch_size: int = 10,
                              start_time: Optional[float] = None,
-                             end_time: Optional[float] = None) -> List[Dict[str, Any]]:
+                             end_time: Optional[float] = None,
+                             batch_analyzer: Optional[Callable[[List[np.ndarray]], List[Any]]] = None,
+                             n_workers: int = 1,
+                             queue_size: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         分析视频帧
 
+        解码在独立线程中进行，帧按批放入有界队列，由 n_workers 个工作线程分析，
+        解码与分析并行。运行统计（帧率、解码/分析利用率）保存在 last_pipeline_stats。
+
         参数:
             video_source: 视频源
             analyzer: 分析函数，接收帧图像作为输入并返回分析结果
             fps: 每秒分析的帧数，如果为None则使用默认值(1)
-            batch_size: 批处理大小，控制内存使用
+            batch_size: 批处理大小，控制每个队列任务的帧数
             start_time: 开始时间（秒）
             end_time: 结束时间（秒）
+            batch_analyzer: 批量分析函数，接收帧图像列表并返回等长结果列表，提供时优先使用
+            n_workers: 分析工作线程数
+            queue_size: 解码队列最多缓存的批次数，默认为工作线程数的2倍
 
         返回:
             分析结果列表，每个元素是包含帧索引、时间戳和分析结果的字典
@@ -496,60 +525,22 @@ class VideoProcessor:
             return []
 
         try:
-            results = []
-            batch = []
-            batch_timestamps = []
-            batch_indices = []
+            pipeline = FrameAnalysisPipeline(
+                analyzer=analyzer,
+                batch_analyzer=batch_analyzer,
+                n_workers=n_workers,
+                queue_size=queue_size or 2 * max(1, n_workers),
+                batch_size=batch_size
+            )
 
             # 使用生成器提取帧
-            for idx, timestamp, frame in self.extract_frames_generator(
+            results = pipeline.run(self.extract_frames_generator(
                 video_source=video_source,
                 fps=fps,
                 start_time=start_time,
                 end_time=end_time
-            ):
-                # 添加到批处理
-                batch.append(frame)
-                batch_timestamps.append(timestamp)
-                batch_indices.append(idx)
-
-                # 达到批处理大小或处理最后一批
-                if len(batch) >= batch_size:
-                    # 处理当前批次
-                    for i, (frame_idx, ts, img) in enumerate(zip(batch_indices, batch_timestamps, batch)):
-                        try:
-                            # 分析帧
-                            analysis_result = analyzer(img)
-
-                            # 添加结果
-                            results.append({
-                                "frame_index": frame_idx,
-                                "timestamp": ts,
-                                "result": analysis_result
-                            })
-                        except Exception as e:
-                            logger.error(f"分析帧 {frame_idx} 失败: {str(e)}")
-
-                    # 清空批处理
-                    batch = []
-                    batch_timestamps = []
-                    batch_indices = []
-
-            # 处理剩余的帧
-            if batch:
-                for i, (frame_idx, ts, img) in enumerate(zip(batch_indices, batch_timestamps, batch)):
-                    try:
-                        # 分析帧
-                        analysis_result = analyzer(img)
-
-                        # 添加结果
-                        results.append({
-                            "frame_index": frame_idx,
-                            "timestamp": ts,
-                            "result": analysis_result
-                        })
-                    except Exception as e:
-                        logger.error(f"分析帧 {frame_idx} 失败: {str(e)}")
+            ))
+            self.last_pipeline_stats = pipeline.stats
 
             logger.info(f"成功分析 {len(results)} 帧")
             return results
@@ -564,7 +555,8 @@ class VideoProcessor:
                                 fps: Optional[float] = None,
                                 batch_size: int = 10,
                                 start_time: Optional[float] = None,
-                                end_time: Optional[float] = None) -> List[Dict[str, Any]]:
+                                end_time: Optional[float] = None,
+                                n_workers: int = 1) -> List[Dict[str, Any]]:
         """
         在视频中检测对象
 
@@ -572,9 +564,10 @@ class VideoProcessor:
             video_source: 视频源
             confidence_threshold: 置信度阈值
             fps: 每秒分析的帧数
-            batch_size: 批处理大小
+            batch_size: 批处理大小，每批帧在一次前向传递中完成检测
             start_time: 开始时间（秒）
             end_time: 结束时间（秒）
+            n_workers: 检测工作线程数
 
         返回:
             检测结果列表
@@ -583,28 +576,79 @@ class VideoProcessor:
             logger.error("对象检测器未初始化，无法执行视频对象检测")
             return []
 
-        # 定义分析函数
-        def analyze_frame(frame):
-            # 检测对象
-            detections = self.object_detector.detect(frame)
-
-            # 过滤低置信度检测
-            detections = [
-                d for d in detections if d.confidence >= confidence_threshold]
-
-            # 转换为可序列化格式
-            return [d.to_dict() for d in detections]
+        # 定义批量分析函数
+        def analyze_batch(frames):
+            # 批量检测对象，过滤低置信度检测并转换为可序列化格式
+            return [
+                [d.to_dict() for d in detections if d.confidence >= confidence_threshold]
+                for detections in self.object_detector.detect_batch(frames, batch_size=batch_size)
+            ]
 
         # 分析视频帧
         return self.analyze_video_frames(
             video_source=video_source,
-            analyzer=analyze_frame,
+            batch_analyzer=analyze_batch,
             fps=fps,
             batch_size=batch_size,
             start_time=start_time,
-            end_time=end_time
+            end_time=end_time,
+            n_workers=n_workers
         )
 
+    def run_frame_bus(self,
+                      video_source: Union[str, Path, BinaryIO, Any],
+                      consumers: List[FrameConsumer],
+                      capacity: int = 32,
+                      use_shared_memory: bool = True) -> Dict[str, Any]:
+        """
+        视频只解码一次，分发给多个消费者
+
+        例如同时进行关键帧提取、按不同帧率采样和延时摄影写入：
+            processor.run_frame_bus(path, [
+                KeyFrameConsumer("key_frames", key_dir, threshold=0.3),
+                FrameSamplerConsumer("thumbs", thumb_dir, fps=1),
+                VideoWriterConsumer("timelapse", "timelapse.mp4", stride=10),
+            ])
+        运行统计（解码帧数、各消费者接收/丢帧数和利用率）保存在 last_frame_bus_stats。
+
+        参数:
+            video_source: 视频源
+            consumers: 帧消费者列表，名称不可重复
+            capacity: 共享帧环形缓冲区的帧数
+            use_shared_memory: 是否将缓冲区分配在共享内存中
+
+        返回:
+            消费者名称到其结果的映射
+        """
+        if not CV2_AVAILABLE:
+            logger.error("OpenCV未安装，无法运行帧总线")
+            return {}
+
+        video = None
+        try:
+            video = self.load_video(video_source)
+            if video is None:
+                return {}
+
+            # 从头开始解码
+            video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+            bus = FrameBus(capacity=capacity, use_shared_memory=use_shared_memory)
+            for consumer in consumers:
+                bus.subscribe(consumer)
+
+            self.last_frame_bus_stats = bus.run(video)
+            return bus.results()
+
+        except Exception as e:
+            logger.error(f"运行帧总线失败: {str(e)}")
+            return {}
+
+        finally:
+            # 如果是从文件路径加载，释放资源
+            if isinstance(video_source, (str, Path)) and video is not None:
+                video.release()
+
     def create_timelapse(self,
                          video_source: Union[str, Path, BinaryIO, Any],
                          output_path: str,
@@ -797,6 +841,114 @@ class VideoProcessor:
             if video is not None and video != video_source:
                 video.release()
 
+    def extract_key_frames_fast(self,
+                                video_source: Union[str, Path, BinaryIO, Any],
+                                threshold: float = 0.5,
+                                max_frames: Optional[int] = None,
+                                output_dir: Optional[str] = None,
+                                metric: str = "pixel",
+                                thumbnail_size: Tuple[int, int] = (160, 90),
+                                coarse_to_fine: bool = True,
+                                candidate_ratio: float = 0.5,
+                                batch_size: int = 16,
+                                frame_step: int = 1,
+                                writer_threads: int = 2,
+                                n_workers: int = 1) -> List[str]:
+        """
+        快速提取视频中的关键帧
+
+        与 extract_key_frames 判定方式相同，但在缩略图上批量比较，
+        关键帧在后台线程写入。coarse_to_fine 为True时候选帧用全分辨率差异确认，
+        结果是 extract_key_frames 的近似：缩略图粗筛可能漏掉以高频细节变化为主的关键帧，
+        降低 candidate_ratio 可以提高召回。
+        关键帧的帧索引保存在 last_key_frame_indices。
+
+        参数:
+            video_source: 视频源
+            threshold: 场景变化阈值 (0-1)，值越大意味着需要更大的变化
+            max_frames: 最大提取帧数
+            output_dir: 输出目录
+            metric: 缩略图比较指标，pixel 或 histogram
+            thumbnail_size: 缩略图尺寸 (宽, 高)
+            coarse_to_fine: 是否用全分辨率差异确认候选帧
+            candidate_ratio: 粗筛阈值相对于threshold的比例
+            batch_size: 每批检测的帧数
+            frame_step: 每frame_step帧检测一帧
+            writer_threads: 后台写入线程数
+            n_workers: 大于1且视频源为文件路径时，将视频分段并行解码检测，
+                       关键帧文件以帧索引命名
+
+        返回:
+            关键帧文件路径列表
+        """
+        if not CV2_AVAILABLE:
+            logger.error("OpenCV未安装，无法提取关键帧")
+            return []
+
+        detector_kwargs = {
+            "threshold": threshold,
+            "metric": metric,
+            "thumbnail_size": thumbnail_size,
+            "coarse_to_fine": coarse_to_fine,
+            "candidate_ratio": candidate_ratio,
+        }
+
+        video = None
+        try:
+            if n_workers > 1 and isinstance(video_source, (str, Path)):
+                output_dir = output_dir or self.temp_dir
+                os.makedirs(output_dir, exist_ok=True)
+                key_frame_paths, self.last_key_frame_indices = extract_key_frames_parallel(
+                    str(video_source),
+                    output_dir,
+                    detector_kwargs,
+                    n_workers=n_workers,
+                    max_frames=max_frames,
+                    batch_size=batch_size,
+                    frame_step=frame_step
+                )
+                logger.info(f"成功提取 {len(key_frame_paths)} 个关键帧")
+                return key_frame_paths
+
+            # 加载视频
+            if not isinstance(video_source, cv2.VideoCapture):
+                video = self.load_video(video_source)
+            else:
+                video = video_source
+
+            if video is None or not video.isOpened():
+                logger.error("无法打开视频")
+                return []
+
+            # 设置输出目录
+            if output_dir is None:
+                output_dir = self.temp_dir
+            elif not os.path.exists(output_dir):
+                os.makedirs(output_dir)
+
+            detector = KeyFrameDetector(**detector_kwargs)
+            key_frame_paths, self.last_key_frame_indices = extract_key_frames_batched(
+                video,
+                output_dir,
+                detector,
+                max_frames=max_frames,
+                batch_size=batch_size,
+                frame_step=frame_step,
+                writer_threads=writer_threads
+            )
+
+            logger.info(f"成功提取 {len(key_frame_paths)} 个关键帧")
+            return key_frame_paths
+
+        except Exception as e:
+            logger.error(f"提取关键帧失败: {str(e)}")
+            return []
+
+        finally:
+            # 关闭视频（如果我们创建了它）
+            if video is not None and video is not video_source:
+                video.release()
+
     def process_video(self,
                       video_source: Union[str, Path, BinaryIO, Any],
                       output_path: str,
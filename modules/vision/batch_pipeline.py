@@ -0,0 +1,521 @@
+# -*- coding: utf-8 -*-
+"""
+视觉模块: 批量图像处理流水线
+功能描述: 将 缩放/颜色转换/滤镜/标准化 步骤串联，按批处理图像列表或4维数组。
+         中间结果写入每个线程预分配的缓冲区，输出写入预分配的批量数组，
+         滤镜直接使用OpenCV实现（与PIL效果一致），并在线程池中并行（OpenCV释放GIL）
+版本: 1.0.0
+作者: 窗口6开发人员
+创建日期: 2026-10-18
+"""
+
+import math
+import time
+import logging
+import threading
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple, Any, Optional, Union, Callable
+
+import numpy as np
+
+# 尝试导入可选依赖
+try:
+    import cv2
+
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+# 初始化日志记录器
+logger = logging.getLogger(__name__)
+
+# 与PIL ImageFilter 效果相同的卷积核（PIL的核按行上下翻转后作用于图像）
+_SMOOTH_KERNEL = np.array([[1, 1, 1], [1, 5, 1], [1, 1, 1]], dtype=np.float32) / 13.0
+_EDGE_KERNEL = np.array([[-1, -1, -1], [-1, 8, -1], [-1, -1, -1]], dtype=np.float32)
+_EMBOSS_KERNEL = np.array([[0, 0, 0], [0, 1, 0], [-1, 0, 0]], dtype=np.float32)
+
+# OpenCV可直接实现的滤镜
+CV2_FILTERS = ("blur", "sharpen", "edge", "emboss", "brightness", "contrast", "color")
+
+# PIL GaussianBlur 用扩展盒式模糊近似高斯模糊的次数
+_BOX_BLUR_PASSES = 3
+
+
+def kernel_size_to_radius(kernel_size: int) -> float:
+    """
+    将OpenCV高斯核尺寸换算为模糊半径（标准差），与 cv2.getGaussianKernel 的默认sigma相同
+
+    参数:
+        kernel_size: 正奇数核尺寸
+
+    返回:
+        模糊半径
+
+    异常:
+        ValueError: 核尺寸不是正奇数
+    """
+    kernel_size = int(kernel_size)
+    if kernel_size <= 0 or kernel_size % 2 == 0:
+        raise ValueError(f"kernel_size必须为正奇数: {kernel_size}")
+    return 0.3 * ((kernel_size - 1) * 0.5 - 1) + 0.8
+
+
+def _box_blur_kernel(radius: float) -> np.ndarray:
+    """
+    PIL扩展盒式模糊的一维核：中间 2r+1 个权重为1，两端权重为半径的小数部分
+
+    盒式半径按 Gwosdek 等人的方法由高斯半径换算，与PIL的 _gaussian_blur_radius 相同
+    """
+    sigma2 = radius * radius / _BOX_BLUR_PASSES
+    length = math.sqrt(12.0 * sigma2 + 1.0)
+    whole = math.floor((length - 1.0) / 2.0)
+    box = whole + (2 * whole + 1) * (whole * (whole + 1) - 3 * sigma2) / (
+        6 * (sigma2 - (whole + 1) * (whole + 1)))
+    # PIL用单精度计算盒式半径
+    box = float(np.float32(box))
+    kernel = np.ones(2 * whole + 3, dtype=np.float32)
+    kernel[0] = kernel[-1] = box - whole
+    return kernel / np.float32(2 * box + 1)
+
+
+def _gaussian_blur(image: np.ndarray, radius: float, dst: Optional[np.ndarray] = None) -> np.ndarray:
+    """按PIL GaussianBlur 的方式模糊：水平、竖直方向各做三次扩展盒式模糊，边界像素外延"""
+    if radius <= 0:
+        if dst is None:
+            return image.copy()
+        np.copyto(dst, image)
+        return dst
+    kernel = _box_blur_kernel(radius)
+    one = np.ones(1, dtype=np.float32)
+    result = image.astype(np.float32)
+    for _ in range(_BOX_BLUR_PASSES):
+        result = cv2.sepFilter2D(result, -1, kernel, one, borderType=cv2.BORDER_REPLICATE)
+    for _ in range(_BOX_BLUR_PASSES):
+        result = cv2.sepFilter2D(result, -1, one, kernel, borderType=cv2.BORDER_REPLICATE)
+    return cv2.convertScaleAbs(result, dst=dst)
+
+
+def _kernel_filter(image: np.ndarray,
+                   kernel: np.ndarray,
+                   dst: Optional[np.ndarray] = None,
+                   delta: float = 0) -> np.ndarray:
+    """3x3卷积，与PIL ImageFilter.Kernel 相同，最外圈像素保持原值"""
+    result = cv2.filter2D(image, -1, kernel, dst=dst, delta=delta)
+    result[0] = image[0]
+    result[-1] = image[-1]
+    result[:, 0] = image[:, 0]
+    result[:, -1] = image[:, -1]
+    return result
+
+
+def cv2_filter(image: np.ndarray,
+               filter_type: str,
+               dst: Optional[np.ndarray] = None,
+               bgr: bool = True,
+               work: Optional[np.ndarray] = None,
+               **kwargs) -> np.ndarray:
+    """
+    使用OpenCV应用滤镜，参数和效果与 ImageProcessor.apply_filter 的PIL实现一致
+
+    参数:
+        image: 输入图像 (uint8)
+        filter_type: 滤镜类型，见 CV2_FILTERS
+        dst: 输出缓冲区，形状和类型需与输入相同
+        bgr: 彩色图像通道顺序是否为BGR（影响灰度计算）
+        work: sharpen/color 使用的中间缓冲区，形状和类型需与输入相同
+        **kwargs: 滤镜参数，blur 使用 radius 或 kernel_size（OpenCV高斯核尺寸，换算为半径），
+            sharpen/brightness/contrast/color 使用 factor
+
+    返回:
+        滤镜结果（提供dst时即为dst）
+    """
+    filter_type = filter_type.lower()
+    is_color = image.ndim == 3 and image.shape[2] == 3
+
+    if filter_type == "blur":
+        if "kernel_size" in kwargs:
+            radius = kernel_size_to_radius(kwargs["kernel_size"])
+        else:
+            radius = kwargs.get("radius", 2)
+        return _gaussian_blur(image, radius, dst=dst)
+
+    if filter_type == "sharpen":
+        # PIL Sharpness: 在平滑图像和原图之间按factor插值
+        factor = kwargs.get("factor", 2.0)
+        smooth = _kernel_filter(image, _SMOOTH_KERNEL, dst=work)
+        return cv2.addWeighted(image, factor, smooth, 1.0 - factor, 0, dst=dst)
+
+    if filter_type == "edge":
+        return _kernel_filter(image, _EDGE_KERNEL, dst=dst)
+
+    if filter_type == "emboss":
+        return _kernel_filter(image, _EMBOSS_KERNEL, dst=dst, delta=128)
+
+    if filter_type == "brightness":
+        factor = kwargs.get("factor", 1.5)
+        return cv2.addWeighted(image, factor, image, 0, 0, dst=dst)
+
+    if filter_type == "contrast":
+        # PIL Contrast: 向灰度均值插值
+        factor = kwargs.get("factor", 1.5)
+        # 灰度均值由各通道均值加权得到，无需生成灰度图
+        channel_means = cv2.mean(image)
+        if is_color:
+            blue, green, red = channel_means[:3] if bgr else channel_means[2::-1]
+            mean = int(0.299 * red + 0.587 * green + 0.114 * blue + 0.5)
+        else:
+            mean = int(channel_means[0] + 0.5)
+        return cv2.addWeighted(image, factor, image, 0, mean * (1.0 - factor), dst=dst)
+
+    if filter_type == "color":
+        # PIL Color: 向灰度图插值，灰度图像保持不变
+        factor = kwargs.get("factor", 1.5)
+        if not is_color:
+            if dst is None:
+                return image.copy()
+            np.copyto(dst, image)
+            return dst
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY if bgr else cv2.COLOR_RGB2GRAY)
+        gray = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR, dst=work)
+        return cv2.addWeighted(image, factor, gray, 1.0 - factor, 0, dst=dst)
+
+    raise ValueError(f"OpenCV不支持的滤镜类型: {filter_type}")
+
+
+class _Step:
+    """流水线步骤：根据输入形状和类型推导输出，并将结果写入给定缓冲区"""
+
+    def __init__(self,
+                 name: str,
+                 apply: Callable[[np.ndarray, np.ndarray], Any],
+                 spec: Callable[[Tuple[int, ...], np.dtype], Tuple[Tuple[int, ...], np.dtype]]):
+        self.name = name
+        self.apply = apply
+        self.spec = spec
+
+
+def _same_spec(shape: Tuple[int, ...], dtype: np.dtype) -> Tuple[Tuple[int, ...], np.dtype]:
+    return shape, dtype
+
+
+class BatchImagePipeline:
+    """
+    批量图像处理流水线
+
+    通过链式调用添加步骤，例如:
+        pipeline = BatchImagePipeline(n_workers=4).resize(224, 224).filter("sharpen").normalize()
+        batch = pipeline.run(images)  # (N, 224, 224, 3) float32
+
+    每个工作线程为每个中间步骤持有一块可复用的缓冲区，最后一步直接写入输出数组，
+    预热后处理一批图像只分配输出数组（reuse_output为True时不再分配）。
+    allocations 记录流水线分配的缓冲区数量。
+    """
+
+    # 颜色转换代码，键为 (当前通道顺序, 目标格式)
+    _COLOR_CODES = {
+        ("BGR", "RGB"): "COLOR_BGR2RGB",
+        ("RGB", "BGR"): "COLOR_RGB2BGR",
+        ("BGR", "GRAY"): "COLOR_BGR2GRAY",
+        ("RGB", "GRAY"): "COLOR_RGB2GRAY",
+    }
+
+    def __init__(self, n_workers: int = 4, channel_order: str = "BGR", reuse_output: bool = False):
+        """
+        初始化流水线
+
+        参数:
+            n_workers: 工作线程数
+            channel_order: 输入彩色图像的通道顺序，BGR 或 RGB
+            reuse_output: 是否在多次 run 之间复用输出数组。
+                          为True时上一次的结果会被下一次覆盖
+        """
+        if not CV2_AVAILABLE:
+            raise ImportError("批量图像流水线需要OpenCV")
+        if channel_order not in ("BGR", "RGB"):
+            raise ValueError(f"无效的通道顺序: {channel_order}")
+
+        self.n_workers = max(1, int(n_workers))
+        self.channel_order = channel_order
+        self.reuse_output = reuse_output
+        self.steps = []
+        self.allocations = 0
+
+        self._order = channel_order
+        self._output = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def resize(self, width: int, height: int, interpolation: Optional[int] = None) -> "BatchImagePipeline":
+        """
+        添加缩放步骤，之后的所有图像尺寸一致
+
+        参数:
+            width: 目标宽度
+            height: 目标高度
+            interpolation: 插值方法，默认INTER_AREA
+        """
+        interpolation = cv2.INTER_AREA if interpolation is None else interpolation
+        size = (int(width), int(height))
+
+        def apply(src, dst):
+            cv2.resize(src, size, dst=dst, interpolation=interpolation)
+
+        def spec(shape, dtype):
+            return (size[1], size[0]) + tuple(shape[2:]), dtype
+
+        self.steps.append(_Step("resize", apply, spec))
+        return self
+
+    def convert_color(self, target: str) -> "BatchImagePipeline":
+        """
+        添加颜色转换步骤
+
+        参数:
+            target: 目标格式，RGB、BGR 或 GRAY
+        """
+        if target == self._order:
+            return self
+        key = (self._order, target)
+        if key not in self._COLOR_CODES:
+            raise ValueError(f"不支持的颜色转换: {self._order} -> {target}")
+        code = getattr(cv2, self._COLOR_CODES[key])
+
+        def apply(src, dst):
+            cv2.cvtColor(src, code, dst=dst)
+
+        def spec(shape, dtype):
+            return (tuple(shape[:2]) if target == "GRAY" else tuple(shape[:2]) + (3,)), dtype
+
+        self.steps.append(_Step(f"color_{target.lower()}", apply, spec))
+        self._order = target
+        return self
+
+    def filter(self, filter_type: str, **kwargs) -> "BatchImagePipeline":
+        """
+        添加滤镜步骤，参数与 ImageProcessor.apply_filter 相同
+
+        参数:
+            filter_type: 滤镜类型，见 CV2_FILTERS
+            **kwargs: 滤镜参数
+        """
+        filter_type = filter_type.lower()
+        if filter_type not in CV2_FILTERS:
+            raise ValueError(f"不支持的滤镜类型: {filter_type}")
+        if filter_type == "blur" and "kernel_size" in kwargs:
+            kernel_size_to_radius(kwargs["kernel_size"])
+        bgr = self._order != "RGB"
+        index = len(self.steps)
+
+        def apply(src, dst):
+            work = None
+            if filter_type in ("sharpen", "color"):
+                work = self._scratch(-1 - index, src.shape, src.dtype)
+            cv2_filter(src, filter_type, dst=dst, bgr=bgr, work=work, **kwargs)
+
+        self.steps.append(_Step(f"filter_{filter_type}", apply, _same_spec))
+        return self
+
+    def normalize(self,
+                  mean: Optional[Union[float, Tuple[float, ...]]] = None,
+                  std: Optional[Union[float, Tuple[float, ...]]] = None) -> "BatchImagePipeline":
+        """
+        添加标准化步骤，uint8 转换为 [0,1] 的float32，可选再减均值除标准差（原地完成）
+
+        参数:
+            mean: 各通道均值
+            std: 各通道标准差
+        """
+        mean = None if mean is None else np.asarray(mean, dtype=np.float32)
+        inv_std = None if std is None else (1.0 / np.asarray(std, dtype=np.float32))
+
+        def apply(src, dst):
+            scale = 255.0 if src.dtype == np.uint8 else (65535.0 if src.dtype == np.uint16 else 1.0)
+            np.divide(src, np.float32(scale), out=dst, casting="unsafe")
+            if mean is not None:
+                np.subtract(dst, mean, out=dst)
+            if inv_std is not None:
+                np.multiply(dst, inv_std, out=dst)
+
+        def spec(shape, dtype):
+            return shape, np.dtype(np.float32)
+
+        self.steps.append(_Step("normalize", apply, spec))
+        return self
+
+    def _plan(self, shape: Tuple[int, ...], dtype: np.dtype) -> List[Tuple[Tuple[int, ...], np.dtype]]:
+        """推导每一步的输出形状和类型"""
+        specs = []
+        for step in self.steps:
+            shape, dtype = step.spec(shape, dtype)
+            specs.append((tuple(shape), np.dtype(dtype)))
+        return specs
+
+    def _scratch(self, index: int, shape: Tuple[int, ...], dtype: np.dtype) -> np.ndarray:
+        """获取当前线程的中间缓冲区"""
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+
+        key = (index, shape, dtype)
+        buffer = buffers.get(key)
+        if buffer is None:
+            buffer = buffers[key] = np.empty(shape, dtype=dtype)
+            with self._lock:
+                self.allocations += 1
+        return buffer
+
+    def _process(self, image: np.ndarray, out: np.ndarray):
+        """处理单张图像，结果写入out"""
+        if not self.steps:
+            np.copyto(out, image)
+            return
+
+        specs = self._plan(image.shape, image.dtype)
+        if specs[-1][0] != out.shape:
+            raise ValueError(f"图像输出形状 {specs[-1][0]} 与批量输出 {out.shape} 不一致，请添加resize步骤")
+
+        src = image
+        last = len(self.steps) - 1
+        for i, (step, (shape, dtype)) in enumerate(zip(self.steps, specs)):
+            dst = out if i == last else self._scratch(i, shape, dtype)
+            step.apply(src, dst)
+            src = dst
+
+    def _output_buffer(self, count: int, shape: Tuple[int, ...], dtype: np.dtype) -> np.ndarray:
+        """获取批量输出数组"""
+        full_shape = (count,) + shape
+        if self.reuse_output and self._output is not None and self._output.shape == full_shape \
+                and self._output.dtype == dtype:
+            return self._output
+
+        output = np.empty(full_shape, dtype=dtype)
+        with self._lock:
+            self.allocations += 1
+        if self.reuse_output:
+            self._output = output
+        return output
+
+    def run(self,
+            images: Union[List[np.ndarray], np.ndarray],
+            out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        处理一批图像
+
+        参数:
+            images: 图像列表或形状为 (N, H, W[, C]) 的数组。
+                    没有resize步骤时所有图像尺寸必须一致
+            out: 输出数组，形状为 (N,) + 单张输出形状，不提供时自动分配
+
+        返回:
+            形状为 (N,) + 单张输出形状 的数组
+        """
+        count = len(images)
+        if count == 0:
+            return np.empty((0,), dtype=np.uint8) if out is None else out
+
+        first = images[0]
+        shape, dtype = (self._plan(first.shape, first.dtype) or [(tuple(first.shape), first.dtype)])[-1]
+        if out is None:
+            out = self._output_buffer(count, shape, dtype)
+        elif out.shape != (count,) + shape or out.dtype != dtype:
+            raise ValueError(f"输出数组应为 {(count,) + shape} {dtype}，实际为 {out.shape} {out.dtype}")
+
+        def process_range(bounds):
+            for i in range(*bounds):
+                self._process(images[i], out[i])
+
+        if self.n_workers == 1 or count == 1:
+            process_range((0, count))
+            return out
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.n_workers, thread_name_prefix="image-batch")
+
+        # 每个线程处理连续的一段图像，减少任务调度开销
+        chunk = -(-count // (self.n_workers * 4))
+        list(self._executor.map(process_range, [(i, min(i + chunk, count)) for i in range(0, count, chunk)]))
+        return out
+
+    def close(self):
+        """关闭线程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def benchmark_image_pipeline(processor: Any,
+                             images: List[np.ndarray],
+                             width: int = 224,
+                             height: int = 224,
+                             filter_type: str = "sharpen",
+                             worker_counts: Tuple[int, ...] = (1, 2, 4)) -> Dict[str, Any]:
+    """
+    对比逐张调用 ImageProcessor 方法与批量流水线处理 缩放→滤镜→标准化 的性能
+
+    参数:
+        processor: ImageProcessor实例
+        images: 测试图像列表 (BGR uint8)
+        width: 目标宽度
+        height: 目标高度
+        filter_type: 滤镜类型
+        worker_counts: 需要测试的工作线程数
+
+    返回:
+        逐张处理和各线程数下批量处理的 图像/秒、峰值内存和新数组数量
+    """
+    from .image_processor import resize_image, normalize_image
+
+    results = {}
+
+    # 逐张处理：每一步都返回新数组，结果保存在列表中以便与批量输出的内存占用对比
+    new_arrays = 0
+    outputs = []
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    for image in images:
+        for step in (
+            lambda x: resize_image(x, width=width, height=height),
+            lambda x: processor.apply_filter(x, filter_type),
+            normalize_image,
+        ):
+            result = step(image)
+            new_arrays += result is not image
+            image = result
+        outputs.append(image)
+    elapsed = time.perf_counter() - start_time
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results["per_image"] = {
+        "images_per_sec": len(images) / elapsed if elapsed > 0 else float("inf"),
+        "allocations": new_arrays,
+        "peak_bytes": peak,
+    }
+
+    for n_workers in worker_counts:
+        with BatchImagePipeline(n_workers=n_workers) as pipeline:
+            pipeline.resize(width, height).filter(filter_type).normalize()
+            tracemalloc.start()
+            start_time = time.perf_counter()
+            pipeline.run(images)
+            elapsed = time.perf_counter() - start_time
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        results[f"batch_{n_workers}"] = {
+            "images_per_sec": len(images) / elapsed if elapsed > 0 else float("inf"),
+            "allocations": pipeline.allocations,
+            "peak_bytes": peak,
+        }
+        logger.info(
+            f"{n_workers} 个线程: {results[f'batch_{n_workers}']['images_per_sec']:.1f} 图像/秒, "
+            f"分配 {pipeline.allocations} 个缓冲区")
+
+    return results
@@ -47,6 +47,8 @@ except ImportError:
         "cache_size": 100,
     }
 
+from .batch_pipeline import BatchImagePipeline, cv2_filter, kernel_size_to_radius, CV2_FILTERS
+
 # 初始化日志记录器
 logger = logging.getLogger(__name__)
 
@@ -106,6 +108,9 @@ class ImageProcessor:
         self.cache = OrderedDict()
         self.temp_dir = None
 
+        # 批量预处理流水线，按 (输出尺寸, 线程数) 复用以保留各线程的缓冲区
+        self._batch_pipelines = {}
+
         logger.info(
             f"图像处理器初始化，格式: {self.config.format}, 最大尺寸: {self.config.max_size}"
         )
@@ -313,6 +318,84 @@ class ImageProcessor:
 
         return image
 
+    def _build_batch_pipeline(
+        self, size: Optional[Tuple[int, int]], n_workers: int
+    ) -> BatchImagePipeline:
+        """按配置构建与 preprocess_image 等价的批量流水线"""
+        key = (size, n_workers)
+        pipeline = self._batch_pipelines.get(key)
+        if pipeline is not None:
+            return pipeline
+
+        # 与 preprocess_image 相同：输出BGR时假设输入为RGB，否则假设输入为BGR
+        channel_order = (
+            "RGB" if self.config.format == "BGR" and not self.config.grayscale else "BGR"
+        )
+        pipeline = BatchImagePipeline(n_workers=n_workers, channel_order=channel_order)
+        if size is not None:
+            pipeline.resize(*size)
+        if self.config.grayscale:
+            pipeline.convert_color("GRAY")
+        else:
+            pipeline.convert_color(self.config.format)
+        if self.config.normalize:
+            pipeline.normalize()
+
+        self._batch_pipelines[key] = pipeline
+        return pipeline
+
+    def preprocess_batch(
+        self,
+        images: Union[List[np.ndarray], np.ndarray],
+        n_workers: int = 4,
+        out: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        批量预处理彩色图像，效果与逐张调用 preprocess_image 相同
+
+        中间结果写入复用的缓冲区，结果写入一个批量数组，并在线程池中并行处理。
+        未同时配置 resize_width 和 resize_height 时，所有图像尺寸必须一致。
+
+        参数:
+            images: 图像列表或形状为 (N, H, W, 3) 的数组
+            n_workers: 工作线程数
+            out: 输出数组，不提供时自动分配
+
+        返回:
+            形状为 (N, H', W', C) 的数组，灰度输出时 C 为1
+
+        异常:
+            ValueError: 目标尺寸取决于输入尺寸而图像尺寸不一致
+        """
+        if len(images) == 0:
+            return np.empty((0,), dtype=np.uint8)
+
+        # 与 preprocess_image 相同：同时指定宽高或设置了 max_size 时才调整大小
+        resize_width, resize_height = self.config.resize_width, self.config.resize_height
+        fixed_size = resize_width is not None and resize_height is not None
+        size = None
+        if fixed_size or self.config.max_size:
+            height, width = images[0].shape[:2]
+            if not fixed_size:
+                # 目标尺寸按第一张图像计算，不能用于其他尺寸的图像
+                for image in images[1:]:
+                    if image.shape[:2] != (height, width):
+                        raise ValueError(
+                            f"按比例调整大小时图像尺寸必须一致: {image.shape[:2]} != {(height, width)}"
+                        )
+            size = _compute_resize_size(
+                height, width, resize_width, resize_height, self.config.max_size
+            )
+        pipeline = self._build_batch_pipeline(size, n_workers)
+
+        if self.config.grayscale:
+            # 灰度结果保持4维形状，与 preprocess_image 的3维灰度图一致
+            if out is not None:
+                out = out[..., 0]
+            return pipeline.run(images, out=out)[..., np.newaxis]
+
+        return pipeline.run(images, out=out)
+
     def save_image(
         self, image: np.ndarray, path: Union[str, Path], format: Optional[str] = None
     ) -> bool:
@@ -442,7 +525,8 @@ class ImageProcessor:
         参数:
             image: 输入图像
             filter_type: 滤镜类型，如 'blur', 'sharpen', 'edge'等
-            **kwargs: 滤镜参数
+            **kwargs: 滤镜参数，blur 使用 radius 或 kernel_size（OpenCV高斯核尺寸），
+                sharpen/brightness/contrast/color 使用 factor
 
         返回:
             应用滤镜后的图像
@@ -454,6 +538,21 @@ class ImageProcessor:
         try:
             filter_type = filter_type.lower()
 
+            if (
+                CV2_AVAILABLE
+                and filter_type in CV2_FILTERS
+                and image.dtype == np.uint8
+                and (image.ndim == 2 or image.shape[2] in (1, 3))
+            ):
+                # OpenCV实现与PIL效果一致，避免转换为PIL图像再转回的复制
+                if image.ndim == 3 and image.shape[2] == 1:
+                    return cv2_filter(image[..., 0], filter_type, **kwargs)[
+                        ..., np.newaxis
+                    ]
+                return cv2_filter(
+                    image, filter_type, bgr=self.config.format == "BGR", **kwargs
+                )
+
             if PIL_AVAILABLE:
                 # 使用PIL应用滤镜
                 if (
@@ -471,7 +570,10 @@ class ImageProcessor:
                 )
 
                 if filter_type == "blur":
-                    radius = kwargs.get("radius", 2)
+                    if "kernel_size" in kwargs:
+                        radius = kernel_size_to_radius(kwargs["kernel_size"])
+                    else:
+                        radius = kwargs.get("radius", 2)
                     filtered = pil_image.filter(
                         ImageFilter.GaussianBlur(radius=radius))
 
@@ -709,6 +811,49 @@ class ImageProcessor:
 # 工具函数
 
 
+def _compute_resize_size(
+    h: int,
+    w: int,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    max_size: Optional[int] = None,
+) -> Optional[Tuple[int, int]]:
+    """
+    计算调整后的图像尺寸
+
+    返回:
+        (新宽度, 新高度)，不需要调整时返回None
+    """
+    # 如果明确指定了宽度和高度
+    if width is not None and height is not None:
+        new_w, new_h = width, height
+
+    # 如果只指定了宽度，按比例计算高度
+    elif width is not None:
+        new_w = width
+        new_h = int(h * (width / w))
+
+    # 如果只指定了高度，按比例计算宽度
+    elif height is not None:
+        new_h = height
+        new_w = int(w * (height / h))
+
+    # 如果设置了最大尺寸限制
+    elif max_size is not None and (w > max_size or h > max_size):
+        if w > h:
+            new_w = max_size
+            new_h = int(h * (max_size / w))
+        else:
+            new_h = max_size
+            new_w = int(w * (max_size / h))
+
+    else:
+        return None
+
+    # 确保尺寸至少为1
+    return max(1, new_w), max(1, new_h)
+
+
 def resize_image(
     image: np.ndarray,
     width: Optional[int] = None,
@@ -732,41 +877,15 @@ def resize_image(
 
     try:
         # 获取原始尺寸
-        if len(image.shape) > 2:
-            h, w = image.shape[:2]
-        else:
-            h, w = image.shape
-
-        # 如果明确指定了宽度和高度
-        if width is not None and height is not None:
-            new_w, new_h = width, height
-
-        # 如果只指定了宽度，按比例计算高度
-        elif width is not None:
-            new_w = width
-            new_h = int(h * (width / w))
-
-        # 如果只指定了高度，按比例计算宽度
-        elif height is not None:
-            new_h = height
-            new_w = int(w * (height / h))
-
-        # 如果设置了最大尺寸限制
-        elif max_size is not None and (w > max_size or h > max_size):
-            if w > h:
-                new_w = max_size
-                new_h = int(h * (max_size / w))
-            else:
-                new_h = max_size
-                new_w = int(w * (max_size / h))
+        h, w = image.shape[:2]
+
+        size = _compute_resize_size(h, w, width, height, max_size)
 
         # 如果没有任何调整参数，返回原图
-        else:
+        if size is None:
             return image
 
-        # 确保尺寸至少为1
-        new_w = max(1, new_w)
-        new_h = max(1, new_h)
+        new_w, new_h = size
 
         # 调整图像大小
         if CV2_AVAILABLE:
@@ -831,10 +950,11 @@ def normalize_image(image: np.ndarray) -> np.ndarray:
         return image
 
     try:
+        # 类型转换和缩放在一次运算中完成，只分配一个输出数组
         if image.dtype == np.uint8:
-            return image.astype(np.float32) / 255.0
+            return np.divide(image, np.float32(255.0), dtype=np.float32)
         elif image.dtype == np.uint16:
-            return image.astype(np.float32) / 65535.0
+            return np.divide(image, np.float32(65535.0), dtype=np.float32)
         else:
             # 已经是浮点类型，确保在[0,1]范围内
             min_val = np.min(image)
@@ -7,32 +7,37 @@
 创建日期: 2025-04-17
 """
 
-from .. config.config_loader import ConfigLoader
-import core
 import os
+import time
 import logging
 import json
+import threading
 from pathlib import Path
 from typing import Dict, List, Tuple, Any, Optional, Union
 from dataclasses import dataclass
-import modules.nlp as np
+import numpy as np
 
 # 尝试导入可选依赖
 try:
-import ui.cli
-CV2_AVAILABLE = True
+    import cv2
+
+    CV2_AVAILABLE = True
 except ImportError:
     CV2_AVAILABLE = False
 
 try:
-TORCH_AVAILABLE = True
+    import torch
+
+    TORCH_AVAILABLE = True
 except ImportError:
     TORCH_AVAILABLE = False
 
 # 从配置加载器获取配置
 try:
-config_loader = ConfigLoader()
-DETECTION_CONFIG = config_loader.load("modules.vision.object_detection")
+    from config.config_loader import ConfigLoader
+
+    config_loader = ConfigLoader()
+    DETECTION_CONFIG = config_loader.load("modules.vision.object_detection")
 except ImportError:
     DETECTION_CONFIG = {
         "model_path": "models/detection/default",
@@ -145,6 +150,80 @@ class DetectionResult:
         )
 
 
+def split_batch_outputs(layer_outputs: List[np.ndarray], batch_count: int) -> List[List[np.ndarray]]:
+    """
+    将批量前向传递的各输出层按图像拆分
+
+    OpenCV不同版本的检测层输出可能为 (N, rows, C) 或 (N*rows, C)，两种形式均可处理。
+
+    参数:
+        layer_outputs: 各输出层的输出
+        batch_count: blob中的图像数量
+
+    返回:
+        每张图像对应的输出层列表
+    """
+    per_image = [[] for _ in range(batch_count)]
+    for output in layer_outputs:
+        output = np.asarray(output)
+        parts = output.reshape(batch_count, -1, output.shape[-1])
+        for i in range(batch_count):
+            per_image[i].append(parts[i])
+    return per_image
+
+
+def decode_detections(layer_outputs: List[np.ndarray],
+                      width: int,
+                      height: int,
+                      confidence_threshold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    向量化解码YOLO格式的检测输出
+
+    每行格式为 [center_x, center_y, w, h, objectness, class_scores...]，坐标为相对值。
+    取整方式与逐行 int() 截断一致。
+
+    参数:
+        layer_outputs: 单张图像的各输出层
+        width: 原始图像宽度
+        height: 原始图像高度
+        confidence_threshold: 置信度阈值
+
+    返回:
+        (检测框 (n, 4) 的 x, y, w, h, 置信度, 类别ID)
+    """
+    rows = [np.asarray(output).reshape(-1, np.asarray(output).shape[-1]) for output in layer_outputs]
+    if not rows:
+        return np.zeros((0, 4), dtype=np.int64), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+    rows = np.concatenate(rows)
+
+    scores = rows[:, 5:]
+    class_ids = np.argmax(scores, axis=1)
+    confidences = scores[np.arange(len(rows)), class_ids]
+
+    mask = confidences > confidence_threshold
+    rows, class_ids, confidences = rows[mask], class_ids[mask], confidences[mask]
+
+    # 检测框中心和尺寸先各自截断取整，再计算左上角坐标
+    center_x = np.trunc(rows[:, 0] * width).astype(np.float64)
+    center_y = np.trunc(rows[:, 1] * height).astype(np.float64)
+    w = np.trunc(rows[:, 2] * width).astype(np.float64)
+    h = np.trunc(rows[:, 3] * height).astype(np.float64)
+    x = np.trunc(center_x - w / 2)
+    y = np.trunc(center_y - h / 2)
+
+    boxes = np.stack([x, y, w, h], axis=1).astype(np.int64)
+    return boxes, confidences, class_ids.astype(np.int64)
+
+
+def _tile_starts(length: int, tile: int, overlap: float) -> List[int]:
+    """计算一个方向上各图块的起始坐标，最后一个图块与边缘对齐"""
+    step = max(1, int(tile * (1 - overlap)))
+    starts = list(range(0, max(length - tile, 0) + 1, step))
+    if starts[-1] + tile < length:
+        starts.append(length - tile)
+    return starts
+
+
 class ObjectDetector:
     """对象检测器类"""
 
@@ -174,6 +253,8 @@ class ObjectDetector:
         self.enable_gpu = enable_gpu
         self.model = None
         self.loaded = False
+        # OpenCV DNN网络的setInput/forward不是线程安全的，多线程共享检测器时串行化前向传递
+        self._forward_lock = threading.Lock()
 
         # 设置模型路径
         if model_path is None:
@@ -544,92 +625,128 @@ class ObjectDetector:
             logger.error(f"执行对象检测失败: {str(e)}")
             return []
 
-    def _detect_opencv(self, image: np.ndarray) -> List[DetectionResult]:
+    def detect_batch(self,
+                     images: List[np.ndarray],
+                     batch_size: int = 16) -> List[List[DetectionResult]]:
         """
-        使用OpenCV DNN模型检测对象
+        批量检测多张图像中的对象
+
+        OpenCV/YOLO后端将每批图像堆叠为一个blob做一次前向传递，
+        PyTorch后端一次推理处理一批图像，结果与逐张调用 detect 一致。
 
         参数:
-            image: 输入图像
+            images: 输入图像列表
+            batch_size: 每次前向传递的图像数量
 
         返回:
-            检测结果列表
+            与输入顺序对应的检测结果列表
         """
-        height, width = image.shape[:2]
+        results = [[] for _ in images]
+        if not self.loaded or self.model is None:
+            logger.error("检测模型未加载，无法执行检测")
+            return results
 
-        # 创建blob，并进行前向传递
-        blob = cv2.dnn.blobFromImage(
-            image, 1/255.0, (416, 416), swapRB=True, crop=False)
-        self.model.setInput(blob)
+        valid = [i for i, image in enumerate(images) if image is not None and image.size > 0]
+        if len(valid) < len(images):
+            logger.warning(f"跳过 {len(images) - len(valid)} 张空图像")
 
-        # 获取模型的输出层
-        output_layers = self.model.getUnconnectedOutLayersNames()
-        layer_outputs = self.model.forward(output_layers)
-
-        # 处理检测结果
-        class_ids = []
-        confidences = []
-        boxes = []
-
-        for output in layer_outputs:
-            for detection in output:
-                # 提取类别ID和置信度
-                scores = detection[5:]
-                class_id = np.argmax(scores)
-                confidence = scores[class_id]
-
-                if confidence > self.confidence_threshold:
-                    # 检测到对象，计算包围框
-                    center_x = int(detection[0] * width)
-                    center_y = int(detection[1] * height)
-                    w = int(detection[2] * width)
-                    h = int(detection[3] * height)
-
-                    # 左上角坐标
-                    x = int(center_x - w / 2)
-                    y = int(center_y - h / 2)
-
-                    boxes.append([x, y, w, h])
-                    confidences.append(float(confidence))
-                    class_ids.append(int(class_id))
-
-        # 应用非极大值抑制
-        indices = cv2.dnn.NMSBoxes(
-            boxes, confidences, self.confidence_threshold, self.nms_threshold)
+        batch_size = max(1, int(batch_size))
+        for start in range(0, len(valid), batch_size):
+            indices = valid[start:start + batch_size]
+            batch = [images[i] for i in indices]
+            try:
+                if self.model_type in ("opencv", "yolo"):
+                    batch_results = self._detect_dnn_batch(batch)
+                elif self.model_type == "torch":
+                    batch_results = self._detect_torch_batch(batch)
+                else:
+                    batch_results = [self.detect(image) for image in batch]
+            except Exception as e:
+                logger.error(f"执行批量对象检测失败: {str(e)}")
+                continue
 
-        # 创建结果对象
-        results = []
+            for i, detections in zip(indices, batch_results):
+                results[i] = detections
 
-        if len(indices) > 0:
-            # OpenCV 4.x 和 OpenCV 3.x 返回的indices格式不同
-            if isinstance(indices, tuple):
-                # OpenCV 4.5.4 及以上版本
-                indices = indices[0]
+        return results
 
-            for i in indices:
-                # 处理不同版本的OpenCV索引格式
-                if isinstance(i, (list, tuple, np.ndarray)):
-                    i = i[0]
+    def detect_tiled(self,
+                     image: np.ndarray,
+                     tile_size: Tuple[int, int] = (832, 832),
+                     overlap: float = 0.2,
+                     batch_size: int = 16) -> List[DetectionResult]:
+        """
+        分块检测超大图像中的对象
 
-                box = boxes[i]
-                x, y, w, h = box
-                class_id = class_ids[i]
-                confidence = confidences[i]
+        图像被切分为互相重叠的图块，图块批量检测后将检测框平移回原图坐标，
+        再对所有检测框统一执行一次非极大值抑制以去除重叠区域的重复结果。
 
-                # 获取类别名称
-                class_name = self.class_names[class_id] if class_id < len(
-                    self.class_names) else f"class_{class_id}"
+        参数:
+            image: 输入图像
+            tile_size: 图块尺寸 (宽, 高)
+            overlap: 相邻图块的重叠比例，范围[0, 1)
+            batch_size: 每次前向传递的图块数量
 
-                results.append(DetectionResult(
-                    class_id=class_id,
-                    class_name=class_name,
-                    confidence=confidence,
-                    x=x,
-                    y=y,
-                    width=w,
-                    height=h
+        返回:
+            原图坐标系下的检测结果列表
+
+        异常:
+            ValueError: overlap不在[0, 1)范围内
+        """
+        if not 0 <= overlap < 1:
+            raise ValueError(f"overlap必须在[0, 1)范围内: {overlap}")
+
+        if image is None or image.size == 0:
+            logger.error("无法检测空图像")
+            return []
+
+        height, width = image.shape[:2]
+        tile_w, tile_h = min(tile_size[0], width), min(tile_size[1], height)
+        if tile_w == width and tile_h == height:
+            return self.detect(image)
+
+        tiles, offsets = [], []
+        for y in _tile_starts(height, tile_h, overlap):
+            for x in _tile_starts(width, tile_w, overlap):
+                tiles.append(image[y:y + tile_h, x:x + tile_w])
+                offsets.append((x, y))
+
+        detections = []
+        for (x_off, y_off), tile_detections in zip(offsets, self.detect_batch(tiles, batch_size)):
+            for d in tile_detections:
+                detections.append(DetectionResult(
+                    class_id=d.class_id,
+                    class_name=d.class_name,
+                    confidence=d.confidence,
+                    x=d.x + x_off,
+                    y=d.y + y_off,
+                    width=d.width,
+                    height=d.height
                 ))
 
-        return results
+        if not detections or not CV2_AVAILABLE:
+            return detections
+
+        indices = cv2.dnn.NMSBoxes(
+            [list(d.box) for d in detections],
+            [d.confidence for d in detections],
+            self.confidence_threshold,
+            self.nms_threshold)
+        if isinstance(indices, tuple):
+            indices = indices[0]
+        return [detections[i] for i in np.asarray(indices).reshape(-1).tolist()]
+
+    def _detect_opencv(self, image: np.ndarray) -> List[DetectionResult]:
+        """
+        使用OpenCV DNN模型检测对象
+
+        参数:
+            image: 输入图像
+
+        返回:
+            检测结果列表
+        """
+        return self._detect_dnn_batch([image])[0]
 
     def _detect_yolo(self, image: np.ndarray) -> List[DetectionResult]:
         """
@@ -641,62 +758,79 @@ class ObjectDetector:
         返回:
             检测结果列表
         """
-        height, width = image.shape[:2]
+        return self._detect_dnn_batch([image])[0]
 
-        # 创建blob
-        blob = cv2.dnn.blobFromImage(
-            image, 1/255.0, (416, 416), swapRB=True, crop=False)
-        self.model.setInput(blob)
+    def _detect_dnn_batch(self, images: List[np.ndarray]) -> List[List[DetectionResult]]:
+        """
+        使用OpenCV DNN模型批量检测对象
 
-        # 前向传递
-        detections = self.model.forward(self.output_layers)
+        多张图像堆叠为一个blob做一次前向传递，置信度过滤和检测框解码
+        在整块输出张量上向量化完成，每张图像各执行一次非极大值抑制。
 
-        # 处理检测结果
-        class_ids = []
-        confidences = []
-        boxes = []
+        参数:
+            images: 输入图像列表
+
+        返回:
+            与输入顺序对应的检测结果列表
+        """
+        # 创建blob，并进行前向传递
+        blob = cv2.dnn.blobFromImages(
+            images, 1/255.0, (416, 416), swapRB=True, crop=False)
+        # 获取模型的输出层
+        if self.model_type == "yolo":
+            output_layers = self.output_layers
+        else:
+            output_layers = self.model.getUnconnectedOutLayersNames()
+        with self._forward_lock:
+            self.model.setInput(blob)
+            layer_outputs = self.model.forward(output_layers)
+
+        results = []
+        for image, outputs in zip(images, split_batch_outputs(layer_outputs, len(images))):
+            height, width = image.shape[:2]
+            boxes, confidences, class_ids = decode_detections(
+                outputs, width, height, self.confidence_threshold)
+            results.append(self._apply_nms(boxes, confidences, class_ids))
+
+        return results
+
+    def _apply_nms(self,
+                   boxes: np.ndarray,
+                   confidences: np.ndarray,
+                   class_ids: np.ndarray) -> List[DetectionResult]:
+        """
+        应用非极大值抑制并创建结果对象
+
+        参数:
+            boxes: 形状为 (n, 4) 的检测框 (x, y, w, h)
+            confidences: 置信度数组
+            class_ids: 类别ID数组
+
+        返回:
+            检测结果列表
+        """
+        if len(boxes) == 0:
+            return []
+
+        box_list = boxes.tolist()
+        confidence_list = confidences.tolist()
+        class_id_list = class_ids.tolist()
 
-        for detection in detections:
-            for obj in detection:
-                scores = obj[5:]
-                class_id = np.argmax(scores)
-                confidence = scores[class_id]
-
-                if confidence > self.confidence_threshold:
-                    # 检测到对象，计算包围框
-                    center_x = int(obj[0] * width)
-                    center_y = int(obj[1] * height)
-                    w = int(obj[2] * width)
-                    h = int(obj[3] * height)
-
-                    # 左上角坐标
-                    x = int(center_x - w / 2)
-                    y = int(center_y - h / 2)
-
-                    boxes.append([x, y, w, h])
-                    confidences.append(float(confidence))
-                    class_ids.append(int(class_id))
-
-        # 应用非极大值抑制
         indices = cv2.dnn.NMSBoxes(
-            boxes, confidences, self.confidence_threshold, self.nms_threshold)
+            box_list, confidence_list, self.confidence_threshold, self.nms_threshold)
 
         # 创建结果对象
         results = []
 
         if len(indices) > 0:
-            # 处理不同版本的OpenCV索引格式
+            # OpenCV 4.x 和 OpenCV 3.x 返回的indices格式不同
             if isinstance(indices, tuple):
+                # OpenCV 4.5.4 及以上版本
                 indices = indices[0]
 
-            for i in indices:
-                if isinstance(i, (list, tuple, np.ndarray)):
-                    i = i[0]
-
-                box = boxes[i]
-                x, y, w, h = box
-                class_id = class_ids[i]
-                confidence = confidences[i]
+            for i in np.asarray(indices).reshape(-1).tolist():
+                x, y, w, h = box_list[i]
+                class_id = class_id_list[i]
 
                 # 获取类别名称
                 class_name = self.class_names[class_id] if class_id < len(
@@ -705,7 +839,7 @@ class ObjectDetector:
                 results.append(DetectionResult(
                     class_id=class_id,
                     class_name=class_name,
-                    confidence=confidence,
+                    confidence=confidence_list[i],
                     x=x,
                     y=y,
                     width=w,
@@ -724,65 +858,88 @@ class ObjectDetector:
         返回:
             检测结果列表
         """
+        return self._detect_torch_batch([image])[0]
+
+    def _detect_torch_batch(self, images: List[np.ndarray]) -> List[List[DetectionResult]]:
+        """
+        使用PyTorch模型批量检测对象，所有图像在一次推理调用中完成
+
+        参数:
+            images: 输入图像列表
+
+        返回:
+            与输入顺序对应的检测结果列表
+        """
         if not TORCH_AVAILABLE:
             logger.error("PyTorch未安装，无法执行检测")
-            return []
+            return [[] for _ in images]
 
         try:
-            import torch
             import torchvision.transforms as T
 
-            # 转换图像为RGB（如果需要）
-            if len(image.shape) > 2 and image.shape[2] == 3:
-                # 假设输入是BGR（OpenCV默认）
-                image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            else:
-                image_rgb = image
-
             # 转换为PyTorch张量
             transform = T.Compose([
                 T.ToTensor()
             ])
-            tensor = transform(image_rgb).to(self.device)
+
+            tensors = []
+            for image in images:
+                # 转换图像为RGB（如果需要）
+                if len(image.shape) > 2 and image.shape[2] == 3:
+                    # 假设输入是BGR（OpenCV默认）
+                    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+                else:
+                    image_rgb = image
+                tensors.append(transform(image_rgb).to(self.device))
 
             # 执行推理
             with torch.no_grad():
-                predictions = self.model([tensor])
+                predictions = self.model(tensors)
 
             # 处理结果
-            results = []
-
-            for i, pred in enumerate(predictions):
-                boxes = pred['boxes'].cpu().numpy()
-                scores = pred['scores'].cpu().numpy()
-                labels = pred['labels'].cpu().numpy()
-
-                for box, score, label in zip(boxes, scores, labels):
-                    if score >= self.confidence_threshold:
-                        x1, y1, x2, y2 = box.astype(int)
-                        width = x2 - x1
-                        height = y2 - y1
-
-                        # 获取类别名称
-                        class_id = int(label)
-                        class_name = self.class_names[class_id - 1] if class_id - 1 < len(
-                            self.class_names) else f"class_{class_id}"
-
-                        results.append(DetectionResult(
-                            class_id=class_id,
-                            class_name=class_name,
-                            confidence=float(score),
-                            x=int(x1),
-                            y=int(y1),
-                            width=int(width),
-                            height=int(height)
-                        ))
-
-            return results
+            return [self._convert_torch_prediction(pred) for pred in predictions]
 
         except Exception as e:
             logger.error(f"PyTorch检测失败: {str(e)}")
-            return []
+            return [[] for _ in images]
+
+    def _convert_torch_prediction(self, pred: Dict[str, Any]) -> List[DetectionResult]:
+        """
+        将PyTorch检测模型的单张图像输出转换为检测结果
+
+        参数:
+            pred: 包含 boxes, scores, labels 的预测字典
+
+        返回:
+            检测结果列表
+        """
+        boxes = pred['boxes'].cpu().numpy()
+        scores = pred['scores'].cpu().numpy()
+        labels = pred['labels'].cpu().numpy()
+
+        results = []
+        for box, score, label in zip(boxes, scores, labels):
+            if score >= self.confidence_threshold:
+                x1, y1, x2, y2 = box.astype(int)
+                width = x2 - x1
+                height = y2 - y1
+
+                # 获取类别名称
+                class_id = int(label)
+                class_name = self.class_names[class_id - 1] if class_id - 1 < len(
+                    self.class_names) else f"class_{class_id}"
+
+                results.append(DetectionResult(
+                    class_id=class_id,
+                    class_name=class_name,
+                    confidence=float(score),
+                    x=int(x1),
+                    y=int(y1),
+                    width=int(width),
+                    height=int(height)
+                ))
+
+        return results
 
     def _detect_custom(self, image: np.ndarray) -> List[DetectionResult]:
         """
@@ -921,4 +1078,42 @@ class ObjectDetector:
         if max_results is not None and max_results > 0:
             filtered = filtered[:max_results]
 
-        return filtered
\ No newline at end of file
+        return filtered
+
+
+def benchmark_detection(detector: ObjectDetector,
+                        images: List[np.ndarray],
+                        batch_size: int = 16) -> Dict[str, Any]:
+    """
+    对比逐张检测与批量检测的吞吐量，并校验两者结果一致
+
+    参数:
+        detector: 已加载模型的对象检测器
+        images: 测试图像列表
+        batch_size: 批量检测的批大小
+
+    返回:
+        包含两种方式每秒处理图像数、加速比和结果是否一致的字典
+    """
+    start_time = time.perf_counter()
+    single_results = [detector.detect(image) for image in images]
+    single_elapsed = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    batch_results = detector.detect_batch(images, batch_size=batch_size)
+    batch_elapsed = time.perf_counter() - start_time
+
+    single_fps = len(images) / single_elapsed if single_elapsed > 0 else float("inf")
+    batch_fps = len(images) / batch_elapsed if batch_elapsed > 0 else float("inf")
+    result = {
+        "images": len(images),
+        "batch_size": batch_size,
+        "single_images_per_sec": single_fps,
+        "batch_images_per_sec": batch_fps,
+        "speedup": batch_fps / single_fps if single_fps > 0 else 0.0,
+        "identical": single_results == batch_results,
+    }
+    logger.info(
+        f"逐张检测 {single_fps:.1f} 张/秒, 批量检测 {batch_fps:.1f} 张/秒, "
+        f"加速比 {result['speedup']:.2f}x")
+    return result
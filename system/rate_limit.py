@@ -0,0 +1,346 @@
+"""
+Rate Limit Module - GCRA Rate Limiting
+--------------------------------------
+基于GCRA(通用信元速率算法)的滑动窗口限流存储，供 security.RateLimiter 使用。
+
+每个(客户端, 端点)只保存一个理论到达时间(TAT)，检查和更新都是O(1)；
+本地存储按键哈希分段加锁，过期记录由时间轮惰性清理，不再在每次请求时扫描全部计数器；
+Redis存储用一个Lua脚本在一次往返内完成检查和更新，多端点请求也只需一次往返。
+
+Classes:
+  - LocalGCRAStore: 本地分段加锁的GCRA存储
+  - RedisGCRAStore: 基于Redis的分布式GCRA存储
+
+Functions:
+  - gcra_result: 根据TAT计算剩余配额和重置时间
+  - benchmark_rate_limiter: 不同客户端数量下的单次检查耗时测试
+"""
+
+import math
+import threading
+import time
+
+# 浮点误差容忍度(秒)
+_EPSILON = 1e-9
+
+# Redis中的GCRA脚本：所有键都允许时才一起更新，时间以毫秒整数表示
+GCRA_LUA = """
+local now = tonumber(ARGV[1])
+local n = #KEYS
+local tats = {}
+local allowed = 1
+for i = 1, n do
+  local interval = tonumber(ARGV[2 * i])
+  local window = tonumber(ARGV[2 * i + 1])
+  local tat = tonumber(redis.call('GET', KEYS[i]) or now)
+  if tat < now then tat = now end
+  if tat + interval - window > now then allowed = 0 end
+  tats[i] = tat
+end
+local reply = {allowed}
+for i = 1, n do
+  local tat = tats[i]
+  if allowed == 1 then
+    tat = tat + tonumber(ARGV[2 * i])
+    redis.call('SET', KEYS[i], string.format('%d', tat), 'PX', math.max(tat - now, 1))
+  end
+  reply[i + 1] = tat
+end
+return reply
+"""
+
+
+def gcra_result(tat, now, limit, window, allowed):
+    """
+    根据TAT计算限流结果
+
+    Args:
+        tat: 本次检查后的理论到达时间
+        now: 当前时间
+        limit: 窗口内请求限制数
+        window: 时间窗口(秒)
+        allowed: 本次请求是否允许
+
+    Returns:
+        tuple: (是否允许, 剩余配额, 重置时间)；允许时重置时间为配额完全恢复的时间，
+               拒绝时为最早可以重试的时间
+    """
+    interval = window / limit
+    if allowed:
+        remaining = int((now + window - tat) / interval + _EPSILON)
+        reset_time = tat
+    else:
+        remaining = 0
+        reset_time = tat + interval - window
+    return allowed, max(0, min(limit, remaining)), int(math.ceil(reset_time))
+
+
+class _Stripe:
+    """一个锁分段：记录表和惰性过期时间轮"""
+
+    __slots__ = ("lock", "records", "wheel", "cursor")
+
+    def __init__(self, slots, now_tick):
+        self.lock = threading.Lock()
+        # 键 -> TAT；每条记录在时间轮中恰好有一个待检查项
+        self.records = {}
+        self.wheel = [[] for _ in range(slots)]
+        self.cursor = now_tick
+
+
+class LocalGCRAStore:
+    """本地分段加锁的GCRA存储"""
+
+    def __init__(self, stripes=64, tick=1.0, wheel_slots=512, clock=time.time):
+        """
+        初始化本地存储
+
+        Args:
+            stripes: 锁分段数(取2的幂)
+            tick: 时间轮刻度(秒)
+            wheel_slots: 时间轮槽数
+            clock: 时间函数
+        """
+        n = 1
+        while n < stripes:
+            n <<= 1
+        self.tick = float(tick)
+        self.wheel_slots = wheel_slots
+        self.clock = clock
+        self._mask = n - 1
+        now_tick = int(clock() // self.tick)
+        self._stripes = [_Stripe(wheel_slots, now_tick) for _ in range(n)]
+
+    def __len__(self):
+        return sum(len(stripe.records) for stripe in self._stripes)
+
+    def _stripe(self, key):
+        return self._stripes[hash(key) & self._mask]
+
+    def _schedule(self, stripe, key, tat):
+        """把记录放入TAT所在刻度的槽，最远放到时间轮一圈之后"""
+        at_tick = min(max(int(math.ceil(tat / self.tick)), stripe.cursor + 1),
+                      stripe.cursor + self.wheel_slots)
+        stripe.wheel[at_tick % self.wheel_slots].append(key)
+
+    def _advance(self, stripe, now):
+        """转动时间轮，删除TAT已过的记录(此时记录与不存在等价)"""
+        now_tick = int(now // self.tick)
+        if now_tick <= stripe.cursor:
+            return
+        records = stripe.records
+        for t in range(max(stripe.cursor + 1, now_tick - self.wheel_slots + 1), now_tick + 1):
+            stripe.cursor = t
+            index = t % self.wheel_slots
+            due, stripe.wheel[index] = stripe.wheel[index], []
+            for key in due:
+                tat = records[key]
+                if tat <= now:
+                    del records[key]
+                else:
+                    # 记录在入槽后被更新过，或TAT超出时间轮一圈
+                    self._schedule(stripe, key, tat)
+        stripe.cursor = now_tick
+
+    def _current_tat(self, stripe, key, now):
+        tat = stripe.records.get(key)
+        return now if tat is None or tat < now else tat
+
+    def _consume(self, stripe, key, interval, now):
+        tat = self._current_tat(stripe, key, now) + interval
+        if key not in stripe.records:
+            self._schedule(stripe, key, tat)
+        stripe.records[key] = tat
+        return tat
+
+    def check(self, key, limit, window, now=None):
+        """
+        检查并记录一次请求
+
+        Args:
+            key: 限流键，如(客户端ID, 端点)
+            limit: 窗口内请求限制数
+            window: 时间窗口(秒)
+            now: 当前时间，默认取时钟
+
+        Returns:
+            tuple: (是否允许, 剩余配额, 重置时间)
+        """
+        now = self.clock() if now is None else now
+        interval = window / limit
+        stripe = self._stripe(key)
+        with stripe.lock:
+            self._advance(stripe, now)
+            tat = self._current_tat(stripe, key, now)
+            if tat + interval - window > now + _EPSILON:
+                return gcra_result(tat, now, limit, window, False)
+            tat = self._consume(stripe, key, interval, now)
+        return gcra_result(tat, now, limit, window, True)
+
+    def check_many(self, items, now=None):
+        """
+        原子地检查多个限流键：全部允许时才一起记录
+
+        Args:
+            items: (限流键, 请求限制数, 时间窗口)列表
+            now: 当前时间，默认取时钟
+
+        Returns:
+            tuple: (是否全部允许, 每个键的(是否允许, 剩余配额, 重置时间)列表)
+        """
+        now = self.clock() if now is None else now
+        stripes = [self._stripe(key) for key, _, _ in items]
+        # 按固定顺序加锁，避免多个批量请求之间死锁
+        locked = sorted({id(s): s for s in stripes}.values(), key=id)
+        for stripe in locked:
+            stripe.lock.acquire()
+        try:
+            tats, checks = [], []
+            for stripe, (key, limit, window) in zip(stripes, items):
+                self._advance(stripe, now)
+                tat = self._current_tat(stripe, key, now)
+                ok = tat + window / limit - window <= now + _EPSILON
+                tats.append(tat)
+                checks.append(ok)
+            allowed = all(checks)
+            if allowed:
+                tats = [self._consume(stripe, key, window / limit, now)
+                        for stripe, (key, limit, window) in zip(stripes, items)]
+        finally:
+            for stripe in locked:
+                stripe.lock.release()
+        # 批量被拒绝时，单独可以通过的键报告为允许，但没有消耗配额
+        results = [gcra_result(tat, now, limit, window, ok)
+                   for tat, ok, (_, limit, window) in zip(tats, checks, items)]
+        return allowed, results
+
+    def reset(self, key):
+        """清空一个限流键的配额记录，记录本身由时间轮删除"""
+        stripe = self._stripe(key)
+        with stripe.lock:
+            if key in stripe.records:
+                stripe.records[key] = 0.0
+
+    def get_stats(self):
+        """
+        获取存储统计
+
+        Returns:
+            dict: 记录数和时间轮中的待检查项数
+        """
+        return {
+            "records": len(self),
+            "stripes": len(self._stripes),
+            "scheduled": sum(len(slot) for stripe in self._stripes for slot in stripe.wheel),
+        }
+
+
+class RedisGCRAStore:
+    """基于Redis的分布式GCRA存储"""
+
+    def __init__(self, redis_client, prefix="ratelimit", clock=time.time):
+        """
+        初始化Redis存储
+
+        Args:
+            redis_client: Redis客户端实例
+            prefix: 键前缀
+            clock: 时间函数
+        """
+        self.redis = redis_client
+        self.prefix = prefix
+        self.clock = clock
+        self._script = redis_client.register_script(GCRA_LUA)
+
+    def _redis_key(self, key):
+        if isinstance(key, tuple):
+            key = ":".join(str(part) for part in key)
+        return f"{self.prefix}:{key}"
+
+    def check(self, key, limit, window, now=None):
+        """
+        检查并记录一次请求(一次往返)
+
+        Args:
+            key: 限流键
+            limit: 窗口内请求限制数
+            window: 时间窗口(秒)
+            now: 当前时间，默认取时钟
+
+        Returns:
+            tuple: (是否允许, 剩余配额, 重置时间)
+        """
+        allowed, results = self.check_many([(key, limit, window)], now)
+        return results[0]
+
+    def check_many(self, items, now=None):
+        """
+        原子地检查多个限流键(一次往返)
+
+        Args:
+            items: (限流键, 请求限制数, 时间窗口)列表
+            now: 当前时间，默认取时钟
+
+        Returns:
+            tuple: (是否全部允许, 每个键的(是否允许, 剩余配额, 重置时间)列表)
+        """
+        now = self.clock() if now is None else now
+        now_ms = int(now * 1000)
+        args = [now_ms]
+        for _, limit, window in items:
+            args.extend([max(1, int(round(window * 1000 / limit))), int(window * 1000)])
+        reply = self._script(keys=[self._redis_key(key) for key, _, _ in items], args=args)
+        allowed = bool(int(reply[0]))
+        results = []
+        for tat_ms, (_, limit, window) in zip(reply[1:], items):
+            tat = int(tat_ms) / 1000.0
+            ok = allowed or tat + window / limit - window <= now + 1e-3
+            results.append(gcra_result(tat, now, limit, window, ok))
+        return allowed, results
+
+    def reset(self, key):
+        """删除一个限流键的记录"""
+        self.redis.delete(self._redis_key(key))
+
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def benchmark_rate_limiter(n_clients=100000, block=10000, limit=100, window=60, store=None):
+    """
+    限流检查耗时测试：依次加入大量不同客户端，统计每一段的平均单次检查耗时
+
+    Args:
+        n_clients: 不同客户端数量
+        block: 每段的客户端数量
+        limit: 请求限制数
+        window: 时间窗口(秒)
+        store: 限流存储，默认新建本地存储
+
+    Returns:
+        dict: 每段的单次检查耗时(微秒)、后半段与前半段耗时中位数之比和最终记录数
+    """
+    store = store or LocalGCRAStore()
+    per_call = []
+    for start in range(0, n_clients, block):
+        keys = [(f"client_{i}", "api/v1/market/data") for i in range(start, min(start + block, n_clients))]
+        began = time.perf_counter()
+        for key in keys:
+            store.check(key, limit, window)
+        per_call.append((time.perf_counter() - began) / len(keys) * 1e6)
+    return {
+        "clients": n_clients,
+        "per_call_us": per_call,
+        "ratio": _median(per_call[len(per_call) // 2:]) / _median(per_call[:max(1, len(per_call) // 2)]),
+        "records": len(store),
+    }
+
+
+if __name__ == "__main__":
+    result = benchmark_rate_limiter()
+    print(f"{result['clients']} clients, {result['records']} records")
+    for i, us in enumerate(result["per_call_us"]):
+        print(f"  block {i}: {us:.2f} us/call")
+    print(f"second/first half median ratio: {result['ratio']:.2f}")
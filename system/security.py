@@ -10,6 +10,7 @@ Classes:
   - AuthManager: 认证管理器
   - AccessControl: 访问控制管理器
   - TradingAPIGuard: 交易API特定安全防护 (新增)
+  - ActivityTracker: 按键分桶的操作活动计数器
 """
 
 import hmac
@@ -24,6 +25,7 @@ import threading
 import modules.audio
 from datetime import datetime, timedelta
 from functools import wraps
+from collections import OrderedDict
 from enum import Enum
 import ui.web.assets.js
 import secrets
@@ -31,6 +33,8 @@ import os
 
 # 导入交易日志模块
 from .trading_logger import TradingLogger, LogLevel
+from .rate_limit import LocalGCRAStore, RedisGCRAStore
+from .cache import LRUCache
 
 # 设置日志
 logger = logging.getLogger("security")
@@ -55,9 +59,9 @@ class SecurityLevel(Enum):
 
 
 class RateLimiter:
-    """API请求速率限制器"""
+    """API请求速率限制器(GCRA滑动窗口)"""
 
-    def __init__(self, redis_client=None, default_limit=100, default_window=3600):
+    def __init__(self, redis_client=None, default_limit=100, default_window=3600, store=None):
         """
         初始化速率限制器
 
@@ -65,15 +69,17 @@ class RateLimiter:
             redis_client: Redis客户端实例(用于分布式限流)
             default_limit: 默认请求限制数
             default_window: 默认时间窗口(秒)
+            store: 限流存储，默认按是否提供Redis客户端选择
         """
         self.use_redis = redis_client is not None
         self.redis = redis_client
         self.default_limit = default_limit
         self.default_window = default_window
 
-        # 本地限流计数器(非分布式模式)
-        self.counters = {}
-        self.lock = threading.Lock()
+        # 每个(客户端, 端点)只保存一个理论到达时间，过期记录由时间轮惰性清理
+        if store is None:
+            store = RedisGCRAStore(redis_client) if self.use_redis else LocalGCRAStore()
+        self.store = store
 
         # 每个端点的限流配置
         self.endpoint_limits = {}
@@ -98,75 +104,65 @@ class RateLimiter:
             endpoint: 请求的API端点
 
         Returns:
-            tuple: (是否允许, 剩余配额, 重置时间)
+            tuple: (是否允许, 剩余配额, 重置时间)；被拒绝时重置时间为最早可以重试的时间
         """
-        # 获取此端点的限流配置
         limit, window = self.endpoint_limits.get(
             endpoint, (self.default_limit, self.default_window)
         )
+        return self.store.check((client_id, endpoint), limit, window)
 
-        # 构建计数器键
-        key = f"{client_id}:{endpoint}"
-        now = int(time.time())
-        window_start = now - (now % window)
-        window_key = f"{key}:{window_start}"
-
-        if self.use_redis:
-            # 分布式模式使用Redis
-            count = self.redis.incr(window_key)
-
-            # 如果是新计数器，设置过期时间
-            if count == 1:
-                self.redis.expire(window_key, window)
-
-            # 获取过期时间
-            ttl = self.redis.ttl(window_key)
-            reset_time = now + ttl if ttl > 0 else now + window
-
-            return count <= limit, limit - count, reset_time
-        else:
-            # 本地模式
-            with self.lock:
-                # 清理过期的计数器
-                self._cleanup_expired_counters()
-
-                # 获取或创建计数器
-                if window_key not in self.counters:
-                    self.counters[window_key] = {
-                        "count": 0, "expires": now + window}
+    def check_endpoints(self, client_id, endpoints):
+        """
+        一次检查涉及多个端点的请求：全部端点都允许时才一起计数
 
-                # 增加计数
-                self.counters[window_key]["count"] += 1
-                count = self.counters[window_key]["count"]
-                reset_time = self.counters[window_key]["expires"]
+        Args:
+            client_id: 客户端ID
+            endpoints: 请求涉及的API端点列表
 
-                return count <= limit, limit - count, reset_time
+        Returns:
+            tuple: (是否允许, {端点: (是否允许, 剩余配额, 重置时间)})
+        """
+        items = []
+        for endpoint in endpoints:
+            limit, window = self.endpoint_limits.get(
+                endpoint, (self.default_limit, self.default_window)
+            )
+            items.append(((client_id, endpoint), limit, window))
+        allowed, results = self.store.check_many(items)
+        return allowed, dict(zip(endpoints, results))
 
-    def _cleanup_expired_counters(self):
-        """清理过期的本地计数器"""
-        now = int(time.time())
-        expired_keys = [
-            key for key, data in self.counters.items() if data["expires"] <= now
-        ]
+    def reset(self, client_id, endpoint):
+        """
+        清空客户端在端点上的限流记录
 
-        for key in expired_keys:
-            del self.counters[key]
+        Args:
+            client_id: 客户端ID
+            endpoint: API端点
+        """
+        self.store.reset((client_id, endpoint))
 
 
 class AuthManager:
     """认证管理器"""
 
-    def __init__(self, jwt_secret=None, token_expiry=24 * 60 * 60):
+    def __init__(self, jwt_secret=None, token_expiry=24 * 60 * 60,
+                 token_cache_size=10000, token_cache_ttl=300):
         """
         初始化认证管理器
 
         Args:
             jwt_secret: JWT签名密钥
             token_expiry: 令牌过期时间(秒)
+            token_cache_size: 已验证令牌缓存容量
+            token_cache_ttl: 已验证令牌缓存时间(秒)，不超过令牌本身的过期时间
         """
         self.jwt_secret = jwt_secret or secrets.token_hex(32)
         self.token_expiry = token_expiry
 
+        # 已验证令牌的声明缓存，按令牌摘要索引，避免每个请求重新解码和验签
+        self.token_cache = LRUCache("verified_tokens", capacity=token_cache_size)
+        self.token_cache_ttl = token_cache_ttl
+
         # API密钥存储 (实际项目中应使用数据库)
         self.api_keys = {}
 
@@ -311,18 +307,44 @@ class AuthManager:
         Returns:
             dict or None: 令牌声明或验证失败返回None
         """
-        try:
-            # 解码并验证令牌
-            claims = jwt.decode(token, self.jwt_secret, algorithms=["HS256"])
+        digest = self._token_digest(token)
+        claims = self.token_cache.get(digest)
 
-            # 检查令牌是否被吊销
-            if claims.get("jti") in self.revoked_tokens:
+        if claims is None:
+            try:
+                # 解码并验证令牌
+                claims = jwt.decode(token, self.jwt_secret, algorithms=["HS256"])
+            except jwt.PyJWTError:
                 return None
 
-            return claims
-        except jwt.PyJWTError:
+            # 缓存时间不超过令牌的过期时间
+            ttl = self.token_cache_ttl
+            if "exp" in claims:
+                ttl = min(ttl, float(claims["exp"]) - time.time())
+            if ttl > 0:
+                self.token_cache.set(digest, claims, ttl)
+
+        # 检查令牌是否被吊销
+        if claims.get("jti") in self.revoked_tokens:
             return None
 
+        return dict(claims)
+
+    @staticmethod
+    def _token_digest(token):
+        """
+        计算令牌摘要作为缓存键，缓存中不保存令牌原文
+
+        Args:
+            token: JWT令牌
+
+        Returns:
+            str: 令牌的SHA-256摘要
+        """
+        if isinstance(token, str):
+            token = token.encode("utf-8")
+        return hashlib.sha256(token).hexdigest()
+
     def revoke_token(self, token):
         """
         吊销JWT令牌
@@ -333,6 +355,8 @@ class AuthManager:
         Returns:
             bool: 是否成功吊销
         """
+        self.token_cache.delete(self._token_digest(token))
+
         try:
             # 解码令牌而不验证，以获取jti
             claims = jwt.decode(token, options={"verify_signature": False})
@@ -368,6 +392,61 @@ class AccessControl:
         # 资源-权限映射
         self.resource_permissions = {}
 
+        # 权限名 -> 位，权限集合编译为整数位掩码
+        self.permission_bits = {}
+
+        # 资源 -> 所需权限位掩码
+        self.resource_masks = {}
+
+        # 用户 -> 有效权限位掩码 / 可访问资源，角色或资源定义变化时失效
+        self._user_masks = {}
+        self._accessible_cache = {}
+
+    def permission_mask(self, permissions):
+        """
+        把权限集合编译为位掩码，新权限按出现顺序分配位
+
+        Args:
+            permissions: 权限名集合
+
+        Returns:
+            int: 权限位掩码
+        """
+        mask = 0
+        for permission in permissions:
+            bit = self.permission_bits.get(permission)
+            if bit is None:
+                bit = self.permission_bits[permission] = 1 << len(self.permission_bits)
+            mask |= bit
+        return mask
+
+    def _user_mask(self, user_id):
+        """获取用户的有效权限位掩码，未缓存时按角色合并"""
+        mask = self._user_masks.get(user_id)
+        if mask is None:
+            mask = 0
+            for role in self.user_roles[user_id]:
+                if role in self.role_permissions:
+                    mask |= self.permission_mask(self.role_permissions[role])
+            self._user_masks[user_id] = mask
+        return mask
+
+    def _invalidate_user(self, user_id):
+        self._user_masks.pop(user_id, None)
+        self._accessible_cache.pop(user_id, None)
+
+    def define_role(self, role, permissions):
+        """
+        定义或修改角色的权限
+
+        Args:
+            role: 角色名称
+            permissions: 权限集合
+        """
+        self.role_permissions[role] = set(permissions)
+        self._user_masks.clear()
+        self._accessible_cache.clear()
+
     def assign_role(self, user_id, role):
         """
         给用户分配角色
@@ -386,6 +465,7 @@ class AccessControl:
             self.user_roles[user_id] = set()
 
         self.user_roles[user_id].add(role)
+        self._invalidate_user(user_id)
         return True
 
     def remove_role(self, user_id, role):
@@ -404,6 +484,7 @@ class AccessControl:
 
         if role in self.user_roles[user_id]:
             self.user_roles[user_id].remove(role)
+            self._invalidate_user(user_id)
             return True
 
         return False
@@ -417,6 +498,8 @@ class AccessControl:
             required_permissions: 所需权限集合
         """
         self.resource_permissions[resource] = set(required_permissions)
+        self.resource_masks[resource] = self.permission_mask(required_permissions)
+        self._accessible_cache.clear()
 
     def check_permission(self, user_id, resource):
         """
@@ -430,24 +513,16 @@ class AccessControl:
             bool: 是否有权限
         """
         # 如果资源没有权限定义，默认拒绝
-        if resource not in self.resource_permissions:
+        required = self.resource_masks.get(resource)
+        if required is None:
             return False
 
         # 如果用户没有角色，拒绝访问
         if user_id not in self.user_roles:
             return False
 
-        # 获取资源所需权限
-        required_permissions = self.resource_permissions[resource]
-
-        # 获取用户所有角色的所有权限
-        user_permissions = set()
-        for role in self.user_roles[user_id]:
-            if role in self.role_permissions:
-                user_permissions.update(self.role_permissions[role])
-
         # 检查是否拥有所有所需权限
-        return required_permissions.issubset(user_permissions)
+        return required & ~self._user_mask(user_id) == 0
 
     def get_accessible_resources(self, user_id):
         """
@@ -463,19 +538,137 @@ class AccessControl:
         if user_id not in self.user_roles:
             return []
 
-        # 获取用户所有权限
-        user_permissions = set()
-        for role in self.user_roles[user_id]:
-            if role in self.role_permissions:
-                user_permissions.update(self.role_permissions[role])
+        accessible = self._accessible_cache.get(user_id)
+        if accessible is None:
+            missing = ~self._user_mask(user_id)
+            accessible = tuple(
+                resource for resource, required in self.resource_masks.items()
+                if required & missing == 0
+            )
+            self._accessible_cache[user_id] = accessible
+
+        return list(accessible)
+
+
+class _ActivityWindow:
+    """一个键的分桶时间环：每桶的计数和整个窗口的累计值"""
 
-        # 查找可访问的资源
-        accessible = []
-        for resource, required_permissions in self.resource_permissions.items():
-            if required_permissions.issubset(user_permissions):
-                accessible.append(resource)
+    __slots__ = ("bucket", "counts", "high_counts", "op_counts",
+                 "total", "high_total", "op_totals", "hot_ops")
 
-        return accessible
+    def __init__(self, n_buckets, bucket):
+        self.bucket = bucket
+        self.counts = [0] * n_buckets
+        self.high_counts = [0] * n_buckets
+        self.op_counts = [None] * n_buckets
+        self.total = 0
+        self.high_total = 0
+        self.op_totals = {}
+        # 窗口内次数达到重复阈值的操作类型数
+        self.hot_ops = 0
+
+
+class ActivityTracker:
+    """按键统计最近一段时间操作次数的分桶环形计数器"""
+
+    def __init__(self, window=1800, bucket_seconds=60, repeat_threshold=20,
+                 max_keys=100000, stripes=16):
+        """
+        初始化活动计数器
+
+        Args:
+            window: 统计窗口(秒)
+            bucket_seconds: 每个桶的时长(秒)
+            repeat_threshold: 同一操作在窗口内达到多少次计为重复操作
+            max_keys: 最多跟踪的键数，超出时淘汰最久未活动的键
+            stripes: 锁分段数
+        """
+        self.bucket_seconds = bucket_seconds
+        # 多保留一个桶，使统计范围覆盖完整窗口
+        self.n_buckets = window // bucket_seconds + 1
+        self.repeat_threshold = repeat_threshold
+        self.max_keys_per_stripe = max(1, max_keys // stripes)
+        self._stripes = [(threading.Lock(), OrderedDict()) for _ in range(stripes)]
+
+    def __len__(self):
+        return sum(len(windows) for _, windows in self._stripes)
+
+    def _advance(self, window, bucket):
+        """把窗口推进到当前桶，减去移出窗口的桶；时钟回拨时不移动"""
+        if bucket <= window.bucket:
+            return
+        if bucket - window.bucket >= self.n_buckets:
+            window.counts = [0] * self.n_buckets
+            window.high_counts = [0] * self.n_buckets
+            window.op_counts = [None] * self.n_buckets
+            window.total = window.high_total = window.hot_ops = 0
+            window.op_totals = {}
+        else:
+            for b in range(window.bucket + 1, bucket + 1):
+                index = b % self.n_buckets
+                window.total -= window.counts[index]
+                window.high_total -= window.high_counts[index]
+                window.counts[index] = window.high_counts[index] = 0
+                expired, window.op_counts[index] = window.op_counts[index], None
+                for operation, count in (expired or {}).items():
+                    before = window.op_totals[operation]
+                    if before - count:
+                        window.op_totals[operation] = before - count
+                    else:
+                        del window.op_totals[operation]
+                    if before >= self.repeat_threshold > before - count:
+                        window.hot_ops -= 1
+        window.bucket = bucket
+
+    def _evict_idle(self, windows, bucket):
+        """淘汰整个窗口都没有活动的键，以及超出容量的最久未活动键"""
+        while windows:
+            key, window = next(iter(windows.items()))
+            if bucket - window.bucket < self.n_buckets and len(windows) <= self.max_keys_per_stripe:
+                break
+            del windows[key]
+
+    def record(self, key, operation, high_risk=False, now=None):
+        """
+        记录一次操作并返回窗口内的累计值
+
+        Args:
+            key: 跟踪键，如"用户ID:客户端IP"
+            operation: 操作类型
+            high_risk: 是否高风险操作
+            now: 当前时间戳，默认取当前时间
+
+        Returns:
+            tuple: (操作总数, 高风险操作数, 达到重复阈值的操作类型数)
+        """
+        now = time.time() if now is None else now
+        bucket = int(now // self.bucket_seconds)
+        lock, windows = self._stripes[hash(key) % len(self._stripes)]
+        with lock:
+            window = windows.get(key)
+            if window is None:
+                window = windows[key] = _ActivityWindow(self.n_buckets, bucket)
+            else:
+                windows.move_to_end(key)
+                self._advance(window, bucket)
+
+            # 时钟回拨时计入当前桶，不回退窗口
+            index = window.bucket % self.n_buckets
+            window.counts[index] += 1
+            window.total += 1
+            if high_risk:
+                window.high_counts[index] += 1
+                window.high_total += 1
+            ops = window.op_counts[index]
+            if ops is None:
+                ops = window.op_counts[index] = {}
+            ops[operation] = ops.get(operation, 0) + 1
+            count = window.op_totals[operation] = window.op_totals.get(operation, 0) + 1
+            if count == self.repeat_threshold:
+                window.hot_ops += 1
+
+            self._evict_idle(windows, bucket)
+            return window.total, window.high_total, window.hot_ops
 
 
 class TradingAPIGuard:
@@ -505,9 +698,9 @@ class TradingAPIGuard:
             "withdraw_funds": SecurityLevel.CRITICAL,
         }
 
-        # 可疑模式检测计数器
-        self.suspicious_activity = {}
-        self.lock = threading.Lock()
+        # 可疑模式检测计数器：每个用户和IP按分钟分桶统计最近30分钟的操作
+        self.suspicious_activity = ActivityTracker(
+            window=1800, bucket_seconds=60, repeat_threshold=20)
 
         # 风险级别对应的额外验证方法
         self.security_level_checks = {
@@ -734,61 +927,27 @@ class TradingAPIGuard:
         Returns:
             bool: 是否检测到可疑活动
         """
-        with self.lock:
-            key = f"{user_id}:{client_ip}"
-            now = int(time.time())
-
-            # 初始化计数器
-            if key not in self.suspicious_activity:
-                self.suspicious_activity[key] = {
-                    "operations": [], "last_check": now}
-
-            # 添加操作记录
-            self.suspicious_activity[key]["operations"].append(
-                {"op": operation, "time": now}
-            )
-
-            # 仅保留最近30分钟的操作记录
-            cutoff = now - 1800
-            self.suspicious_activity[key]["operations"] = [
-                op
-                for op in self.suspicious_activity[key]["operations"]
-                if op["time"] >= cutoff
-            ]
-
-            # 可疑模式检测
-            operations = self.suspicious_activity[key]["operations"]
-
-            # 1. 短时间内多次高风险操作
-            high_risk_ops = [
-                op
-                for op in operations
-                if self.operation_risk_levels.get(op["op"], SecurityLevel.LOW)
-                in [SecurityLevel.HIGH, SecurityLevel.CRITICAL]
-            ]
-
-            if len(high_risk_ops) >= 5:  # 30分钟内5次或更多高风险操作
-                return True
+        risk_level = self.operation_risk_levels.get(operation, SecurityLevel.LOW)
+        total, high_risk_total, repeated_ops = self.suspicious_activity.record(
+            f"{user_id}:{client_ip}",
+            operation,
+            risk_level in (SecurityLevel.HIGH, SecurityLevel.CRITICAL),
+        )
 
-            # 2. 短时间内大量操作
-            if len(operations) >= 50:  # 30分钟内50次或更多操作
-                return True
+        # 1. 短时间内多次高风险操作(30分钟内5次或更多)
+        if high_risk_total >= 5:
+            return True
 
-            # 3. 多次快速重复相同操作
-            op_counts = {}
-            for op in operations:
-                op_type = op["op"]
-                if op_type not in op_counts:
-                    op_counts[op_type] = 0
-                op_counts[op_type] += 1
+        # 2. 短时间内大量操作(30分钟内50次或更多)
+        if total >= 50:
+            return True
 
-            # 检查是否有任何操作超过阈值
-            for op_type, count in op_counts.items():
-                if count >= 20:  # 30分钟内20次或更多相同操作
-                    return True
+        # 3. 多次快速重复相同操作(30分钟内20次或更多相同操作)
+        if repeated_ops:
+            return True
 
-            # 未检测到可疑模式
-            return False
+        # 未检测到可疑模式
+        return False
 
 
 class APISecurityManager:
@@ -1022,6 +1181,54 @@ class APISecurityManager:
         return True, {"success": True, "message": "Operation authorized"}
 
 
+def benchmark_authorization(n_users=1000, n_checks=100000, role_counts=(4, 64)):
+    """
+    授权检查微基准：角色和资源数量增加时，单次权限检查耗时应保持不变
+
+    Args:
+        n_users: 用户数量
+        n_checks: 每种规模的检查次数
+        role_counts: 测试的角色数量(每个角色一个独有权限，资源数为角色数的10倍)
+
+    Returns:
+        dict: 每种规模下位掩码检查和逐角色合并集合的单次耗时(微秒)
+    """
+    import random
+
+    rng = random.Random(0)
+    results = {}
+    for n_roles in role_counts:
+        access = AccessControl()
+        for r in range(n_roles):
+            access.define_role(f"role_{r}", {"read", f"perm_{r}"})
+        for i in range(n_roles * 10):
+            access.define_resource_permissions(
+                f"resource_{i}", {"read", f"perm_{rng.randrange(n_roles)}"})
+        for u in range(n_users):
+            for r in rng.sample(range(n_roles), min(3, n_roles)):
+                access.assign_role(f"user_{u}", f"role_{r}")
+
+        checks = [(f"user_{rng.randrange(n_users)}", f"resource_{rng.randrange(n_roles * 10)}")
+                  for _ in range(n_checks)]
+
+        start = time.perf_counter()
+        for user_id, resource in checks:
+            access.check_permission(user_id, resource)
+        bitset_us = (time.perf_counter() - start) / n_checks * 1e6
+
+        # 对照：每次请求合并用户所有角色的权限集合
+        start = time.perf_counter()
+        for user_id, resource in checks:
+            user_permissions = set()
+            for role in access.user_roles[user_id]:
+                user_permissions.update(access.role_permissions[role])
+            access.resource_permissions[resource].issubset(user_permissions)
+        union_us = (time.perf_counter() - start) / n_checks * 1e6
+
+        results[n_roles] = {"bitset_us": bitset_us, "set_union_us": union_us}
+    return results
+
+
 # 示例用法
 if __name__ == "__main__":
     # 创建安全管理器
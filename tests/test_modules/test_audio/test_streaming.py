@@ -0,0 +1,218 @@
+"""
+流式长音频转录测试模块
+测试增量分段、重叠去重拼接、有界并行识别、异步迭代接口和工作数扩展
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+import wave
+
+import numpy as np
+
+from modules.audio.streaming import (
+    PCMStream, StreamingTranscriber, iter_segments, merge_overlap, pcm_to_mono, read_pcm,
+    stitch_transcripts
+)
+
+RATE = 16000
+WORD_SECONDS = 0.3
+
+
+def write_word_wav(path, n_words, channels=1):
+    """生成测试音频：每个"单词"是一段0.3秒的恒定采样值，多声道时各声道围绕该值对称偏移"""
+    samples = np.repeat(np.arange(1, n_words + 1, dtype=np.int16) * 100, int(WORD_SECONDS * RATE))
+    if channels > 1:
+        offsets = np.linspace(-40, 40, channels).astype(np.int16)
+        samples = (samples[:, None] + offsets).ravel()
+    with wave.open(path, "wb") as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(RATE)
+        wav_file.writeframes(samples.tobytes())
+
+
+class FakeRecognizer:
+    """将恒定采样值的片段识别为单词，分段边界处被切断的片段识别为残缺词"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def recognize_bytes(self, audio_bytes, sample_rate, sample_width, channels, language=None):
+        if self.delay:
+            time.sleep(self.delay)
+        samples = np.frombuffer(audio_bytes, dtype=np.int16)
+        edges = np.flatnonzero(np.diff(samples)) + 1
+        starts = np.concatenate(([0], edges))
+        ends = np.concatenate((edges, [len(samples)]))
+        full = int(WORD_SECONDS * sample_rate)
+        words = []
+        for start, end in zip(starts, ends):
+            word = f"w{samples[start] // 100}"
+            words.append(word if end - start >= full else f"cut{samples[start] // 100}")
+        return {"text": " ".join(words), "success": True}
+
+
+def expected_text(n_words):
+    return " ".join(f"w{i}" for i in range(1, n_words + 1))
+
+
+class TestStitching(unittest.TestCase):
+    """测试重叠去重"""
+
+    def test_merge_overlap(self):
+        """测试去掉重复的单词"""
+        self.assertEqual(merge_overlap("a b c d".split(), "c d e f".split()), (0, ["e", "f"]))
+        # 忽略大小写和标点
+        self.assertEqual(merge_overlap("the stock rose.".split(), "Stock rose, then fell".split()),
+                         (0, ["then", "fell"]))
+        # 没有重叠时原样追加
+        self.assertEqual(merge_overlap("a b".split(), "c d".split()), (0, ["c", "d"]))
+
+    def test_cut_words_at_boundaries(self):
+        """测试边界处被切断的单词"""
+        # 前一段末尾的 mar 和后一段开头的 t 都是被切断的词
+        drop, added = merge_overlap("a b c mar".split(), "t b c market rose".split())
+        self.assertEqual((drop, added), (1, ["market", "rose"]))
+
+    def test_single_word_match_ignored(self):
+        """测试只有一个词相同时不认定为重叠"""
+        self.assertEqual(merge_overlap("buy the".split(), "the the dip".split(), min_match_words=2),
+                         (0, ["the", "the", "dip"]))
+
+    def test_stitch_is_deterministic(self):
+        """测试拼接结果确定"""
+        texts = ["one two three four", "three four five six", "five six seven"]
+        self.assertEqual(stitch_transcripts(texts), "one two three four five six seven")
+        self.assertEqual(stitch_transcripts(texts), stitch_transcripts(list(texts)))
+
+
+class TestPCMConversion(unittest.TestCase):
+    """测试多声道混合和WAV文件头处理"""
+
+    def test_pcm_to_mono(self):
+        """测试各样本宽度的声道平均"""
+        stereo = np.array([[100, 300], [-50, -150], [7, 8]], dtype=np.int16)
+        mono = np.frombuffer(pcm_to_mono(stereo.tobytes(), 2, 2), dtype=np.int16)
+        np.testing.assert_array_equal(mono, [200, -100, 8])
+
+        unsigned = np.array([[0, 255], [100, 110]], dtype=np.uint8)
+        self.assertEqual(pcm_to_mono(unsigned.tobytes(), 1, 2), bytes([128, 105]))
+
+        # 24位样本: (-2 + 4) / 2 = 1，(1000 + 3000) / 2 = 2000
+        values = [-2, 4, 1000, 3000]
+        packed = b"".join(v.to_bytes(3, "little", signed=True) for v in values)
+        self.assertEqual(pcm_to_mono(packed, 3, 2),
+                         (1).to_bytes(3, "little", signed=True) + (2000).to_bytes(3, "little", signed=True))
+
+        # 单声道原样返回，不完整的末帧被丢弃
+        self.assertEqual(pcm_to_mono(b"abcd", 2, 1), b"abcd")
+        self.assertEqual(len(pcm_to_mono(stereo.tobytes() + b"\x01\x02", 2, 2)), 6)
+
+    def test_read_pcm_strips_wav_header(self):
+        """测试WAV文件内容只取音频帧并按文件头的参数混合为单声道"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "stereo.wav")
+            write_word_wav(path, 2, channels=2)
+            with open(path, "rb") as f:
+                content = f.read()
+
+        frames, sample_rate, sample_width = read_pcm(content, 8000, 1, 1)
+        self.assertEqual((sample_rate, sample_width), (RATE, 2))
+        samples = np.frombuffer(frames, dtype=np.int16)
+        self.assertEqual(len(samples), 2 * int(WORD_SECONDS * RATE))
+        self.assertEqual(sorted(set(samples.tolist())), [100, 200])
+
+        raw = np.array([1, 3, 5, 7], dtype=np.int16).tobytes()
+        self.assertEqual(read_pcm(raw, RATE, 2, 2), (np.array([2, 6], dtype=np.int16).tobytes(), RATE, 2))
+
+
+class TestStreamingTranscriber(unittest.TestCase):
+    """测试流式转录"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "words.wav")
+        write_word_wav(self.path, 40)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_segments_cover_audio(self):
+        """测试分段覆盖全部音频且相邻分段重叠"""
+        with PCMStream(self.path) as stream:
+            segments = list(iter_segments(stream, segment_duration=2.0, overlap=1.0))
+        self.assertEqual([s[1] for s in segments[:3]], [0.0, 1.0, 2.0])
+        self.assertAlmostEqual(segments[-1][2], 40 * WORD_SECONDS)
+        self.assertTrue(all(len(s[3]) <= 2 * RATE * 2 for s in segments))
+
+    def test_transcribe_stitches_overlaps(self):
+        """测试多线程转录结果与原文一致"""
+        with StreamingTranscriber(n_workers=3, segment_duration=2.0, overlap=1.0, max_pending=2,
+                                  recognizer_factory=FakeRecognizer) as transcriber:
+            result = transcriber.transcribe(self.path)
+        self.assertEqual(result["text"], expected_text(40))
+        self.assertEqual(result["failed_segments"], [])
+        self.assertAlmostEqual(result["audio_duration"], 12.0)
+
+    def test_transcribe_stereo_wav(self):
+        """测试立体声WAV混合为单声道后识别"""
+        path = os.path.join(self.temp_dir.name, "stereo.wav")
+        write_word_wav(path, 10, channels=2)
+        with PCMStream(path) as stream:
+            self.assertEqual((stream.channels, stream.frame_bytes), (1, 2))
+        with StreamingTranscriber(n_workers=2, segment_duration=2.0, overlap=1.0,
+                                  recognizer_factory=FakeRecognizer) as transcriber:
+            result = transcriber.transcribe(path)
+        self.assertEqual(result["text"], expected_text(10))
+        self.assertAlmostEqual(result["audio_duration"], 3.0)
+
+    def test_partial_results_are_ordered(self):
+        """测试部分结果按顺序产出，新增文本拼接后与最终文本一致"""
+        transcriber = StreamingTranscriber(n_workers=4, segment_duration=2.0, overlap=1.0,
+                                           recognizer_factory=lambda: FakeRecognizer(delay=0.01))
+        words = []
+        indices = []
+        for item in transcriber.iter_transcribe(self.path):
+            indices.append(item["index"])
+            del words[len(words) - item["retracted_words"]:]
+            words += item["new_text"].split()
+        transcriber.close()
+        self.assertEqual(indices, sorted(indices))
+        self.assertEqual(" ".join(words), expected_text(40))
+
+    def test_async_iterator(self):
+        """测试异步迭代接口"""
+        async def collect():
+            transcriber = StreamingTranscriber(n_workers=2, segment_duration=2.0, overlap=1.0,
+                                               recognizer_factory=FakeRecognizer)
+            items = [item async for item in transcriber.aiter_transcribe(self.path)]
+            transcriber.close()
+            return items
+
+        items = asyncio.run(collect())
+        self.assertEqual(len(items), 11)
+        self.assertTrue(all(item["success"] for item in items))
+
+    def test_process_workers(self):
+        """测试进程池模式"""
+        with StreamingTranscriber(n_workers=2, executor="process", segment_duration=2.0, overlap=1.0,
+                                  recognizer_factory=FakeRecognizer) as transcriber:
+            result = transcriber.transcribe(self.path)
+        self.assertEqual(result["text"], expected_text(40))
+
+    def test_throughput_scales_with_workers(self):
+        """测试识别耗时随工作数增加而减少"""
+        times = {}
+        for n_workers in (1, 4):
+            with StreamingTranscriber(n_workers=n_workers, segment_duration=2.0, overlap=1.0,
+                                      recognizer_factory=lambda: FakeRecognizer(delay=0.05)) as transcriber:
+                transcriber.transcribe(self.path)
+            times[n_workers] = transcriber.stats["wall_time"]
+        self.assertLess(times[4], times[1] * 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+"""
+语音合成缓存测试模块
+测试内容寻址缓存、字节预算淘汰、磁盘持久化以及批量合成的去重和进程池模式
+"""
+
+import os
+import tempfile
+import time
+import unittest
+
+from modules.audio.synthesis_cache import SynthesisCache, synthesis_cache_key
+from modules.audio.text_to_speech import TextToSpeech
+
+
+class FakeTextToSpeech(TextToSpeech):
+    """用文本内容生成确定的假音频数据，并记录引擎调用次数"""
+
+    delay = 0.0
+
+    def __init__(self, config=None, cache=None):
+        super().__init__(config, cache)
+        self.engine_calls = []
+
+    def _synthesize_engine(self, text, output_file=None):
+        if self.delay:
+            time.sleep(self.delay)
+        self.engine_calls.append(text)
+        return f"{self.config.voice}:{self.config.rate}:{text}".encode("utf-8") * 10
+
+
+class TestSynthesisCache(unittest.TestCase):
+    """测试合成结果缓存"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_key_depends_on_text_and_params(self):
+        """测试缓存键由文本和合成参数共同决定"""
+        key = synthesis_cache_key("order filled", engine="pyttsx3", voice="default", rate=1.0)
+        self.assertEqual(key, synthesis_cache_key("order filled", rate=1.0, voice="default", engine="pyttsx3"))
+        self.assertNotEqual(key, synthesis_cache_key("order filled", engine="pyttsx3", voice="default", rate=1.2))
+        self.assertNotEqual(key, synthesis_cache_key("order filled.", engine="pyttsx3", voice="default", rate=1.0))
+
+    def test_memory_budget_evicts_least_recently_used(self):
+        """测试内存层按字节预算淘汰最久未使用的结果"""
+        cache = SynthesisCache(max_bytes=250)
+        for name in "abc":
+            cache.put(name, name.encode() * 100)
+        self.assertNotIn("a", cache)
+        self.assertIn("c", cache)
+
+        cache.get("b")
+        cache.put("d", b"d" * 100)
+        self.assertIn("b", cache)
+        self.assertNotIn("c", cache)
+        self.assertLessEqual(cache.memory_bytes, 250)
+
+    def test_disk_persistence(self):
+        """测试磁盘缓存在新实例中仍可命中，且受磁盘预算限制"""
+        cache = SynthesisCache(self.temp_dir.name, max_disk_bytes=300)
+        cache.put("a", b"a" * 100)
+        cache.put("b", b"b" * 100)
+
+        reopened = SynthesisCache(self.temp_dir.name, max_disk_bytes=300)
+        self.assertEqual(reopened.disk_bytes, 200)
+        self.assertEqual(reopened.get("a"), b"a" * 100)
+        self.assertEqual(reopened.get_stats()["disk_hits"], 1)
+        self.assertIsNone(reopened.get("missing"))
+
+        reopened.put("c", b"c" * 100)
+        reopened.put("d", b"d" * 100)
+        self.assertLessEqual(reopened.disk_bytes, 300)
+        self.assertEqual(len(os.listdir(self.temp_dir.name)), 3)
+        # b 是最久未使用的
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir.name, "b.wav")))
+
+
+class TestCachedTextToSpeech(unittest.TestCase):
+    """测试TextToSpeech的缓存和批量合成"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config = {"cache_dir": self.temp_dir.name}
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_repeated_phrase_synthesized_once(self):
+        """测试重复短语只调用一次引擎"""
+        tts = FakeTextToSpeech(self.config)
+        first = tts.synthesize("stop loss triggered")
+        second = tts.synthesize("stop loss triggered")
+        self.assertEqual(first, second)
+        self.assertEqual(tts.engine_calls, ["stop loss triggered"])
+
+        output_file = os.path.join(self.temp_dir.name, "out", "alert.wav")
+        self.assertIsNone(tts.synthesize("stop loss triggered", output_file))
+        with open(output_file, "rb") as f:
+            self.assertEqual(f.read(), first)
+        self.assertEqual(len(tts.engine_calls), 1)
+
+    def test_cache_survives_restart(self):
+        """测试新的合成器实例从磁盘缓存读取"""
+        FakeTextToSpeech(self.config).synthesize("order filled")
+        tts = FakeTextToSpeech(self.config)
+        self.assertIsNotNone(tts.synthesize("order filled"))
+        self.assertEqual(tts.engine_calls, [])
+
+    def test_params_change_invalidates(self):
+        """测试改变语速后重新合成"""
+        cache = SynthesisCache()
+        FakeTextToSpeech({"rate": 1.0}, cache=cache).synthesize("order filled")
+        tts = FakeTextToSpeech({"rate": 1.5}, cache=cache)
+        tts.synthesize("order filled")
+        self.assertEqual(tts.engine_calls, ["order filled"])
+
+    def test_disabled_cache(self):
+        """测试关闭缓存时每次都调用引擎"""
+        tts = FakeTextToSpeech({"cache_enabled": False})
+        tts.synthesize("order filled")
+        tts.synthesize("order filled")
+        self.assertIsNone(tts.cache)
+        self.assertEqual(len(tts.engine_calls), 2)
+
+    def test_batch_deduplicates(self):
+        """测试批量合成去重并保持输入顺序"""
+        tts = FakeTextToSpeech(self.config)
+        tts.synthesize("b")
+        results = tts.synthesize_batch(["a", "b", "a", "", "c"], n_workers=2, executor="thread")
+        self.assertEqual(results[0], results[2])
+        self.assertEqual(results[1], tts.synthesize("b"))
+        self.assertIsNone(results[3])
+        self.assertEqual(sorted(tts.engine_calls), ["a", "b", "c"])
+        self.assertEqual(tts.last_batch_stats["unique"], 3)
+        self.assertEqual(tts.last_batch_stats["cached"], 1)
+        self.assertEqual(tts.last_batch_stats["rendered"], 2)
+
+    def test_batch_process_pool(self):
+        """测试进程池合成的结果写入主进程缓存"""
+        tts = FakeTextToSpeech(self.config)
+        phrases = [f"phrase {i}" for i in range(6)]
+        results = tts.synthesize_batch(phrases, n_workers=2, executor="process")
+        self.assertEqual(results, [FakeTextToSpeech({"cache_enabled": False}).synthesize(p) for p in phrases])
+        self.assertEqual(tts.engine_calls, [])
+        self.assertTrue(all(tts.cache_key(p) in tts.cache for p in phrases))
+
+    def test_prerender(self):
+        """测试预合成后的通知只需读取缓存"""
+        FakeTextToSpeech.delay = 0.02
+        try:
+            tts = FakeTextToSpeech(self.config)
+            thread = tts.prerender(["order filled", "stop loss triggered"], n_workers=1, background=True)
+            thread.join()
+            start = time.perf_counter()
+            tts.synthesize("order filled")
+            self.assertLess(time.perf_counter() - start, 0.02)
+            self.assertEqual(len(tts.engine_calls), 2)
+        finally:
+            FakeTextToSpeech.delay = 0.0
+
+
+if __name__ == "__main__":
+    unittest.main()
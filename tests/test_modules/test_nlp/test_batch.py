@@ -0,0 +1,126 @@
+"""
+NLP批处理测试模块
+测试编译词典、进程池批处理和流式接口与逐条处理结果一致
+"""
+
+import unittest
+
+from modules.nlp.batch import CompiledLexicon, ProcessBatchRunner, iter_chunks
+from modules.nlp.sentiment import SentimentAnalyzer
+from modules.nlp.tokenizer import Tokenizer
+
+
+class TestCompiledLexicon(unittest.TestCase):
+    """测试编译词典"""
+
+    def test_matches_basic_analyzer(self):
+        """测试编译词典得分与基础分析器一致"""
+        analyzer = SentimentAnalyzer(sentiment_lexicon={"good": 0.7, "bad": -0.7, "meh": 0.0})
+        texts = ["Good good BAD", "meh", "no match", "good\nbad", "bad, bad!"]
+        matrix = CompiledLexicon(analyzer.sentiment_lexicon).score_batch(texts)
+
+        for text, row in zip(texts, matrix.tolist()):
+            expected = analyzer._analyze_basic(text)
+            self.assertEqual(
+                row,
+                [expected["positive"], expected["negative"], expected["neutral"], expected["compound"]],
+            )
+
+    def test_stale_detection(self):
+        """测试词典变化后需要重新编译"""
+        lexicon = {"good": 0.7}
+        compiled = CompiledLexicon(lexicon)
+        self.assertFalse(compiled.is_stale(lexicon))
+        lexicon["bad"] = -0.7
+        self.assertTrue(compiled.is_stale(lexicon))
+
+        # 原地修改得分，词条数不变
+        compiled = CompiledLexicon(lexicon)
+        lexicon["good"] = 0.9
+        self.assertTrue(compiled.is_stale(lexicon))
+        self.assertFalse(compiled.is_stale({"good": 0.7, "bad": -0.7}))
+
+
+class TestSentimentBatch(unittest.TestCase):
+    """测试情感分析批处理"""
+
+    def setUp(self):
+        self.analyzer = SentimentAnalyzer(language="en")
+        self.texts = ["I love this great market", "", "terrible awful crash", "plain text", "  "] * 40
+
+    def tearDown(self):
+        self.analyzer.close()
+
+    def test_local_batch_matches_single(self):
+        """测试进程内批处理结果与逐条分析一致"""
+        expected = [self.analyzer.analyze(text) for text in self.texts]
+        self.assertEqual(self.analyzer.analyze_batch(self.texts), expected)
+
+    def test_process_pool_batch_matches_single(self):
+        """测试进程池批处理结果顺序和内容一致"""
+        expected = [self.analyzer.analyze(text) for text in self.texts]
+        result = self.analyzer.analyze_batch(self.texts, n_workers=2, chunk_size=17)
+        self.assertEqual(result, expected)
+
+    def test_lexicon_edit_in_place(self):
+        """测试原地修改词典得分后，进程内和进程池批处理都使用新得分"""
+        texts = ["great market", "plain text"]
+        self.analyzer.analyze_batch(texts)
+        self.analyzer.analyze_batch(texts, n_workers=2, chunk_size=1)
+        self.analyzer.sentiment_lexicon["great"] = -0.5
+
+        expected = [self.analyzer.analyze(text) for text in texts]
+        self.assertLess(expected[0]["scores"]["compound"], 0)
+        self.assertEqual(self.analyzer.analyze_batch(texts), expected)
+        self.assertEqual(self.analyzer.analyze_batch(texts, n_workers=2, chunk_size=1), expected)
+
+    def test_streaming_iterator(self):
+        """测试流式接口可处理生成器输入"""
+        stream = (text for text in self.texts)
+        results = list(self.analyzer.iter_analyze(stream, chunk_size=7))
+        self.assertEqual(results, [self.analyzer.analyze(text) for text in self.texts])
+
+
+class TestTokenizerBatch(unittest.TestCase):
+    """测试分词批处理"""
+
+    def setUp(self):
+        self.tokenizer = Tokenizer({"remove_stopwords": True, "custom_stopwords": ["the"]})
+        self.texts = ["The BTC price, rose 5%!", "", "line one\nline two", "x.y-z"] * 30
+
+    def tearDown(self):
+        self.tokenizer.close()
+
+    def test_batch_matches_single(self):
+        """测试批量分词结果与逐条分词一致"""
+        expected = [self.tokenizer.tokenize(text) for text in self.texts]
+        self.assertEqual(self.tokenizer.tokenize_batch(self.texts), expected)
+        self.assertEqual(
+            self.tokenizer.tokenize_batch(self.texts, n_workers=2, chunk_size=11), expected
+        )
+
+    def test_streaming_iterator(self):
+        """测试流式分词"""
+        results = list(self.tokenizer.iter_tokenize(iter(self.texts), chunk_size=5))
+        self.assertEqual(results, [self.tokenizer.tokenize(text) for text in self.texts])
+
+
+class TestBatchHelpers(unittest.TestCase):
+    """测试批处理辅助工具"""
+
+    def test_iter_chunks(self):
+        """测试分片"""
+        self.assertEqual(list(iter_chunks(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(iter_chunks([], 3)), [])
+
+    def test_runner_bounded_pending(self):
+        """测试进程池处理器保持输入顺序"""
+        with ProcessBatchRunner(
+            factory=Tokenizer, method="tokenize_batch", n_workers=2, chunk_size=3, max_pending=2
+        ) as runner:
+            texts = [f"word{i} other" for i in range(20)]
+            self.assertEqual(runner.map(texts), [[f"word{i}", "other"] for i in range(20)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+批量嵌入测试模块
+测试EmbeddingModel批量嵌入、文本向量缓存和向量化词向量平均
+"""
+
+import os
+import pickle
+import tempfile
+import unittest
+
+import numpy as np
+
+from modules.nlp.embedding import EmbeddingModel, benchmark_embedding_throughput
+
+
+class TestBatchEmbedding(unittest.TestCase):
+    """测试批量嵌入功能"""
+
+    def setUp(self):
+        """创建一个小型自定义词向量模型"""
+        rng = np.random.default_rng(0)
+        self.vectors = {
+            word: rng.normal(size=8)
+            for word in ["btc", "price", "rises", "falls", "market", "news"]
+        }
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.temp_dir.name, "vectors.pkl")
+        with open(self.model_path, "wb") as f:
+            pickle.dump(self.vectors, f)
+
+        self.model = EmbeddingModel(
+            model_type="custom", model_path=self.model_path, cache_size=4
+        )
+        self.texts = [
+            "btc price rises",
+            "market news",
+            "btc falls unknown",
+            "",
+            "btc price rises",
+        ]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _reference_embedding(self, text):
+        """逐词求平均的参考实现"""
+        tokens = text.split()
+        if not tokens:
+            return np.zeros(8)
+        return np.mean(
+            [self.vectors.get(token, np.zeros(8)) for token in tokens], axis=0
+        )
+
+    def test_batch_matches_per_text_average(self):
+        """测试批量结果与逐词平均一致"""
+        embeddings = self.model.get_text_embeddings(self.texts, batch_size=2)
+        self.assertEqual(embeddings.shape, (len(self.texts), 8))
+        for text, embedding in zip(self.texts, embeddings):
+            np.testing.assert_allclose(embedding, self._reference_embedding(text))
+
+    def test_single_text_uses_batch_path(self):
+        """测试单文本接口结果不变"""
+        for text in self.texts:
+            np.testing.assert_allclose(
+                self.model.get_text_embedding(text), self._reference_embedding(text)
+            )
+
+    def test_cache_is_bounded_lru(self):
+        """测试文本向量缓存有界且按最近使用淘汰"""
+        self.model.get_text_embeddings([f"btc {i}" for i in range(10)])
+        self.assertEqual(len(self.model.text_cache), 4)
+
+        self.model.clear_cache()
+        self.model.get_text_embeddings(["btc", "price", "rises", "falls"])
+        self.model.get_text_embedding("btc")  # 刷新为最近使用
+        self.model.get_text_embedding("market")
+        remaining = set(self.model.text_cache)
+        self.assertIn(self.model._text_cache_key("btc"), remaining)
+        self.assertNotIn(self.model._text_cache_key("price"), remaining)
+
+    def test_vocab_index_is_bounded(self):
+        """测试词表矩阵超过上限后在下一批前清空，结果不变"""
+        model = EmbeddingModel(
+            model_type="custom", model_path=self.model_path, cache_size=0, vocab_cache_size=3
+        )
+        for text in self.texts + [f"word{i} btc" for i in range(20)]:
+            embedding = model.get_text_embeddings([text])[0]
+            np.testing.assert_allclose(embedding, self._reference_embedding(text))
+            self.assertLessEqual(len(model._vocab_index), 3 + 3)
+
+    def test_cached_result_is_not_aliased(self):
+        """测试修改返回结果不会污染缓存"""
+        first = self.model.get_text_embedding("btc price")
+        first[:] = 0
+        second = self.model.get_text_embedding("btc price")
+        np.testing.assert_allclose(second, self._reference_embedding("btc price"))
+
+    def test_explicit_tokens(self):
+        """测试显式传入分词"""
+        embeddings = self.model.get_text_embeddings(
+            ["ignored", "ignored"], tokens_list=[["btc"], ["price", "falls"]]
+        )
+        np.testing.assert_allclose(embeddings[0], self.vectors["btc"])
+        np.testing.assert_allclose(
+            embeddings[1], (self.vectors["price"] + self.vectors["falls"]) / 2
+        )
+
+        with self.assertRaises(ValueError):
+            self.model.get_text_embeddings(["a", "b"], tokens_list=[["a"]])
+
+    def test_vector_index_search(self):
+        """测试构建向量索引并检索相似文本"""
+        index = self.model.build_vector_index(
+            ["btc price rises", "market news", "btc falls"], ids=[10, 20, 30]
+        )
+        results = self.model.search_similar_texts("market news", index, n=2)
+        self.assertEqual(results[0][0], 20)
+        self.assertAlmostEqual(results[0][1], 1.0, places=5)
+        self.assertEqual(len(results), 2)
+
+    def test_benchmark_reports_throughput(self):
+        """测试吞吐量基准测试输出"""
+        results = benchmark_embedding_throughput(
+            self.model, self.texts * 10, batch_sizes=(1, 16)
+        )
+        self.assertEqual(set(results), {1, 16})
+        self.assertTrue(all(value > 0 for value in results.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+向量索引测试模块
+测试精确检索、IVF近似检索、增量插入和持久化
+"""
+
+import tempfile
+import unittest
+
+import numpy as np
+
+from modules.nlp.vector_index import VectorIndex, benchmark_vector_index
+
+
+class TestVectorIndex(unittest.TestCase):
+    """测试向量索引功能"""
+
+    def setUp(self):
+        """生成带聚类结构的测试向量"""
+        rng = np.random.default_rng(1)
+        centers = rng.normal(size=(20, 16))
+        labels = rng.integers(0, 20, 2000)
+        self.vectors = centers[labels] + 0.2 * rng.normal(size=(2000, 16))
+        self.queries = self.vectors[:25] + 0.05 * rng.normal(size=(25, 16))
+
+    def _brute_force(self, queries, k):
+        """暴力计算余弦相似度top-k"""
+        data = self.vectors / np.linalg.norm(self.vectors, axis=1, keepdims=True)
+        q = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+        return np.argsort(-(q @ data.T), axis=1)[:, :k]
+
+    def test_exact_search_matches_brute_force(self):
+        """测试分块精确检索结果与暴力计算一致"""
+        index = VectorIndex(dim=16, block_size=300)
+        index.add(self.vectors)
+        scores, ids = index.search(self.queries, k=5, exact=True)
+
+        np.testing.assert_array_equal(ids, self._brute_force(self.queries, 5))
+        self.assertTrue(np.all(np.diff(scores, axis=1) <= 1e-6))
+        self.assertEqual(scores.dtype, np.float32)
+
+    def test_ivf_search_recall(self):
+        """测试IVF检索召回率"""
+        index = VectorIndex(dim=16, ivf_threshold=1000, n_lists=20, n_probe=4)
+        index.add(self.vectors)
+        _, ids = index.search(self.queries, k=10)
+        self.assertTrue(index.is_trained)
+
+        expected = self._brute_force(self.queries, 10)
+        hits = sum(len(np.intersect1d(a, b)) for a, b in zip(ids, expected))
+        self.assertGreater(hits / expected.size, 0.9)
+
+    def test_incremental_insert_after_training(self):
+        """测试训练后增量插入的向量可被检索"""
+        index = VectorIndex(dim=16, n_lists=10)
+        index.add(self.vectors[:1000])
+        index.train()
+        new_ids = index.add(self.vectors[1000:1010], ids=np.arange(5000, 5010))
+
+        _, ids = index.search(self.vectors[1000:1010], k=1, exact=False, n_probe=10)
+        np.testing.assert_array_equal(ids[:, 0], new_ids)
+        self.assertEqual(len(index), 1010)
+
+    def test_save_and_load_with_mmap(self):
+        """测试持久化和内存映射加载"""
+        index = VectorIndex(dim=16, n_lists=8)
+        index.add(self.vectors)
+        index.train()
+        expected = index.search(self.queries, k=5, exact=False)
+
+        with tempfile.TemporaryDirectory() as directory:
+            index.save(directory)
+            loaded = VectorIndex.load(directory, mmap=True)
+            self.assertIsInstance(loaded.vectors.base, np.memmap)
+
+            result = loaded.search(self.queries, k=5, exact=False)
+            np.testing.assert_array_equal(result[1], expected[1])
+
+            # 插入时从内存映射复制到内存
+            loaded.add(self.vectors[:3])
+            self.assertEqual(len(loaded), len(self.vectors) + 3)
+            self.assertEqual(loaded.ids[-1], len(self.vectors) + 2)
+
+    def test_save_mmap_index_to_same_directory(self):
+        """测试内存映射加载的索引保存回原目录"""
+        index = VectorIndex(dim=16, n_lists=8)
+        index.add(self.vectors)
+        index.train()
+        expected = index.search(self.queries, k=5, exact=False)
+
+        with tempfile.TemporaryDirectory() as directory:
+            index.save(directory)
+            loaded = VectorIndex.load(directory, mmap=True)
+            loaded.save(directory)
+            result = VectorIndex.load(directory, mmap=True).search(self.queries, k=5, exact=False)
+            np.testing.assert_array_equal(result[1], expected[1])
+
+            loaded = VectorIndex.load(directory, mmap=True)
+            loaded.add(self.vectors[:3])
+            loaded.save(directory)
+            reloaded = VectorIndex.load(directory, mmap=True)
+            self.assertEqual(len(reloaded), len(self.vectors) + 3)
+            np.testing.assert_allclose(reloaded.vectors, loaded.vectors)
+
+    def test_dimension_mismatch(self):
+        """测试维度不匹配时报错"""
+        index = VectorIndex(dim=16)
+        with self.assertRaises(ValueError):
+            index.add(np.zeros((2, 8)))
+
+    def test_benchmark(self):
+        """测试召回率和延迟基准测试"""
+        results = benchmark_vector_index(
+            n_vectors=3000, dim=16, n_queries=10, k=5, n_probes=(2, 8)
+        )
+        self.assertIn("exact_latency_ms", results)
+        self.assertEqual(set(results["ivf"]), {2, 8})
+        self.assertGreaterEqual(results["ivf"][8]["recall"], results["ivf"][2]["recall"])
+
+
+if __name__ == "__main__":
+    unittest.main()
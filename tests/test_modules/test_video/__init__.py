@@ -0,0 +1,3 @@
+"""
+视频模块测试包
+"""
@@ -0,0 +1,205 @@
+"""
+帧总线测试模块
+测试单次解码多消费者分发、步长、背压、非阻塞丢帧以及与VideoProcessor的集成
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import cv2
+import numpy as np
+
+from modules.video.frame_bus import (
+    FrameBus, FrameConsumer, CallbackConsumer, FrameSamplerConsumer,
+    KeyFrameConsumer, VideoWriterConsumer
+)
+from modules.video.video_processor import VideoProcessor
+
+
+def write_test_video(path, frame_count=60, size=(96, 64), fps=30.0):
+    """生成帧内容随帧号变化的测试视频"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    for i in range(frame_count):
+        frame = np.full((size[1], size[0], 3), (i * 4) % 256, dtype=np.uint8)
+        writer.write(frame)
+    writer.release()
+
+
+class RecordingConsumer(FrameConsumer):
+    """记录收到的帧号和像素值"""
+
+    def __init__(self, name, delay=0.0, **kwargs):
+        super().__init__(name, **kwargs)
+        self.delay = delay
+        self.result = []
+
+    def on_frame(self, frame_index, timestamp, frame):
+        if self.delay:
+            time.sleep(self.delay)
+        self.result.append((frame_index, int(frame[0, 0, 0])))
+
+
+class TestFrameBus(unittest.TestCase):
+    """测试帧总线"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.video_path = os.path.join(self.temp_dir.name, "test.avi")
+        write_test_video(self.video_path, frame_count=60, fps=30.0)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _run(self, consumers, capacity=8):
+        video = cv2.VideoCapture(self.video_path)
+        bus = FrameBus(capacity=capacity)
+        for consumer in consumers:
+            bus.subscribe(consumer)
+        stats = bus.run(video)
+        video.release()
+        return bus, stats
+
+    def _expected_pixels(self):
+        video = cv2.VideoCapture(self.video_path)
+        pixels = []
+        while True:
+            success, frame = video.read()
+            if not success:
+                break
+            pixels.append(int(frame[0, 0, 0]))
+        video.release()
+        return pixels
+
+    def test_consumers_receive_frames_at_their_stride(self):
+        """测试各消费者按步长收到与顺序解码一致的帧"""
+        pixels = self._expected_pixels()
+        every = RecordingConsumer("every")
+        sampled = RecordingConsumer("sampled", fps=10)
+        sparse = RecordingConsumer("sparse", stride=7)
+        _, stats = self._run([every, sampled, sparse])
+
+        self.assertEqual(every.result, list(enumerate(pixels)))
+        self.assertEqual(sampled.stride, 3)
+        self.assertEqual(sampled.result, [(i, pixels[i]) for i in range(0, 60, 3)])
+        self.assertEqual(sparse.result, [(i, pixels[i]) for i in range(0, 60, 7)])
+        self.assertEqual(stats["decoded_frames"], 60)
+        self.assertEqual(stats["grabbed_frames"], 0)
+
+    def test_unneeded_frames_are_only_grabbed(self):
+        """测试没有消费者需要的帧不做完整解码"""
+        consumer = RecordingConsumer("sparse", stride=5)
+        _, stats = self._run([consumer])
+        self.assertEqual(stats["decoded_frames"], 12)
+        self.assertEqual(stats["grabbed_frames"], 48)
+        self.assertEqual([i for i, _ in consumer.result], list(range(0, 60, 5)))
+
+    def test_slow_blocking_consumer_applies_backpressure(self):
+        """测试慢速阻塞型消费者不丢帧"""
+        pixels = self._expected_pixels()
+        slow = RecordingConsumer("slow", delay=0.002)
+        fast = RecordingConsumer("fast")
+        _, stats = self._run([slow, fast], capacity=2)
+        self.assertEqual(slow.result, list(enumerate(pixels)))
+        self.assertEqual(fast.result, list(enumerate(pixels)))
+        self.assertEqual(stats["consumers"]["slow"]["dropped"], 0)
+
+    def test_non_blocking_consumer_drops_instead_of_stalling(self):
+        """测试非阻塞消费者落后时丢帧且收到的帧内容正确"""
+        pixels = self._expected_pixels()
+        gate = threading.Event()
+
+        class GatedConsumer(RecordingConsumer):
+            def on_frame(self, frame_index, timestamp, frame):
+                gate.wait(5)
+                super().on_frame(frame_index, timestamp, frame)
+
+        lossy = GatedConsumer("lossy", blocking=False)
+        releaser = CallbackConsumer("releaser", lambda frame: None)
+        original = releaser.on_end
+        releaser.on_end = lambda: (gate.set(), original())
+        _, stats = self._run([lossy, releaser], capacity=4)
+
+        received = stats["consumers"]["lossy"]["received"]
+        self.assertEqual(received + stats["consumers"]["lossy"]["dropped"], 60)
+        self.assertLess(received, 60)
+        for index, pixel in lossy.result:
+            self.assertEqual(pixel, pixels[index])
+
+    def test_read_slot_rejects_slot_being_written(self):
+        """测试seqlock读取在槽位写入中或已被覆盖时返回None"""
+        bus = FrameBus(capacity=4)
+        frame = np.full((4, 4, 3), 7, dtype=np.uint8)
+        bus._allocate(frame)
+        bus.ring[1] = frame
+        bus.slot_seq[1] = 5
+        np.testing.assert_array_equal(bus._read_slot(5), frame)
+
+        bus.slot_seq[1] = -1
+        self.assertIsNone(bus._read_slot(5))
+        bus.slot_seq[1] = 9
+        self.assertIsNone(bus._read_slot(5))
+        bus._release()
+
+    def test_done_consumer_stops_decoding(self):
+        """测试所有消费者完成后停止解码"""
+        consumer = FrameSamplerConsumer(
+            "frames", os.path.join(self.temp_dir.name, "frames"), stride=2, max_frames=5
+        )
+        _, stats = self._run([consumer])
+        self.assertEqual(len(consumer.result), 5)
+        self.assertLess(stats["decoded_frames"] + stats["grabbed_frames"], 60)
+
+    def test_duplicate_consumer_name_rejected(self):
+        """测试消费者名称重复时报错"""
+        bus = FrameBus()
+        bus.subscribe(RecordingConsumer("a"))
+        with self.assertRaises(ValueError):
+            bus.subscribe(RecordingConsumer("a"))
+
+    def test_shared_memory_released(self):
+        """测试运行结束后释放共享内存"""
+        bus, _ = self._run([RecordingConsumer("a")])
+        self.assertIsNone(bus.shm)
+        self.assertIsNone(bus.ring)
+
+
+class TestVideoProcessorFrameBus(unittest.TestCase):
+    """测试VideoProcessor的帧总线接口"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.video_path = os.path.join(self.temp_dir.name, "test.avi")
+        write_test_video(self.video_path, frame_count=60, fps=30.0)
+        self.processor = VideoProcessor({"temp_dir": self.temp_dir.name})
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_matches_independent_methods(self):
+        """测试单次解码的结果与各方法分别解码一致"""
+        key_dir = os.path.join(self.temp_dir.name, "key")
+        expected_keys = self.processor.extract_key_frames(
+            self.video_path, threshold=0.05, output_dir=key_dir
+        )
+
+        results = self.processor.run_frame_bus(self.video_path, [
+            KeyFrameConsumer("key_frames", os.path.join(self.temp_dir.name, "bus_key"), threshold=0.05),
+            FrameSamplerConsumer("frames", os.path.join(self.temp_dir.name, "frames"), fps=1),
+            VideoWriterConsumer("timelapse", os.path.join(self.temp_dir.name, "timelapse.mp4"), stride=10),
+        ])
+
+        self.assertEqual(len(results["key_frames"]), len(expected_keys))
+        self.assertEqual(len(results["frames"]), 2)
+        self.assertTrue(results["timelapse"])
+        self.assertEqual(self.processor.last_frame_bus_stats["decoded_frames"], 60)
+
+        timelapse = cv2.VideoCapture(os.path.join(self.temp_dir.name, "timelapse.mp4"))
+        self.assertEqual(int(timelapse.get(cv2.CAP_PROP_FRAME_COUNT)), 6)
+        timelapse.release()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+"""
+快速关键帧提取测试模块
+测试批量缩略图检测、粗到精判定、直方图指标、后台写入以及与原方法结果的一致性
+"""
+
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from modules.video.key_frames import KeyFrameDetector, AsyncFrameWriter
+from modules.video.video_processor import VideoProcessor
+
+
+def write_scene_video(path, scene_lengths=(12, 20, 7, 25, 16), size=(128, 72), fps=30.0):
+    """生成包含多个场景切换的测试视频，每个场景内有轻微噪声"""
+    rng = np.random.RandomState(0)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    for scene, length in enumerate(scene_lengths):
+        base = np.full((size[1], size[0], 3), (scene * 97 + 30) % 256, dtype=np.int16)
+        base[:, : size[0] // 2] = (scene * 53 + 200) % 256
+        for _ in range(length):
+            noise = rng.randint(-3, 4, size=base.shape)
+            writer.write(np.clip(base + noise, 0, 255).astype(np.uint8))
+    writer.release()
+
+
+def reference_key_frames(path, threshold):
+    """原 extract_key_frames 的逐帧判定，返回关键帧索引"""
+    video = cv2.VideoCapture(path)
+    success, frame = video.read()
+    prev_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    indices = [0]
+    index = 0
+    while True:
+        success, frame = video.read()
+        if not success:
+            break
+        index += 1
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if cv2.mean(cv2.absdiff(gray, prev_gray))[0] / 255.0 > threshold:
+            indices.append(index)
+            prev_gray = gray
+    video.release()
+    return indices
+
+
+class TestKeyFrameDetector(unittest.TestCase):
+    """测试批量场景变化检测器"""
+
+    def setUp(self):
+        rng = np.random.RandomState(1)
+        self.frames = []
+        for level in [10, 12, 200, 201, 60, 61, 62, 250]:
+            frame = np.full((40, 64, 3), level, dtype=np.uint8)
+            frame[::2] = np.clip(level + rng.randint(-2, 3), 0, 255)
+            self.frames.append(frame)
+
+    def test_batch_split_does_not_change_result(self):
+        """测试不同批大小得到相同的关键帧"""
+        whole = KeyFrameDetector(threshold=0.1, thumbnail_size=(16, 10)).process_batch(self.frames)
+
+        detector = KeyFrameDetector(threshold=0.1, thumbnail_size=(16, 10))
+        split = []
+        for start in range(0, len(self.frames), 3):
+            split += [start + pos for pos in detector.process_batch(self.frames[start:start + 3])]
+
+        self.assertEqual(whole, [0, 2, 4, 7])
+        self.assertEqual(split, whole)
+
+    def test_compares_with_last_key_frame(self):
+        """测试每帧与最近的关键帧而非上一帧比较"""
+        frames = [np.full((8, 8, 3), level, dtype=np.uint8) for level in [0, 20, 40, 60, 80]]
+        detector = KeyFrameDetector(threshold=0.1, thumbnail_size=(4, 4))
+        self.assertEqual(detector.process_batch(frames), [0, 2, 4])
+
+    def test_histogram_features_match_calc_hist(self):
+        """测试向量化直方图与cv2.calcHist一致"""
+        detector = KeyFrameDetector(metric="histogram", hist_bins=32, thumbnail_size=(16, 10))
+        thumbs = detector.thumbnails(self.frames)
+        features = detector.features(thumbs)
+        for thumb, feature in zip(thumbs, features):
+            expected = cv2.calcHist([thumb], [0], None, [32], [0, 256]).ravel() / thumb.size
+            np.testing.assert_allclose(feature, expected)
+
+    def test_coarse_to_fine_rejects_false_candidates(self):
+        """测试粗筛候选帧经全分辨率确认后才成为关键帧"""
+        detector = KeyFrameDetector(threshold=0.1, thumbnail_size=(16, 10),
+                                    coarse_to_fine=True, candidate_ratio=0.01)
+        self.assertEqual(detector.process_batch(self.frames), [0, 2, 4, 7])
+        self.assertGreater(detector.fine_checks, 3)
+
+    def test_invalid_metric(self):
+        """测试不支持的指标"""
+        with self.assertRaises(ValueError):
+            KeyFrameDetector(metric="edges")
+
+
+class TestAsyncFrameWriter(unittest.TestCase):
+    """测试后台写入器"""
+
+    def test_writes_all_frames(self):
+        """测试所有图像在关闭后写入完成"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            paths = [os.path.join(temp_dir, f"{i}.jpg") for i in range(10)]
+            writer = AsyncFrameWriter(n_threads=2, max_pending=3)
+            for i, path in enumerate(paths):
+                writer.write(path, np.full((8, 8, 3), i * 20, dtype=np.uint8))
+            self.assertEqual(writer.close(), [])
+            self.assertTrue(all(os.path.exists(path) for path in paths))
+
+
+class TestExtractKeyFramesFast(unittest.TestCase):
+    """测试VideoProcessor快速关键帧提取"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.video_path = os.path.join(self.temp_dir.name, "scenes.avi")
+        write_scene_video(self.video_path)
+        self.processor = VideoProcessor({"temp_dir": self.temp_dir.name})
+        self.expected = reference_key_frames(self.video_path, 0.2)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_matches_legacy_selection(self):
+        """测试粗到精模式选出的关键帧与原方法一致"""
+        paths = self.processor.extract_key_frames_fast(
+            self.video_path, threshold=0.2, output_dir=os.path.join(self.temp_dir.name, "fast"),
+            batch_size=8
+        )
+        self.assertEqual(self.expected, [0, 12, 32, 39, 64])
+        self.assertEqual(self.processor.last_key_frame_indices, self.expected)
+        self.assertEqual(len(paths), len(self.expected))
+        self.assertTrue(all(os.path.exists(path) for path in paths))
+
+    def test_thumbnail_only_mode(self):
+        """测试仅缩略图判定模式"""
+        self.processor.extract_key_frames_fast(
+            self.video_path, threshold=0.2, output_dir=os.path.join(self.temp_dir.name, "fast"),
+            coarse_to_fine=False
+        )
+        self.assertEqual(self.processor.last_key_frame_indices, self.expected)
+
+    def test_max_frames_and_frame_step(self):
+        """测试最大帧数和跳帧检测"""
+        paths = self.processor.extract_key_frames_fast(
+            self.video_path, threshold=0.2, max_frames=3, frame_step=4,
+            output_dir=os.path.join(self.temp_dir.name, "fast")
+        )
+        self.assertEqual(len(paths), 3)
+        self.assertEqual(self.processor.last_key_frame_indices, [0, 12, 32])
+
+    def test_parallel_segments(self):
+        """测试分段并行提取与顺序处理结果一致"""
+        output_dir = os.path.join(self.temp_dir.name, "parallel")
+        paths = self.processor.extract_key_frames_fast(
+            self.video_path, threshold=0.2, output_dir=output_dir, n_workers=3, batch_size=4
+        )
+        self.assertEqual(self.processor.last_key_frame_indices, self.expected)
+        self.assertEqual(sorted(os.listdir(output_dir)), [os.path.basename(path) for path in paths])
+        self.assertEqual(os.path.basename(paths[1]), "keyframe_0012.jpg")
+
+
+if __name__ == "__main__":
+    unittest.main()
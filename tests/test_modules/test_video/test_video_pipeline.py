@@ -0,0 +1,113 @@
+"""
+视频帧分析流水线测试模块
+测试解码/分析并行流水线、结果顺序、批量分析钩子和运行统计
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+
+import cv2
+import numpy as np
+
+from modules.video.pipeline import FrameAnalysisPipeline, benchmark_pipeline
+from modules.video.video_processor import VideoProcessor
+
+
+def write_test_video(path, frame_count=60, size=(96, 64), fps=30.0):
+    """生成帧内容随帧号变化的测试视频"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    for i in range(frame_count):
+        frame = np.full((size[1], size[0], 3), (i * 4) % 256, dtype=np.uint8)
+        writer.write(frame)
+    writer.release()
+
+
+class TestFrameAnalysisPipeline(unittest.TestCase):
+    """测试帧分析流水线"""
+
+    def setUp(self):
+        self.frames = [(i, i / 10.0, np.full((4, 4), i, dtype=np.uint8)) for i in range(50)]
+
+    def test_results_are_ordered(self):
+        """测试多线程分析后结果按帧序号排列"""
+        pipeline = FrameAnalysisPipeline(
+            analyzer=lambda frame: int(frame[0, 0]) * 2, n_workers=4, queue_size=2, batch_size=3
+        )
+        results = pipeline.run(iter(self.frames))
+        self.assertEqual([r["frame_index"] for r in results], list(range(50)))
+        self.assertEqual([r["result"] for r in results], [i * 2 for i in range(50)])
+        self.assertEqual(pipeline.stats["frames"], 50)
+        self.assertEqual(len(pipeline.stats["worker_utilization"]), 4)
+
+    def test_batch_analyzer_receives_batches(self):
+        """测试批量分析钩子按批接收帧"""
+        sizes = []
+        lock = threading.Lock()
+
+        def batch_analyzer(frames):
+            with lock:
+                sizes.append(len(frames))
+            return [int(frame.sum()) for frame in frames]
+
+        pipeline = FrameAnalysisPipeline(batch_analyzer=batch_analyzer, n_workers=2, batch_size=8)
+        results = pipeline.run(self.frames)
+        self.assertEqual(sorted(sizes), [2] + [8] * 6)
+        self.assertEqual(results[3]["result"], 3 * 16)
+
+    def test_failed_frames_are_skipped(self):
+        """测试分析失败的帧被跳过"""
+        def analyzer(frame):
+            if frame[0, 0] % 10 == 0:
+                raise ValueError("bad frame")
+            return True
+
+        results = FrameAnalysisPipeline(analyzer=analyzer, n_workers=3).run(self.frames)
+        self.assertEqual(len(results), 45)
+
+    def test_requires_analyzer(self):
+        """测试缺少分析函数时报错"""
+        with self.assertRaises(ValueError):
+            FrameAnalysisPipeline()
+
+    def test_benchmark(self):
+        """测试流水线基准测试统计"""
+        stats = benchmark_pipeline(lambda: iter(self.frames), analyzer=lambda f: f.mean(),
+                                   worker_counts=(1, 2))
+        self.assertEqual(set(stats), {1, 2})
+        self.assertGreater(stats[2]["frames_per_sec"], 0)
+
+
+class TestVideoProcessorPipeline(unittest.TestCase):
+    """测试VideoProcessor的流水线分析"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.video_path = os.path.join(self.temp_dir.name, "test.avi")
+        write_test_video(self.video_path)
+        self.processor = VideoProcessor({"temp_dir": self.temp_dir.name})
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_parallel_matches_serial(self):
+        """测试多线程分析与单线程分析结果一致"""
+        analyzer = lambda frame: round(float(frame.mean()))
+        serial = self.processor.analyze_video_frames(self.video_path, analyzer, fps=10)
+        parallel = self.processor.analyze_video_frames(
+            self.video_path, analyzer, fps=10, n_workers=4, batch_size=2)
+        self.assertEqual(len(serial), 20)
+        self.assertEqual(serial, parallel)
+        self.assertEqual(self.processor.last_pipeline_stats["frames"], 20)
+
+    def test_grab_skips_frames(self):
+        """测试按间隔抽帧时跳过的帧不解码且帧内容正确"""
+        frames = list(self.processor.extract_frames_generator(self.video_path, frame_interval=5))
+        self.assertEqual([f[0] for f in frames], list(range(12)))
+        for idx, timestamp, frame in frames:
+            self.assertAlmostEqual(float(frame.mean()), (idx * 5 * 4) % 256, delta=3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,203 @@
+"""
+批量图像流水线测试模块
+测试OpenCV滤镜与PIL效果一致、流水线与逐张处理结果一致、缓冲区复用和多线程处理
+"""
+
+import unittest
+
+import cv2
+import numpy as np
+from PIL import Image, ImageEnhance, ImageFilter
+
+from modules.vision.batch_pipeline import BatchImagePipeline, benchmark_image_pipeline, cv2_filter
+from modules.vision.image_processor import ImageProcessor, normalize_image, resize_image
+
+
+def make_images(count, size=(64, 48), seed=0):
+    """生成带渐变和噪声的BGR测试图像"""
+    rng = np.random.RandomState(seed)
+    width, height = size
+    ramp = np.linspace(0, 200, width, dtype=np.float32)[None, :, None]
+    images = []
+    for _ in range(count):
+        noise = rng.randint(0, 55, size=(height, width, 3))
+        images.append(np.clip(ramp + noise, 0, 255).astype(np.uint8))
+    return images
+
+
+class TestCv2Filter(unittest.TestCase):
+    """测试OpenCV滤镜与PIL实现一致（包括边界像素，只允许舍入误差）"""
+
+    def setUp(self):
+        self.image = make_images(1)[0]
+        self.pil_image = Image.fromarray(self.image[..., ::-1])
+
+    def assert_close_to_pil(self, filter_type, pil_result, tolerance=2, image=None, **kwargs):
+        image = self.image if image is None else image
+        expected = np.array(pil_result).astype(np.int16)
+        if image.ndim == 3:
+            expected = expected[..., ::-1]
+        result = cv2_filter(image, filter_type, **kwargs).astype(np.int16)
+        diff = np.abs(result - expected)
+        self.assertLessEqual(diff.max(), tolerance, filter_type)
+
+    def test_enhance_filters(self):
+        """测试增强类滤镜"""
+        self.assert_close_to_pil("brightness", ImageEnhance.Brightness(self.pil_image).enhance(1.5))
+        self.assert_close_to_pil("contrast", ImageEnhance.Contrast(self.pil_image).enhance(1.5))
+        self.assert_close_to_pil("color", ImageEnhance.Color(self.pil_image).enhance(1.5))
+        self.assert_close_to_pil("sharpen", ImageEnhance.Sharpness(self.pil_image).enhance(2.0))
+
+    def test_kernel_filters(self):
+        """测试卷积类滤镜"""
+        self.assert_close_to_pil("edge", self.pil_image.filter(ImageFilter.FIND_EDGES))
+        self.assert_close_to_pil("emboss", self.pil_image.filter(ImageFilter.EMBOSS))
+        self.assert_close_to_pil("edge", self.pil_image.filter(ImageFilter.FIND_EDGES), tolerance=0)
+        self.assert_close_to_pil("emboss", self.pil_image.filter(ImageFilter.EMBOSS), tolerance=0)
+
+    def test_blur(self):
+        """测试模糊与PIL GaussianBlur一致，kernel_size按OpenCV的sigma换算"""
+        for radius in (0, 0.5, 1, 2, 5):
+            self.assert_close_to_pil("blur", self.pil_image.filter(ImageFilter.GaussianBlur(radius)),
+                                     radius=radius)
+        self.assert_close_to_pil("blur", self.pil_image.filter(ImageFilter.GaussianBlur(1.1)),
+                                 kernel_size=5)
+        gray = self.image[..., 1]
+        self.assert_close_to_pil("blur", Image.fromarray(gray).filter(ImageFilter.GaussianBlur(2)),
+                                 image=gray)
+        with self.assertRaises(ValueError):
+            cv2_filter(self.image, "blur", kernel_size=4)
+
+    def test_writes_into_dst(self):
+        """测试结果写入给定缓冲区"""
+        dst = np.empty_like(self.image)
+        work = np.empty_like(self.image)
+        result = cv2_filter(self.image, "sharpen", dst=dst, work=work)
+        self.assertIs(result, dst)
+
+    def test_unknown_filter(self):
+        """测试不支持的滤镜"""
+        with self.assertRaises(ValueError):
+            cv2_filter(self.image, "contour")
+
+
+class TestBatchImagePipeline(unittest.TestCase):
+    """测试批量图像流水线"""
+
+    def setUp(self):
+        self.images = make_images(12)
+
+    def test_matches_per_image_processing(self):
+        """测试批量结果与逐张处理一致"""
+        with BatchImagePipeline(n_workers=3) as pipeline:
+            batch = pipeline.resize(32, 24).filter("sharpen").normalize().run(self.images)
+
+        self.assertEqual(batch.shape, (12, 24, 32, 3))
+        self.assertEqual(batch.dtype, np.float32)
+        for image, result in zip(self.images, batch):
+            expected = normalize_image(cv2_filter(resize_image(image, width=32, height=24), "sharpen"))
+            np.testing.assert_array_equal(result, expected)
+
+    def test_accepts_4d_array_and_mixed_sizes(self):
+        """测试输入为4维数组或不同尺寸图像列表"""
+        pipeline = BatchImagePipeline(n_workers=1).convert_color("GRAY")
+        batch = pipeline.run(np.stack(self.images))
+        self.assertEqual(batch.shape, (12, 48, 64))
+        np.testing.assert_array_equal(batch[0], cv2.cvtColor(self.images[0], cv2.COLOR_BGR2GRAY))
+
+        mixed = [self.images[0], cv2.resize(self.images[1], (100, 80))]
+        batch = BatchImagePipeline(n_workers=2).resize(16, 16).run(mixed)
+        self.assertEqual(batch.shape, (2, 16, 16, 3))
+
+        with self.assertRaises(ValueError):
+            BatchImagePipeline(n_workers=1).normalize().run(mixed)
+
+    def test_buffers_are_reused(self):
+        """测试多次运行复用中间缓冲区和输出数组"""
+        pipeline = BatchImagePipeline(n_workers=1, reuse_output=True)
+        pipeline.resize(32, 24).filter("color").normalize(mean=0.5, std=0.25)
+        first = pipeline.run(self.images)
+        allocations = pipeline.allocations
+        second = pipeline.run(self.images)
+        self.assertIs(first, second)
+        self.assertEqual(pipeline.allocations, allocations)
+        # 输出数组 + resize和color两个中间缓冲区 + color的工作缓冲区
+        self.assertEqual(allocations, 4)
+
+        expected = (cv2_filter(cv2.resize(self.images[0], (32, 24), interpolation=cv2.INTER_AREA), "color")
+                    / np.float32(255.0) - 0.5) / 0.25
+        np.testing.assert_allclose(second[0], expected, rtol=1e-5, atol=1e-5)
+
+    def test_output_shape_checked(self):
+        """测试给定输出数组形状不符时报错"""
+        pipeline = BatchImagePipeline(n_workers=1).resize(8, 8)
+        with self.assertRaises(ValueError):
+            pipeline.run(self.images, out=np.empty((12, 8, 8), dtype=np.uint8))
+
+
+class TestImageProcessorBatch(unittest.TestCase):
+    """测试ImageProcessor的批量预处理和OpenCV滤镜"""
+
+    def setUp(self):
+        self.images = make_images(6, size=(80, 60))
+
+    def test_preprocess_batch_matches_preprocess_image(self):
+        """测试批量预处理与逐张预处理一致"""
+        for config in (
+            {"resize_width": 40, "resize_height": 30, "normalize": True},
+            {"max_size": 50, "grayscale": True},
+            {"format": "BGR", "max_size": 1024},
+            {"resize_width": 40},
+            {"resize_width": 40, "max_size": 50},
+        ):
+            processor = ImageProcessor(config)
+            batch = processor.preprocess_batch(self.images, n_workers=2)
+            for image, result in zip(self.images, batch):
+                np.testing.assert_array_equal(result, processor.preprocess_image(image), str(config))
+
+    def test_preprocess_batch_requires_uniform_sizes(self):
+        """测试目标尺寸取决于输入尺寸时不同尺寸的图像报错"""
+        mixed = [self.images[0], cv2.resize(self.images[1], (60, 80))]
+        batch = ImageProcessor({"resize_width": 40, "resize_height": 30}).preprocess_batch(mixed)
+        self.assertEqual(batch.shape, (2, 30, 40, 3))
+        with self.assertRaises(ValueError):
+            ImageProcessor({"max_size": 50}).preprocess_batch(mixed)
+
+    def test_apply_filter_uses_opencv(self):
+        """测试apply_filter对OpenCV支持的滤镜不经过PIL"""
+        processor = ImageProcessor({"format": "BGR"})
+        image = self.images[0]
+        np.testing.assert_array_equal(processor.apply_filter(image, "blur", radius=1),
+                                      cv2_filter(image, "blur", radius=1))
+        gray = image[..., :1]
+        self.assertEqual(processor.apply_filter(gray, "edge").shape, gray.shape)
+
+    def test_apply_filter_matches_pil(self):
+        """测试apply_filter的结果与PIL实现一致，kernel_size参数生效"""
+        processor = ImageProcessor({"format": "BGR"})
+        image = self.images[0]
+        pil_image = Image.fromarray(image[..., ::-1])
+        cases = [
+            ("blur", {}, pil_image.filter(ImageFilter.GaussianBlur(2)), 2),
+            ("blur", {"kernel_size": 9}, pil_image.filter(ImageFilter.GaussianBlur(1.7)), 2),
+            ("sharpen", {}, ImageEnhance.Sharpness(pil_image).enhance(2.0), 1),
+            ("edge", {}, pil_image.filter(ImageFilter.FIND_EDGES), 0),
+            ("emboss", {}, pil_image.filter(ImageFilter.EMBOSS), 0),
+        ]
+        for filter_type, kwargs, pil_result, tolerance in cases:
+            expected = np.array(pil_result)[..., ::-1].astype(np.int16)
+            result = processor.apply_filter(image, filter_type, **kwargs).astype(np.int16)
+            self.assertLessEqual(np.abs(result - expected).max(), tolerance, filter_type)
+        self.assertFalse(np.array_equal(processor.apply_filter(image, "blur", kernel_size=3),
+                                        processor.apply_filter(image, "blur", kernel_size=15)))
+
+    def test_benchmark(self):
+        """测试基准测试输出"""
+        results = benchmark_image_pipeline(ImageProcessor({"format": "BGR"}), self.images,
+                                           width=32, height=24, worker_counts=(1, 2))
+        self.assertEqual(results["per_image"]["allocations"], 18)
+        self.assertIn("images_per_sec", results["batch_2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
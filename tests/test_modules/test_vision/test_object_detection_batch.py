@@ -0,0 +1,174 @@
+"""
+批量对象检测测试模块
+测试向量化解码、批量检测和分块检测与逐张检测结果一致
+"""
+
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from modules.vision.object_detection import (
+    ObjectDetector,
+    benchmark_detection,
+    decode_detections,
+    split_batch_outputs,
+)
+
+
+class FakeYoloNet:
+    """模拟OpenCV DNN网络，输出由图像内容决定，形状为 (N*rows, 85)"""
+
+    GRID = 8
+
+    def setInput(self, blob):
+        self.blob = blob
+
+    def getUnconnectedOutLayersNames(self):
+        return ("yolo_82", "yolo_94")
+
+    def forward(self, names):
+        outputs = []
+        for layer, _ in enumerate(names):
+            per_image = []
+            for image in self.blob:
+                cells = image.reshape(3, self.GRID, 416 // self.GRID, self.GRID, 416 // self.GRID)
+                means = cells.mean(axis=(2, 4)).reshape(3, -1).T
+                rows = np.zeros((len(means), 85), dtype=np.float32)
+                grid = np.arange(len(means))
+                rows[:, 0] = (grid % self.GRID + 0.5) / self.GRID
+                rows[:, 1] = (grid // self.GRID + 0.5) / self.GRID
+                rows[:, 2] = 0.1 + 0.2 * means[:, 0]
+                rows[:, 3] = 0.1 + 0.2 * means[:, 1]
+                rows[:, 4] = means[:, 2]
+                rows[:, 5 + (grid + layer) % 80] = means.mean(axis=1)
+                per_image.append(rows)
+            outputs.append(np.concatenate(per_image))
+        return outputs
+
+
+class SlowYoloNet(FakeYoloNet):
+    """在setInput和forward之间让出线程，暴露共享网络的竞争"""
+
+    def forward(self, names):
+        time.sleep(0.005)
+        return super().forward(names)
+
+
+def reference_decode(layer_outputs, width, height, threshold):
+    """原逐行循环解码实现，用于对比"""
+    class_ids, confidences, boxes = [], [], []
+    for output in layer_outputs:
+        for detection in output:
+            scores = detection[5:]
+            class_id = np.argmax(scores)
+            confidence = scores[class_id]
+            if confidence > threshold:
+                center_x = int(detection[0] * width)
+                center_y = int(detection[1] * height)
+                w = int(detection[2] * width)
+                h = int(detection[3] * height)
+                x = int(center_x - w / 2)
+                y = int(center_y - h / 2)
+                boxes.append([x, y, w, h])
+                confidences.append(float(confidence))
+                class_ids.append(int(class_id))
+    return boxes, confidences, class_ids
+
+
+class TestBatchDetection(unittest.TestCase):
+    """测试批量对象检测"""
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.images = [
+            rng.integers(0, 256, size=(240 + 16 * i, 320 + 8 * i, 3), dtype=np.uint8)
+            for i in range(6)
+        ]
+        self.detector = ObjectDetector(
+            model_path="missing.weights", model_type="opencv", confidence_threshold=0.3
+        )
+        self.detector.model = FakeYoloNet()
+        self.detector.loaded = True
+
+    def test_decode_matches_reference_loop(self):
+        """测试向量化解码与逐行循环结果一致"""
+        net = FakeYoloNet()
+        net.setInput(np.random.default_rng(0).random((1, 3, 416, 416), dtype=np.float32))
+        outputs = net.forward(net.getUnconnectedOutLayersNames())
+
+        boxes, confidences, class_ids = decode_detections(outputs, 637, 481, 0.3)
+        expected = reference_decode(outputs, 637, 481, 0.3)
+        self.assertGreater(len(expected[0]), 0)
+        self.assertEqual(boxes.tolist(), expected[0])
+        self.assertEqual(confidences.tolist(), expected[1])
+        self.assertEqual(class_ids.tolist(), expected[2])
+
+    def test_split_batch_outputs(self):
+        """测试按图像拆分二维和三维输出"""
+        flat = np.arange(2 * 3 * 6, dtype=np.float32).reshape(6, 6)
+        parts = split_batch_outputs([flat, flat.reshape(2, 3, 6)], 2)
+        self.assertEqual(len(parts), 2)
+        np.testing.assert_array_equal(parts[1][0], flat[3:])
+        np.testing.assert_array_equal(parts[1][1], flat[3:])
+
+    def test_batch_matches_single(self):
+        """测试批量检测与逐张检测结果一致"""
+        single = [self.detector.detect(image) for image in self.images]
+        self.assertTrue(any(single))
+        self.assertEqual(self.detector.detect_batch(self.images, batch_size=4), single)
+
+    def test_batch_skips_empty_images(self):
+        """测试批量检测跳过空图像并保持顺序"""
+        images = [self.images[0], np.zeros((0, 0, 3), dtype=np.uint8), self.images[1]]
+        results = self.detector.detect_batch(images)
+        self.assertEqual(results[1], [])
+        self.assertEqual(results[2], self.detector.detect(self.images[1]))
+
+    def test_tiled_detection_maps_to_image_coordinates(self):
+        """测试分块检测结果位于原图坐标范围内"""
+        image = np.random.default_rng(5).integers(0, 256, size=(900, 1500, 3), dtype=np.uint8)
+        detections = self.detector.detect_tiled(image, tile_size=(416, 416), overlap=0.25)
+        self.assertTrue(detections)
+        for d in detections:
+            cx, cy = d.center
+            self.assertTrue(0 <= cx <= 1500 and 0 <= cy <= 900)
+
+        # 图块不小于图像时等价于直接检测
+        self.assertEqual(
+            self.detector.detect_tiled(self.images[0], tile_size=(2000, 2000)),
+            self.detector.detect(self.images[0]),
+        )
+
+    def test_tiled_detection_rejects_invalid_overlap(self):
+        """测试重叠比例不在[0, 1)范围内时报错"""
+        for overlap in (1.0, 1.5, -0.1):
+            with self.assertRaises(ValueError):
+                self.detector.detect_tiled(self.images[0], tile_size=(64, 64), overlap=overlap)
+
+    def test_concurrent_detection_on_shared_detector(self):
+        """测试多线程共享检测器时每个线程得到自己图像的检测结果"""
+        expected = [self.detector.detect(image) for image in self.images]
+        self.detector.model = SlowYoloNet()
+        results = [None] * len(self.images)
+
+        def worker(i):
+            results[i] = self.detector.detect_batch([self.images[i]])[0]
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(self.images))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, expected)
+
+    def test_benchmark(self):
+        """测试吞吐量基准测试"""
+        result = benchmark_detection(self.detector, self.images * 3, batch_size=16)
+        self.assertTrue(result["identical"])
+        self.assertGreater(result["batch_images_per_sec"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,3 @@
+"""
+系统模块测试包
+"""
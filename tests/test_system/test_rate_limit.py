@@ -0,0 +1,105 @@
+"""
+GCRA限流测试模块
+测试突发配额、匀速恢复、剩余配额和重置时间、批量检查的原子性、时间轮惰性清理以及大量客户端下的单次耗时
+"""
+
+import unittest
+
+from system.rate_limit import LocalGCRAStore, benchmark_rate_limiter
+
+
+class FakeClock:
+    """可手动推进的时钟"""
+
+    def __init__(self, now=1000000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestLocalGCRAStore(unittest.TestCase):
+    """测试本地GCRA存储"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.store = LocalGCRAStore(stripes=4, tick=1.0, wheel_slots=16, clock=self.clock)
+
+    def test_burst_then_steady_rate(self):
+        """测试窗口开始时允许整批请求，之后按限制速率恢复"""
+        results = [self.store.check("k", 10, 60) for _ in range(11)]
+        self.assertTrue(all(r[0] for r in results[:10]))
+        self.assertEqual([r[1] for r in results[:10]], list(range(9, -1, -1)))
+        allowed, remaining, retry_at = results[10]
+        self.assertFalse(allowed)
+        self.assertEqual(remaining, 0)
+        self.assertEqual(retry_at, int(self.clock.now) + 6)
+
+        self.clock.now += 5.9
+        self.assertFalse(self.store.check("k", 10, 60)[0])
+        self.clock.now += 0.1
+        self.assertEqual(self.store.check("k", 10, 60)[:2], (True, 0))
+
+    def test_sliding_window_has_no_boundary_burst(self):
+        """测试不会在固定窗口边界处放行两倍请求"""
+        self.clock.now = 1000059.0
+        for _ in range(10):
+            self.assertTrue(self.store.check("k", 10, 60)[0])
+        self.clock.now = 1000061.0
+        allowed = sum(self.store.check("k", 10, 60)[0] for _ in range(10))
+        self.assertEqual(allowed, 0)
+
+    def test_reset_time_when_allowed(self):
+        """测试允许时重置时间为配额完全恢复的时间"""
+        self.store.check("k", 10, 60)
+        self.assertEqual(self.store.check("k", 10, 60)[2], int(self.clock.now) + 12)
+
+    def test_check_many_is_atomic(self):
+        """测试批量检查中任一键被拒绝时，其余键也不计数"""
+        self.store.check("b", 1, 60)
+        allowed, results = self.store.check_many([("a", 5, 60), ("b", 1, 60)])
+        self.assertFalse(allowed)
+        self.assertEqual(results[0][:2], (True, 5))
+        self.assertFalse(results[1][0])
+        self.assertEqual(self.store.check("a", 5, 60)[1], 4)
+
+        self.clock.now += 60
+        allowed, results = self.store.check_many([("a", 5, 60), ("b", 1, 60)])
+        self.assertTrue(allowed)
+        self.assertEqual([r[1] for r in results], [4, 0])
+
+    def test_expired_records_are_evicted(self):
+        """测试TAT过去后记录被时间轮删除，包括超过时间轮一圈的长窗口"""
+        for i in range(100):
+            self.store.check(("client", i), 10, 5)
+        self.store.check("long", 1, 100)
+        self.assertEqual(len(self.store), 101)
+
+        self.clock.now += 10
+        self.store.check("other", 10, 5)
+        for stripe in self.store._stripes:
+            self.store._advance(stripe, self.clock.now)
+        self.assertEqual(len(self.store), 2)
+
+        self.clock.now += 200
+        for stripe in self.store._stripes:
+            self.store._advance(stripe, self.clock.now)
+        self.assertEqual(len(self.store), 0)
+        self.assertEqual(self.store.get_stats()["scheduled"], 0)
+
+    def test_reset(self):
+        """测试清空配额记录"""
+        self.store.check("k", 1, 60)
+        self.assertFalse(self.store.check("k", 1, 60)[0])
+        self.store.reset("k")
+        self.assertTrue(self.store.check("k", 1, 60)[0])
+
+    def test_flat_latency_with_many_clients(self):
+        """测试10万个不同客户端时单次检查耗时不随记录数增长"""
+        result = benchmark_rate_limiter(n_clients=100000, block=10000)
+        self.assertEqual(result["records"], 100000)
+        self.assertLess(result["ratio"], 3.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,195 @@
+"""
+安全模块测试
+测试权限位掩码与逐角色合并集合的结果一致、角色和资源变化时缓存失效、已验证令牌缓存，
+以及可疑活动计数器与逐条记录实现的检测结果一致
+"""
+
+import random
+import unittest
+
+from system import security
+from system.security import (
+    AccessControl, ActivityTracker, AuthManager, SecurityLevel, TradingAPIGuard,
+    benchmark_authorization
+)
+
+
+def reference_check(access, user_id, resource):
+    """逐角色合并权限集合的参考实现"""
+    if resource not in access.resource_permissions or user_id not in access.user_roles:
+        return False
+    user_permissions = set()
+    for role in access.user_roles[user_id]:
+        user_permissions.update(access.role_permissions.get(role, ()))
+    return access.resource_permissions[resource].issubset(user_permissions)
+
+
+class TestAccessControl(unittest.TestCase):
+    """测试访问控制"""
+
+    def setUp(self):
+        self.access = AccessControl()
+        self.access.define_resource_permissions("trading:place_order", {"read", "trade"})
+        self.access.define_resource_permissions("trading:get_market_data", {"read"})
+        self.access.define_resource_permissions("admin:users", {"read", "admin"})
+
+    def test_matches_reference(self):
+        """测试随机分配和移除角色后，检查结果与参考实现一致"""
+        rng = random.Random(4)
+        roles = list(self.access.role_permissions)
+        resources = list(self.access.resource_permissions) + ["undefined"]
+        for _ in range(500):
+            user_id = f"u{rng.randrange(5)}"
+            if rng.random() < 0.3:
+                self.access.assign_role(user_id, rng.choice(roles))
+            elif rng.random() < 0.2:
+                self.access.remove_role(user_id, rng.choice(roles))
+            for resource in resources:
+                self.assertEqual(self.access.check_permission(user_id, resource),
+                                 reference_check(self.access, user_id, resource))
+            expected = [r for r in self.access.resource_permissions
+                        if reference_check(self.access, user_id, r)]
+            if user_id in self.access.user_roles:
+                self.assertEqual(self.access.get_accessible_resources(user_id), expected)
+
+    def test_role_changes_invalidate_cache(self):
+        """测试分配、移除角色和修改角色权限后立即生效"""
+        self.access.assign_role("u1", "viewer")
+        self.assertFalse(self.access.check_permission("u1", "trading:place_order"))
+        self.access.assign_role("u1", "trader")
+        self.assertTrue(self.access.check_permission("u1", "trading:place_order"))
+        self.access.remove_role("u1", "trader")
+        self.assertFalse(self.access.check_permission("u1", "trading:place_order"))
+
+        self.access.define_role("viewer", {"read", "trade"})
+        self.assertTrue(self.access.check_permission("u1", "trading:place_order"))
+        self.assertFalse(self.access.assign_role("u1", "missing"))
+
+    def test_resource_definition_invalidates_accessible(self):
+        """测试新定义的资源出现在可访问资源列表中"""
+        self.access.assign_role("u1", "analyst")
+        self.assertEqual(self.access.get_accessible_resources("u1"), ["trading:get_market_data"])
+        self.access.define_resource_permissions("report:daily", {"analyze"})
+        self.assertEqual(self.access.get_accessible_resources("u1"),
+                         ["trading:get_market_data", "report:daily"])
+        self.assertEqual(self.access.get_accessible_resources("nobody"), [])
+
+    def test_benchmark(self):
+        """测试角色和资源增多时单次检查耗时不增长"""
+        result = benchmark_authorization(n_users=200, n_checks=20000, role_counts=(4, 64))
+        self.assertLess(result[64]["bitset_us"], result[4]["bitset_us"] * 3)
+
+
+@unittest.skipUnless(hasattr(security, "jwt"), "需要PyJWT")
+class TestTokenCache(unittest.TestCase):
+    """测试已验证令牌缓存"""
+
+    def setUp(self):
+        self.auth = AuthManager(jwt_secret="secret")
+
+    def test_cached_and_revoked(self):
+        """测试令牌验证后进入缓存，吊销后立即失效"""
+        token = self.auth.create_jwt_token("u1")
+        self.assertEqual(self.auth.verify_jwt_token(token)["sub"], "u1")
+        self.assertEqual(self.auth.token_cache.get_stats()["size"], 1)
+        self.assertEqual(self.auth.verify_jwt_token(token)["sub"], "u1")
+        self.assertEqual(self.auth.token_cache.hits, 1)
+
+        self.assertTrue(self.auth.revoke_token(token))
+        self.assertIsNone(self.auth.verify_jwt_token(token))
+
+    def test_invalid_token_not_cached(self):
+        """测试验证失败的令牌不进入缓存"""
+        self.assertIsNone(self.auth.verify_jwt_token("not-a-token"))
+        self.assertEqual(self.auth.token_cache.get_stats()["size"], 0)
+
+
+class ReferenceActivity:
+    """逐条记录操作、每次重新统计的参考实现"""
+
+    def __init__(self, risk_levels):
+        self.risk_levels = risk_levels
+        self.operations = {}
+
+    def check(self, key, operation, now):
+        operations = self.operations.setdefault(key, [])
+        operations.append((operation, now))
+        operations[:] = [op for op in operations if op[1] >= now - 1800]
+        high = sum(self.risk_levels.get(op, SecurityLevel.LOW) in (SecurityLevel.HIGH, SecurityLevel.CRITICAL)
+                   for op, _ in operations)
+        counts = {}
+        for op, _ in operations:
+            counts[op] = counts.get(op, 0) + 1
+        return high >= 5 or len(operations) >= 50 or any(c >= 20 for c in counts.values())
+
+
+class TestActivityTracker(unittest.TestCase):
+    """测试可疑活动计数器"""
+
+    def setUp(self):
+        self.guard = TradingAPIGuard(None, None, AccessControl())
+        self.reference = ReferenceActivity(self.guard.operation_risk_levels)
+
+    def detect(self, user_id, operation, now):
+        key = f"{user_id}:1.1.1.1"
+        risk = self.guard.operation_risk_levels.get(operation, SecurityLevel.LOW)
+        total, high, repeated = self.guard.suspicious_activity.record(
+            key, operation, risk in (SecurityLevel.HIGH, SecurityLevel.CRITICAL), now=now)
+        return high >= 5 or total >= 50 or repeated > 0
+
+    def test_matches_reference_on_minute_boundaries(self):
+        """测试操作时间落在整分钟时检测结果与参考实现完全一致"""
+        rng = random.Random(5)
+        operations = list(self.guard.operation_risk_levels)
+        now = 6000000
+        for _ in range(3000):
+            now += 60 * rng.choice([0, 0, 0, 1, 1, 2, 5, 40])
+            user_id = f"u{rng.randrange(3)}"
+            operation = rng.choice(operations)
+            self.assertEqual(self.detect(user_id, operation, now),
+                             self.reference.check(f"{user_id}:1.1.1.1", operation, now))
+
+    def test_never_misses_reference_detection(self):
+        """测试任意时间下，参考实现检测到的可疑活动都能检测到"""
+        rng = random.Random(6)
+        operations = list(self.guard.operation_risk_levels)
+        now = 6000000
+        for _ in range(3000):
+            now += rng.randint(0, 90)
+            operation = rng.choice(operations)
+            if self.reference.check("u:1.1.1.1", operation, now):
+                self.assertTrue(self.detect("u", operation, now))
+            else:
+                self.detect("u", operation, now)
+
+    def test_guard_uses_tracker(self):
+        """测试同一操作重复20次后被判定为可疑"""
+        results = [self.guard._check_suspicious_activity("u1", "1.1.1.1", "cancel_order")
+                   for _ in range(20)]
+        self.assertEqual(results, [False] * 19 + [True])
+        self.assertFalse(self.guard._check_suspicious_activity("u1", "2.2.2.2", "cancel_order"))
+
+    def test_clock_step_back_keeps_counts(self):
+        """测试时钟回拨时计入当前桶，之后前进不会清掉仍在窗口内的计数"""
+        tracker = ActivityTracker(window=1800, bucket_seconds=60)
+        now = 6000000
+        for _ in range(10):
+            tracker.record("k", "op", now=now)
+        self.assertEqual(tracker.record("k", "op", now=now - 600)[0], 11)
+        self.assertEqual(tracker.record("k", "op", now=now + 60)[0], 12)
+
+    def test_idle_keys_evicted(self):
+        """测试整个窗口没有活动的键被淘汰，键数不超过容量"""
+        tracker = ActivityTracker(max_keys=40, stripes=4)
+        for i in range(100):
+            tracker.record(f"k{i}", "op", now=0)
+        self.assertLessEqual(len(tracker), 40)
+        tracker2 = ActivityTracker(stripes=1)
+        for i in range(10):
+            tracker2.record(f"k{i}", "op", now=0)
+        tracker2.record("new", "op", now=1900)
+        self.assertEqual(len(tracker2), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
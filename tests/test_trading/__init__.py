@@ -0,0 +1,3 @@
+"""
+交易模块测试包
+"""
@@ -0,0 +1,80 @@
+"""
+异步交易工作流测试模块
+使用本地模拟服务器测试结果格式、提供方并发上限、相同在途请求去重、历史记录上限和吞吐量
+"""
+
+import unittest
+
+from trading.gpt_claude.async_workflow import (
+    AsyncWorkflowEngine, StubProviderServer, benchmark_workflows
+)
+from trading.gpt_claude.communication import (
+    ClaudeCommunicator, CommunicationManager, GptCommunicator
+)
+
+
+class TestAsyncWorkflowEngine(unittest.TestCase):
+    """测试异步工作流引擎"""
+
+    def setUp(self):
+        self.gpt_server = StubProviderServer("gpt", latency=0.1).start()
+        self.claude_server = StubProviderServer("claude", latency=0.1).start()
+        self.addCleanup(self.gpt_server.stop)
+        self.addCleanup(self.claude_server.stop)
+        self.manager = CommunicationManager(
+            GptCommunicator("key", endpoint=self.gpt_server.url),
+            ClaudeCommunicator("key", endpoint=self.claude_server.url),
+            history_size=5,
+        )
+
+    @staticmethod
+    def workflows(n, same=False):
+        return [{"market_data": {"symbol": "BTC/USDT" if same else f"S{i}"}, "config": {}}
+                for i in range(n)]
+
+    def test_results_match_sequential_path(self):
+        """测试结果格式和顺序与同步工作流一致"""
+        items = self.workflows(3)
+        expected = [self.manager.execute_trading_workflow(w["market_data"], w["config"])
+                    for w in items]
+        results = AsyncWorkflowEngine(self.manager).run_sync(items)
+        self.assertEqual([r["status"] for r in results], ["completed"] * 3)
+        for got, want in zip(results, expected):
+            self.assertEqual(got["gpt_decision"], want["gpt_decision"])
+            self.assertEqual(got["claude_execution"], want["claude_execution"])
+        self.assertEqual(len({r["workflow_id"] for r in results}), 3)
+
+    def test_concurrency_limit_and_history(self):
+        """测试每个提供方的并发数不超过上限，历史记录只保留最近几条"""
+        engine = AsyncWorkflowEngine(self.manager, gpt_concurrency=2, claude_concurrency=3)
+        results = self.manager.execute_trading_workflows(self.workflows(8), engine=engine)
+        self.assertEqual(len(results), 8)
+        self.assertLessEqual(self.gpt_server.max_active, 2)
+        self.assertLessEqual(self.claude_server.max_active, 3)
+        self.assertEqual(engine.get_stats()["requests"], {"gpt": 8, "claude": 8})
+        self.assertEqual(len(self.manager.conversation_history), 5)
+
+    def test_identical_requests_deduplicated(self):
+        """测试相同的在途请求只发送一次"""
+        engine = AsyncWorkflowEngine(self.manager)
+        results = engine.run_sync(self.workflows(4, same=True))
+        self.assertEqual([r["status"] for r in results], ["completed"] * 4)
+        self.assertEqual(self.gpt_server.requests, 1)
+        self.assertEqual(self.claude_server.requests, 1)
+        self.assertEqual(engine.get_stats()["deduplicated"], 6)
+
+    def test_connection_error(self):
+        """测试提供方不可用时工作流失败而不抛出异常"""
+        self.manager.claude.endpoint = "http://127.0.0.1:9/"
+        results = AsyncWorkflowEngine(self.manager).run_sync(self.workflows(2))
+        self.assertEqual([r["status"] for r in results], ["failed"] * 2)
+
+    def test_throughput(self):
+        """测试流水线执行的每分钟工作流数明显高于顺序执行"""
+        result = benchmark_workflows(n_workflows=8, latency=0.1, concurrency=4)
+        self.assertEqual(result["completed"], 8)
+        self.assertGreater(result["speedup"], 2.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
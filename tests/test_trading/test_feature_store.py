@@ -0,0 +1,106 @@
+"""
+特征存储测试模块
+测试列式特征存储的追加、原地更新、失效与压缩、列扩展和重新打开
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from trading.optimization.feature_store import FeatureStore, performance_signature
+
+
+class TestFeatureStore(unittest.TestCase):
+    """测试特征存储"""
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+    def test_append_and_load_views(self):
+        """测试追加的行可以读取，没有失效行时返回内存映射视图"""
+        store = FeatureStore(self.path)
+        store.put("s1", 1, 11, {"param_a": 1, "market": "BTC"}, {"sharpe_ratio": 0.5})
+        store.put("s1", 2, 12, {"param_a": 2}, {"sharpe_ratio": 0.7})
+        store.put("s2", 1, 21, {"param_b": 3.5}, {"sharpe_ratio": 1.1})
+        self.assertEqual(store.flush(), 3)
+
+        features, metrics = store.load()
+        self.assertIsInstance(metrics["sharpe_ratio"], np.memmap)
+        self.assertNotIn("market", features)
+        np.testing.assert_array_equal(features["version"], [1, 2, 1])
+        self.assertEqual(list(features["strategy_id"]), ["s1", "s1", "s2"])
+        np.testing.assert_array_equal(features["param_a"], [1, 2, np.nan])
+        np.testing.assert_array_equal(metrics["sharpe_ratio"], [0.5, 0.7, 1.1])
+
+        # 按策略读取时不返回该策略全部缺失的特征
+        features, metrics = store.load("s1")
+        self.assertNotIn("param_b", features)
+        np.testing.assert_array_equal(metrics["sharpe_ratio"], [0.5, 0.7])
+
+    def test_update_retain_and_reopen(self):
+        """测试原地更新和失效标记，重新打开后数据一致"""
+        store = FeatureStore(self.path)
+        for version in range(1, 5):
+            store.put("s1", version, version, {"param_a": version}, {"sharpe_ratio": version / 10})
+        store.flush()
+
+        store.put("s1", 2, 99, {"param_a": 20, "param_new": 1}, {"sharpe_ratio": 2.0})
+        store.retain("s1", [2, 3, 4])
+        store.flush()
+
+        reopened = FeatureStore(self.path)
+        self.assertEqual(reopened.signature("s1", 2), 99)
+        self.assertIsNone(reopened.signature("s1", 1))
+        self.assertEqual(len(reopened), 3)
+        features, metrics = reopened.load()
+        np.testing.assert_array_equal(features["version"], [2, 3, 4])
+        np.testing.assert_array_equal(features["param_a"], [20, 3, 4])
+        np.testing.assert_array_equal(features["param_new"], [1, np.nan, np.nan])
+        np.testing.assert_array_equal(metrics["sharpe_ratio"], [2.0, 0.3, 0.4])
+
+    def test_compaction(self):
+        """测试失效行超过一半时压缩列文件"""
+        store = FeatureStore(self.path)
+        for version in range(100):
+            store.put("s1", version, version, {"param_a": version}, {"sharpe_ratio": 0.0})
+        store.flush()
+        store.retain("s1", range(90, 100))
+        store.flush()
+
+        self.assertEqual(store._rows, 10)
+        self.assertEqual(os.path.getsize(os.path.join(self.path, "feature.param_a.bin")), 80)
+        features, _ = FeatureStore(self.path).load("s1")
+        np.testing.assert_array_equal(features["param_a"], np.arange(90, 100))
+
+    def test_discards_interrupted_append(self):
+        """测试写入中断留下的多余数据在下次追加时被丢弃"""
+        store = FeatureStore(self.path)
+        store.put("s1", 1, 1, {"param_a": 1}, {"sharpe_ratio": 0.1})
+        store.flush()
+        with open(os.path.join(self.path, "metric.sharpe_ratio.bin"), "ab") as f:
+            f.write(np.zeros(3).tobytes())
+
+        store = FeatureStore(self.path)
+        store.put("s1", 2, 2, {"param_a": 2}, {"sharpe_ratio": 0.2})
+        store.flush()
+        _, metrics = store.load()
+        np.testing.assert_array_equal(metrics["sharpe_ratio"], [0.1, 0.2])
+
+    def test_performance_signature(self):
+        """测试性能数据签名只随交易数、权益曲线长度和最终权益变化"""
+        performance = {"trades": [{}] * 3, "equity_curve": [{"equity": 1.0}, {"equity": 2.0}]}
+        same = {"trades": [{"profit": 1}] * 3, "equity_curve": [{"equity": 5.0}, {"equity": 2.0}]}
+        self.assertEqual(performance_signature(performance), performance_signature(same))
+        self.assertNotEqual(
+            performance_signature(performance),
+            performance_signature(dict(performance, equity_curve=[{"equity": 3.0}])),
+        )
+        self.assertGreaterEqual(performance_signature({}), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,177 @@
+"""
+反馈存储测试模块
+测试批量写入、按ID和按策略时间范围查询、更新、持久化、JSON目录迁移以及反馈收集器使用存储
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from trading.gpt_claude.feedback_store import FeedbackStore, migrate_json_feedback
+from trading.gpt_claude.feedback_system import FeedbackCollector
+
+
+def make_entry(i, strategies=("s1",), timestamp=None):
+    return {
+        "feedback_id": f"fb-{i}",
+        "timestamp": float(i) if timestamp is None else timestamp,
+        "execution_result": {"strategies_executed": list(strategies)},
+        "strategy_ids": list(strategies),
+    }
+
+
+class TestFeedbackStore(unittest.TestCase):
+    """测试反馈存储"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.db_path = os.path.join(self.directory.name, "feedback.db")
+
+    def open(self, **kwargs):
+        store = FeedbackStore(self.db_path, **kwargs)
+        self.addCleanup(store.close)
+        return store
+
+    def test_batched_writes(self):
+        """测试写入先缓冲，达到批量大小时一次写入"""
+        store = self.open(batch_size=10, flush_interval=60)
+        for i in range(9):
+            store.put(make_entry(i))
+        self.assertEqual(store.get("fb-3")["timestamp"], 3.0)
+        reader = FeedbackStore(self.db_path)
+        self.addCleanup(reader.close)
+        self.assertIsNone(reader.get("fb-3"))
+        store.put(make_entry(9))
+        self.assertEqual(reader.get("fb-3")["timestamp"], 3.0)
+
+    def test_timed_flush(self):
+        """测试没有后续写入时，缓冲数据在flush_interval后由定时器写入"""
+        store = self.open(batch_size=100, flush_interval=0.1)
+        for i in range(5):
+            store.put(make_entry(i))
+        reader = self.open()
+        self.assertIsNone(reader.get("fb-0"))
+        time.sleep(0.4)
+        self.assertEqual(len(reader), 5)
+
+    def test_flush_on_exit(self):
+        """测试进程退出前没有调用close时缓冲数据仍被写入"""
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        script = (
+            "from trading.gpt_claude.feedback_store import FeedbackStore\n"
+            f"store = FeedbackStore({self.db_path!r}, batch_size=100, flush_interval=60)\n"
+            "for i in range(5):\n"
+            "    store.put({'feedback_id': f'fb-{i}', 'timestamp': float(i)})\n"
+        )
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")])))
+        subprocess.run([sys.executable, "-c", script], check=True, env=env, timeout=60)
+        self.assertEqual(len(self.open()), 5)
+
+    def test_strategy_time_range(self):
+        """测试按策略和时间范围查询，结果按时间排序并限制条数"""
+        store = self.open()
+        for i in range(100):
+            store.put(make_entry(i, ("s1",) if i % 2 else ("s1", "s2")))
+        newest = store.query("s1", limit=3)
+        self.assertEqual([e["feedback_id"] for e in newest], ["fb-99", "fb-98", "fb-97"])
+        window = store.query("s2", since=10, until=20, newest_first=False)
+        self.assertEqual([e["timestamp"] for e in window], [10.0, 12.0, 14.0, 16.0, 18.0])
+        self.assertEqual(store.query("missing"), [])
+
+    def test_queries_use_indexes(self):
+        """测试按ID和按策略时间范围查询走索引而不是全表扫描"""
+        store = self.open()
+        plans = [
+            " ".join(row[-1] for row in store._conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+            for sql, params in (
+                ("SELECT data FROM feedback WHERE feedback_id = ?", ("fb-1",)),
+                ("SELECT feedback_id FROM feedback_strategy WHERE strategy_id = ? "
+                 "AND timestamp >= ? AND timestamp < ? ORDER BY timestamp DESC", ("s1", 0, 10)),
+            )
+        ]
+        for plan in plans:
+            self.assertIn("USING", plan)
+            self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_update_and_persistence(self):
+        """测试更新反馈时同步更新策略索引，重新打开后数据仍在"""
+        store = self.open()
+        store.put(make_entry(1, ("s1",)))
+        store.flush()
+        entry = store.get("fb-1")
+        entry["strategy_ids"] = ["s2"]
+        entry["performance_data"] = {"quality_score": 80}
+        store.put(entry)
+        store.close()
+
+        reopened = self.open()
+        self.assertEqual(len(reopened), 1)
+        self.assertEqual(reopened.query("s1"), [])
+        self.assertEqual(reopened.query("s2")[0]["performance_data"], {"quality_score": 80})
+
+    def test_import_json_dir(self):
+        """测试从JSON文件目录导入，跳过损坏的文件，重复导入不覆盖已有数据"""
+        for i in range(5):
+            with open(os.path.join(self.directory.name, f"fb-{i}.json"), "w", encoding="utf-8") as f:
+                json.dump(make_entry(i, ("s1", "s2")), f, indent=2)
+        with open(os.path.join(self.directory.name, "fb-broken.json"), "w") as f:
+            f.write("{")
+
+        store = self.open()
+        updated = make_entry(0)
+        updated["performance_data"] = {"quality_score": 90}
+        store.put(updated)
+
+        self.assertEqual(store.import_json_dir(self.directory.name, batch_size=2), 4)
+        self.assertEqual(store.import_json_dir(self.directory.name), 0)
+        self.assertEqual(len(store), 5)
+        self.assertEqual(store.get("fb-0")["performance_data"], {"quality_score": 90})
+        self.assertEqual(len(store.query("s2")), 4)
+        store.close()
+
+        self.assertEqual(migrate_json_feedback(self.directory.name), 0)
+
+
+class TestFeedbackCollector(unittest.TestCase):
+    """测试反馈收集器使用反馈存储"""
+
+    def test_round_trip(self):
+        """测试添加执行反馈和性能反馈后按策略查询"""
+        with tempfile.TemporaryDirectory() as directory:
+            collector = FeedbackCollector(storage_path=directory)
+            ids = [
+                collector.add_execution_feedback(
+                    {"strategies_executed": [{"id": "trend"}, "mean_reversion"]}, {"close": i}
+                )
+                for i in range(3)
+            ]
+            collector.add_performance_feedback(ids[1], {"quality_score": 75})
+            collector.add_performance_feedback("fb-missing", {})
+
+            self.assertEqual(len(set(ids)), 3)
+            self.assertEqual(collector.get_feedback(ids[1])["performance_data"], {"quality_score": 75})
+            self.assertIsNone(collector.get_feedback("fb-missing"))
+            recent = collector.get_strategy_feedback("trend", limit=2)
+            self.assertEqual([fb["feedback_id"] for fb in recent], ids[:0:-1])
+            self.assertEqual(len(collector.get_strategy_feedback("mean_reversion", since=0)), 3)
+            collector.close()
+            self.assertTrue(collector.store._closed)
+
+    def test_close_keeps_shared_store_open(self):
+        """测试外部传入的存储在收集器关闭时只写入不关闭"""
+        store = FeedbackStore(":memory:", flush_interval=60)
+        self.addCleanup(store.close)
+        with FeedbackCollector(store=store) as collector:
+            collector.add_execution_feedback({"strategies_executed": ["trend"]}, {})
+        self.assertFalse(store._closed)
+        self.assertEqual(len(store._pending), 0)
+        self.assertEqual(len(store), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+"""
+滚动统计测试模块
+测试增量维护的窗口统计与直接计算一致、时间过滤、批量向量化统计，以及反馈分析器使用滚动统计
+"""
+
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+from trading.gpt_claude.feedback_system import FeedbackAnalyzer, FeedbackCollector
+from trading.gpt_claude.rolling_stats import RollingStatsEngine
+
+
+def feed(engine, strategy_id, values, start=0.0):
+    for i, value in enumerate(values):
+        engine.update(strategy_id, start + i,
+                      {"quality_score": value, "success_rate": value / 100, "execution_time": 1.0},
+                      errors=["timeout"] if i % 10 == 0 else ())
+
+
+class TestRollingStatsEngine(unittest.TestCase):
+    """测试滚动统计引擎"""
+
+    def test_matches_direct_computation(self):
+        """测试窗口滑动后的均值、极值、EWMA和斜率与直接计算一致"""
+        rng = np.random.default_rng(0)
+        values = rng.normal(60, 15, 257) + np.arange(257) * 0.2
+        engine = RollingStatsEngine(window=50, alpha=0.3)
+        feed(engine, "s1", values)
+
+        window = values[-50:]
+        quality = engine.stats("s1")["metrics"]["quality_score"]
+        self.assertAlmostEqual(quality["mean"], window.mean(), places=9)
+        self.assertEqual(quality["min"], window.min())
+        self.assertEqual(quality["max"], window.max())
+        self.assertAlmostEqual(quality["slope"], np.polyfit(np.arange(50), window, 1)[0], places=9)
+
+        ewma = values[0]
+        for value in values[1:]:
+            ewma = 0.3 * value + 0.7 * ewma
+        self.assertAlmostEqual(quality["ewma"], ewma, places=9)
+
+    def test_partial_window_and_since(self):
+        """测试窗口未满时的统计，以及只统计某时间之后的反馈"""
+        engine = RollingStatsEngine(window=10)
+        self.assertEqual(engine.stats("missing")["count"], 0)
+        feed(engine, "s1", [10.0])
+        self.assertIsNone(engine.stats("s1")["metrics"]["quality_score"]["slope"])
+        feed(engine, "s1", [20.0, 30.0, 40.0, 50.0], start=1)
+
+        stats = engine.stats("s1", since=2)
+        self.assertEqual(stats["count"], 3)
+        self.assertAlmostEqual(stats["metrics"]["quality_score"]["mean"], 40.0)
+        self.assertAlmostEqual(stats["metrics"]["quality_score"]["slope"], 10.0)
+        self.assertEqual(stats["metrics"]["quality_score"]["min"], 30.0)
+        self.assertEqual(engine.stats("s1", since=100)["count"], 0)
+
+    def test_error_counts_follow_window(self):
+        """测试错误计数随反馈移出窗口而减少"""
+        engine = RollingStatsEngine(window=10)
+        feed(engine, "s1", [1.0] * 25)
+        self.assertEqual(engine.stats("s1")["errors"], {"timeout": 1})
+        self.assertEqual(engine.stats("s1", since=19)["errors"], {"timeout": 1})
+        self.assertEqual(engine.stats("s1", since=21)["errors"], {})
+
+    def test_summary_matches_stats(self):
+        """测试批量统计与逐个策略统计一致，容量不足时自动扩容"""
+        rng = np.random.default_rng(1)
+        engine = RollingStatsEngine(window=20, capacity=2)
+        for k in range(30):
+            feed(engine, f"s{k}", rng.uniform(0, 100, rng.integers(1, 45)))
+
+        summary = engine.summary()
+        self.assertEqual(len(summary), 30)
+        for strategy_id, batch in summary.items():
+            single = engine.stats(strategy_id)
+            self.assertEqual(batch["count"], single["count"])
+            self.assertEqual(batch["errors"], single["errors"])
+            for name, metric in single["metrics"].items():
+                for key, value in metric.items():
+                    if value is None:
+                        self.assertIsNone(batch["metrics"][name][key])
+                    else:
+                        self.assertAlmostEqual(batch["metrics"][name][key], value, places=9)
+
+
+class TestFeedbackAnalyzer(unittest.TestCase):
+    """测试反馈分析器使用滚动统计"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.collector = FeedbackCollector(storage_path=directory.name)
+        self.addCleanup(self.collector.store.close)
+
+    def add(self, strategy_id, quality, warnings=()):
+        feedback_id = self.collector.add_execution_feedback(
+            {"strategies_executed": [strategy_id], "warnings": list(warnings)}, {}
+        )
+        self.collector.add_performance_feedback(
+            feedback_id, {"quality_score": quality, "success_rate": 0.9, "execution_time": 2.0}
+        )
+        return feedback_id
+
+    def test_incremental_analysis(self):
+        """测试反馈到达时更新统计，趋势按时间先后计算"""
+        analyzer = FeedbackAnalyzer(self.collector)
+        for i in range(10):
+            self.add("trend", 50 + i * 2, warnings=["滑点过大"] if i < 4 else ())
+        analysis = analyzer.analyze_strategy_performance("trend")
+
+        self.assertEqual(analysis["execution_count"], 10)
+        self.assertEqual(analysis["performance_stats"]["avg_quality_score"], 59.0)
+        self.assertEqual(analysis["performance_stats"]["max_quality_score"], 68.0)
+        self.assertEqual(analysis["trend"], "strongly_improving")
+        self.assertIn("频繁出现错误 (4次): 滑点过大，建议重点解决此问题",
+                      [s["suggestion"] for s in analysis["improvement_suggestions"]])
+
+        # 更新已有反馈的性能数据不重复计入
+        feedback_id = self.add("trend", 40)
+        self.collector.add_performance_feedback(feedback_id, {"quality_score": 40})
+        self.assertEqual(analyzer.analyze_strategy_performance("trend")["execution_count"], 11)
+
+    def test_loads_history_and_batch(self):
+        """测试新的分析器从存储加载历史，批量分析所有策略"""
+        for i in range(6):
+            self.add("a", 90 - i * 5)
+            self.add("b", 85)
+        self.collector.add_execution_feedback({"strategies_executed": ["c"]}, {})
+
+        analyzer = FeedbackAnalyzer(self.collector)
+        results = analyzer.analyze_all_strategies(["a", "b", "c", "d"])
+        self.assertEqual(results["a"]["trend"], "strongly_declining")
+        self.assertEqual(results["b"]["trend"], "stable")
+        self.assertEqual(results["a"]["execution_count"], 6)
+        self.assertEqual(results["c"]["status"], "no_recent_data")
+        self.assertEqual(results["d"]["status"], "no_data")
+        self.assertEqual(results["b"], {**analyzer.analyze_strategy_performance("b"),
+                                        "timestamp": results["b"]["timestamp"]})
+
+        learning = analyzer.generate_learning_feedback("a")
+        self.assertEqual(learning["performance_summary"]["trend"], "strongly_declining")
+
+    def test_lookback_window(self):
+        """测试只统计回溯天数内的反馈"""
+        analyzer = FeedbackAnalyzer(self.collector)
+        old = self.collector.store.get(self.add("s", 10))
+        old["timestamp"] = time.time() - 30 * 86400
+        self.collector.store.put(old)
+        analyzer = FeedbackAnalyzer(self.collector)
+        self.add("s", 80)
+        self.add("s", 90)
+        analysis = analyzer.analyze_strategy_performance("s", lookback_days=7)
+        self.assertEqual(analysis["execution_count"], 2)
+        self.assertEqual(analysis["performance_stats"]["avg_quality_score"], 85.0)
+        self.assertEqual(analyzer.analyze_strategy_performance("s", lookback_days=60)["execution_count"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
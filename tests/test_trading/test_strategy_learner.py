@@ -0,0 +1,244 @@
+"""
+策略学习器测试模块
+测试进化过程中预测模型的缓存、种群批量预测、适应度缓存和进程池并行评估，
+以及训练数据的特征存储和学习器状态的增量保存
+"""
+
+import json
+import os
+import pickle
+import random
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from trading.optimization import strategy_learner as sl
+
+
+def period_fitness(strategy):
+    """适应度函数：fast_period越接近12越好(需为模块级函数以便在进程池中执行)"""
+    return -abs(strategy["parameters"]["fast_period"] - 12)
+
+
+def make_performance(seed):
+    rng = random.Random(seed)
+    equity, curve = 1000.0, []
+    for _ in range(60):
+        equity *= 1 + rng.gauss(0.0005, 0.01)
+        curve.append({"equity": equity})
+    trades = [{"profit": rng.gauss(1, 10)} for _ in range(20)]
+    return {"trades": trades, "equity_curve": curve}
+
+
+def make_strategy(i):
+    return {
+        "market": "BTC/USDT",
+        "timeframe": "1h",
+        "parameters": {"fast_period": 10 + i, "rsi_threshold": 70.0 - i, "stop_loss": 0.02 + 0.001 * i},
+        "entry_conditions": [{"indicator": "ema"}, {"indicator": "rsi"}],
+        "exit_conditions": [{"indicator": "atr"}],
+    }
+
+
+class TestEvolveStrategy(unittest.TestCase):
+    """测试策略进化"""
+
+    def setUp(self):
+        self.storage_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.storage_path)
+        sl.LEARNER_STATUS["models"] = {}
+        sl.initialize_learner({
+            "storage_path": self.storage_path,
+            "max_history_versions": 10,
+            "metrics": sl.DEFAULT_METRICS,
+            "primary_metric": "sharpe_ratio",
+            "evolution_params": dict(sl.DEFAULT_EVOLUTION_PARAMS),
+            "use_ml_models": True,
+            "backtest_lookback_days": 365,
+        })
+        sl.LEARNER_STATUS["strategy_history"] = {"s1": {"versions": [
+            {"version": i, "strategy": make_strategy(i), "performance": make_performance(i)}
+            for i in range(1, 8)
+        ]}}
+        self.params = {"population_size": 12, "generations": 4, "mutation_rate": 0.3, "crossover_rate": 0.7}
+
+    def test_model_reused_until_new_performance(self):
+        """测试训练数据不变时复用模型，有新的性能数据时重新训练"""
+        random.seed(1)
+        result = sl.evolve_strategy("s1", self.params)
+        self.assertEqual(result["status"], "success")
+        model = sl.LEARNER_STATUS["models"]["s1_sharpe_ratio"]["model"]
+        self.assertLessEqual(result["evaluation"]["evaluations"], 12 * 4)
+
+        # 进化出的新版本还没有性能数据，训练数据不变
+        sl.evolve_strategy("s1", self.params)
+        self.assertIs(sl.LEARNER_STATUS["models"]["s1_sharpe_ratio"]["model"], model)
+
+        versions = sl.LEARNER_STATUS["strategy_history"]["s1"]["versions"]
+        max(versions, key=lambda v: v["version"])["performance"] = make_performance(99)
+        sl.evolve_strategy("s1", self.params)
+        self.assertIsNot(sl.LEARNER_STATUS["models"]["s1_sharpe_ratio"]["model"], model)
+
+    def test_batch_prediction_matches_single(self):
+        """测试整个种群一次预测与逐个预测的结果一致"""
+        model_info = sl._train_prediction_model("s1", "sharpe_ratio")
+        population = [make_strategy(i) for i in range(10)]
+        batch = sl._predict_population(model_info, population)
+        single = [sl._predict_population(model_info, [s])[0] for s in population]
+        self.assertEqual(batch, single)
+
+    def test_fitness_cached_by_parameters(self):
+        """测试相同参数只评估一次"""
+        calls = []
+
+        def fitness(strategy):
+            calls.append(strategy)
+            return strategy["parameters"]["fast_period"]
+
+        cache = {}
+        population = [make_strategy(1), make_strategy(2), make_strategy(1)]
+        self.assertEqual(sl._score_population(population, cache, fitness_function=fitness), [11, 12, 11])
+        self.assertEqual(len(calls), 2)
+        sl._score_population([make_strategy(2), make_strategy(3)], cache, fitness_function=fitness)
+        self.assertEqual(len(calls), 3)
+
+    def test_process_pool_matches_serial(self):
+        """测试进程池并行评估与串行评估的进化结果一致"""
+        results = []
+        for n_jobs in (1, 2):
+            random.seed(7)
+            sl.LEARNER_STATUS["strategy_history"]["s1"]["versions"] = [
+                {"version": i, "strategy": make_strategy(i)} for i in range(1, 8)
+            ]
+            results.append(sl.evolve_strategy(
+                "s1", dict(self.params, fitness_function=period_fitness, n_jobs=n_jobs)
+            ))
+        self.assertEqual(results[0]["improvements"], results[1]["improvements"])
+        self.assertEqual(results[1]["improvements"]["estimated_score"], 0)
+
+    def test_unpicklable_fitness_runs_serially(self):
+        """测试不能被pickle的适应度函数在n_jobs>1时退回串行评估"""
+        sl.LEARNER_STATUS["strategy_history"]["s1"]["versions"] = [
+            {"version": i, "strategy": make_strategy(i)} for i in range(1, 8)
+        ]
+        fitness = lambda strategy: -abs(strategy["parameters"]["fast_period"] - 12)
+        with mock.patch.object(sl, "ProcessPoolExecutor") as pool, \
+                self.assertLogs(sl.logger, "WARNING"):
+            result = sl.evolve_strategy(
+                "s1", dict(self.params, fitness_function=fitness, n_jobs=4)
+            )
+        pool.assert_not_called()
+        self.assertEqual(result["improvements"]["estimated_score"], 0)
+
+    def test_historical_scores_without_model(self):
+        """测试没有模型时按历史版本的指标评分"""
+        sl.LEARNER_STATUS["config"]["use_ml_models"] = False
+        history = sl.LEARNER_STATUS["strategy_history"]["s1"]
+        scores = sl._historical_scores(history)
+        expected = sl._calculate_performance_metrics(history["versions"][2]["performance"])["sharpe_ratio"]
+        self.assertEqual(scores[sl._parameter_key(make_strategy(3))], expected)
+
+        random.seed(3)
+        result = sl.evolve_strategy("s1", self.params)
+        self.assertEqual(result["improvements"]["estimated_score"], max(scores.values()))
+
+
+class TestLearnerStorage(unittest.TestCase):
+    """测试训练数据的特征存储和状态的增量保存"""
+
+    def setUp(self):
+        self.storage_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.storage_path)
+        self.config = {
+            "storage_path": self.storage_path,
+            "max_history_versions": 10,
+            "metrics": sl.DEFAULT_METRICS,
+            "primary_metric": "sharpe_ratio",
+            "evolution_params": dict(sl.DEFAULT_EVOLUTION_PARAMS),
+            "use_ml_models": True,
+            "backtest_lookback_days": 365,
+        }
+        sl.LEARNER_STATUS["models"] = {}
+        sl.LEARNER_STATUS["strategy_history"] = {}
+        sl.initialize_learner(self.config)
+        sl.LEARNER_STATUS["strategy_history"] = {"s1": {"versions": [
+            {"version": i, "strategy": make_strategy(i), "performance": make_performance(i)}
+            for i in range(1, 8)
+        ]}}
+
+    def count_metric_calls(self):
+        return mock.patch.object(
+            sl, "_calculate_performance_metrics", wraps=sl._calculate_performance_metrics
+        )
+
+    def test_features_computed_once_per_version(self):
+        """测试每个版本的指标只计算一次，重启后从磁盘读取"""
+        with self.count_metric_calls() as calls:
+            features_df, metrics_df = sl._prepare_training_data()
+            self.assertEqual(calls.call_count, 7)
+            sl._prepare_training_data()
+            self.assertEqual(calls.call_count, 7)
+
+        self.assertEqual(list(features_df["version"]), list(range(1, 8)))
+        expected = sl._calculate_performance_metrics(make_performance(3))["sharpe_ratio"]
+        self.assertAlmostEqual(metrics_df["sharpe_ratio"][2], expected)
+
+        history = sl.LEARNER_STATUS["strategy_history"]
+        sl.initialize_learner(self.config)
+        sl.LEARNER_STATUS["strategy_history"] = history
+        versions = history["s1"]["versions"]
+        versions[0]["performance"] = make_performance(50)
+        del versions[1]
+        with self.count_metric_calls() as calls:
+            features_df, metrics_df = sl._prepare_training_data()
+            self.assertEqual(calls.call_count, 1)
+
+        self.assertEqual(list(features_df["version"]), [1, 3, 4, 5, 6, 7])
+        expected = sl._calculate_performance_metrics(make_performance(50))["sharpe_ratio"]
+        self.assertAlmostEqual(metrics_df["sharpe_ratio"][0], expected)
+
+    def test_state_saved_per_strategy_and_model(self):
+        """测试状态按策略和模型分别保存，只重写有变化的文件"""
+        sl.LEARNER_STATUS["strategy_history"]["s2"] = {"versions": [{"version": 1, "strategy": make_strategy(1)}]}
+        sl._save_learner_state()
+        s2_path = os.path.join(self.storage_path, "history", "s2.json")
+        s2_mtime = os.path.getmtime(s2_path)
+
+        random.seed(5)
+        result = sl.evolve_strategy("s1", {"population_size": 8, "generations": 2})
+        self.assertEqual(os.path.getmtime(s2_path), s2_mtime)
+        self.assertTrue(os.path.exists(os.path.join(self.storage_path, "models", "s1_sharpe_ratio.pkl")))
+
+        history = sl.LEARNER_STATUS["strategy_history"]
+        sl.LEARNER_STATUS["models"] = {}
+        sl.initialize_learner(self.config)
+        self.assertEqual(sl.LEARNER_STATUS["strategy_history"], json.loads(json.dumps(history)))
+        self.assertEqual(
+            max(v["version"] for v in sl.LEARNER_STATUS["strategy_history"]["s1"]["versions"]),
+            result["new_version"],
+        )
+        self.assertIn("s1_sharpe_ratio", sl.LEARNER_STATUS["models"])
+
+    def test_migrates_single_file_state(self):
+        """测试旧版本的单文件状态被转存为分开的文件"""
+        legacy_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, legacy_path)
+        with open(os.path.join(legacy_path, "strategy_history.json"), "w") as f:
+            json.dump({"a/b": {"versions": [{"version": 1, "strategy": make_strategy(1)}]}}, f)
+        with open(os.path.join(legacy_path, "models.pkl"), "wb") as f:
+            pickle.dump({"global_sharpe_ratio": {"feature_columns": []}}, f)
+
+        sl.LEARNER_STATUS["models"] = {}
+        sl.initialize_learner(dict(self.config, storage_path=legacy_path))
+        self.assertTrue(os.path.exists(os.path.join(legacy_path, "history", "a%2Fb.json")))
+
+        sl.LEARNER_STATUS["models"] = {}
+        sl.LEARNER_STATUS["strategy_history"] = {}
+        sl.initialize_learner(dict(self.config, storage_path=legacy_path))
+        self.assertIn("a/b", sl.LEARNER_STATUS["strategy_history"])
+        self.assertIn("global_sharpe_ratio", sl.LEARNER_STATUS["models"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,3 @@
+"""
+界面模块测试包
+"""
@@ -0,0 +1,170 @@
+"""
+聊天AI回复流水线测试模块
+测试上下文环形缓冲、批量写入、非阻塞提交、文本片段合并推送、取消、有界排队和并发负载
+"""
+
+import threading
+import time
+import unittest
+
+from ui.web.chat_pipeline import (
+    BatchWriter, ChatHistory, ChatJobPipeline, benchmark_chat_pipeline, stub_model
+)
+
+
+class Recorder:
+    """记录流水线回调"""
+
+    def __init__(self):
+        self.tokens = {}
+        self.completed = {}
+        self.errors = {}
+        self.done = threading.Event()
+
+    def on_token(self, job, text):
+        self.tokens.setdefault(job.job_id, []).append(text)
+
+    def on_complete(self, job, text):
+        self.completed[job.job_id] = text
+        self.done.set()
+
+    def on_error(self, job, error):
+        self.errors[job.job_id] = error
+        self.done.set()
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.005)
+    return predicate()
+
+
+class TestChatHistory(unittest.TestCase):
+    """测试上下文缓冲"""
+
+    def test_loads_once_and_keeps_last_messages(self):
+        """测试每个聊天只从数据库加载一次，只保留最近的消息"""
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return [{"role": "user", "content": f"m{i}"} for i in range(12)]
+
+        history = ChatHistory(maxlen=10)
+        self.assertEqual(len(history.context(1, loader)), 10)
+        history.append(1, "assistant", "reply")
+        context = history.context(1, loader)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(context[-1], {"role": "assistant", "content": "reply"})
+        self.assertEqual(context[0]["content"], "m3")
+
+    def test_evicts_least_recently_used(self):
+        """测试超过聊天数上限时淘汰最久未使用的聊天"""
+        history = ChatHistory(max_chats=2)
+        for chat_id in (1, 2):
+            history.context(chat_id, list)
+        history.context(1)
+        history.context(3, list)
+        self.assertEqual(history.loads, 3)
+        history.context(1, list)
+        history.context(2, list)
+        self.assertEqual(history.loads, 4)
+
+
+class TestBatchWriter(unittest.TestCase):
+    """测试批量写入"""
+
+    def test_batches_records(self):
+        """测试多条记录合并为少数几批写入，关闭时写入剩余记录"""
+        batches = []
+        writer = BatchWriter(batches.append, max_batch=20, interval=0.05)
+        for i in range(50):
+            writer.add(i)
+        writer.close()
+        self.assertEqual(sorted(r for batch in batches for r in batch), list(range(50)))
+        self.assertLessEqual(len(batches), 4)
+        self.assertTrue(all(len(batch) <= 20 for batch in batches))
+
+
+class TestChatJobPipeline(unittest.TestCase):
+    """测试AI回复流水线"""
+
+    def setUp(self):
+        self.recorder = Recorder()
+
+    def make_pipeline(self, generate, **kwargs):
+        pipeline = ChatJobPipeline(generate, self.recorder.on_token, self.recorder.on_complete,
+                                   self.recorder.on_error, **kwargs)
+        self.addCleanup(pipeline.close)
+        return pipeline
+
+    def test_submit_does_not_block(self):
+        """测试提交立即返回，文本片段合并推送且拼接后与完整回复一致"""
+        pipeline = self.make_pipeline(stub_model(latency=0.3, n_tokens=30), token_interval=0.05)
+        start = time.perf_counter()
+        job = pipeline.submit("c1", "hi", [])
+        self.assertLess(time.perf_counter() - start, 0.05)
+        self.assertTrue(self.recorder.done.wait(5))
+
+        text = self.recorder.completed[job.job_id]
+        self.assertEqual(text, "".join(f"t{i} " for i in range(30)))
+        self.assertEqual("".join(self.recorder.tokens[job.job_id]), text)
+        self.assertLess(len(self.recorder.tokens[job.job_id]), 15)
+        self.assertEqual(pipeline.get_stats()["completed"], 1)
+
+    def test_plain_string_response(self):
+        """测试生成函数返回字符串"""
+        pipeline = self.make_pipeline(lambda content, context: f"echo {content} {len(context)}")
+        job = pipeline.submit("c1", "hi", [{"role": "user", "content": "hi"}])
+        self.assertTrue(self.recorder.done.wait(5))
+        self.assertEqual(self.recorder.completed[job.job_id], "echo hi 1")
+
+    def test_cancel_running_and_queued(self):
+        """测试离开聊天时取消生成中和排队的回复"""
+        pipeline = self.make_pipeline(stub_model(latency=1.0, n_tokens=50), max_workers=1)
+        running = pipeline.submit("c1", "a", [])
+        queued = pipeline.submit("c1", "b", [])
+        other = pipeline.submit("c2", "c", [])
+        self.assertTrue(wait_until(lambda: running.first_token_at is not None))
+
+        self.assertEqual(pipeline.cancel_chat("c1"), 2)
+        self.assertTrue(wait_until(lambda: other.job_id in self.recorder.completed))
+        self.assertNotIn(running.job_id, self.recorder.completed)
+        self.assertNotIn(queued.job_id, self.recorder.completed)
+        self.assertEqual(running.status, "cancelled")
+        self.assertEqual(queued.status, "cancelled")
+        # 生成中的回复在下一个片段处停止，而不是生成完
+        self.assertLess(running.finished_at - running.submitted_at, 0.5)
+
+    def test_bounded_queue(self):
+        """测试超过并发和排队上限时拒绝新任务"""
+        pipeline = self.make_pipeline(stub_model(latency=0.2, n_tokens=2), max_workers=2, max_pending=3)
+        jobs = [pipeline.submit(i, "x", []) for i in range(7)]
+        self.assertEqual(sum(job is None for job in jobs), 2)
+        self.assertEqual(pipeline.get_stats()["rejected"], 2)
+        self.assertTrue(wait_until(lambda: pipeline.active == 0))
+        self.assertIsNotNone(pipeline.submit(9, "x", []))
+
+    def test_generation_error(self):
+        """测试生成失败时调用错误回调"""
+        def broken(content, context):
+            raise RuntimeError("model unavailable")
+
+        pipeline = self.make_pipeline(broken)
+        job = pipeline.submit("c1", "x", [])
+        self.assertTrue(self.recorder.done.wait(5))
+        self.assertIn(job.job_id, self.recorder.errors)
+        self.assertEqual(pipeline.get_stats()["failed"], 1)
+
+    def test_concurrent_chat_capacity(self):
+        """负载测试：32个聊天同时发送消息，16个并发生成时总耗时远小于逐个处理"""
+        result = benchmark_chat_pipeline(n_chats=32, latency=0.2, n_tokens=10, max_workers=16)
+        self.assertEqual(result["accepted"], 32)
+        self.assertLess(result["submit_time"], 0.1)
+        self.assertLess(result["wall_time"], result["sequential_time"] / 4)
+        self.assertLess(result["db_batches"], 32)
+
+
+if __name__ == "__main__":
+    unittest.main()
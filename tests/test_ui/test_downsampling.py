@@ -0,0 +1,174 @@
+"""
+图表数据降采样测试模块
+测试LTTB与逐点实现一致、最小/最大值抽取保留极值、OHLC聚合、多分辨率金字塔的缩放查询和缓存
+"""
+
+import unittest
+
+import numpy as np
+
+from ui.charts.downsampling import (
+    CandlePyramid, PyramidCache, SeriesPyramid, aggregate_ohlc, downsample_records,
+    lttb_indices, minmax_indices
+)
+
+
+def reference_lttb(x, y, n_out):
+    """逐点的LTTB参考实现"""
+    n = len(x)
+    every = (n - 2) / (n_out - 2)
+    selected = [0]
+    a = 0
+    for i in range(n_out - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_start = end
+        next_end = min(int((i + 2) * every) + 1, n - 1) if i < n_out - 3 else n
+        if i == n_out - 3:
+            avg_x, avg_y = x[-1], y[-1]
+        else:
+            avg_x = sum(x[next_start:next_end]) / (next_end - next_start)
+            avg_y = sum(y[next_start:next_end]) / (next_end - next_start)
+        best, best_area = start, -1.0
+        for j in range(start, min(end, n - 1)):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+
+class TestSeriesDownsampling(unittest.TestCase):
+    """测试折线降采样"""
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.x = np.arange(5000, dtype=float)
+        self.y = np.cumsum(rng.normal(size=5000))
+
+    def test_lttb_matches_reference(self):
+        """测试向量化LTTB与逐点实现选出相同的点"""
+        for n_out in (3, 10, 257):
+            self.assertEqual(lttb_indices(self.x, self.y, n_out).tolist(),
+                             reference_lttb(self.x.tolist(), self.y.tolist(), n_out))
+
+    def test_lttb_small_input(self):
+        """测试点数不多于输出点数时原样返回"""
+        self.assertEqual(lttb_indices([0, 1, 2], [1, 2, 3], 5).tolist(), [0, 1, 2])
+
+    def test_minmax_keeps_extremes(self):
+        """测试每个桶的极值都被保留，下标递增"""
+        y = self.y.copy()
+        y[1234] = 1000.0
+        y[4321] = -1000.0
+        selected = minmax_indices(y, 100)
+        self.assertLessEqual(len(selected), 202)
+        self.assertTrue(np.all(np.diff(selected) > 0))
+        self.assertIn(1234, selected)
+        self.assertIn(4321, selected)
+        self.assertEqual((selected[0], selected[-1]), (0, 4999))
+        size = 50
+        for start in range(0, 5000, size):
+            bucket = y[start:start + size]
+            self.assertIn(start + int(np.argmax(bucket)), selected)
+            self.assertIn(start + int(np.argmin(bucket)), selected)
+
+    def test_pyramid_query(self):
+        """测试金字塔查询的点数受图表宽度限制，范围内的尖峰不会丢失"""
+        n = 200000
+        x = np.arange(n, dtype=float)
+        y = np.sin(x / 5000.0)
+        y[150001] = 5.0
+        pyramid = SeriesPyramid(x, y)
+        self.assertGreater(len(pyramid.levels), 3)
+
+        full = pyramid.query(400)
+        self.assertLessEqual(len(full), 802)
+        self.assertIn(150001, full)
+
+        zoomed = pyramid.query(400, x_start=149000, x_end=151000)
+        self.assertTrue(np.all((x[zoomed] >= 149000) & (x[zoomed] <= 151000)))
+        self.assertIn(150001, zoomed)
+        # 缩放到2000个点时使用原始数据
+        self.assertEqual(len(pyramid.query(400, x_start=149000, x_end=149500)), 501)
+
+        lttb = pyramid.query(400, method="lttb")
+        self.assertEqual(len(lttb), 400)
+        self.assertEqual(pyramid.query(None, x_start=199990).tolist(), list(range(199990, n)))
+
+
+class TestCandles(unittest.TestCase):
+    """测试K线聚合"""
+
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        n = 10000
+        close = 100 + np.cumsum(rng.normal(size=n))
+        self.candles = {
+            "time": np.arange(n, dtype=float) * 60,
+            "open": close + rng.normal(size=n),
+            "high": close + 2,
+            "low": close - 2,
+            "close": close,
+            "volume": rng.uniform(1, 10, size=n),
+        }
+
+    def test_aggregate_ohlc(self):
+        """测试合并后的K线与逐组计算一致"""
+        merged = aggregate_ohlc(self.candles, 7)
+        for i, start in enumerate(range(0, 10000, 7)):
+            group = slice(start, start + 7)
+            self.assertEqual(merged["open"][i], self.candles["open"][start])
+            self.assertEqual(merged["high"][i], self.candles["high"][group].max())
+            self.assertEqual(merged["low"][i], self.candles["low"][group].min())
+            self.assertEqual(merged["close"][i], self.candles["close"][group][-1])
+            self.assertAlmostEqual(merged["volume"][i], self.candles["volume"][group].sum())
+
+    def test_pyramid_query(self):
+        """测试按宽度选择合并级别，缩放后使用更细的K线"""
+        pyramid = CandlePyramid(self.candles)
+        full = pyramid.query(600, min_candle_px=3)
+        self.assertLessEqual(len(full["close"]), 200)
+        self.assertEqual(full["high"].max(), self.candles["high"].max())
+        self.assertEqual(full["low"].min(), self.candles["low"].min())
+
+        zoomed = pyramid.query(600, t_start=60 * 5000, t_end=60 * 5100, min_candle_px=3)
+        self.assertEqual(zoomed["time"].tolist(), self.candles["time"][5000:5101].tolist())
+
+
+class TestCache(unittest.TestCase):
+    """测试金字塔缓存和数据点降采样"""
+
+    def test_rebuilds_on_version_change(self):
+        """测试同一版本只构建一次"""
+        cache = PyramidCache(max_entries=2)
+        build = lambda: SeriesPyramid(np.arange(10.0), np.arange(10.0))
+        first = cache.get("s1", (10, 9), build)
+        self.assertIs(cache.get("s1", (10, 9), build), first)
+        self.assertIsNot(cache.get("s1", (11, 10), build), first)
+        cache.get("s2", 1, build)
+        cache.get("s3", 1, build)
+        self.assertEqual(cache.builds, 4)
+        cache.get("s1", (11, 10), build)
+        self.assertEqual(cache.builds, 5)
+
+    def test_downsample_records(self):
+        """测试按ISO时间降采样数据点"""
+        records = [{"timestamp": f"2026-01-{1 + i // 1440:02d}T{i // 60 % 24:02d}:{i % 60:02d}:00Z",
+                    "equity": float(i % 97)} for i in range(1440 * 20)]
+        cache = PyramidCache()
+        selected = downsample_records(records, "equity", 300, x_field="timestamp",
+                                      cache_key="s1", cache=cache)
+        self.assertLessEqual(len(selected), 602)
+        self.assertEqual(selected[0], records[0])
+        self.assertEqual(selected[-1], records[-1])
+        self.assertEqual(max(r["equity"] for r in selected), 96.0)
+        self.assertEqual(len(downsample_records(records, "equity", 300)), 300)
+        short = records[:10]
+        self.assertIs(downsample_records(short, "equity", 300), short)
+
+
+if __name__ == "__main__":
+    unittest.main()
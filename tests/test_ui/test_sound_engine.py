@@ -0,0 +1,217 @@
+"""
+软件混音音效引擎测试模块
+测试音效解码、向量化混音与淡入淡出、声部限制和优先级抢占、单混音线程以及AudioManager的无界面播放
+"""
+
+import math
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from ui.utils.audio import (
+    AudioCategory, AudioManager, SoundType, _write_wav, click_sound_samples, generate_all_default_sounds
+)
+from ui.utils.sound_engine import NullSink, SoundEngine, decode_wav
+
+
+def reference_click_sound(volume=0.7, frequency=1000, sample_rate=44100):
+    """原逐采样实现的点击音效"""
+    num_samples = int(0.05 * sample_rate)
+    buf = [0] * num_samples
+    for i in range(num_samples):
+        t = i / sample_rate
+        buf[i] = int(32767 * volume * math.sin(2 * math.pi * frequency * t))
+    for i in range(num_samples):
+        buf[i] = int(buf[i] * math.exp(-5 * i / num_samples))
+    return np.array(buf, dtype=np.int16)
+
+
+def constant_clip(engine, name, value, frames):
+    """向音效库加入恒定幅度的单声道音效"""
+    engine.bank.add(name, np.full(frames, value, dtype=np.float32))
+
+
+class TestSoundGeneration(unittest.TestCase):
+    """测试向量化音效生成"""
+
+    def test_matches_per_sample_generation(self):
+        """测试与逐采样生成的结果完全一致"""
+        np.testing.assert_array_equal(click_sound_samples(), reference_click_sound())
+        np.testing.assert_array_equal(click_sound_samples(0.5, 1500), reference_click_sound(0.5, 1500))
+
+    def test_generate_all_default_sounds(self):
+        """测试生成全部默认音效文件"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.assertEqual(generate_all_default_sounds(temp_dir), 9)
+            samples, rate = decode_wav(os.path.join(temp_dir, "sounds", "ui", "click.wav"))
+            self.assertEqual(rate, 44100)
+            np.testing.assert_allclose(samples[:, 0], reference_click_sound() / 32768.0)
+
+
+class TestSoundEngine(unittest.TestCase):
+    """测试混音引擎"""
+
+    def setUp(self):
+        self.engine = SoundEngine(sample_rate=1000, channels=2, block_size=64, max_voices=3, max_instances=2)
+
+    def test_bank_converts_rate_and_channels(self):
+        """测试音效库统一采样率和声道数"""
+        clip = self.engine.bank.add("tone", np.zeros(500, dtype=np.int16), sample_rate=500)
+        self.assertEqual(clip.samples.shape, (1000, 2))
+        self.assertEqual(clip.samples.dtype, np.float32)
+
+    def test_mixes_voices_with_gain(self):
+        """测试多个声部按增益相加并限幅"""
+        constant_clip(self.engine, "a", 0.25, 100)
+        constant_clip(self.engine, "b", 0.5, 50)
+        self.engine.play("a", gain=1.0)
+        self.engine.play("b", gain=0.5)
+        output = self.engine.render(150)
+        self.assertEqual(output[0, 0], int(0.5 * 32767))
+        self.assertEqual(output[60, 1], int(0.25 * 32767))
+        self.assertEqual(output[120, 0], 0)
+        self.assertEqual(self.engine.active_voices, 0)
+
+        constant_clip(self.engine, "loud", 0.9, 10)
+        self.engine.play("loud")
+        self.engine.play("loud")
+        self.assertEqual(self.engine.render(10)[0, 0], 32767)
+
+    def test_category_and_master_gain(self):
+        """测试类别音量和主音量"""
+        constant_clip(self.engine, "a", 0.5, 100)
+        self.engine.category_gains = {AudioCategory.ALERT: 0.5}
+        self.engine.master_gain = 0.5
+        self.engine.play("a", category=AudioCategory.ALERT)
+        self.assertEqual(self.engine.render(10)[5, 0], int(0.125 * 32767))
+
+    def test_fade_in_and_fade_out(self):
+        """测试淡入和停止时的淡出包络"""
+        constant_clip(self.engine, "a", 1.0, 1000)
+        voice = self.engine.play("a", fade_in=0.1, fade_out=0.1)
+        output = self.engine.render(200)[:, 0].astype(np.float64) / 32767
+        np.testing.assert_allclose(output[:100], np.arange(100) / 100, atol=1e-4)
+        np.testing.assert_allclose(output[100:], 1.0, atol=1e-4)
+
+        voice.stop()
+        output = self.engine.render(200)[:, 0].astype(np.float64) / 32767
+        np.testing.assert_allclose(output[:100], 1 - np.arange(100) / 100, atol=1e-4)
+        np.testing.assert_array_equal(output[100:], 0)
+        self.assertFalse(voice.is_playing)
+
+    def test_loop(self):
+        """测试循环播放跨越混音块"""
+        self.engine.bank.add("saw", np.arange(10, dtype=np.float32) / 10)
+        self.engine.play("saw", loop=True)
+        output = self.engine.render(100)[:, 0]
+        np.testing.assert_array_equal(output[:10], output[50:60])
+        self.assertEqual(self.engine.active_voices, 1)
+
+    def test_priority_stealing(self):
+        """测试声部已满时按优先级抢占或拒绝"""
+        for name in ("a", "b", "c", "d"):
+            constant_clip(self.engine, name, 0.1, 1000)
+        low = self.engine.play("a", priority=1)
+        self.engine.play("b", priority=2)
+        self.engine.play("c", priority=2)
+
+        high = self.engine.play("d", priority=3)
+        self.assertIsNotNone(high)
+        self.assertTrue(low.stolen)
+        self.assertIsNone(self.engine.play("a", priority=0))
+        self.assertEqual(self.engine.voices_rejected, 1)
+
+        # 被抢占的声部短暂淡出后结束
+        self.engine.render(64)
+        self.assertFalse(low.is_playing)
+        self.assertEqual(self.engine.active_voices, 3)
+
+    def test_instance_limit(self):
+        """测试同一音效的实例数限制"""
+        constant_clip(self.engine, "typing", 0.1, 1000)
+        voices = [self.engine.play("typing") for _ in range(5)]
+        self.engine.render(64)
+        self.assertEqual([voice.is_playing for voice in voices], [False, False, False, True, True])
+
+
+class TestMixerThread(unittest.TestCase):
+    """测试混音线程"""
+
+    def test_single_thread_for_many_events(self):
+        """测试大量播放请求只使用一个混音线程"""
+        sink = NullSink(realtime=True, keep_blocks=True)
+        with SoundEngine(block_size=256, max_voices=8, sink=sink) as engine:
+            engine.bank.add("typing", click_sound_samples())
+            threads_before = threading.active_count()
+            for _ in range(50):
+                engine.play("typing")
+            self.assertEqual(threading.active_count(), threads_before)
+            self.assertTrue(engine.wait_idle(timeout=5.0))
+            stats = engine.get_stats()
+
+        self.assertLessEqual(stats["peak_voices"], 4)
+        self.assertEqual(stats["voices_started"], 50)
+        self.assertGreater(np.abs(sink.output()).max(), 0)
+        self.assertGreater(sink.frames_written, len(click_sound_samples()))
+
+    def test_idle_engine_does_not_spin(self):
+        """测试没有声部时混音线程不产生输出"""
+        sink = NullSink()
+        with SoundEngine(sink=sink) as engine:
+            time.sleep(0.05)
+            self.assertEqual(engine.blocks_mixed, 0)
+
+
+class TestAudioManagerMixer(unittest.TestCase):
+    """测试AudioManager使用混音引擎"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.sink = NullSink(keep_blocks=True)
+        self.manager = AudioManager(sound_dir=self.temp_dir.name, sink=self.sink)
+
+    def tearDown(self):
+        self.manager.cleanup()
+        self.temp_dir.cleanup()
+
+    def test_default_sounds_generated_in_memory(self):
+        """测试缺少的默认音效在内存中生成"""
+        for sound_type in AudioManager.DEFAULT_SOUNDS:
+            self.assertIn(sound_type.value, self.manager.engine.bank)
+        self.assertEqual(self.manager.audio_cache, {})
+
+    def test_play_sound_and_notification(self):
+        """测试播放界面音效和通知音效"""
+        voice = self.manager.play_sound(SoundType.CLICK)
+        self.assertEqual(voice.category, AudioCategory.UI_FEEDBACK)
+        notification = self.manager.play_notification()
+        self.assertGreater(notification.priority, voice.priority)
+        self.assertTrue(self.manager.engine.wait_idle(timeout=5.0))
+        self.assertGreater(np.abs(self.sink.output()).max(), 0)
+
+    def test_play_file_and_preload(self):
+        """测试播放文件路径和预加载音效"""
+        path = os.path.join(self.temp_dir.name, "beep.wav")
+        _write_wav(path, click_sound_samples(), sample_rate=22050)
+        self.assertIsNotNone(self.manager.play_sound(path, volume=0.5))
+        self.assertTrue(self.manager.preload_sound(path, "beep", AudioCategory.ALERT))
+        voice = self.manager.play_preloaded_sound("beep")
+        self.assertEqual(voice.priority, AudioManager.CATEGORY_PRIORITIES[AudioCategory.ALERT])
+        self.assertIsNone(self.manager.play_preloaded_sound("missing"))
+        self.assertIsNone(self.manager.play_sound("missing.wav"))
+
+    def test_mute(self):
+        """测试静音时不播放并停止正在播放的声部"""
+        voice = self.manager.play_sound(SoundType.SUCCESS, loop=True)
+        self.manager.set_mute(True)
+        self.assertIsNone(self.manager.play_sound(SoundType.CLICK))
+        self.assertTrue(self.manager.engine.wait_idle(timeout=5.0))
+        self.assertFalse(voice.is_playing)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,228 @@
+"""
+策略监控增量汇总测试模块
+测试运行汇总与逐笔重新计算结果一致、交易去重和更新、交易列表同步以及去抖的增量快照
+"""
+
+import json
+import os
+import random
+import tempfile
+import time
+import unittest
+
+from ui.strategy_aggregates import IncrementalSnapshot, StrategyAggregator
+
+
+def recompute_metrics(strategies):
+    """逐笔交易重新计算仪表板指标（原实现）"""
+    all_trades = [t for s in strategies.values() for t in s.get("trades", [])]
+    total_trades = len(all_trades)
+    winning_trades = sum(1 for t in all_trades if t.get("profit", 0) > 0)
+    performance = []
+    for strategy_id, strategy in strategies.items():
+        trades = strategy.get("trades", [])
+        if trades:
+            profit = sum(t.get("profit", 0) for t in trades)
+            performance.append({
+                "id": strategy_id,
+                "name": strategy.get("name", strategy_id),
+                "profit": profit,
+                "trade_count": len(trades),
+                "avg_profit": profit / len(trades)
+            })
+    return {
+        "total_strategies": len(strategies),
+        "active_count": sum(1 for s in strategies.values() if s.get("status") == "active"),
+        "paused_count": sum(1 for s in strategies.values() if s.get("status") == "paused"),
+        "total_trades": total_trades,
+        "winning_trades": winning_trades,
+        "win_rate": winning_trades / total_trades if total_trades > 0 else 0,
+        "total_profit": sum(t.get("profit", 0) for t in all_trades),
+        "best_strategy": max(performance, key=lambda x: x["avg_profit"]) if performance else None,
+        "worst_strategy": min(performance, key=lambda x: x["avg_profit"]) if performance else None
+    }
+
+
+def make_trade(rng, trade_id):
+    return {"id": trade_id, "profit": round(rng.uniform(-100, 100), 2)}
+
+
+class TestStrategyAggregator(unittest.TestCase):
+    """测试运行汇总"""
+
+    def assertMetricsEqual(self, actual, expected):
+        for key in ("total_strategies", "active_count", "paused_count", "total_trades", "winning_trades"):
+            self.assertEqual(actual[key], expected[key], key)
+        for key in ("win_rate", "total_profit"):
+            self.assertAlmostEqual(actual[key], expected[key], places=6)
+        for key in ("best_strategy", "worst_strategy"):
+            if expected[key] is None:
+                self.assertIsNone(actual[key])
+            else:
+                self.assertEqual(actual[key]["id"], expected[key]["id"])
+                self.assertAlmostEqual(actual[key]["avg_profit"], expected[key]["avg_profit"], places=6)
+
+    def test_empty(self):
+        """测试没有策略时的指标"""
+        metrics = StrategyAggregator().metrics()
+        self.assertEqual(metrics["total_strategies"], 0)
+        self.assertIsNone(metrics["best_strategy"])
+
+    def test_matches_recomputation(self):
+        """测试随机推送交易和状态后汇总与重新计算一致"""
+        rng = random.Random(7)
+        strategies = {}
+        aggregator = StrategyAggregator()
+        for i in range(5):
+            strategy_id = f"s{i}"
+            strategies[strategy_id] = {"name": f"Strategy {i}", "status": "active",
+                                       "trades": [make_trade(rng, f"{strategy_id}-{j}") for j in range(3)]}
+            aggregator.register_strategy(strategy_id, strategies[strategy_id])
+        strategies["s4"]["trades"] = []
+        aggregator.register_strategy("s4", strategies["s4"])
+
+        for step in range(500):
+            strategy_id = rng.choice(list(strategies))
+            if rng.random() < 0.1:
+                status = rng.choice(["active", "paused", "stopped"])
+                strategies[strategy_id]["status"] = status
+                aggregator.set_status(strategy_id, status)
+            else:
+                trade = make_trade(rng, f"{strategy_id}-n{step}")
+                strategies[strategy_id]["trades"].append(trade)
+                self.assertTrue(aggregator.apply_trade(strategy_id, trade))
+        self.assertMetricsEqual(aggregator.metrics(), recompute_metrics(strategies))
+
+        del strategies["s0"]
+        aggregator.remove_strategy("s0")
+        self.assertMetricsEqual(aggregator.metrics(), recompute_metrics(strategies))
+
+    def test_duplicate_and_updated_trades(self):
+        """测试重复推送的交易不重复计数，交易更新调整盈亏"""
+        aggregator = StrategyAggregator()
+        self.assertTrue(aggregator.apply_trade("s1", {"id": "t1", "profit": 10}))
+        self.assertFalse(aggregator.apply_trade("s1", {"id": "t1", "profit": 10}))
+        self.assertEqual(aggregator.total_trades, 1)
+
+        self.assertFalse(aggregator.apply_trade("s1", {"id": "t1", "profit": -5}))
+        metrics = aggregator.metrics()
+        self.assertEqual(metrics["total_trades"], 1)
+        self.assertEqual(metrics["winning_trades"], 0)
+        self.assertEqual(metrics["total_profit"], -5)
+
+    def test_sync_trades(self):
+        """测试同步只追加的交易列表时只处理新增交易，列表被替换时重建"""
+        aggregator = StrategyAggregator()
+        trades = [{"id": i, "profit": i} for i in range(10)]
+        self.assertEqual(aggregator.sync_trades("s1", trades[:6]), 6)
+        self.assertEqual(aggregator.sync_trades("s1", trades), 4)
+        self.assertEqual(aggregator.sync_trades("s1", trades), 0)
+        self.assertEqual(aggregator.total_profit, sum(range(10)))
+
+        replaced = [{"id": "x", "profit": 3}]
+        self.assertEqual(aggregator.sync_trades("s1", replaced), 1)
+        self.assertEqual(aggregator.total_trades, 1)
+        self.assertEqual(aggregator.total_profit, 3)
+
+        # 没有ID的交易按位置识别
+        aggregator.sync_trades("s2", [{"profit": 1}, {"profit": 2}])
+        self.assertEqual(aggregator.sync_trades("s2", [{"profit": 1}, {"profit": 2}, {"profit": 4}]), 1)
+        self.assertEqual(aggregator.get("s2").total_profit, 7)
+
+    def test_sync_trades_detects_updated_profit(self):
+        """测试同步时已有交易的盈亏变化计入汇总"""
+        aggregator = StrategyAggregator()
+        trades = [{"id": i, "profit": 1.0} for i in range(4)]
+        aggregator.sync_trades("s1", trades)
+
+        trades[1] = {"id": 1, "profit": 12.0}
+        trades[2] = {"id": 2, "profit": -1.0}
+        trades.append({"id": 4, "profit": 3.0})
+        self.assertEqual(aggregator.sync_trades("s1", trades), 3)
+        self.assertEqual(aggregator.total_profit, 16.0)
+        self.assertEqual(aggregator.total_trades, 5)
+        self.assertEqual(aggregator.winning_trades, 4)
+
+        # 没有ID的交易按位置比较
+        aggregator.sync_trades("s2", [{"profit": 1}, {"profit": 2}])
+        self.assertEqual(aggregator.sync_trades("s2", [{"profit": 1}, {"profit": 13}]), 1)
+        self.assertEqual(aggregator.get("s2").total_profit, 14)
+
+        # 已有交易被删除时整体重建
+        self.assertEqual(aggregator.sync_trades("s1", trades[:2] + trades[3:]), 4)
+        self.assertEqual(aggregator.get("s1").total_profit, 17.0)
+
+
+class TestIncrementalSnapshot(unittest.TestCase):
+    """测试增量快照"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.state = {f"s{i}": {"id": f"s{i}", "trades": []} for i in range(20)}
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_flush_writes_only_dirty(self):
+        """测试只写入修改过的策略，删除的策略移除文件"""
+        snapshot = IncrementalSnapshot(self.temp_dir.name, self.state.get, delay=60)
+        snapshot.mark_dirty(self.state)
+        self.assertEqual(snapshot.flush(), 20)
+
+        self.state["s3"]["status"] = "paused"
+        snapshot.mark_dirty(["s3", "s3"])
+        self.assertEqual(snapshot.pending, 1)
+        self.assertEqual(snapshot.flush(), 1)
+        with open(os.path.join(self.temp_dir.name, "s3.json")) as f:
+            self.assertEqual(json.load(f)["data"]["status"], "paused")
+
+        del self.state["s4"]
+        snapshot.mark_dirty(["s4"])
+        snapshot.close()
+        self.assertEqual(len(os.listdir(self.temp_dir.name)), 19)
+
+        loaded = IncrementalSnapshot(self.temp_dir.name, self.state.get).load()
+        self.assertEqual(loaded, self.state)
+
+    def test_debounce(self):
+        """测试连续修改合并为一次写入"""
+        snapshot = IncrementalSnapshot(self.temp_dir.name, self.state.get, delay=0.05, max_delay=1.0)
+        for i in range(10):
+            snapshot.mark_dirty([f"s{i}"])
+        self.assertEqual(snapshot.flushes, 0)
+        deadline = time.time() + 2.0
+        while snapshot.flushes == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(snapshot.flushes, 1)
+        self.assertEqual(snapshot.files_written, 10)
+        self.assertEqual(snapshot.pending, 0)
+
+    def test_max_delay(self):
+        """测试持续修改时仍在最长延迟内写入"""
+        snapshot = IncrementalSnapshot(self.temp_dir.name, self.state.get, delay=0.1, max_delay=0.2)
+        start = time.time()
+        while snapshot.flushes == 0 and time.time() - start < 2.0:
+            snapshot.mark_dirty(["s1"])
+            time.sleep(0.02)
+        self.assertGreater(snapshot.flushes, 0)
+        self.assertLess(time.time() - start, 0.5)
+
+    def test_failed_write_retried(self):
+        """测试写入失败时删除临时文件并重新安排写入"""
+        self.state["s1"]["bad"] = object()
+        snapshot = IncrementalSnapshot(self.temp_dir.name, self.state.get, delay=0.05)
+        snapshot.mark_dirty(["s1"])
+        self.assertEqual(snapshot.flush(), 0)
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+        self.assertEqual(snapshot.pending, 1)
+
+        del self.state["s1"]["bad"]
+        deadline = time.time() + 2.0
+        while snapshot.files_written == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(os.listdir(self.temp_dir.name), ["s1.json"])
+        snapshot.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
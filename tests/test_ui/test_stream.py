@@ -0,0 +1,284 @@
+"""
+仪表板增量推送测试模块
+测试列式二进制编码、快照加增量还原出的状态与服务端一致、帧内合并、订阅时序以及带宽
+"""
+
+import json
+import random
+import unittest
+
+from ui.web.stream import StreamHub, pack_records, strategy_listener, unpack_records
+
+
+class FakeClient:
+    """按协议应用快照和增量的客户端"""
+
+    def __init__(self):
+        self.state = None
+        self.seq = None
+        self.limits = {}
+
+    def on_snapshot(self, snapshot):
+        self.seq = snapshot["seq"]
+        self.limits = snapshot["limits"]
+        self.state = {key: unpack_records(value) for key, value in snapshot["state"].items()}
+
+    def on_delta(self, message):
+        if self.state is None or message["seq"] <= self.seq:
+            return
+        assert message["seq"] == self.seq + 1, "missed delta"
+        self.seq = message["seq"]
+        for key, value in message.get("set", {}).items():
+            if isinstance(value, dict) and "$merge" in value:
+                self.state[key] = dict(self.state.get(key, {}), **value["$merge"])
+            else:
+                self.state[key] = unpack_records(value)
+        replace_on = message.get("replace_on", {})
+        for key, packed in message.get("append", {}).items():
+            series = self.state.setdefault(key, [])
+            key_field = replace_on.get(key)
+            for item in unpack_records(packed):
+                if (key_field and series and item.get(key_field) is not None
+                        and series[-1].get(key_field) == item.get(key_field)):
+                    series[-1] = item
+                else:
+                    series.append(item)
+            limit = self.limits.get(key)
+            if limit and len(series) > limit:
+                del series[:-limit]
+
+
+class RoomHub:
+    """测试用：把推送中心的广播分发给订阅了主题的客户端"""
+
+    def __init__(self, **kwargs):
+        self.rooms = {}
+        self.sent = []
+        self.hub = StreamHub(self.broadcast, **kwargs)
+
+    def broadcast(self, topic, message):
+        self.sent.append((topic, message))
+        for client in self.rooms.get(topic, []):
+            client.on_delta(message)
+
+    def subscribe(self, topic, client):
+        self.rooms.setdefault(topic, []).append(client)
+        snapshot = self.hub.subscribe(topic, id(client))
+        client.on_snapshot(snapshot)
+        return snapshot
+
+
+def candle(t, close):
+    return {"timestamp": t, "open": close - 1, "high": close + 1, "low": close - 2, "close": close}
+
+
+class TestPacking(unittest.TestCase):
+    """测试列式编码"""
+
+    def test_round_trip(self):
+        """测试数值列编码为字节，字符串列保留"""
+        records = [{"timestamp": f"2026-10-18T00:0{i}", "equity": 1000.5 + i, "count": i} for i in range(5)]
+        packed = pack_records(records)
+        self.assertIsInstance(packed["$columns"]["equity"], bytes)
+        self.assertIsInstance(packed["$columns"]["timestamp"], list)
+        self.assertEqual(unpack_records(packed), records)
+
+    def test_integer_columns_keep_int64(self):
+        """测试整数列按int64编码，超过float64精度的ID不失真"""
+        records = [{"id": 2 ** 53 + 1 + i, "price": 1.5, "qty": 3} for i in range(3)]
+        packed = pack_records(records)
+        self.assertEqual(packed["$types"], {"id": "<i8", "qty": "<i8"})
+        unpacked = unpack_records(packed)
+        self.assertEqual(unpacked, records)
+        self.assertIsInstance(unpacked[0]["qty"], int)
+        self.assertIsInstance(unpacked[0]["price"], float)
+
+        # 超出int64范围时退回float64，整数与浮点混合的列也按float64编码
+        self.assertNotIn("$types", pack_records([{"v": 2 ** 70}, {"v": 1}]))
+        self.assertNotIn("$types", pack_records([{"v": 1}, {"v": 1.5}]))
+
+    def test_irregular_records_unchanged(self):
+        """测试字段不一致的列表原样返回"""
+        records = [{"a": 1}, {"b": 2}]
+        self.assertIs(pack_records(records), records)
+        self.assertEqual(pack_records([1, 2]), [1, 2])
+
+
+class TestStreamHub(unittest.TestCase):
+    """测试增量推送"""
+
+    def setUp(self):
+        self.state = {"strategy": {"s1": {"name": "Alpha", "status": "active",
+                                          "metrics": {"profit": 0, "trades": 0},
+                                          "price_data": [candle(i, 100 + i) for i in range(50)],
+                                          "trades": []}}}
+        self.room = RoomHub()
+        self.room.hub.register_source("strategy", lambda key: self.state["strategy"].get(key),
+                                      max_lengths={"price_data": 60})
+
+    def test_unknown_topic(self):
+        """测试未注册的主题返回None"""
+        self.assertIsNone(self.room.hub.subscribe("missing:1", "sid"))
+        self.assertIsNone(self.room.hub.subscribe("strategy:missing", "sid"))
+
+    def test_topics_kept_only_while_subscribed(self):
+        """测试没有订阅者的主题不保存状态，最后一个订阅者离开后删除，再订阅时重新加载"""
+        hub = self.room.hub
+        hub.update("strategy:s1", {"status": "paused"})
+        hub.append("strategy:s2", "trades", [{"id": 1, "profit": 2.0}])
+        hub.sync("strategy:s3", {"status": "active"})
+        self.assertEqual(hub.get_stats()["topics"], 0)
+
+        first, second = FakeClient(), FakeClient()
+        self.room.subscribe("strategy:s1", first)
+        self.room.subscribe("strategy:s1", second)
+        hub.unsubscribe("strategy:s1", id(first))
+        self.assertEqual(hub.get_stats()["topics"], 1)
+        hub.unsubscribe_all(id(second))
+        self.assertEqual(hub.get_stats()["topics"], 0)
+
+        self.state["strategy"]["s1"]["status"] = "paused"
+        client = FakeClient()
+        self.room.subscribe("strategy:s1", client)
+        self.assertEqual(client.state["status"], "paused")
+
+    def test_clients_track_server_state(self):
+        """测试随机修改后客户端状态与服务端一致，每帧每个主题只广播一次"""
+        rng = random.Random(3)
+        hub = self.room.hub
+        early, late = FakeClient(), FakeClient()
+        self.room.subscribe("strategy:s1", early)
+
+        t = 50
+        for frame in range(40):
+            for _ in range(rng.randint(0, 6)):
+                action = rng.random()
+                if action < 0.4:
+                    # 更新当前K线或开始新K线
+                    t += rng.random() < 0.5
+                    hub.append("strategy:s1", "price_data", [candle(t, rng.uniform(90, 110))], key_field="timestamp")
+                elif action < 0.6:
+                    hub.append("strategy:s1", "trades", [{"id": f"t{frame}-{_}", "profit": rng.uniform(-5, 5)}])
+                elif action < 0.9:
+                    hub.update("strategy:s1", {"metrics": {"profit": rng.randint(0, 3), "trades": frame}})
+                else:
+                    hub.update("strategy:s1", {"status": rng.choice(["active", "paused"])})
+            if frame == 20:
+                self.room.subscribe("strategy:s1", late)
+            sent_before = len(self.room.sent)
+            hub.flush()
+            self.assertLessEqual(len(self.room.sent) - sent_before, 1)
+
+        server_state = hub._topics["strategy:s1"].state
+        self.assertEqual(len(server_state["price_data"]), 60)
+        for client in (early, late):
+            self.assertEqual(client.state, server_state)
+
+    def test_subscribe_flushes_pending(self):
+        """测试订阅时先发出待发送的增量，新订阅者不会重复应用"""
+        first, second = FakeClient(), FakeClient()
+        self.room.subscribe("strategy:s1", first)
+        self.room.hub.append("strategy:s1", "trades", [{"id": 1, "profit": 2.0}])
+        self.room.subscribe("strategy:s1", second)
+        self.assertEqual(len(self.room.sent), 1)
+        self.assertEqual(first.state, second.state)
+        self.assertEqual(len(second.state["trades"]), 1)
+
+    def test_points_without_key_field_are_appended(self):
+        """测试没有替换字段的数据点总是追加"""
+        client = FakeClient()
+        self.room.subscribe("strategy:s1", client)
+        self.room.hub.append("strategy:s1", "trades", [{"profit": 1.0}, {"profit": 2.0}], key_field="id")
+        self.room.hub.flush()
+        self.assertEqual(len(client.state["trades"]), 2)
+
+    def test_dict_fields_send_changed_keys(self):
+        """测试字典字段只发送变化的子键，同一帧内多次修改合并"""
+        client = FakeClient()
+        self.room.subscribe("strategy:s1", client)
+        self.room.hub.update("strategy:s1", {"metrics": {"profit": 5, "trades": 0}})
+        self.room.hub.update("strategy:s1", {"metrics": {"profit": 7, "trades": 0}})
+        self.room.hub.update("strategy:s1", {"status": "active"})
+        self.room.hub.flush()
+        (_, message), = self.room.sent
+        self.assertEqual(message["set"], {"metrics": {"$merge": {"profit": 7}}})
+
+    def test_sync_sends_tail_only(self):
+        """测试与完整状态同步时只发送新增数据点，头部截断不影响"""
+        client = FakeClient()
+        self.room.subscribe("strategy:s1", client)
+        data = self.state["strategy"]["s1"]
+        data["price_data"] = data["price_data"][3:] + [candle(50 + i, 150) for i in range(3)]
+        self.room.hub.invalidate("strategy:s1")
+        self.room.hub.flush()
+        (_, message), = self.room.sent
+        self.assertNotIn("set", message)
+        self.assertEqual(message["append"]["price_data"]["length"], 3)
+        self.assertEqual(client.state["price_data"][-3:], data["price_data"][-3:])
+
+    def test_sync_resends_list_when_existing_item_changes(self):
+        """测试已有数据点被修改（包括原地修改）时整体发送列表"""
+        client = FakeClient()
+        self.room.subscribe("strategy:s1", client)
+        data = self.state["strategy"]["s1"]
+        data["price_data"][10]["close"] = 999
+        data["price_data"].append(candle(50, 150))
+        self.room.hub.invalidate("strategy:s1")
+        self.room.hub.flush()
+        (_, message), = self.room.sent
+        self.assertNotIn("append", message)
+        self.assertIn("price_data", message["set"])
+        self.assertEqual(client.state["price_data"], data["price_data"])
+
+    def test_sync_with_source_longer_than_limit(self):
+        """测试数据源保留的点多于长度上限时仍只发送新增部分"""
+        client = FakeClient()
+        self.room.subscribe("strategy:s1", client)
+        data = self.state["strategy"]["s1"]
+        data["price_data"] = data["price_data"] + [candle(50 + i, 150 + i) for i in range(30)]
+        self.room.hub.invalidate("strategy:s1")
+        self.room.hub.flush()
+        data["price_data"].append(candle(80, 180))
+        self.room.hub.invalidate("strategy:s1")
+        self.room.hub.flush()
+        _, message = self.room.sent[-1]
+        self.assertNotIn("set", message)
+        self.assertEqual(message["append"]["price_data"]["length"], 1)
+        self.assertEqual(client.state["price_data"], data["price_data"][-60:])
+
+    def test_bandwidth(self):
+        """测试单个新数据点的增量远小于完整快照"""
+        hub = StreamHub(lambda topic, message: None)
+        equity = [{"timestamp": f"t{i}", "equity": 10000.0 + i, "drawdown_pct": 0.0} for i in range(1000)]
+        hub.register_source("performance", lambda key: {"equity_curve": equity, "summary": {"profit": 1}})
+        hub.subscribe("performance:1", "sid")
+        full = len(json.dumps({"equity_curve": equity, "summary": {"profit": 1}}))
+
+        hub.append("performance:1", "equity_curve", [{"timestamp": "t1000", "equity": 11000.0, "drawdown_pct": 0.0}])
+        hub.update("performance:1", {"summary": {"profit": 2}})
+        message = hub._topics["performance:1"].take_delta()
+        delta = len(json.dumps(message, default=lambda b: "x" * len(b)))
+        self.assertLess(delta * 10, full)
+
+    def test_strategy_listener(self):
+        """测试策略监控的增量转为推送；修改已有交易时整体替换交易列表"""
+        client = FakeClient()
+        self.room.subscribe("strategy:s1", client)
+        listener = strategy_listener(self.room.hub, dashboard_topic=None)
+        data = self.state["strategy"]["s1"]
+
+        trade = {"id": "a", "profit": 1.0}
+        data["trades"].append(trade)
+        listener("s1", data, {"status": "paused", "trades": [trade], "updated_trades": []})
+        self.room.hub.flush()
+        self.assertEqual(self.room.sent[-1][1]["set"], {"status": "paused"})
+        self.assertEqual(client.state["trades"], [trade])
+
+        data["trades"][0] = {"id": "a", "profit": -1.0}
+        listener("s1", data, {"trades": [], "updated_trades": [data["trades"][0]]})
+        self.room.hub.flush()
+        self.assertEqual(client.state["trades"], [{"id": "a", "profit": -1.0}])
+
+
+if __name__ == "__main__":
+    unittest.main()
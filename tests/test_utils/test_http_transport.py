@@ -0,0 +1,297 @@
+"""
+HTTP传输层测试模块
+测试长连接复用、遵守Retry-After的退避重试、令牌桶限速、熔断器、读请求对冲、延迟直方图和异步传输
+"""
+
+import asyncio
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.http_transport import (
+    AsyncHTTPTransport, CircuitBreaker, CircuitOpenError, HTTPTransport, LatencyHistogram,
+    RetryPolicy, TokenBucket, TransportError, parse_retry_after
+)
+
+
+class StubServer:
+    """按预设脚本返回响应的本地HTTP服务器，脚本项为(状态码, 延迟, 响应头)"""
+
+    def __init__(self, script=None, default=(200, 0.0, {})):
+        self.script = list(script or [])
+        self.default = default
+        self.requests = []
+        self.connections = set()
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _respond(self):
+                length = int(self.headers.get("Content-Length", 0))
+                if length:
+                    self.rfile.read(length)
+                with server._lock:
+                    server.requests.append((self.command, self.path))
+                    server.connections.add(self.client_address)
+                    status, delay, headers = server.script.pop(0) if server.script else server.default
+                time.sleep(delay)
+                body = b'{"ok": true}'
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = _respond
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1/data"
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def fast_retry(max_retries=3):
+    return RetryPolicy(max_retries=max_retries, base_delay=0.01, max_delay=1.0)
+
+
+class TestPolicies(unittest.TestCase):
+    """测试限速、熔断、退避和直方图"""
+
+    def test_token_bucket(self):
+        """测试突发请求用完后按速率排队"""
+        now = [0.0]
+        bucket = TokenBucket(rate=10, capacity=2, clock=lambda: now[0])
+        self.assertEqual([bucket.reserve() for _ in range(4)], [0.0, 0.0, 0.1, 0.2])
+        self.assertFalse(bucket.try_acquire())
+        now[0] = 1.0
+        self.assertTrue(bucket.try_acquire())
+        bucket.defer(0.5)
+        self.assertAlmostEqual(bucket.reserve(), 0.6)
+
+    def test_circuit_breaker(self):
+        """测试连续失败后打开，恢复时间后只放行一个试探请求"""
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=5, clock=lambda: now[0])
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+        now[0] = 5.0
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        now[0] = 10.0
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_circuit_breaker_release(self):
+        """测试试探请求没有结果时让出名额，其他请求的标识不能释放它"""
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=5, clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 5.0
+        trial = object()
+        self.assertTrue(breaker.allow(trial))
+        self.assertFalse(breaker.allow())
+        breaker.release(object())
+        self.assertFalse(breaker.allow())
+        breaker.release(trial)
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(breaker.allow())
+
+    def test_backoff(self):
+        """测试退避带抖动且指数增长，遵守Retry-After"""
+        policy = RetryPolicy(base_delay=0.5, max_delay=4.0)
+        for attempt in range(6):
+            self.assertLessEqual(policy.backoff(attempt), min(4.0, 0.5 * 2 ** attempt))
+        self.assertGreaterEqual(policy.backoff(0, retry_after=3.0), 3.0)
+        self.assertIsNone(policy.backoff(0, retry_after=60))
+        self.assertEqual(parse_retry_after("2"), 2.0)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertLessEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+
+    def test_histogram(self):
+        """测试分位数落在对应的桶上界"""
+        histogram = LatencyHistogram()
+        for _ in range(90):
+            histogram.observe(0.004)
+        for _ in range(10):
+            histogram.observe(0.3)
+        self.assertEqual(histogram.percentile(50), 0.005)
+        self.assertEqual(histogram.percentile(95), 0.3)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot["count"], 100)
+        self.assertEqual(snapshot["buckets"]["<=5ms"], 90)
+
+
+class TestHTTPTransport(unittest.TestCase):
+    """测试同步传输"""
+
+    def make(self, script=None, default=(200, 0.0, {}), **kwargs):
+        server = StubServer(script, default)
+        self.addCleanup(server.stop)
+        kwargs.setdefault("retry", fast_retry())
+        transport = HTTPTransport(**kwargs)
+        self.addCleanup(transport.close)
+        return server, transport
+
+    def test_connections_reused(self):
+        """测试多次请求复用少量长连接，并按端点记录延迟"""
+        server, transport = self.make()
+        for _ in range(20):
+            self.assertEqual(transport.get(server.url).json(), {"ok": True})
+        self.assertEqual(len(server.connections), 1)
+        latency = transport.get_stats()["latency"]
+        self.assertEqual(latency[f"GET {server.url[7:]}"]["count"], 20)
+
+    def test_retry_honours_retry_after(self):
+        """测试429/503时按Retry-After等待后重试"""
+        server, transport = self.make([(503, 0, {"Retry-After": "0.3"}), (429, 0, {})])
+        start = time.perf_counter()
+        response = transport.get(server.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.3)
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(transport.get_stats()["retries"], 2)
+
+    def test_non_idempotent_not_retried_by_default(self):
+        """测试POST默认不重试，显式开启后重试"""
+        server, transport = self.make([(503, 0, {}), (503, 0, {})], failure_threshold=10)
+        self.assertEqual(transport.post(server.url, json={"a": 1}).status_code, 503)
+        self.assertEqual(len(server.requests), 1)
+        response = transport.post(server.url, json={"a": 1}, retry_non_idempotent=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(transport.get_stats()["retries"], 1)
+
+    def test_retries_exhausted(self):
+        """测试重试用尽后返回最后的响应，4xx不重试，连接失败抛出TransportError"""
+        server, transport = self.make(default=(500, 0, {}), retry=fast_retry(2), failure_threshold=10)
+        self.assertEqual(transport.get(server.url).status_code, 500)
+        self.assertEqual(len(server.requests), 3)
+        server.default = (404, 0, {})
+        self.assertEqual(transport.get(server.url).status_code, 404)
+        self.assertEqual(len(server.requests), 4)
+        with self.assertRaises(TransportError):
+            transport.get("http://127.0.0.1:9/")
+
+    def test_rate_limit(self):
+        """测试按提供方限速"""
+        server, transport = self.make(rate_limits={"gpt": (20, 1)})
+        start = time.perf_counter()
+        for _ in range(6):
+            transport.post(server.url, provider="gpt")
+        self.assertGreaterEqual(time.perf_counter() - start, 0.24)
+        transport.post(server.url, provider="claude")
+        self.assertEqual(transport.get_stats()["rate_limits"], {"gpt": 20.0})
+
+    def test_circuit_opens(self):
+        """测试连续失败后熔断，不再发送请求，恢复后试探成功即关闭"""
+        server, transport = self.make(default=(503, 0, {}), retry=fast_retry(0),
+                                      failure_threshold=2, recovery_timeout=0.2)
+        transport.post(server.url, provider="gpt")
+        transport.post(server.url, provider="gpt")
+        with self.assertRaises(CircuitOpenError):
+            transport.post(server.url, provider="gpt")
+        self.assertEqual(len(server.requests), 2)
+        self.assertEqual(transport.get_stats()["circuits"]["gpt"], "open")
+
+        server.default = (200, 0, {})
+        time.sleep(0.25)
+        self.assertEqual(transport.post(server.url, provider="gpt").status_code, 200)
+        self.assertEqual(transport.get_stats()["circuits"]["gpt"], "closed")
+
+    def test_hedged_read(self):
+        """测试慢的读请求被对冲，写请求不对冲"""
+        server, transport = self.make([(200, 1.0, {})], hedge_after=0.05)
+        start = time.perf_counter()
+        self.assertEqual(transport.get(server.url).status_code, 200)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        stats = transport.get_stats()
+        self.assertEqual((stats["hedged"], stats["hedge_wins"]), (1, 1))
+
+        server.script = [(200, 0.2, {})]
+        transport.post(server.url)
+        self.assertEqual(transport.get_stats()["hedged"], 1)
+
+    def test_adaptive_hedge_delay(self):
+        """测试未指定对冲延迟时按端点的p95延迟对冲"""
+        server, transport = self.make()
+        for _ in range(20):
+            transport.get(server.url)
+        server.script = [(200, 1.0, {})]
+        start = time.perf_counter()
+        transport.get(server.url)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(transport.get_stats()["hedge_wins"], 1)
+
+
+class TestAsyncHTTPTransport(unittest.TestCase):
+    """测试异步传输"""
+
+    def test_retry_and_hedge(self):
+        """测试异步传输的重试、对冲和连接复用"""
+        server = StubServer([(503, 0, {}), (200, 0, {}), (200, 1.0, {})])
+        self.addCleanup(server.stop)
+
+        async def run():
+            async with AsyncHTTPTransport(retry=fast_retry(), hedge_after=0.05) as transport:
+                first = await transport.request("POST", server.url, provider="gpt", json={},
+                                                retry_non_idempotent=True)
+                start = time.perf_counter()
+                second = await transport.request("GET", server.url)
+                elapsed = time.perf_counter() - start
+                results = await asyncio.gather(*(transport.request("GET", server.url, hedge=False)
+                                                 for _ in range(10)))
+                return first, second, elapsed, results, transport.get_stats()
+
+        first, second, elapsed, results, stats = asyncio.run(run())
+        self.assertEqual(first.status, 200)
+        self.assertEqual(first.json(), {"ok": True})
+        self.assertEqual(second.status, 200)
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(stats["retries"], 1)
+        self.assertEqual(stats["hedge_wins"], 1)
+        self.assertTrue(all(r.status == 200 for r in results))
+
+    def test_cancelled_trial_releases_circuit(self):
+        """测试半开状态的试探请求被取消后，下一个请求可以继续试探"""
+        server = StubServer([(200, 2.0, {})])
+        self.addCleanup(server.stop)
+
+        async def run():
+            async with AsyncHTTPTransport(retry=fast_retry(0), failure_threshold=1,
+                                          recovery_timeout=0.05) as transport:
+                breaker = transport.circuit("gpt")
+                breaker.record_failure()
+                await asyncio.sleep(0.1)
+                trial = asyncio.ensure_future(transport.request("GET", server.url, provider="gpt",
+                                                                hedge=False))
+                await asyncio.sleep(0.2)
+                with self.assertRaises(CircuitOpenError):
+                    await transport.request("GET", server.url, provider="gpt")
+                trial.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await trial
+                response = await transport.request("GET", server.url, provider="gpt")
+                return response.status, breaker.state
+
+        self.assertEqual(asyncio.run(run()), (200, CircuitBreaker.CLOSED))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+"""
+模型响应缓存测试模块
+测试规范化精确匹配、语义匹配、有效期、字节预算、持久化，以及GPT-Claude桥接通过本地模拟模型端点使用缓存
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from utils.http_transport import HTTPTransport, RetryPolicy
+from utils.response_cache import ResponseCache, normalize_prompt
+
+
+def bag_of_words(text):
+    """按词哈希的词袋向量"""
+    vector = np.zeros(64)
+    for word in text.lower().split():
+        vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % 64] += 1
+    return vector
+
+
+class StubModelServer:
+    """按请求格式返回GPT或Claude响应的本地模型端点"""
+
+    def __init__(self):
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                server.requests.append(body)
+                text = f"reply {len(server.requests)}"
+                if "claude" in body["model"]:
+                    data = {"content": [{"type": "text", "text": text}]}
+                else:
+                    data = {"choices": [{"message": {"content": text}}]}
+                payload = json.dumps(data).encode()
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/"
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class TestResponseCache(unittest.TestCase):
+    """测试响应缓存"""
+
+    def test_exact_match_normalizes_prompt(self):
+        """测试空白不同的提示词精确命中，不同上下文互不命中"""
+        cache = ResponseCache()
+        cache.set("生成  RSI 策略\n", "code", context={"model": "gpt-4"})
+        self.assertEqual(cache.get(" 生成 RSI 策略", context={"model": "gpt-4"}), "code")
+        self.assertIsNone(cache.get("生成 RSI 策略", context={"model": "gpt-4o"}))
+        self.assertEqual(normalize_prompt([{"b": 1, "a": "x  y"}]), '[{"a": "x y", "b": 1}]')
+        stats = cache.get_stats()
+        self.assertEqual((stats["exact_hits"], stats["misses"]), (1, 1))
+        self.assertAlmostEqual(stats["hit_rate"], 0.5)
+
+    def test_semantic_match(self):
+        """测试相似度达到阈值的提示词语义命中"""
+        cache = ResponseCache(embed=bag_of_words, similarity_threshold=0.9)
+        cache.set("generate a trend strategy for BTC in a bull market regime", "trend")
+        self.assertEqual(cache.get("generate a trend strategy for ETH in a bull market regime"), "trend")
+        self.assertIsNone(cache.get("summarize yesterday's losing trades"))
+        self.assertIsNone(cache.get("generate a trend strategy for ETH in a bull market regime", context="other"))
+        self.assertEqual(cache.get_stats()["semantic_hits"], 1)
+
+    def test_ttl(self):
+        """测试过期条目不再命中"""
+        cache = ResponseCache(ttl=0.05, embed=bag_of_words)
+        cache.set("prompt", "value")
+        cache.set("long lived prompt", "value", ttl=60)
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("prompt"))
+        self.assertEqual(cache.get("long lived prompt"), "value")
+        self.assertEqual(len(cache), 1)
+
+    def test_byte_budget(self):
+        """测试超过字节预算时淘汰最久未使用的条目"""
+        cache = ResponseCache(max_bytes=300, embed=bag_of_words)
+        for i in range(3):
+            cache.set(f"prompt {i}", "x" * 90)
+        cache.get("prompt 0")
+        cache.set("prompt 3", "x" * 90)
+        self.assertIsNone(cache.get("prompt 1"))
+        self.assertIsNotNone(cache.get("prompt 0"))
+        self.assertLessEqual(cache.get_stats()["bytes"], 300)
+        self.assertEqual(cache.get_stats()["evictions"], 1)
+
+    def test_persistence(self):
+        """测试重启后恢复未过期的条目并压缩文件"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.jsonl")
+            cache = ResponseCache(persist_path=path)
+            cache.set("a", {"strategy": "rsi"})
+            cache.set("a", {"strategy": "macd"})
+            cache.set("b", "expired", ttl=-1)
+
+            restored = ResponseCache(persist_path=path, embed=bag_of_words)
+            self.assertEqual(restored.get("a"), {"strategy": "macd"})
+            self.assertIsNone(restored.get("b"))
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(len(f.readlines()), 1)
+
+    def test_get_or_call(self):
+        """测试只在未命中时调用模型，不可缓存的响应不缓存"""
+        cache = ResponseCache()
+        calls = []
+        call = lambda: calls.append(1) or f"r{len(calls)}"
+        self.assertEqual(cache.get_or_call("p", call), "r1")
+        self.assertEqual(cache.get_or_call("p", call), "r1")
+        cache.get_or_call("q", call, cacheable=lambda value: False)
+        cache.get_or_call("q", call, cacheable=lambda value: False)
+        self.assertEqual(len(calls), 3)
+
+
+class TestBridgeCache(unittest.TestCase):
+    """测试GPT-Claude桥接使用响应缓存"""
+
+    def setUp(self):
+        from api.modules.gpt_claude_bridge import GPTClaudeBridge
+
+        self.server = StubModelServer()
+        self.addCleanup(self.server.stop)
+        transport = HTTPTransport(retry=RetryPolicy(max_retries=0))
+        self.addCleanup(transport.close)
+        self.bridge = GPTClaudeBridge(transport=transport)
+        self.bridge.gpt_api_key = self.bridge.claude_api_key = "test-key"
+        self.bridge.gpt_endpoint = self.bridge.claude_endpoint = self.server.url
+
+    def test_repeated_prompt_served_from_cache(self):
+        """测试重复的提示词不再请求模型，命中率出现在桥接状态中"""
+        first = self.bridge.process_prompt("基于RSI生成BTC/USDT策略")
+        second = self.bridge.process_prompt("基于RSI生成BTC/USDT策略 ")
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.server.requests), 2)
+
+        status = self.bridge.get_bridge_status()["response_cache"]
+        self.assertEqual(status["hits"], 2)
+        self.assertAlmostEqual(status["hit_rate"], 0.5)
+
+    def test_errors_not_cached(self):
+        """测试模型请求失败时不缓存"""
+        self.bridge.gpt_endpoint = "http://127.0.0.1:9/"
+        self.bridge.process_prompt("p")
+        self.assertEqual(self.bridge.response_cache.get_stats()["sets"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
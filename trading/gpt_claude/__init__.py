@@ -7,16 +7,22 @@
 """
 
 from .communication import GptCommunicator, ClaudeCommunicator, CommunicationManager
+from .async_workflow import AsyncWorkflowEngine
+from .feedback_store import FeedbackStore
 from .feedback_system import FeedbackAnalyzer, FeedbackCollector, PerformanceEvaluator
+from .rolling_stats import RollingStatsEngine
 from .templates.strategy_templates import StrategyTemplate, StrategyTemplateManager
 
 __all__ = [
     "GptCommunicator",
     "ClaudeCommunicator",
     "CommunicationManager",
+    "AsyncWorkflowEngine",
     "FeedbackAnalyzer",
     "FeedbackCollector",
+    "FeedbackStore",
     "PerformanceEvaluator",
+    "RollingStatsEngine",
     "StrategyTemplate",
     "StrategyTemplateManager",
 ]
\ No newline at end of file
@@ -0,0 +1,332 @@
+"""
+模块名称：async_workflow
+功能描述：基于asyncio的GPT→Claude交易工作流引擎，多个工作流并发执行，
+          每个模型提供方有独立的并发上限，A的Claude调用与B的GPT调用流水线重叠，
+          相同的在途请求只发送一次
+版本：1.0
+创建日期：2026-10-18
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from utils.http_transport import AsyncHTTPTransport, TransportError
+
+from .communication import AIComponent, CommunicationError, CommunicationManager
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+class AsyncWorkflowEngine:
+    """
+    异步交易工作流引擎
+
+    复用CommunicationManager的消息构建、响应解析和历史记录，HTTP调用走异步传输层
+    """
+
+    def __init__(
+        self,
+        manager: CommunicationManager,
+        gpt_concurrency: int = 4,
+        claude_concurrency: int = 4,
+        timeout: float = 60.0,
+        transport: Optional[AsyncHTTPTransport] = None,
+    ):
+        """
+        初始化工作流引擎
+
+        参数:
+            manager (CommunicationManager): 通信管理器
+            gpt_concurrency (int): GPT的最大并发请求数
+            claude_concurrency (int): Claude的最大并发请求数
+            timeout (float): 单个请求的超时时间(秒)
+            transport (AsyncHTTPTransport, optional): 异步传输，默认在进入引擎时新建，退出时关闭
+        """
+        self.manager = manager
+        self.concurrency = {"gpt": gpt_concurrency, "claude": claude_concurrency}
+        self.timeout = timeout
+        self.stats = {
+            "workflows": 0,
+            "failed": 0,
+            "requests": {"gpt": 0, "claude": 0},
+            "deduplicated": 0,
+        }
+        self.transport = transport
+        self._owns_transport = transport is None
+        self._active = False
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight: Dict[tuple, asyncio.Task] = {}
+
+    async def __aenter__(self) -> "AsyncWorkflowEngine":
+        """准备传输层，在同一事件循环内复用连接"""
+        self._semaphores = {
+            provider: asyncio.Semaphore(limit)
+            for provider, limit in self.concurrency.items()
+        }
+        if self._owns_transport:
+            self.transport = AsyncHTTPTransport(
+                limit=sum(self.concurrency.values()), timeout=self.timeout
+            )
+        self._active = True
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        """关闭自己创建的传输层"""
+        self._active = False
+        if self._owns_transport:
+            await self.transport.close()
+
+    async def run(self, market_data: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        执行一个交易工作流，需在 ``async with engine`` 内调用
+
+        参数:
+            market_data (Dict[str, Any]): 市场数据
+            config (Dict[str, Any]): 交易配置
+
+        返回:
+            Dict[str, Any]: 与 CommunicationManager.execute_trading_workflow 相同格式的结果
+        """
+        manager = self.manager
+        try:
+            gpt_message = manager._prepare_gpt_message(market_data, config)
+            gpt_response = await self._send("gpt", manager.gpt, gpt_message)
+            gpt_result = manager.gpt.process_response(gpt_response)
+
+            claude_message = manager._prepare_claude_message(gpt_result, market_data, config)
+            claude_response = await self._send("claude", manager.claude, claude_message)
+            claude_result = manager.claude.process_response(claude_response)
+
+            self.stats["workflows"] += 1
+            return manager._complete_workflow(market_data, config, gpt_result, claude_result)
+        except Exception as e:
+            logger.error(f"交易工作流执行失败: {str(e)}")
+            self.stats["failed"] += 1
+            return manager._failed_workflow(e)
+
+    async def run_many(self, workflows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        并发执行多个工作流
+
+        参数:
+            workflows (List[Dict[str, Any]]): 工作流列表，每项包含market_data和config
+
+        返回:
+            List[Dict[str, Any]]: 与输入顺序一致的执行结果
+        """
+        if not self._active:
+            async with self:
+                return await self.run_many(workflows)
+        return list(await asyncio.gather(*(
+            self.run(item.get("market_data", {}), item.get("config", {}))
+            for item in workflows
+        )))
+
+    def run_sync(self, workflows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        在新的事件循环中执行多个工作流，供同步代码调用
+
+        参数:
+            workflows (List[Dict[str, Any]]): 工作流列表
+
+        返回:
+            List[Dict[str, Any]]: 执行结果
+        """
+        return asyncio.run(self.run_many(workflows))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取引擎统计
+
+        返回:
+            Dict[str, Any]: 工作流数、各提供方请求数、去重次数和在途请求数
+        """
+        return dict(self.stats, requests=dict(self.stats["requests"]),
+                    in_flight=len(self._in_flight))
+
+    async def _send(self, provider: str, communicator: AIComponent,
+                    message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        发送请求，相同的在途请求共享同一个结果
+
+        参数:
+            provider (str): 提供方名称
+            communicator (AIComponent): 通信器，提供端点、请求头和请求数据
+            message (Dict[str, Any]): 消息
+
+        返回:
+            Dict[str, Any]: 原始响应
+        """
+        payload = communicator.build_payload(message)
+        digest = hashlib.sha256(
+            json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+        key = (communicator.endpoint, digest)
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.stats["deduplicated"] += 1
+        else:
+            task = asyncio.ensure_future(self._post(provider, communicator, payload))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # 一个等待者被取消时不影响其他共享该请求的工作流
+        return await asyncio.shield(task)
+
+    async def _post(self, provider: str, communicator: AIComponent,
+                    payload: Dict[str, Any]) -> Dict[str, Any]:
+        async with self._semaphores[provider]:
+            self.stats["requests"][provider] += 1
+            try:
+                # 推理请求没有副作用，可以安全重试
+                response = await self.transport.request(
+                    "POST", communicator.endpoint, provider=provider,
+                    json=payload, headers=communicator.headers, retry_non_idempotent=True,
+                )
+                response.raise_for_status()
+                return response.json()
+            except TransportError as e:
+                logger.error(f"{provider}通信失败: {str(e)}")
+                raise CommunicationError(f"无法连接到{provider} API: {str(e)}")
+            except json.JSONDecodeError as e:
+                logger.error(f"{provider}响应解析失败: {str(e)}")
+                raise CommunicationError(f"无法解析{provider}响应: {str(e)}")
+
+
+class StubProviderServer:
+    """
+    本地模型API模拟服务器，按固定延迟返回GPT或Claude格式的响应，用于测试和基准
+    """
+
+    def __init__(self, kind: str, latency: float = 0.2):
+        """
+        初始化模拟服务器
+
+        参数:
+            kind (str): 响应格式，"gpt" 或 "claude"
+            latency (float): 每个请求的模拟延迟(秒)
+        """
+        self.kind = kind
+        self.latency = latency
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with server._lock:
+                    server.requests += 1
+                    server.active += 1
+                    server.max_active = max(server.max_active, server.active)
+                time.sleep(server.latency)
+                with server._lock:
+                    server.active -= 1
+                data = json.dumps(server.respond(body)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """服务器地址"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def respond(self, body: bytes) -> Dict[str, Any]:
+        """按请求内容构建响应，结果中带有请求摘要以便区分"""
+        content = json.dumps({
+            "request": hashlib.sha256(body).hexdigest()[:12],
+            "strategy_selection": ["trend_following"],
+        })
+        if self.kind == "gpt":
+            return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+        return {"content": [{"type": "text", "text": content}]}
+
+    def start(self) -> "StubProviderServer":
+        """在后台线程中启动服务器"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """停止服务器"""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def benchmark_workflows(n_workflows: int = 8, latency: float = 0.2,
+                        concurrency: int = 4) -> Dict[str, Any]:
+    """
+    对比顺序执行和异步流水线执行的工作流吞吐量(使用本地模拟服务器)
+
+    参数:
+        n_workflows (int): 工作流数量，每个交易对一个
+        latency (float): 模拟的模型延迟(秒)
+        concurrency (int): 每个提供方的并发上限
+
+    返回:
+        Dict[str, Any]: 两种方式的耗时和每分钟工作流数
+    """
+    from .communication import ClaudeCommunicator, GptCommunicator
+
+    gpt_server = StubProviderServer("gpt", latency).start()
+    claude_server = StubProviderServer("claude", latency).start()
+    try:
+        manager = CommunicationManager(
+            GptCommunicator("test-key", endpoint=gpt_server.url),
+            ClaudeCommunicator("test-key", endpoint=claude_server.url),
+        )
+        workflows = [
+            {"market_data": {"symbol": f"SYM{i}/USDT", "close": 100.0 + i}, "config": {}}
+            for i in range(n_workflows)
+        ]
+
+        start = time.perf_counter()
+        sequential = [manager.execute_trading_workflow(w["market_data"], w["config"])
+                      for w in workflows]
+        sequential_time = time.perf_counter() - start
+
+        engine = AsyncWorkflowEngine(manager, concurrency, concurrency)
+        start = time.perf_counter()
+        pipelined = engine.run_sync(workflows)
+        pipelined_time = time.perf_counter() - start
+    finally:
+        gpt_server.stop()
+        claude_server.stop()
+
+    return {
+        "workflows": n_workflows,
+        "completed": sum(r["status"] == "completed" for r in pipelined),
+        "sequential_completed": sum(r["status"] == "completed" for r in sequential),
+        "sequential_time": sequential_time,
+        "pipelined_time": pipelined_time,
+        "sequential_per_minute": n_workflows / sequential_time * 60,
+        "pipelined_per_minute": n_workflows / pipelined_time * 60,
+        "speedup": sequential_time / pipelined_time,
+    }
+
+
+if __name__ == "__main__":
+    result = benchmark_workflows()
+    print(f"sequential: {result['sequential_per_minute']:.0f} workflows/min")
+    print(f"pipelined:  {result['pipelined_per_minute']:.0f} workflows/min "
+          f"({result['speedup']:.1f}x)")
@@ -9,10 +9,14 @@
 import json
 import logging
 import time
+import uuid
+from collections import deque
 from typing import Dict, List, Optional, Union, Any
 from abc import ABC, abstractmethod
 import requests
 
+from utils.http_transport import HTTPTransport, TransportError, get_transport
+
 # 配置日志
 logger = logging.getLogger(__name__)
 
@@ -59,7 +63,13 @@ class GptCommunicator(AIComponent):
     GPT通信器，负责与GPT-4o API的通信
     """
 
-    def __init__(self, api_key: str, model: str = "gpt-4o", endpoint: str = None):
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gpt-4o",
+        endpoint: str = None,
+        transport: Optional[HTTPTransport] = None,
+    ):
         """
         初始化GPT通信器
 
@@ -67,15 +77,41 @@ class GptCommunicator(AIComponent):
             api_key (str): GPT API密钥
             model (str): 使用的GPT模型，默认为"gpt-4o"
             endpoint (str, optional): 自定义API端点
+            transport (HTTPTransport, optional): HTTP传输，默认使用进程共享的连接池
         """
         self.api_key = api_key
         self.model = model
         self.endpoint = endpoint or "https://api.openai.com/v1/chat/completions"
-        self.session = requests.Session()
-        self.session.headers.update(
-            {"Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"}
-        )
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        }
+        self.transport = transport or get_transport()
+
+    def build_payload(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        构建GPT API请求数据
+
+        参数:
+            message (Dict[str, Any]): 包含指令和数据的消息
+
+        返回:
+            Dict[str, Any]: 请求数据
+        """
+        return {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": message.get(
+                        "system_prompt", "你是一个量化交易策略决策系统"
+                    ),
+                },
+                {"role": "user", "content": json.dumps(
+                    message.get("content", {}))},
+            ],
+            "temperature": message.get("temperature", 0.2),
+        }
 
     def send_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -92,27 +128,17 @@ class GptCommunicator(AIComponent):
         """
         try:
             # 准备请求数据
-            payload = {
-                "model": self.model,
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": message.get(
-                            "system_prompt", "你是一个量化交易策略决策系统"
-                        ),
-                    },
-                    {"role": "user", "content": json.dumps(
-                        message.get("content", {}))},
-                ],
-                "temperature": message.get("temperature", 0.2),
-            }
+            payload = self.build_payload(message)
 
-            # 发送请求
-            response = self.session.post(self.endpoint, json=payload)
+            # 发送请求(连接池、限速、重试和熔断由传输层处理，推理请求没有副作用，可以安全重试)
+            response = self.transport.post(
+                self.endpoint, provider="gpt", json=payload, headers=self.headers,
+                retry_non_idempotent=True,
+            )
             response.raise_for_status()
 
             return response.json()
-        except requests.RequestException as e:
+        except (requests.RequestException, TransportError) as e:
             logger.error(f"GPT通信失败: {str(e)}")
             raise CommunicationError(f"无法连接到GPT API: {str(e)}")
         except json.JSONDecodeError as e:
@@ -184,6 +210,7 @@ class ClaudeCommunicator(AIComponent):
         api_key: str,
         model: str = "claude-3-sonnet-20240229",
         endpoint: str = None,
+        transport: Optional[HTTPTransport] = None,
     ):
         """
         初始化Claude通信器
@@ -192,18 +219,38 @@ class ClaudeCommunicator(AIComponent):
             api_key (str): Claude API密钥
             model (str): 使用的Claude模型，默认为"claude-3-sonnet-20240229"
             endpoint (str, optional): 自定义API端点
+            transport (HTTPTransport, optional): HTTP传输，默认使用进程共享的连接池
         """
         self.api_key = api_key
         self.model = model
         self.endpoint = endpoint or "https://api.anthropic.com/v1/messages"
-        self.session = requests.Session()
-        self.session.headers.update(
-            {
-                "x-api-key": api_key,
-                "anthropic-version": "2023-06-01",
-                "Content-Type": "application/json",
-            }
-        )
+        self.headers = {
+            "x-api-key": api_key,
+            "anthropic-version": "2023-06-01",
+            "Content-Type": "application/json",
+        }
+        self.transport = transport or get_transport()
+
+    def build_payload(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        构建Claude API请求数据
+
+        参数:
+            message (Dict[str, Any]): 包含指令和数据的消息
+
+        返回:
+            Dict[str, Any]: 请求数据
+        """
+        return {
+            "model": self.model,
+            "system": message.get("system_prompt", "你是一个量化交易策略执行系统"),
+            "messages": [
+                {"role": "user", "content": json.dumps(
+                    message.get("content", {}))}
+            ],
+            "temperature": message.get("temperature", 0.2),
+            "max_tokens": message.get("max_tokens", 4000),
+        }
 
     def send_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -220,23 +267,17 @@ class ClaudeCommunicator(AIComponent):
         """
         try:
             # 准备请求数据
-            payload = {
-                "model": self.model,
-                "system": message.get("system_prompt", "你是一个量化交易策略执行系统"),
-                "messages": [
-                    {"role": "user", "content": json.dumps(
-                        message.get("content", {}))}
-                ],
-                "temperature": message.get("temperature", 0.2),
-                "max_tokens": message.get("max_tokens", 4000),
-            }
+            payload = self.build_payload(message)
 
-            # 发送请求
-            response = self.session.post(self.endpoint, json=payload)
+            # 发送请求(连接池、限速、重试和熔断由传输层处理，推理请求没有副作用，可以安全重试)
+            response = self.transport.post(
+                self.endpoint, provider="claude", json=payload, headers=self.headers,
+                retry_non_idempotent=True,
+            )
             response.raise_for_status()
 
             return response.json()
-        except requests.RequestException as e:
+        except (requests.RequestException, TransportError) as e:
             logger.error(f"Claude通信失败: {str(e)}")
             raise CommunicationError(f"无法连接到Claude API: {str(e)}")
         except json.JSONDecodeError as e:
@@ -301,7 +342,10 @@ class CommunicationManager:
     """
 
     def __init__(
-        self, gpt_communicator: GptCommunicator, claude_communicator: ClaudeCommunicator
+        self,
+        gpt_communicator: GptCommunicator,
+        claude_communicator: ClaudeCommunicator,
+        history_size: int = 1000,
     ):
         """
         初始化通信管理器
@@ -309,10 +353,11 @@ class CommunicationManager:
         参数:
             gpt_communicator (GptCommunicator): GPT通信器实例
             claude_communicator (ClaudeCommunicator): Claude通信器实例
+            history_size (int): 保留的交互历史条数，超出时丢弃最早的记录
         """
         self.gpt = gpt_communicator
         self.claude = claude_communicator
-        self.conversation_history = []
+        self.conversation_history = deque(maxlen=history_size)
 
     def execute_trading_workflow(
         self, market_data: Dict[str, Any], config: Dict[str, Any]
@@ -344,37 +389,93 @@ class CommunicationManager:
             claude_response = self.claude.send_message(claude_message)
             claude_result = self.claude.process_response(claude_response)
 
-            # 5. 保存交互历史
-            interaction = {
-                "timestamp": time.time(),
-                "market_data": market_data,
-                "config": config,
-                "gpt_decision": gpt_result,
-                "claude_execution": claude_result,
-            }
-            self.conversation_history.append(interaction)
-
-            # 6. 返回完整的执行结果
-            return {
-                "workflow_id": f"wf-{int(time.time())}",
-                "timestamp": time.time(),
-                "gpt_decision": gpt_result.get("decision", {}),
-                "claude_execution": claude_result.get("execution", {}),
-                "status": (
-                    "completed"
-                    if "error" not in gpt_result and "error" not in claude_result
-                    else "error"
-                ),
-                "errors": self._collect_errors(gpt_result, claude_result),
-            }
+            # 5. 保存交互历史并返回完整的执行结果
+            return self._complete_workflow(
+                market_data, config, gpt_result, claude_result)
         except Exception as e:
             logger.error(f"交易工作流执行失败: {str(e)}")
-            return {
-                "workflow_id": f"wf-{int(time.time())}",
-                "timestamp": time.time(),
-                "status": "failed",
-                "error": str(e),
-            }
+            return self._failed_workflow(e)
+
+    def execute_trading_workflows(
+        self, workflows: List[Dict[str, Any]], engine=None
+    ) -> List[Dict[str, Any]]:
+        """
+        并发执行多个交易工作流(例如每个交易对一个)，GPT和Claude调用流水线重叠
+
+        参数:
+            workflows (List[Dict[str, Any]]): 工作流列表，每项包含market_data和config
+            engine (AsyncWorkflowEngine, optional): 工作流引擎，默认新建
+
+        返回:
+            List[Dict[str, Any]]: 与输入顺序一致的执行结果
+        """
+        from .async_workflow import AsyncWorkflowEngine
+
+        engine = engine or AsyncWorkflowEngine(self)
+        return engine.run_sync(workflows)
+
+    def _complete_workflow(
+        self,
+        market_data: Dict[str, Any],
+        config: Dict[str, Any],
+        gpt_result: Dict[str, Any],
+        claude_result: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """
+        保存交互历史并构建工作流结果
+
+        参数:
+            market_data (Dict[str, Any]): 市场数据
+            config (Dict[str, Any]): 交易配置
+            gpt_result (Dict[str, Any]): GPT的决策结果
+            claude_result (Dict[str, Any]): Claude的执行结果
+
+        返回:
+            Dict[str, Any]: 执行结果，包含决策和执行细节
+        """
+        interaction = {
+            "timestamp": time.time(),
+            "market_data": market_data,
+            "config": config,
+            "gpt_decision": gpt_result,
+            "claude_execution": claude_result,
+        }
+        self.conversation_history.append(interaction)
+
+        return {
+            "workflow_id": self._new_workflow_id(),
+            "timestamp": time.time(),
+            "gpt_decision": gpt_result.get("decision", {}),
+            "claude_execution": claude_result.get("execution", {}),
+            "status": (
+                "completed"
+                if "error" not in gpt_result and "error" not in claude_result
+                else "error"
+            ),
+            "errors": self._collect_errors(gpt_result, claude_result),
+        }
+
+    def _failed_workflow(self, error: Exception) -> Dict[str, Any]:
+        """
+        构建失败的工作流结果
+
+        参数:
+            error (Exception): 失败原因
+
+        返回:
+            Dict[str, Any]: 失败结果
+        """
+        return {
+            "workflow_id": self._new_workflow_id(),
+            "timestamp": time.time(),
+            "status": "failed",
+            "error": str(error),
+        }
+
+    @staticmethod
+    def _new_workflow_id() -> str:
+        """生成工作流ID，并发执行的工作流在同一秒内也不会重复"""
+        return f"wf-{int(time.time())}-{uuid.uuid4().hex[:8]}"
 
     def _prepare_gpt_message(
         self, market_data: Dict[str, Any], config: Dict[str, Any]
@@ -0,0 +1,299 @@
+"""
+模块名称：feedback_store
+功能描述：基于SQLite的反馈数据存储，按反馈ID、策略ID和时间建立索引，批量写入，
+          支持按策略的时间范围查询，以及从旧的每条反馈一个JSON文件的目录一次性导入
+版本：1.0
+创建日期：2026-10-18
+"""
+
+import atexit
+import glob
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback (
+    feedback_id TEXT PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    updated_at REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_feedback_timestamp ON feedback (timestamp);
+CREATE TABLE IF NOT EXISTS feedback_strategy (
+    strategy_id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    feedback_id TEXT NOT NULL,
+    PRIMARY KEY (strategy_id, timestamp, feedback_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_feedback_strategy_id ON feedback_strategy (feedback_id);
+"""
+
+
+class FeedbackStore:
+    """
+    反馈数据存储
+
+    写入先进入缓冲区，缓冲条数达到batch_size或最早的缓冲数据超过flush_interval秒时
+    (由后台定时器触发，不依赖后续写入)，在一个事务内批量写入；按ID读取时先查缓冲区，
+    范围查询前先写入缓冲区。进程正常退出时自动关闭并写入缓冲区
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 100, flush_interval: float = 1.0):
+        """
+        初始化反馈存储
+
+        参数:
+            db_path (str): SQLite数据库文件路径，":memory:"表示只保存在内存
+            batch_size (int): 缓冲区达到此条数时批量写入
+            flush_interval (float): 缓冲数据最长保留时间(秒)
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        directory = os.path.dirname(db_path)
+        if directory and db_path != ":memory:":
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._last_flush = time.time()
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+        self._closed = False
+        atexit.register(self.close)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self.flush()
+            return self._conn.execute("SELECT COUNT(*) FROM feedback").fetchone()[0]
+
+    def __enter__(self) -> "FeedbackStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def put(self, entry: Dict[str, Any]) -> None:
+        """
+        写入或更新一条反馈
+
+        参数:
+            entry (Dict[str, Any]): 反馈数据，需包含feedback_id和timestamp
+        """
+        with self._lock:
+            self._pending[entry["feedback_id"]] = entry
+            if (
+                len(self._pending) >= self.batch_size
+                or time.time() - self._last_flush >= self.flush_interval
+            ):
+                self.flush()
+            elif self._timer is None:
+                # 缓冲区的第一条数据最多保留flush_interval秒
+                self._timer = threading.Timer(self.flush_interval, self._timed_flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def get(self, feedback_id: str) -> Optional[Dict[str, Any]]:
+        """
+        按ID获取反馈(主键索引查找)
+
+        参数:
+            feedback_id (str): 反馈ID
+
+        返回:
+            Optional[Dict[str, Any]]: 反馈数据，不存在时返回None
+        """
+        with self._lock:
+            entry = self._pending.get(feedback_id)
+            if entry is not None:
+                return entry
+            row = self._conn.execute(
+                "SELECT data FROM feedback WHERE feedback_id = ?", (feedback_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query(
+        self,
+        strategy_id: str,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: Optional[int] = None,
+        newest_first: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """
+        按策略和时间范围查询反馈(策略-时间索引范围扫描)
+
+        参数:
+            strategy_id (str): 策略ID
+            since (float, optional): 起始时间戳(含)
+            until (float, optional): 结束时间戳(不含)
+            limit (int, optional): 返回的最大记录数
+            newest_first (bool): 是否按时间从新到旧排序
+
+        返回:
+            List[Dict[str, Any]]: 反馈数据列表
+        """
+        sql = (
+            "SELECT f.data FROM feedback_strategy s "
+            "JOIN feedback f ON f.feedback_id = s.feedback_id "
+            "WHERE s.strategy_id = ? AND s.timestamp >= ? AND s.timestamp < ? "
+            f"ORDER BY s.timestamp {'DESC' if newest_first else 'ASC'}"
+        )
+        params: List[Any] = [
+            strategy_id,
+            float("-inf") if since is None else since,
+            float("inf") if until is None else until,
+        ]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            self.flush()
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def flush(self) -> int:
+        """
+        把缓冲区的反馈在一个事务内写入数据库
+
+        返回:
+            int: 写入的条数
+        """
+        with self._lock:
+            self._last_flush = time.time()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return 0
+            entries = list(self._pending.values())
+            self._pending.clear()
+            with self._conn:
+                self._write(entries)
+            return len(entries)
+
+    def import_json_dir(self, directory: str, pattern: str = "fb-*.json",
+                        batch_size: int = 1000) -> int:
+        """
+        从每条反馈一个JSON文件的目录一次性导入，已存在的反馈ID不会被覆盖，可重复执行
+
+        参数:
+            directory (str): JSON文件目录
+            pattern (str): 文件名匹配模式
+            batch_size (int): 每个事务导入的文件数
+
+        返回:
+            int: 新导入的条数
+        """
+        self.flush()
+        paths = sorted(glob.glob(os.path.join(directory, pattern)))
+        imported = 0
+        for start in range(0, len(paths), batch_size):
+            entries = []
+            for path in paths[start:start + batch_size]:
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        entries.append(json.load(f))
+                except (OSError, ValueError) as e:
+                    logger.warning(f"跳过无法读取的反馈文件 {path}: {str(e)}")
+            with self._lock, self._conn:
+                imported += self._write(entries, replace=False)
+        logger.info(f"从 {directory} 导入 {imported} 条反馈 ({len(paths)} 个文件)")
+        return imported
+
+    def close(self) -> None:
+        """写入缓冲区并关闭数据库，可重复调用"""
+        with self._lock:
+            if self._closed:
+                return
+            self.flush()
+            self._conn.close()
+            self._closed = True
+        atexit.unregister(self.close)
+
+    def _timed_flush(self) -> None:
+        """定时器回调：写入超过flush_interval秒的缓冲数据"""
+        with self._lock:
+            self._timer = None
+            if self._closed:
+                return
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.error(f"定时写入反馈失败: {str(e)}")
+
+    def _write(self, entries: Iterable[Dict[str, Any]], replace: bool = True) -> int:
+        """
+        写入反馈及其策略索引，调用方负责事务
+
+        参数:
+            entries (Iterable[Dict[str, Any]]): 反馈数据
+            replace (bool): 是否覆盖已存在的反馈ID，为False时跳过已存在的反馈
+
+        返回:
+            int: 写入的反馈条数
+        """
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        written = 0
+        for entry in entries:
+            feedback_id = entry.get("feedback_id")
+            if feedback_id is None:
+                continue
+            timestamp = entry.get("timestamp", 0.0)
+            if replace:
+                self._conn.execute(
+                    "DELETE FROM feedback_strategy WHERE feedback_id = ?", (feedback_id,)
+                )
+            cursor = self._conn.execute(
+                f"{verb} INTO feedback (feedback_id, timestamp, updated_at, data) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    feedback_id,
+                    timestamp,
+                    entry.get("updated_at"),
+                    json.dumps(entry, ensure_ascii=False, default=str),
+                ),
+            )
+            if cursor.rowcount:
+                written += 1
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO feedback_strategy "
+                    "(strategy_id, timestamp, feedback_id) VALUES (?, ?, ?)",
+                    [(sid, timestamp, feedback_id) for sid in entry.get("strategy_ids", [])],
+                )
+        return written
+
+
+def migrate_json_feedback(json_dir: str, db_path: Optional[str] = None) -> int:
+    """
+    把旧的JSON反馈目录导入到SQLite存储
+
+    参数:
+        json_dir (str): 旧的反馈目录(每条反馈一个fb-*.json文件)
+        db_path (str, optional): 数据库路径，默认为目录下的feedback.db
+
+    返回:
+        int: 新导入的条数
+    """
+    with FeedbackStore(db_path or os.path.join(json_dir, "feedback.db")) as store:
+        return store.import_json_dir(json_dir)
+
+
+if __name__ == "__main__":
+    import sys
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "data/feedback"
+    target = sys.argv[2] if len(sys.argv) > 2 else None
+    print(f"imported {migrate_json_feedback(source, target)} feedback entries")
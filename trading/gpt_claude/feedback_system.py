@@ -8,12 +8,17 @@
 
 import json
 import logging
+import os
 import time
-from typing import Dict, List, Optional, Union, Any
+import uuid
+from typing import Callable, Dict, List, Optional, Union, Any
 from datetime import datetime, timedelta
 import config.paths as pd
 import modules.nlp as np
 
+from .feedback_store import FeedbackStore
+from .rolling_stats import RollingStatsEngine
+
 # 配置日志
 logger = logging.getLogger(__name__)
 
@@ -23,15 +28,32 @@ class FeedbackCollector:
     反馈收集器，收集和存储策略执行的反馈数据
     """
 
-    def __init__(self, storage_path: str = None):
+    def __init__(self, storage_path: str = None, store: Optional[FeedbackStore] = None):
         """
         初始化反馈收集器
 
         参数:
-            storage_path (str, optional): 反馈数据存储路径
+            storage_path (str, optional): 反馈数据存储路径，数据库为其中的feedback.db
+            store (FeedbackStore, optional): 反馈存储，默认在storage_path下创建，由收集器负责关闭
         """
         self.storage_path = storage_path or "data/feedback"
-        self.feedback_data = []
+        self._owns_store = store is None
+        # 空的FeedbackStore长度为0，不能用 or 判断是否传入
+        self.store = (
+            store
+            if store is not None
+            else FeedbackStore(os.path.join(self.storage_path, "feedback.db"))
+        )
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+    def add_listener(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        注册性能反馈监听器，每条反馈第一次收到性能数据时调用
+
+        参数:
+            callback (Callable[[Dict[str, Any]], None]): 以反馈数据为参数的回调
+        """
+        self._listeners.append(callback)
 
     def add_execution_feedback(
         self, execution_result: Dict[str, Any], market_data: Dict[str, Any]
@@ -46,7 +68,7 @@ class FeedbackCollector:
         返回:
             str: 反馈ID
         """
-        feedback_id = f"fb-{int(time.time())}-{len(self.feedback_data)}"
+        feedback_id = f"fb-{int(time.time())}-{uuid.uuid4().hex[:8]}"
 
         feedback_entry = {
             "feedback_id": feedback_id,
@@ -57,7 +79,6 @@ class FeedbackCollector:
             "strategy_ids": self._extract_strategy_ids(execution_result),
         }
 
-        self.feedback_data.append(feedback_entry)
         self._save_feedback(feedback_entry)
 
         return feedback_id
@@ -72,15 +93,20 @@ class FeedbackCollector:
             feedback_id (str): 反馈ID
             performance_data (Dict[str, Any]): 性能数据
         """
-        for entry in self.feedback_data:
-            if entry["feedback_id"] == feedback_id:
-                entry["performance_data"] = performance_data
-                entry["updated_at"] = time.time()
-                self._save_feedback(entry)
-                logger.info(f"已添加性能反馈数据到 {feedback_id}")
-                break
-        else:
+        entry = self.store.get(feedback_id)
+        if entry is None:
             logger.warning(f"无法找到反馈ID: {feedback_id}")
+            return
+
+        first_report = "performance_data" not in entry
+        entry["performance_data"] = performance_data
+        entry["updated_at"] = time.time()
+        self._save_feedback(entry)
+        logger.info(f"已添加性能反馈数据到 {feedback_id}")
+
+        if first_report:
+            for callback in self._listeners:
+                callback(entry)
 
     def get_feedback(self, feedback_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -92,48 +118,61 @@ class FeedbackCollector:
         返回:
             Optional[Dict[str, Any]]: 反馈数据，如果不存在则返回None
         """
-        for entry in self.feedback_data:
-            if entry["feedback_id"] == feedback_id:
-                return entry
-
-        # 尝试从存储中加载
         try:
-            import os
-            import json
-
-            file_path = os.path.join(self.storage_path, f"{feedback_id}.json")
-            if os.path.exists(file_path):
-                with open(file_path, "r", encoding="utf-8") as f:
-                    return json.load(f)
+            return self.store.get(feedback_id)
         except Exception as e:
             logger.error(f"加载反馈数据失败: {str(e)}")
-
-        return None
+            return None
 
     def get_strategy_feedback(
-        self, strategy_id: str, limit: int = 10
+        self,
+        strategy_id: str,
+        limit: int = 10,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
     ) -> List[Dict[str, Any]]:
         """
-        获取指定策略的反馈数据
+        获取指定策略的反馈数据，按时间从新到旧排列
 
         参数:
             strategy_id (str): 策略ID
             limit (int): 返回的最大记录数，默认为10
+            since (float, optional): 起始时间戳(含)
+            until (float, optional): 结束时间戳(不含)
 
         返回:
             List[Dict[str, Any]]: 反馈数据列表
         """
-        results = []
+        return self.store.query(strategy_id, since=since, until=until, limit=limit)
+
+    def migrate_json_files(self, json_dir: str = None) -> int:
+        """
+        把旧版本每条反馈一个JSON文件的数据导入反馈存储，可重复执行
+
+        参数:
+            json_dir (str, optional): JSON文件目录，默认为storage_path
+
+        返回:
+            int: 新导入的条数
+        """
+        return self.store.import_json_dir(json_dir or self.storage_path)
+
+    def flush(self) -> None:
+        """把缓冲的反馈写入存储"""
+        self.store.flush()
+
+    def close(self) -> None:
+        """写入缓冲的反馈；存储由收集器创建时一并关闭"""
+        if self._owns_store:
+            self.store.close()
+        else:
+            self.store.flush()
 
-        for entry in sorted(
-            self.feedback_data, key=lambda x: x["timestamp"], reverse=True
-        ):
-            if strategy_id in entry.get("strategy_ids", []):
-                results.append(entry)
-                if len(results) >= limit:
-                    break
+    def __enter__(self) -> "FeedbackCollector":
+        return self
 
-        return results
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
     def _extract_strategy_ids(self, execution_result: Dict[str, Any]) -> List[str]:
         """
@@ -161,26 +200,13 @@ class FeedbackCollector:
 
     def _save_feedback(self, feedback_entry: Dict[str, Any]) -> None:
         """
-        保存反馈数据到存储
+        保存反馈数据到存储(批量写入)
 
         参数:
             feedback_entry (Dict[str, Any]): 反馈数据条目
         """
         try:
-            import os
-            import json
-
-            # 确保存储目录存在
-            os.makedirs(self.storage_path, exist_ok=True)
-
-            # 保存反馈数据
-            file_path = os.path.join(
-                self.storage_path, f"{feedback_entry['feedback_id']}.json"
-            )
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(feedback_entry, f, ensure_ascii=False, indent=2)
-
-            logger.info(f"反馈数据已保存到 {file_path}")
+            self.store.put(feedback_entry)
         except Exception as e:
             logger.error(f"保存反馈数据失败: {str(e)}")
 
@@ -390,14 +416,17 @@ class FeedbackAnalyzer:
     反馈分析器，分析策略执行反馈并生成改进建议
     """
 
-    def __init__(self, feedback_collector: FeedbackCollector):
+    def __init__(self, feedback_collector: FeedbackCollector, rolling_window: int = 100):
         """
         初始化反馈分析器
 
         参数:
             feedback_collector (FeedbackCollector): 反馈收集器实例
+            rolling_window (int): 每个策略参与统计的最近反馈条数
         """
         self.feedback_collector = feedback_collector
+        self.rolling_stats = RollingStatsEngine(window=rolling_window)
+        feedback_collector.add_listener(self._on_performance_feedback)
 
     def analyze_strategy_performance(
         self, strategy_id: str, lookback_days: int = 7
@@ -412,29 +441,56 @@ class FeedbackAnalyzer:
         返回:
             Dict[str, Any]: 策略表现分析结果
         """
-        # 获取策略的历史反馈数据
-        feedback_data = self.feedback_collector.get_strategy_feedback(
-            strategy_id, limit=100
-        )
+        self._ensure_loaded(strategy_id)
+        cutoff_time = time.time() - (lookback_days * 86400)
+        stats = self.rolling_stats.stats(strategy_id, since=cutoff_time)
+        return self._build_analysis(strategy_id, lookback_days, stats)
 
-        # 如果没有反馈数据，返回空结果
-        if not feedback_data:
-            return {
-                "strategy_id": strategy_id,
-                "timestamp": time.time(),
-                "status": "no_data",
-                "message": f"没有找到策略 {strategy_id} 的反馈数据",
-            }
+    def analyze_all_strategies(
+        self, strategy_ids: Optional[List[str]] = None, lookback_days: int = 7
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        在一次向量化计算中分析多个策略的历史表现
+
+        参数:
+            strategy_ids (List[str], optional): 策略ID列表，默认为所有已有统计的策略
+            lookback_days (int): 回溯天数，默认为7
 
-        # 过滤最近N天的数据
+        返回:
+            Dict[str, Dict[str, Any]]: 策略ID -> 与analyze_strategy_performance相同格式的结果
+        """
+        for strategy_id in strategy_ids or []:
+            self._ensure_loaded(strategy_id)
         cutoff_time = time.time() - (lookback_days * 86400)
-        recent_feedback = [
-            fb
-            for fb in feedback_data
-            if fb["timestamp"] >= cutoff_time and "performance_data" in fb
-        ]
+        summary = self.rolling_stats.summary(strategy_ids, since=cutoff_time)
+        return {
+            strategy_id: self._build_analysis(strategy_id, lookback_days, stats)
+            for strategy_id, stats in summary.items()
+        }
 
-        if not recent_feedback:
+    def _build_analysis(
+        self, strategy_id: str, lookback_days: int, stats: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        由滚动统计构建分析结果
+
+        参数:
+            strategy_id (str): 策略ID
+            lookback_days (int): 回溯天数
+            stats (Dict[str, Any]): RollingStatsEngine的统计
+
+        返回:
+            Dict[str, Any]: 策略表现分析结果
+        """
+        if not stats["count"]:
+            # 区分完全没有反馈和最近没有性能数据
+            if not self.feedback_collector.get_strategy_feedback(strategy_id, limit=1):
+                return {
+                    "strategy_id": strategy_id,
+                    "timestamp": time.time(),
+                    "status": "no_data",
+                    "message": f"没有找到策略 {strategy_id} 的反馈数据",
+                }
             return {
                 "strategy_id": strategy_id,
                 "timestamp": time.time(),
@@ -443,42 +499,31 @@ class FeedbackAnalyzer:
             }
 
         try:
-            # 提取性能指标
-            quality_scores = [
-                fb["performance_data"].get("quality_score", 0) for fb in recent_feedback
-            ]
-            success_rates = [
-                fb["performance_data"].get("success_rate", 0) for fb in recent_feedback
-            ]
-            execution_times = [
-                fb["performance_data"].get("execution_time", 0)
-                for fb in recent_feedback
-            ]
-
-            # 计算统计数据
-            avg_quality = sum(quality_scores) / len(quality_scores)
-            avg_success_rate = sum(success_rates) / len(success_rates)
-            avg_execution_time = sum(execution_times) / len(execution_times)
+            quality = stats["metrics"]["quality_score"]
+            success_rate = stats["metrics"]["success_rate"]
+            execution_time = stats["metrics"]["execution_time"]
 
             # 评估性能趋势
-            trend = self._evaluate_trend(quality_scores)
+            trend = self._evaluate_trend(quality["slope"])
 
             # 生成改进建议
             improvement_suggestions = self._generate_improvement_suggestions(
-                avg_quality, avg_success_rate, recent_feedback
+                quality["mean"], success_rate["mean"], stats["errors"]
             )
 
             return {
                 "strategy_id": strategy_id,
                 "timestamp": time.time(),
                 "analysis_period": f"{lookback_days} days",
-                "execution_count": len(recent_feedback),
+                "execution_count": stats["count"],
                 "performance_stats": {
-                    "avg_quality_score": round(avg_quality, 2),
-                    "avg_success_rate": round(avg_success_rate, 4),
-                    "avg_execution_time": round(avg_execution_time, 4),
-                    "min_quality_score": min(quality_scores),
-                    "max_quality_score": max(quality_scores),
+                    "avg_quality_score": round(quality["mean"], 2),
+                    "avg_success_rate": round(success_rate["mean"], 4),
+                    "avg_execution_time": round(execution_time["mean"], 4),
+                    "min_quality_score": quality["min"],
+                    "max_quality_score": quality["max"],
+                    "ewma_quality_score": round(quality["ewma"], 2),
+                    "quality_trend_slope": quality["slope"],
                 },
                 "trend": trend,
                 "improvement_suggestions": improvement_suggestions,
@@ -492,6 +537,60 @@ class FeedbackAnalyzer:
                 "message": f"分析失败: {str(e)}",
             }
 
+    def _ensure_loaded(self, strategy_id: str) -> bool:
+        """
+        第一次分析某个策略时，从反馈存储加载它最近的性能反馈到滚动统计
+
+        参数:
+            strategy_id (str): 策略ID
+
+        返回:
+            bool: 这次是否进行了加载
+        """
+        if strategy_id in self.rolling_stats:
+            return False
+        history = self.feedback_collector.get_strategy_feedback(
+            strategy_id, limit=self.rolling_stats.window
+        )
+        self.rolling_stats.ensure(strategy_id)
+        for fb in reversed(history):
+            if "performance_data" in fb:
+                self._record(strategy_id, fb)
+        return True
+
+    def _on_performance_feedback(self, feedback_entry: Dict[str, Any]) -> None:
+        """收到性能反馈时增量更新相关策略的滚动统计"""
+        for strategy_id in feedback_entry.get("strategy_ids", []):
+            # 首次加载时已经包含这条反馈
+            if not self._ensure_loaded(strategy_id):
+                self._record(strategy_id, feedback_entry)
+
+    def _record(self, strategy_id: str, feedback_entry: Dict[str, Any]) -> None:
+        self.rolling_stats.update(
+            strategy_id,
+            feedback_entry["timestamp"],
+            feedback_entry["performance_data"],
+            self._execution_errors(feedback_entry),
+        )
+
+    @staticmethod
+    def _execution_errors(feedback_entry: Dict[str, Any]) -> List[str]:
+        """
+        提取一条反馈中的执行警告和失败操作的错误
+
+        参数:
+            feedback_entry (Dict[str, Any]): 反馈数据
+
+        返回:
+            List[str]: 警告和错误信息
+        """
+        execution = feedback_entry.get("execution_result", {})
+        errors = list(execution.get("warnings", []))
+        for op in execution.get("execution_details", {}).get("operations", []):
+            if op.get("status") != "success" and "error" in op:
+                errors.append(op["error"])
+        return errors
+
     def generate_learning_feedback(self, strategy_id: str) -> Dict[str, Any]:
         """
         生成学习反馈，用于策略的自我改进
@@ -603,51 +702,35 @@ class FeedbackAnalyzer:
                 "status": "error",
             }
 
-    def _evaluate_trend(self, quality_scores: List[float]) -> str:
+    def _evaluate_trend(self, slope: Optional[float]) -> str:
         """
         评估性能趋势
 
         参数:
-            quality_scores (List[float]): 质量评分列表
+            slope (Optional[float]): 质量评分按反馈先后的线性趋势斜率，由滚动统计增量维护
 
         返回:
             str: 趋势评估结果
         """
-        if len(quality_scores) < 2:
+        if slope is None:
             return "insufficient_data"
 
-        # 简单线性趋势
-        x = list(range(len(quality_scores)))
-        y = quality_scores
-
-        if len(x) == len(y) and len(x) > 1:
-            n = len(x)
-            xy = sum(x[i] * y[i] for i in range(n))
-            x_sum = sum(x)
-            y_sum = sum(y)
-            x_squared = sum(xi * xi for xi in x)
-
-            slope = (n * xy - x_sum * y_sum) / (n * x_squared - x_sum * x_sum)
-
-            # 评估趋势
-            if slope > 0.5:
-                return "strongly_improving"
-            elif slope > 0.1:
-                return "improving"
-            elif slope < -0.5:
-                return "strongly_declining"
-            elif slope < -0.1:
-                return "declining"
-            else:
-                return "stable"
+        if slope > 0.5:
+            return "strongly_improving"
+        elif slope > 0.1:
+            return "improving"
+        elif slope < -0.5:
+            return "strongly_declining"
+        elif slope < -0.1:
+            return "declining"
         else:
-            return "error"
+            return "stable"
 
     def _generate_improvement_suggestions(
         self,
         avg_quality: float,
         avg_success_rate: float,
-        feedback_data: List[Dict[str, Any]],
+        error_counts: Dict[str, int],
     ) -> List[Dict[str, Any]]:
         """
         生成改进建议
@@ -655,7 +738,7 @@ class FeedbackAnalyzer:
         参数:
             avg_quality (float): 平均质量评分
             avg_success_rate (float): 平均成功率
-            feedback_data (List[Dict[str, Any]]): 反馈数据列表
+            error_counts (Dict[str, int]): 窗口内各执行警告和错误的出现次数
 
         返回:
             List[Dict[str, Any]]: 改进建议列表
@@ -680,18 +763,6 @@ class FeedbackAnalyzer:
                 }
             )
 
-        # 分析常见的执行问题
-        error_counts = {}
-        for fb in feedback_data:
-            execution = fb.get("execution_result", {})
-            for warning in execution.get("warnings", []):
-                error_counts[warning] = error_counts.get(warning, 0) + 1
-
-            for op in execution.get("execution_details", {}).get("operations", []):
-                if op.get("status") != "success" and "error" in op:
-                    error_counts[op["error"]] = error_counts.get(
-                        op["error"], 0) + 1
-
         # 找出最常见的错误
         if error_counts:
             common_errors = sorted(
@@ -9,9 +9,11 @@ import json
 import asyncio
 import logging
 import time
-import aiohttp
 from typing import Dict, Any, Optional, List, Tuple
 
+from utils.http_transport import AsyncHTTPTransport, RetryPolicy, TransportError
+from utils.response_cache import ResponseCache
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -32,6 +34,36 @@ BRIDGE_STATUS = {
     "active_requests": {},
 }
 
+# 模型响应缓存，initialize_bridge时按配置中的response_cache项重建
+RESPONSE_CACHE = ResponseCache()
+
+
+def _build_transport(config: Optional[Dict[str, Any]] = None) -> AsyncHTTPTransport:
+    """
+    按配置创建模型请求共用的异步传输(连接池、限速、重试、熔断)
+
+    Args:
+        config (Optional[Dict[str, Any]]): 桥接配置，transport项为AsyncHTTPTransport的参数
+
+    Returns:
+        AsyncHTTPTransport: 异步传输
+    """
+    config = config or {}
+    options = dict(config.get("transport", {}))
+    options.setdefault("timeout", config.get("timeout", DEFAULT_TIMEOUT))
+    options.setdefault(
+        "retry",
+        RetryPolicy(
+            max_retries=config.get("retry_count", MAX_RETRY_COUNT) - 1,
+            base_delay=RETRY_DELAY,
+        ),
+    )
+    return AsyncHTTPTransport(**options)
+
+
+# 模型请求共用的异步传输，initialize_bridge时按配置重建
+HTTP_TRANSPORT = _build_transport()
+
 
 class ModelConnectionError(Exception):
     """模型连接异常"""
@@ -61,30 +93,31 @@ async def _connect_to_model(model_type: str, api_key: str, endpoint: str) -> Dic
         ModelConnectionError: 连接失败时抛出
     """
     try:
-        # 创建会话并验证连接
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            }
-            async with session.post(
-                endpoint,
-                headers=headers,
-                json={"type": "connection_test"},
-                timeout=DEFAULT_TIMEOUT,
-            ) as response:
-                if response.status != 200:
-                    raise ModelConnectionError(
-                        f"Failed to connect to {model_type}. Status: {response.status}"
-                    )
-
-                return {
-                    "session": aiohttp.ClientSession(),
-                    "headers": headers,
-                    "endpoint": endpoint,
-                    "model_type": model_type,
-                    "status": "connected",
-                }
+        # 验证连接，连接本身由共用的传输层连接池保持
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        }
+        response = await HTTP_TRANSPORT.request(
+            "POST",
+            endpoint,
+            provider=model_type,
+            headers=headers,
+            json={"type": "connection_test"},
+            timeout=DEFAULT_TIMEOUT,
+            retry=False,
+        )
+        if response.status != 200:
+            raise ModelConnectionError(
+                f"Failed to connect to {model_type}. Status: {response.status}"
+            )
+
+        return {
+            "headers": headers,
+            "endpoint": endpoint,
+            "model_type": model_type,
+            "status": "connected",
+        }
     except Exception as e:
         logger.error(f"Error connecting to {model_type}: {str(e)}")
         raise ModelConnectionError(
@@ -101,7 +134,7 @@ def initialize_bridge(config: Optional[Dict[str, Any]] = None) -> bool:
     Returns:
         bool: 初始化是否成功
     """
-    global BRIDGE_STATUS
+    global BRIDGE_STATUS, RESPONSE_CACHE, HTTP_TRANSPORT
 
     if config is None:
         # 使用默认配置
@@ -131,6 +164,10 @@ def initialize_bridge(config: Optional[Dict[str, Any]] = None) -> bool:
             "CLAUDE_API_KEY", config["claude"]["api_key"]
         )
 
+        if "response_cache" in config:
+            RESPONSE_CACHE = ResponseCache(**config["response_cache"])
+        HTTP_TRANSPORT = _build_transport(config)
+
         # 异步初始化连接
         loop = asyncio.get_event_loop()
         gpt_connection, claude_connection = loop.run_until_complete(
@@ -175,7 +212,6 @@ async def _send_request_to_model(
     Returns:
         Dict[str, Any]: 模型响应
     """
-    session = model_connection["session"]
     headers = model_connection["headers"]
     endpoint = model_connection["endpoint"]
     model_type = model_connection["model_type"]
@@ -198,33 +234,35 @@ async def _send_request_to_model(
             "max_tokens": payload.get("max_tokens", 4000),
         }
 
-    # 发送请求并处理重试
-    retry_count = 0
-    while retry_count < MAX_RETRY_COUNT:
-        try:
-            async with session.post(
-                endpoint, headers=headers, json=request_payload, timeout=timeout
-            ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    logger.error(f"Error from {model_type}: {error_text}")
-                    raise Exception(
-                        f"Failed request to {model_type}. Status: {response.status}"
-                    )
-
-                return await response.json()
-
-        except Exception as e:
-            retry_count += 1
-            logger.warning(
-                f"Retry {retry_count}/{MAX_RETRY_COUNT} for {model_type}: {str(e)}"
-            )
+    # 相同的请求(规范化后的消息和模型参数)直接返回缓存的响应
+    cache_context = {key: value for key, value in request_payload.items() if key != "messages"}
+    cached = RESPONSE_CACHE.get(request_payload["messages"], cache_context)
+    if cached is not None:
+        return cached
 
-            if retry_count >= MAX_RETRY_COUNT:
-                raise Exception(
-                    f"Max retries reached for {model_type}: {str(e)}")
+    # 发送请求，限速、带抖动的指数退避重试和熔断由传输层处理；推理请求没有副作用，可以安全重试
+    try:
+        response = await HTTP_TRANSPORT.request(
+            "POST",
+            endpoint,
+            provider=model_type,
+            headers=headers,
+            json=request_payload,
+            timeout=timeout,
+            retry_non_idempotent=True,
+        )
+    except TransportError as e:
+        raise ModelConnectionError(f"Failed request to {model_type}: {str(e)}")
+
+    if response.status != 200:
+        logger.error(f"Error from {model_type}: {response.text()}")
+        raise ModelConnectionError(
+            f"Failed request to {model_type}. Status: {response.status}"
+        )
 
-            await asyncio.sleep(RETRY_DELAY * retry_count)  # 指数级退避
+    result = response.json()
+    RESPONSE_CACHE.set(request_payload["messages"], result, cache_context)
+    return result
 
 
 def _validate_strategy_structure(
@@ -559,17 +597,9 @@ def close_bridge() -> bool:
         return True
 
     try:
-        # 关闭会话
-        for connection_name in ["gpt_connection", "claude_connection"]:
-            if (
-                BRIDGE_STATUS[connection_name]
-                and "session" in BRIDGE_STATUS[connection_name]
-            ):
-                session = BRIDGE_STATUS[connection_name]["session"]
-
-                # 异步关闭会话
-                loop = asyncio.get_event_loop()
-                loop.run_until_complete(session.close())
+        # 关闭传输层的连接池
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(HTTP_TRANSPORT.close())
 
         # 重置状态
         BRIDGE_STATUS = {
@@ -595,7 +625,7 @@ def get_bridge_status() -> Dict[str, Any]:
     获取桥接状态
 
     Returns:
-        Dict[str, Any]: 桥接状态信息
+        Dict[str, Any]: 桥接状态信息，包含响应缓存统计(hit_rate为命中率)
     """
     status_copy = BRIDGE_STATUS.copy()
 
@@ -617,4 +647,10 @@ def get_bridge_status() -> Dict[str, Any]:
         ):
             status_copy["config"]["claude"]["api_key"] = "**REDACTED**"
 
+    # 响应缓存命中率
+    status_copy["response_cache"] = RESPONSE_CACHE.get_stats()
+
+    # 传输层统计：重试、熔断器状态和各端点的延迟直方图
+    status_copy["transport"] = HTTP_TRANSPORT.get_stats()
+
     return status_copy
\ No newline at end of file
@@ -0,0 +1,298 @@
+"""
+模块名称：rolling_stats
+功能描述：按策略的滚动窗口统计引擎。每个策略的最近N条性能反馈保存在NumPy环形数组中，
+          均值、EWMA和线性趋势斜率随反馈到达增量更新，单个策略的查询为O(1)；
+          批量接口在一次向量化计算中分析所有策略
+版本：1.0
+创建日期：2026-10-18
+"""
+
+import threading
+from collections import Counter, deque
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+# 默认统计的性能指标
+DEFAULT_METRICS = ("quality_score", "success_rate", "execution_time")
+
+
+class RollingStatsEngine:
+    """
+    按策略的滚动统计引擎
+
+    每个策略占用环形数组的一行，保存最近window条反馈的各项指标和时间戳；
+    同时维护窗口内的累加和与位置加权和，用于O(1)计算均值和最小二乘斜率
+    """
+
+    def __init__(
+        self,
+        window: int = 100,
+        metrics: Sequence[str] = DEFAULT_METRICS,
+        alpha: float = 0.2,
+        capacity: int = 64,
+    ):
+        """
+        初始化统计引擎
+
+        参数:
+            window (int): 每个策略保留的反馈条数
+            metrics (Sequence[str]): 统计的指标名称
+            alpha (float): EWMA平滑系数，越大越偏重最近的反馈
+            capacity (int): 初始策略容量，不足时翻倍扩容
+        """
+        self.window = window
+        self.metrics = tuple(metrics)
+        self.alpha = alpha
+
+        self._index: Dict[str, int] = {}
+        self._ids: List[str] = []
+        n_metrics = len(self.metrics)
+        self._values = np.full((capacity, n_metrics, window), np.nan)
+        self._times = np.full((capacity, window), np.nan)
+        self._count = np.zeros(capacity, dtype=np.int64)
+        self._head = np.zeros(capacity, dtype=np.int64)
+        self._sum = np.zeros((capacity, n_metrics))
+        # 窗口内按位置(最旧为0)加权的和，用于计算斜率
+        self._sxy = np.zeros((capacity, n_metrics))
+        self._ewma = np.full((capacity, n_metrics), np.nan)
+        self._updates = np.zeros(capacity, dtype=np.int64)
+
+        # 每条反馈的执行错误，与环形数组同步进出窗口
+        self._errors: Dict[str, deque] = {}
+        self._error_counts: Dict[str, Counter] = {}
+        self._lock = threading.RLock()
+
+    def __contains__(self, strategy_id: str) -> bool:
+        return strategy_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def strategy_ids(self) -> List[str]:
+        """已有统计的策略ID"""
+        return list(self._ids)
+
+    def ensure(self, strategy_id: str) -> int:
+        """
+        为策略分配一行，已存在时直接返回
+
+        参数:
+            strategy_id (str): 策略ID
+
+        返回:
+            int: 行号
+        """
+        with self._lock:
+            row = self._index.get(strategy_id)
+            if row is not None:
+                return row
+            row = len(self._ids)
+            if row >= self._count.shape[0]:
+                self._grow()
+            self._index[strategy_id] = row
+            self._ids.append(strategy_id)
+            self._errors[strategy_id] = deque()
+            self._error_counts[strategy_id] = Counter()
+            return row
+
+    def update(
+        self,
+        strategy_id: str,
+        timestamp: float,
+        values: Mapping[str, float],
+        errors: Iterable[str] = (),
+    ) -> None:
+        """
+        加入一条反馈，窗口已满时替换最旧的一条
+
+        参数:
+            strategy_id (str): 策略ID
+            timestamp (float): 反馈时间戳
+            values (Mapping[str, float]): 指标值，缺少的指标记为0
+            errors (Iterable[str]): 这次执行的错误和警告
+        """
+        y = np.array([float(values.get(name, 0) or 0) for name in self.metrics])
+        with self._lock:
+            row = self.ensure(strategy_id)
+            n, head = self._count[row], self._head[row]
+            if n < self.window:
+                self._sxy[row] += n * y
+                self._sum[row] += y
+                self._count[row] = n + 1
+            else:
+                oldest = self._values[row, :, head]
+                # 所有位置前移一位，最旧的一条移出，新的一条放在最后
+                self._sxy[row] += (n - 1) * y - (self._sum[row] - oldest)
+                self._sum[row] += y - oldest
+            self._values[row, :, head] = y
+            self._times[row, head] = timestamp
+            self._head[row] = (head + 1) % self.window
+
+            ewma = self._ewma[row]
+            self._ewma[row] = np.where(np.isnan(ewma), y, self.alpha * y + (1 - self.alpha) * ewma)
+
+            # 定期按环形数组重算累加和，消除浮点累积误差
+            self._updates[row] += 1
+            if self._updates[row] % self.window == 0:
+                self._resync(row)
+
+            errors = tuple(errors)
+            log = self._errors[strategy_id]
+            if len(log) >= self.window:
+                _, expired = log.popleft()
+                self._error_counts[strategy_id].subtract(expired)
+            log.append((timestamp, errors))
+            self._error_counts[strategy_id].update(errors)
+
+    def stats(self, strategy_id: str, since: Optional[float] = None) -> Dict[str, Any]:
+        """
+        获取一个策略的窗口统计
+
+        窗口内的反馈都不早于since时，均值、EWMA和斜率直接由增量维护的值得出(O(1))；
+        否则只统计不早于since的反馈
+
+        参数:
+            strategy_id (str): 策略ID
+            since (float, optional): 只统计此时间之后的反馈
+
+        返回:
+            Dict[str, Any]: count、各指标的mean/min/max/ewma/slope，以及errors错误计数
+        """
+        with self._lock:
+            row = self._index.get(strategy_id)
+            if row is None:
+                return self._empty()
+            n = int(self._count[row])
+            times = self._times[row]
+            if n and since is not None and np.nanmin(times) < since:
+                return self.summary([strategy_id], since)[strategy_id]
+            if not n:
+                return self._empty()
+
+            slopes = self._slope(n, self._sum[row], self._sxy[row])
+            values = self._values[row, :, :n] if n < self.window else self._values[row]
+            metrics = {
+                name: {
+                    "mean": float(self._sum[row, i] / n),
+                    "min": float(values[i].min()),
+                    "max": float(values[i].max()),
+                    "ewma": float(self._ewma[row, i]),
+                    "slope": slopes[i],
+                }
+                for i, name in enumerate(self.metrics)
+            }
+            return {"count": n, "metrics": metrics,
+                    "errors": +self._error_counts[strategy_id]}
+
+    def summary(
+        self, strategy_ids: Optional[Iterable[str]] = None, since: Optional[float] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        在一次向量化计算中统计多个策略
+
+        参数:
+            strategy_ids (Iterable[str], optional): 策略ID，默认为所有策略
+            since (float, optional): 只统计此时间之后的反馈
+
+        返回:
+            Dict[str, Dict[str, Any]]: 策略ID -> 与stats相同格式的统计
+        """
+        with self._lock:
+            ids = self.strategy_ids if strategy_ids is None else list(strategy_ids)
+            known = [sid for sid in ids if sid in self._index]
+            results = {sid: self._empty() for sid in ids if sid not in self._index}
+            if not known:
+                return results
+
+            rows = np.array([self._index[sid] for sid in known])
+            values = self._values[rows]
+            times = self._times[rows]
+            ewma = self._ewma[rows].copy()
+            full = self._count[rows] == self.window
+            start = np.where(full, self._head[rows], 0)
+            error_logs = {sid: list(self._errors[sid]) for sid in known}
+
+        mask = ~np.isnan(times)
+        if since is not None:
+            mask &= times >= since
+        count = mask.sum(axis=1)
+        mask3 = mask[:, None, :]
+
+        # 最旧的反馈位置为0，斜率对位置的平移不敏感，窗口内被since排除的总是最旧的反馈
+        positions = (np.arange(self.window)[None, :] - start[:, None]) % self.window
+        x = np.where(mask, positions, 0).astype(float)
+        y = np.where(mask3, values, 0.0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sums = y.sum(axis=2)
+            means = sums / count[:, None]
+            mins = np.where(mask3, values, np.inf).min(axis=2)
+            maxs = np.where(mask3, values, -np.inf).max(axis=2)
+            sx = x.sum(axis=1)
+            sxx = (x * x).sum(axis=1)
+            sxy = (y * x[:, None, :]).sum(axis=2)
+            denom = count * sxx - sx * sx
+            slopes = (count[:, None] * sxy - sx[:, None] * sums) / denom[:, None]
+            slopes = np.where((count >= 2)[:, None] & (denom > 0)[:, None], slopes, np.nan)
+
+        for i, sid in enumerate(known):
+            if not count[i]:
+                results[sid] = self._empty()
+                continue
+            errors = Counter()
+            for timestamp, entry_errors in error_logs[sid]:
+                if since is None or timestamp >= since:
+                    errors.update(entry_errors)
+            results[sid] = {
+                "count": int(count[i]),
+                "metrics": {
+                    name: {
+                        "mean": float(means[i, j]),
+                        "min": float(mins[i, j]),
+                        "max": float(maxs[i, j]),
+                        "ewma": float(ewma[i, j]),
+                        "slope": None if np.isnan(slopes[i, j]) else float(slopes[i, j]),
+                    }
+                    for j, name in enumerate(self.metrics)
+                },
+                "errors": errors,
+            }
+        return results
+
+    def _slope(self, n: int, sums: np.ndarray, sxy: np.ndarray) -> List[Optional[float]]:
+        """按位置0..n-1的最小二乘斜率"""
+        if n < 2:
+            return [None] * len(self.metrics)
+        sx = n * (n - 1) / 2.0
+        sxx = (n - 1) * n * (2 * n - 1) / 6.0
+        denom = n * sxx - sx * sx
+        return [float(v) for v in (n * sxy - sx * sums) / denom]
+
+    def _resync(self, row: int) -> None:
+        n = int(self._count[row])
+        start = self._head[row] if n == self.window else 0
+        ordered = np.roll(self._values[row], -start, axis=1)[:, :n]
+        self._sum[row] = ordered.sum(axis=1)
+        self._sxy[row] = (ordered * np.arange(n)).sum(axis=1)
+
+    def _grow(self) -> None:
+        capacity = self._count.shape[0] * 2
+
+        def grown(array, fill):
+            result = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+            result[: array.shape[0]] = array
+            return result
+
+        self._values = grown(self._values, np.nan)
+        self._times = grown(self._times, np.nan)
+        self._count = grown(self._count, 0)
+        self._head = grown(self._head, 0)
+        self._sum = grown(self._sum, 0.0)
+        self._sxy = grown(self._sxy, 0.0)
+        self._ewma = grown(self._ewma, np.nan)
+        self._updates = grown(self._updates, 0)
+
+    def _empty(self) -> Dict[str, Any]:
+        return {"count": 0, "metrics": {}, "errors": Counter()}
@@ -0,0 +1,391 @@
+"""
+trading/optimization/feature_store.py
+功能描述: 策略学习器训练数据的列式特征存储，每个策略版本的特征和性能指标只在写入时计算一次，
+          追加到磁盘上的定长列文件中，读取时以内存映射的NumPy视图返回
+版本: 1.0.0
+创建日期: 2026-10-18
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+import numpy as np
+
+# 配置日志
+logger = logging.getLogger("feature_store")
+
+# 标识列及其类型，特征列和指标列均为float64
+KEY_COLUMNS = {
+    "strategy": np.int32,
+    "version": np.int64,
+    "signature": np.int64,
+    "live": np.uint8,
+}
+
+
+def performance_signature(performance: Dict[str, Any]) -> int:
+    """
+    计算性能数据的签名，只读取交易数、权益曲线长度和最终权益，不遍历数据
+
+    Args:
+        performance (Dict[str, Any]): 性能数据
+
+    Returns:
+        int: 63位签名
+    """
+    equity_curve = performance.get("equity_curve") or [{}]
+    text = repr(
+        (
+            len(performance.get("trades", [])),
+            len(equity_curve),
+            equity_curve[-1].get("equity"),
+        )
+    )
+    return int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "big") >> 1
+
+
+class FeatureStore:
+    """
+    列式特征存储
+
+    每列一个二进制文件，每个策略版本占一行；新版本追加一行，性能数据变化的版本原地更新，
+    已从历史中删除的版本标记为失效，失效行过多时压缩。index.json记录行数和列名
+    """
+
+    def __init__(self, path: str):
+        """
+        打开或创建特征存储
+
+        Args:
+            path (str): 存储目录
+        """
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        self._rows = 0
+        self._strategies: List[str] = []
+        self._features: List[str] = []
+        self._metrics: List[str] = []
+        self._load_index()
+
+        self._strategy_codes = {s_id: i for i, s_id in enumerate(self._strategies)}
+        self._views: Dict[Tuple[str, str], np.ndarray] = {}
+        # {策略编码: {版本号: 行号}}，只包含有效行
+        self._row_of: Dict[int, Dict[int, int]] = {}
+        self._build_row_index()
+
+        self._appends: List[Tuple[int, int, int, Dict[str, Any], Dict[str, float]]] = []
+        self._updates: Dict[int, Tuple[int, Dict[str, Any], Dict[str, float]]] = {}
+        self._dead: List[int] = []
+
+    def __len__(self) -> int:
+        return sum(len(rows) for rows in self._row_of.values()) + len(self._appends)
+
+    @property
+    def feature_names(self) -> List[str]:
+        """特征列名"""
+        return list(self._features)
+
+    @property
+    def strategy_ids(self) -> List[str]:
+        """有数据的策略ID"""
+        codes = set(code for code, rows in self._row_of.items() if rows)
+        codes.update(item[0] for item in self._appends)
+        return [self._strategies[code] for code in sorted(codes)]
+
+    def signature(self, strategy_id: str, version: int) -> Optional[int]:
+        """
+        获取已存储版本的性能数据签名
+
+        Args:
+            strategy_id (str): 策略ID
+            version (int): 版本号
+
+        Returns:
+            Optional[int]: 签名，版本未存储时返回None
+        """
+        code = self._strategy_codes.get(strategy_id)
+        row = self._row_of.get(code, {}).get(version)
+        if row is None:
+            for a_code, a_version, a_signature, _, _ in self._appends:
+                if a_code == code and a_version == version:
+                    return a_signature
+            return None
+        if row in self._updates:
+            return self._updates[row][0]
+        return int(self._column("key", "signature")[row])
+
+    def put(
+        self,
+        strategy_id: str,
+        version: int,
+        signature: int,
+        features: Dict[str, Any],
+        metrics: Dict[str, float],
+    ) -> None:
+        """
+        写入一个策略版本的特征和指标，调用flush后写入磁盘
+
+        Args:
+            strategy_id (str): 策略ID
+            version (int): 版本号
+            signature (int): 性能数据签名
+            features (Dict[str, Any]): 特征，非数值特征不存储
+            metrics (Dict[str, float]): 性能指标
+        """
+        code = self._strategy_codes.get(strategy_id)
+        if code is None:
+            code = len(self._strategies)
+            self._strategies.append(strategy_id)
+            self._strategy_codes[strategy_id] = code
+
+        features = {
+            name: value
+            for name, value in features.items()
+            if isinstance(value, (int, float, np.number))
+        }
+        row = self._row_of.get(code, {}).get(version)
+        if row is not None:
+            self._updates[row] = (signature, features, metrics)
+            return
+
+        self._appends = [
+            item for item in self._appends if (item[0], item[1]) != (code, version)
+        ]
+        self._appends.append((code, version, signature, features, metrics))
+
+    def retain(self, strategy_id: str, versions: Iterable[int]) -> None:
+        """
+        把策略中不在versions内的版本标记为失效
+
+        Args:
+            strategy_id (str): 策略ID
+            versions (Iterable[int]): 仍然有效的版本号
+        """
+        code = self._strategy_codes.get(strategy_id)
+        if code is None:
+            return
+        keep = set(versions)
+        rows = self._row_of.get(code, {})
+        for version in [v for v in rows if v not in keep]:
+            row = rows.pop(version)
+            self._updates.pop(row, None)
+            self._dead.append(row)
+        self._appends = [
+            item for item in self._appends if item[0] != code or item[1] in keep
+        ]
+
+    def flush(self) -> int:
+        """
+        把缓冲的写入、更新和失效标记写入磁盘
+
+        Returns:
+            int: 追加的行数
+        """
+        if not (self._appends or self._updates or self._dead):
+            return 0
+
+        appended = len(self._appends)
+        if self._appends:
+            self._write_appends()
+        for row, (signature, features, metrics) in self._updates.items():
+            self._write_row(row, signature, features, metrics)
+        for row in self._dead:
+            self._write_value(("key", "live"), row, 0)
+
+        self._updates.clear()
+        self._dead.clear()
+        self._views.clear()
+        self._save_index()
+
+        live = len(self)
+        if self._rows > 64 and live < self._rows // 2:
+            self.compact()
+        return appended
+
+    def load(
+        self, strategy_id: Optional[str] = None
+    ) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+        """
+        读取训练数据
+
+        没有失效行且不按策略过滤时，返回的列是列文件的内存映射视图，不复制数据
+
+        Args:
+            strategy_id (Optional[str], optional): 只读取此策略的版本. Defaults to None.
+
+        Returns:
+            Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]: (特征列, 指标列)，
+                特征列包含strategy_id和version标识列，所选行中全部缺失的特征列不返回
+        """
+        self.flush()
+
+        live = self._column("key", "live")
+        codes = self._column("key", "strategy")
+        if strategy_id is not None:
+            code = self._strategy_codes.get(strategy_id, -1)
+            selection = np.flatnonzero((codes == code) & (live == 1))
+        elif live.all():
+            selection = slice(None)
+        else:
+            selection = np.flatnonzero(live == 1)
+
+        features = {
+            "strategy_id": np.asarray(self._strategies, dtype=object)[codes[selection]]
+            if self._strategies
+            else np.empty(0, dtype=object),
+            "version": self._column("key", "version")[selection],
+        }
+        for name in self._features:
+            column = self._column("feature", name)[selection]
+            if len(column) and not np.isnan(column).all():
+                features[name] = column
+
+        metrics = {name: self._column("metric", name)[selection] for name in self._metrics}
+        return features, metrics
+
+    def compact(self) -> None:
+        """去掉失效行，重写所有列文件"""
+        self.flush()
+        live = np.flatnonzero(self._column("key", "live") == 1)
+
+        for group, name in self._all_columns():
+            data = np.array(self._column(group, name)[live])
+            path = self._column_path(group, name)
+            with open(f"{path}.tmp", "wb") as f:
+                f.write(data.tobytes())
+            os.replace(f"{path}.tmp", path)
+
+        logger.info(f"Compacted feature store from {self._rows} to {len(live)} rows")
+        self._rows = len(live)
+        self._views.clear()
+        self._build_row_index()
+        self._save_index()
+
+    def _all_columns(self) -> List[Tuple[str, str]]:
+        return (
+            [("key", name) for name in KEY_COLUMNS]
+            + [("feature", name) for name in self._features]
+            + [("metric", name) for name in self._metrics]
+        )
+
+    def _dtype(self, group: str, name: str):
+        return KEY_COLUMNS[name] if group == "key" else np.float64
+
+    def _column_path(self, group: str, name: str) -> str:
+        return os.path.join(self.path, f"{group}.{quote(name, safe='')}.bin")
+
+    def _column(self, group: str, name: str) -> np.ndarray:
+        """列文件前rows行的只读内存映射"""
+        view = self._views.get((group, name))
+        if view is None:
+            dtype = self._dtype(group, name)
+            if self._rows == 0:
+                view = np.empty(0, dtype=dtype)
+            else:
+                view = np.memmap(
+                    self._column_path(group, name), dtype=dtype, mode="r", shape=(self._rows,)
+                )
+            self._views[(group, name)] = view
+        return view
+
+    def _write_appends(self) -> None:
+        """按列追加缓冲的新行，新出现的列先用NaN补齐已有行"""
+        for _, _, _, features, metrics in self._appends:
+            for name in features:
+                if name not in self._features:
+                    self._add_column("feature", name)
+            for name in metrics:
+                if name not in self._metrics:
+                    self._add_column("metric", name)
+
+        values = {
+            ("key", "strategy"): [item[0] for item in self._appends],
+            ("key", "version"): [item[1] for item in self._appends],
+            ("key", "signature"): [item[2] for item in self._appends],
+            ("key", "live"): [1] * len(self._appends),
+        }
+        for name in self._features:
+            values[("feature", name)] = [item[3].get(name, np.nan) for item in self._appends]
+        for name in self._metrics:
+            values[("metric", name)] = [item[4].get(name, np.nan) for item in self._appends]
+
+        for (group, name), column in values.items():
+            dtype = self._dtype(group, name)
+            itemsize = np.dtype(dtype).itemsize
+            with open(self._column_path(group, name), "r+b") as f:
+                # 丢弃上次中断的写入留下的多余数据
+                f.truncate(self._rows * itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(np.asarray(column, dtype=dtype).tobytes())
+
+        for i, (code, version, _, _, _) in enumerate(self._appends):
+            self._row_of.setdefault(code, {})[version] = self._rows + i
+        self._rows += len(self._appends)
+        self._appends.clear()
+
+    def _add_column(self, group: str, name: str) -> None:
+        with open(self._column_path(group, name), "wb") as f:
+            f.write(np.full(self._rows, np.nan).tobytes())
+        (self._features if group == "feature" else self._metrics).append(name)
+
+    def _write_row(
+        self, row: int, signature: int, features: Dict[str, Any], metrics: Dict[str, float]
+    ) -> None:
+        for name in features:
+            if name not in self._features:
+                self._add_column("feature", name)
+        for name in metrics:
+            if name not in self._metrics:
+                self._add_column("metric", name)
+        self._write_value(("key", "signature"), row, signature)
+        for name in self._features:
+            self._write_value(("feature", name), row, features.get(name, np.nan))
+        for name in self._metrics:
+            self._write_value(("metric", name), row, metrics.get(name, np.nan))
+
+    def _write_value(self, column: Tuple[str, str], row: int, value: Any) -> None:
+        dtype = np.dtype(self._dtype(*column))
+        with open(self._column_path(*column), "r+b") as f:
+            f.seek(row * dtype.itemsize)
+            f.write(np.asarray([value], dtype=dtype).tobytes())
+
+    def _build_row_index(self) -> None:
+        self._row_of = {}
+        codes = self._column("key", "strategy")
+        versions = self._column("key", "version")
+        live = self._column("key", "live")
+        for row in np.flatnonzero(live == 1):
+            self._row_of.setdefault(int(codes[row]), {})[int(versions[row])] = int(row)
+
+    def _load_index(self) -> None:
+        index_path = os.path.join(self.path, "index.json")
+        if os.path.exists(index_path):
+            with open(index_path, "r") as f:
+                index = json.load(f)
+            self._rows = index["rows"]
+            self._strategies = index["strategies"]
+            self._features = index["features"]
+            self._metrics = index["metrics"]
+        for group, name in self._all_columns():
+            path = self._column_path(group, name)
+            if not os.path.exists(path):
+                open(path, "wb").close()
+
+    def _save_index(self) -> None:
+        index_path = os.path.join(self.path, "index.json")
+        with open(f"{index_path}.tmp", "w") as f:
+            json.dump(
+                {
+                    "rows": self._rows,
+                    "strategies": self._strategies,
+                    "features": self._features,
+                    "metrics": self._metrics,
+                },
+                f,
+            )
+        os.replace(f"{index_path}.tmp", index_path)
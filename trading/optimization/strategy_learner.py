@@ -5,20 +5,25 @@ trading/optimization/strategy_learner.py
 创建日期: 2025-04-20
 """
 
+import hashlib
 import json
 import logging
 import time
-import modules.nlp as np
-import config.paths as pd
-from typing import Dict, Any, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Any, List, Optional, Tuple, Union
 from datetime import datetime
 import random
 import os
 import pickle
+from urllib.parse import quote, unquote
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 
+from .feature_store import FeatureStore, performance_signature
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -51,9 +56,13 @@ LEARNER_STATUS = {
     "models": {},
     "strategy_history": {},
     "performance_cache": {},
+    "feature_store": None,
     "last_error": None,
 }
 
+# 已同步到特征存储的性能数据 {策略ID: {版本号: 性能数据}}，性能数据对象未替换的版本不再计算签名
+_SYNCED_PERFORMANCE: Dict[str, Dict[int, Dict[str, Any]]] = {}
+
 
 class LearnerInitError(Exception):
     """学习器初始化异常"""
@@ -102,24 +111,53 @@ def initialize_learner(config: Optional[Dict[str, Any]] = None) -> bool:
         performance_path = os.path.join(
             config["storage_path"], "performance_cache.json"
         )
+        models_dir = os.path.join(config["storage_path"], "models")
+        history_dir = os.path.join(config["storage_path"], "history")
 
-        if os.path.exists(models_path):
+        # 旧版本的单文件状态，加载后转存为按模型和策略分开的文件
+        migrate = False
+        if os.path.exists(models_path) and not os.path.isdir(models_dir):
             with open(models_path, "rb") as f:
                 LEARNER_STATUS["models"] = pickle.load(f)
+            migrate = True
 
-        if os.path.exists(history_path):
+        if os.path.exists(history_path) and not os.path.isdir(history_dir):
             with open(history_path, "r") as f:
                 LEARNER_STATUS["strategy_history"] = json.load(f)
+            migrate = True
+
+        if os.path.isdir(models_dir):
+            LEARNER_STATUS["models"] = {}
+            for name in os.listdir(models_dir):
+                if name.endswith(".pkl"):
+                    with open(os.path.join(models_dir, name), "rb") as f:
+                        LEARNER_STATUS["models"][unquote(name[:-4])] = pickle.load(f)
+
+        if os.path.isdir(history_dir):
+            LEARNER_STATUS["strategy_history"] = {}
+            for name in os.listdir(history_dir):
+                if name.endswith(".json"):
+                    with open(os.path.join(history_dir, name), "r") as f:
+                        LEARNER_STATUS["strategy_history"][unquote(name[:-5])] = json.load(f)
 
         if os.path.exists(performance_path):
             with open(performance_path, "r") as f:
                 LEARNER_STATUS["performance_cache"] = json.load(f)
 
+        # 训练数据的列式特征存储
+        _SYNCED_PERFORMANCE.clear()
+        LEARNER_STATUS["feature_store"] = FeatureStore(
+            os.path.join(config["storage_path"], "features")
+        )
+
         # 更新状态
         LEARNER_STATUS["initialized"] = True
         LEARNER_STATUS["config"] = config
         LEARNER_STATUS["last_error"] = None
 
+        if migrate:
+            _save_learner_state()
+
         logger.info("Strategy learner initialized successfully")
         return True
 
@@ -130,36 +168,78 @@ def initialize_learner(config: Optional[Dict[str, Any]] = None) -> bool:
         return False
 
 
-def _save_learner_state() -> bool:
+def _write_state_file(path: str, data: bytes) -> None:
+    """
+    先写入临时文件再替换，避免写入中断留下不完整的文件
+
+    Args:
+        path (str): 文件路径
+        data (bytes): 文件内容
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", "wb") as f:
+        f.write(data)
+    os.replace(f"{path}.tmp", path)
+
+
+def _save_learner_state(
+    strategy_ids: Optional[List[str]] = None,
+    model_keys: Optional[List[str]] = None,
+    performance_cache: bool = False,
+) -> bool:
     """
     保存学习器状态到磁盘
 
+    每个模型和每个策略的历史保存为单独的文件，只重写有变化的部分；不传参数时保存全部状态
+
+    Args:
+        strategy_ids (Optional[List[str]], optional): 历史有变化的策略ID. Defaults to None.
+        model_keys (Optional[List[str]], optional): 有变化的模型. Defaults to None.
+        performance_cache (bool, optional): 是否保存性能缓存. Defaults to False.
+
     Returns:
         bool: 是否成功保存
     """
     if not LEARNER_STATUS["initialized"]:
         return False
 
+    if strategy_ids is None and model_keys is None and not performance_cache:
+        strategy_ids = list(LEARNER_STATUS["strategy_history"])
+        model_keys = list(LEARNER_STATUS["models"])
+        performance_cache = True
+
     try:
         config = LEARNER_STATUS["config"]
 
         # 保存模型
-        models_path = os.path.join(config["storage_path"], "models.pkl")
-        with open(models_path, "wb") as f:
-            pickle.dump(LEARNER_STATUS["models"], f)
+        for model_key in model_keys or []:
+            if model_key in LEARNER_STATUS["models"]:
+                _write_state_file(
+                    os.path.join(
+                        config["storage_path"], "models", f"{quote(model_key, safe='')}.pkl"
+                    ),
+                    pickle.dumps(LEARNER_STATUS["models"][model_key]),
+                )
 
         # 保存策略历史
-        history_path = os.path.join(
-            config["storage_path"], "strategy_history.json")
-        with open(history_path, "w") as f:
-            json.dump(LEARNER_STATUS["strategy_history"], f, indent=2)
+        for s_id in strategy_ids or []:
+            if s_id in LEARNER_STATUS["strategy_history"]:
+                _write_state_file(
+                    os.path.join(
+                        config["storage_path"], "history", f"{quote(s_id, safe='')}.json"
+                    ),
+                    json.dumps(LEARNER_STATUS["strategy_history"][s_id], indent=2).encode(
+                        "utf-8"
+                    ),
+                )
 
         # 保存性能缓存
-        performance_path = os.path.join(
-            config["storage_path"], "performance_cache.json"
-        )
-        with open(performance_path, "w") as f:
-            json.dump(LEARNER_STATUS["performance_cache"], f, indent=2)
+        if performance_cache:
+            performance_path = os.path.join(
+                config["storage_path"], "performance_cache.json"
+            )
+            with open(performance_path, "w") as f:
+                json.dump(LEARNER_STATUS["performance_cache"], f, indent=2)
 
         return True
 
@@ -355,12 +435,70 @@ def _extract_strategy_features(strategy: Dict[str, Any]) -> Dict[str, Any]:
     return features
 
 
+def _sync_feature_store(strategy_id: Optional[str] = None) -> FeatureStore:
+    """
+    把策略历史同步到特征存储
+
+    只为新版本和性能数据有变化的版本提取特征和计算指标，已从历史中删除的版本标记为失效。
+    性能数据应以替换对象的方式更新，原地修改的性能数据对象在本进程内不会被重新计算
+
+    Args:
+        strategy_id (Optional[str], optional): 只同步此策略. Defaults to None.
+
+    Returns:
+        FeatureStore: 特征存储
+    """
+    store = LEARNER_STATUS["feature_store"]
+
+    for s_id, history in LEARNER_STATUS["strategy_history"].items():
+        if strategy_id and s_id != strategy_id:
+            continue
+
+        previous = _SYNCED_PERFORMANCE.get(s_id, {})
+        synced = {}
+        for version_data in history["versions"]:
+            # 确保有性能数据
+            performance = version_data.get("performance")
+            if not performance:
+                continue
+
+            version = version_data["version"]
+            synced[version] = performance
+            if previous.get(version) is performance:
+                continue
+
+            signature = performance_signature(performance)
+            if store.signature(s_id, version) != signature:
+                store.put(
+                    s_id,
+                    version,
+                    signature,
+                    _extract_strategy_features(version_data["strategy"]),
+                    _calculate_performance_metrics(performance),
+                )
+
+        _SYNCED_PERFORMANCE[s_id] = synced
+        store.retain(s_id, synced)
+
+    # 清除已不在历史中的策略
+    if not strategy_id:
+        for s_id in store.strategy_ids:
+            if s_id not in LEARNER_STATUS["strategy_history"]:
+                _SYNCED_PERFORMANCE.pop(s_id, None)
+                store.retain(s_id, [])
+
+    store.flush()
+    return store
+
+
 def _prepare_training_data(
     strategy_id: str = None,
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
     准备用于训练的数据
 
+    特征和指标从特征存储读取，每个版本只在首次出现或性能数据变化时计算一次
+
     Args:
         strategy_id (str, optional): 可选的策略ID过滤器. Defaults to None.
 
@@ -370,38 +508,45 @@ def _prepare_training_data(
     if not LEARNER_STATUS["initialized"]:
         raise LearnerInitError("Learner not initialized")
 
-    # 收集所有策略数据
-    all_features = []
-    all_metrics = []
+    features, metrics = _sync_feature_store(strategy_id).load(strategy_id)
+
+    # 转换为DataFrame
+    features_df = pd.DataFrame(features, copy=False)
+    metrics_df = pd.DataFrame(metrics, copy=False)
+
+    return features_df, metrics_df
+
+
+def _training_signature(strategy_id: Optional[str] = None) -> str:
+    """
+    计算训练数据的签名，有新的带性能数据的版本或性能数据变化时签名改变
+
+    只读取版本号和交易、权益曲线的长度及最终权益，不提取特征
+
+    Args:
+        strategy_id (Optional[str], optional): 特定策略ID或所有策略. Defaults to None.
+
+    Returns:
+        str: 签名
+    """
+    digest = hashlib.sha1()
 
     for s_id, history in LEARNER_STATUS["strategy_history"].items():
         if strategy_id and s_id != strategy_id:
             continue
 
         for version_data in history["versions"]:
-            # 确保有性能数据
-            if not version_data.get("performance"):
+            performance = version_data.get("performance")
+            if not performance:
                 continue
 
-            strategy = version_data["strategy"]
-            performance = version_data["performance"]
-
-            # 提取特征和指标
-            features = _extract_strategy_features(strategy)
-            metrics = _calculate_performance_metrics(performance)
-
-            # 添加标识信息
-            features["strategy_id"] = s_id
-            features["version"] = version_data["version"]
-
-            all_features.append(features)
-            all_metrics.append(metrics)
-
-    # 转换为DataFrame
-    features_df = pd.DataFrame(all_features)
-    metrics_df = pd.DataFrame(all_metrics)
+            digest.update(
+                repr(
+                    (s_id, version_data["version"], performance_signature(performance))
+                ).encode("utf-8")
+            )
 
-    return features_df, metrics_df
+    return digest.hexdigest()
 
 
 def _train_prediction_model(
@@ -427,6 +572,17 @@ def _train_prediction_model(
     if target_metric is None:
         target_metric = LEARNER_STATUS["config"]["primary_metric"]
 
+    if strategy_id:
+        model_key = f"{strategy_id}_{target_metric}"
+    else:
+        model_key = f"global_{target_metric}"
+
+    # 训练数据没有变化时复用已训练的模型
+    signature = _training_signature(strategy_id)
+    cached_model = LEARNER_STATUS["models"].get(model_key)
+    if cached_model and cached_model.get("data_signature") == signature:
+        return cached_model
+
     try:
         # 准备训练数据
         features_df, metrics_df = _prepare_training_data(strategy_id)
@@ -476,18 +632,14 @@ def _train_prediction_model(
             "train_date": datetime.now().isoformat(),
             "performance": {"mse": mse, "mae": mae, "r2": r2},
             "feature_importance": feature_importance,
+            "data_signature": signature,
         }
 
         # 更新模型存储
-        if strategy_id:
-            model_key = f"{strategy_id}_{target_metric}"
-        else:
-            model_key = f"global_{target_metric}"
-
         LEARNER_STATUS["models"][model_key] = model_info
 
         # 保存状态
-        _save_learner_state()
+        _save_learner_state(model_keys=[model_key])
 
         return model_info
 
@@ -658,7 +810,7 @@ def analyze_strategy_performance(
             }
 
     # 保存状态
-    _save_learner_state()
+    _save_learner_state(strategy_ids=[strategy_id], performance_cache=True)
 
     return {
         "strategy_id": strategy_id,
@@ -834,7 +986,7 @@ def generate_improvement_suggestions(
             latest_version["analysis"]["parameter_adjustments"] = parameter_adjustments
 
     # 保存状态
-    _save_learner_state()
+    _save_learner_state(strategy_ids=[strategy_id])
 
     return {
         "strategy_id": strategy_id,
@@ -952,6 +1104,125 @@ def _mutate(
     return mutated
 
 
+def _parameter_key(strategy: Dict[str, Any]) -> str:
+    """
+    计算策略参数向量的哈希，用于缓存适应度
+
+    Args:
+        strategy (Dict[str, Any]): 策略定义
+
+    Returns:
+        str: 参数哈希
+    """
+    return hashlib.sha1(
+        json.dumps(strategy.get("parameters", {}), sort_keys=True, default=str).encode(
+            "utf-8"
+        )
+    ).hexdigest()
+
+
+def _predict_population(
+    model_info: Dict[str, Any], population: List[Dict[str, Any]]
+) -> List[float]:
+    """
+    用预测模型一次评估整个种群
+
+    Args:
+        model_info (Dict[str, Any]): 模型信息
+        population (List[Dict[str, Any]]): 策略列表
+
+    Returns:
+        List[float]: 预测评分，与种群顺序一致
+    """
+    feature_cols = model_info["feature_columns"]
+    matrix = np.array(
+        [
+            [features.get(col, 0) for col in feature_cols]
+            for features in map(_extract_strategy_features, population)
+        ],
+        dtype=float,
+    )
+    predictions = model_info["model"].predict(pd.DataFrame(matrix, columns=feature_cols))
+    return predictions.tolist()
+
+
+def _historical_scores(history: Dict[str, Any]) -> Dict[str, float]:
+    """
+    按参数哈希汇总历史版本的主要指标，用于没有模型时的启发式评分
+
+    Args:
+        history (Dict[str, Any]): 策略历史
+
+    Returns:
+        Dict[str, float]: {参数哈希: 指标值}，相同参数取最早的带性能数据的版本
+    """
+    primary_metric = LEARNER_STATUS["config"]["primary_metric"]
+    scores = {}
+
+    for version_data in history["versions"]:
+        key = _parameter_key(version_data["strategy"])
+        if key not in scores and "performance" in version_data:
+            metrics = _calculate_performance_metrics(version_data["performance"])
+            scores[key] = metrics.get(primary_metric, 0)
+
+    return scores
+
+
+def _score_population(
+    population: List[Dict[str, Any]],
+    fitness_cache: Dict[str, float],
+    fitness_function: Optional[Callable[[Dict[str, Any]], float]] = None,
+    model_info: Optional[Dict[str, Any]] = None,
+    history_scores: Optional[Dict[str, float]] = None,
+    executor: Optional[ProcessPoolExecutor] = None,
+    n_jobs: int = 1,
+) -> List[float]:
+    """
+    评估种群适应度，只评估缓存中没有的参数向量
+
+    优先使用适应度函数(如回测)，有进程池时并行执行；其次用预测模型批量预测；
+    都没有时使用历史版本的指标
+
+    Args:
+        population (List[Dict[str, Any]]): 策略列表
+        fitness_cache (Dict[str, float]): 参数哈希到适应度的缓存，跨代共享
+        fitness_function (Optional[Callable], optional): 适应度函数. Defaults to None.
+        model_info (Optional[Dict[str, Any]], optional): 预测模型信息. Defaults to None.
+        history_scores (Optional[Dict[str, float]], optional): 历史版本评分. Defaults to None.
+        executor (Optional[ProcessPoolExecutor], optional): 进程池. Defaults to None.
+        n_jobs (int, optional): 进程池的进程数，用于划分任务. Defaults to 1.
+
+    Returns:
+        List[float]: 评分，与种群顺序一致
+    """
+    keys = [_parameter_key(individual) for individual in population]
+
+    pending = {}
+    for key, individual in zip(keys, population):
+        if key not in fitness_cache and key not in pending:
+            pending[key] = individual
+
+    if pending:
+        individuals = list(pending.values())
+
+        if fitness_function is not None:
+            if executor is not None:
+                chunksize = max(1, len(individuals) // (n_jobs * 4))
+                scores = list(
+                    executor.map(fitness_function, individuals, chunksize=chunksize)
+                )
+            else:
+                scores = [fitness_function(individual) for individual in individuals]
+        elif model_info:
+            scores = _predict_population(model_info, individuals)
+        else:
+            scores = [(history_scores or {}).get(key, 0) for key in pending]
+
+        fitness_cache.update(zip(pending, scores))
+
+    return [fitness_cache[key] for key in keys]
+
+
 def evolve_strategy(
     strategy_id: str, evolution_parameters: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
@@ -999,6 +1270,16 @@ def evolve_strategy(
     crossover_rate = evolution_parameters.get(
         "crossover_rate", DEFAULT_EVOLUTION_PARAMS["crossover_rate"]
     )
+    # 可选的适应度函数(如回测)，n_jobs>1时在进程池中执行，不能被pickle时退回串行评估
+    fitness_function = evolution_parameters.get("fitness_function")
+    n_jobs = evolution_parameters.get("n_jobs", 1)
+    if fitness_function is not None and n_jobs > 1:
+        try:
+            pickle.dumps(fitness_function)
+        except (pickle.PicklingError, AttributeError, TypeError) as e:
+            logger.warning(
+                f"Fitness function cannot be pickled ({e}), evaluating serially")
+            n_jobs = 1
 
     # 获取参数边界
     params_bounds = _get_parameter_bounds(base_strategy)
@@ -1035,108 +1316,107 @@ def evolve_strategy(
     best_strategy = None
     best_score = float("-inf")
 
-    # 训练模型用于评估
-    model_info = _train_prediction_model(
-        strategy_id=strategy_id,
-        target_metric=LEARNER_STATUS["config"]["primary_metric"],
-    )
-
-    # 如果模型训练失败，使用全局模型
-    if not model_info:
-        model_key = f"global_{LEARNER_STATUS['config']['primary_metric']}"
-        if model_key in LEARNER_STATUS["models"]:
-            model_info = LEARNER_STATUS["models"][model_key]
-
-    # 进化循环
-    for generation in range(generations):
-        logger.info(
-            f"Evolving strategy {strategy_id}: Generation {generation+1}/{generations}"
+    # 训练模型用于评估（训练数据没有变化时复用缓存的模型）
+    model_info = None
+    if fitness_function is None:
+        model_info = _train_prediction_model(
+            strategy_id=strategy_id,
+            target_metric=LEARNER_STATUS["config"]["primary_metric"],
         )
 
-        # 评估当前种群
-        scored_population = []
+        # 如果模型训练失败，使用全局模型
+        if not model_info:
+            model_key = f"global_{LEARNER_STATUS['config']['primary_metric']}"
+            if model_key in LEARNER_STATUS["models"]:
+                model_info = LEARNER_STATUS["models"][model_key]
 
-        for individual in population:
-            # 获取性能评分
-            if model_info:
-                # 使用机器学习模型评估
-                features = _extract_strategy_features(individual)
-                feature_cols = model_info["feature_columns"]
+    # 没有模型时使用历史版本的指标评分
+    history_scores = None
+    if fitness_function is None and not model_info:
+        history_scores = _historical_scores(history)
 
-                feature_vector = {col: features.get(
-                    col, 0) for col in feature_cols}
-                feature_df = pd.DataFrame([feature_vector])
+    # 按参数哈希缓存适应度，跨代复用
+    fitness_cache: Dict[str, float] = {}
+    executor = None
+    if fitness_function is not None and n_jobs > 1:
+        executor = ProcessPoolExecutor(max_workers=n_jobs)
 
-                model = model_info["model"]
-                score = model.predict(feature_df)[0]
-            else:
-                # 如果没有模型，使用简单启发式评分
-                # 尝试找到个体的历史性能
-                score = 0
-                for version_data in history["versions"]:
-                    if version_data["strategy"].get("parameters") == individual.get(
-                        "parameters"
-                    ):
-                        if "performance" in version_data:
-                            metrics = _calculate_performance_metrics(
-                                version_data["performance"]
-                            )
-                            score = metrics.get(
-                                LEARNER_STATUS["config"]["primary_metric"], 0
-                            )
-                            break
+    evolution_start = time.time()
 
-            scored_population.append((individual, score))
+    try:
+        # 进化循环
+        for generation in range(generations):
+            logger.info(
+                f"Evolving strategy {strategy_id}: Generation {generation+1}/{generations}"
+            )
+
+            # 评估当前种群
+            scores = _score_population(
+                population,
+                fitness_cache,
+                fitness_function=fitness_function,
+                model_info=model_info,
+                history_scores=history_scores,
+                executor=executor,
+                n_jobs=n_jobs,
+            )
+            scored_population = list(zip(population, scores))
 
             # 更新最佳策略
-            if score > best_score:
-                best_score = score
-                best_strategy = individual
+            for individual, score in scored_population:
+                if score > best_score:
+                    best_score = score
+                    best_strategy = individual
 
-        # 按评分排序
-        scored_population.sort(key=lambda x: x[1], reverse=True)
+            # 按评分排序
+            scored_population.sort(key=lambda x: x[1], reverse=True)
 
-        # 记录当前最佳
-        logger.info(
-            f"Generation {generation+1}: Best score = {scored_population[0][1]}"
-        )
+            # 记录当前最佳
+            logger.info(
+                f"Generation {generation+1}: Best score = {scored_population[0][1]}"
+            )
 
-        # 如果是最终一代，结束循环
-        if generation == generations - 1:
-            break
-
-        # 选择精英（保留最佳个体）
-        elite_count = max(1, int(population_size * 0.1))
-        new_population = [item[0] for item in scored_population[:elite_count]]
-
-        # 生成下一代
-        while len(new_population) < population_size:
-            # 锦标赛选择
-            tournament_size = 3
-            tournament = random.sample(scored_population, tournament_size)
-            tournament.sort(key=lambda x: x[1], reverse=True)
-
-            parent1 = tournament[0][0]
-
-            # 决定是执行交叉还是变异
-            if random.random() < crossover_rate and len(scored_population) > 1:
-                # 交叉操作
-                tournament2 = random.sample(scored_population, tournament_size)
-                tournament2.sort(key=lambda x: x[1], reverse=True)
-                parent2 = tournament2[0][0]
-
-                child = _crossover(parent1, parent2, params_bounds)
-                # 然后对子代进行可能的变异
-                if random.random() < mutation_rate:
-                    child = _mutate(child, params_bounds, mutation_rate)
-            else:
-                # 变异操作
-                child = _mutate(parent1, params_bounds, mutation_rate)
+            # 如果是最终一代，结束循环
+            if generation == generations - 1:
+                break
+
+            # 选择精英（保留最佳个体）
+            elite_count = max(1, int(population_size * 0.1))
+            new_population = [item[0] for item in scored_population[:elite_count]]
+
+            # 生成下一代
+            while len(new_population) < population_size:
+                # 锦标赛选择
+                tournament_size = 3
+                tournament = random.sample(scored_population, tournament_size)
+                tournament.sort(key=lambda x: x[1], reverse=True)
+
+                parent1 = tournament[0][0]
 
-            new_population.append(child)
+                # 决定是执行交叉还是变异
+                if random.random() < crossover_rate and len(scored_population) > 1:
+                    # 交叉操作
+                    tournament2 = random.sample(scored_population, tournament_size)
+                    tournament2.sort(key=lambda x: x[1], reverse=True)
+                    parent2 = tournament2[0][0]
 
-        # 更新种群
-        population = new_population
+                    child = _crossover(parent1, parent2, params_bounds)
+                    # 然后对子代进行可能的变异
+                    if random.random() < mutation_rate:
+                        child = _mutate(child, params_bounds, mutation_rate)
+                else:
+                    # 变异操作
+                    child = _mutate(parent1, params_bounds, mutation_rate)
+
+                new_population.append(child)
+
+            # 更新种群
+            population = new_population
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    evolution_time = time.time() - evolution_start
 
     # 确认最佳策略不为空
     if not best_strategy:
@@ -1161,7 +1441,7 @@ def evolve_strategy(
         history["versions"] = history["versions"][:MAX_HISTORY_VERSIONS]
 
     # 保存状态
-    _save_learner_state()
+    _save_learner_state(strategy_ids=[strategy_id])
 
     return {
         "strategy_id": strategy_id,
@@ -1176,5 +1456,12 @@ def evolve_strategy(
                 and v != base_strategy["parameters"][k]
             },
         },
+        "evaluation": {
+            "evaluations": len(fitness_cache),
+            "evaluation_time": evolution_time,
+            "generations_per_minute": (
+                generations / evolution_time * 60 if evolution_time > 0 else 0.0
+            ),
+        },
         "timestamp": datetime.now().isoformat(),
     }
\ No newline at end of file
@@ -9,11 +9,17 @@
 import logging
 import json
 import os
+import re
 from typing import Dict, List, Optional, Any, Union, Tuple
 
+from utils.response_cache import ResponseCache
+
 # 设置日志
 logger = logging.getLogger(__name__)
 
+# 缓存的策略代码中用来代替策略名称的占位符，命中时替换为新策略的名称
+STRATEGY_NAME_PLACEHOLDER = "__STRATEGY_NAME__"
+
 
 class StrategyTemplate:
     """
@@ -79,14 +85,16 @@ class StrategyGenerator:
         available_templates (Dict[str, StrategyTemplate]): 可用模板
     """
 
-    def __init__(self, gpt_interface=None):
+    def __init__(self, gpt_interface=None, response_cache: Optional[ResponseCache] = None):
         """
         初始化策略生成器
 
         参数:
             gpt_interface: GPT接口对象
+            response_cache (ResponseCache, optional): 生成结果缓存，默认新建只做精确匹配的缓存
         """
         self.gpt_interface = gpt_interface
+        self.response_cache = response_cache or ResponseCache()
         self.templates_dir = os.path.join(
             os.path.dirname(__file__), "templates")
         self.generated_dir = os.path.join(
@@ -177,11 +185,24 @@ class StrategyGenerator:
             prompt = self._build_strategy_prompt(
                 template, strategy_name, parameters)
 
-            # 调用GPT接口
-            response = self.gpt_interface.generate_code(prompt)
-
-            if not response:
-                return False, "GPT生成策略失败", None
+            # 同一模板和参数生成过的策略直接复用，缓存键中不包含策略名称
+            cache_prompt = self._build_strategy_prompt(
+                template, STRATEGY_NAME_PLACEHOLDER, parameters)
+            cached = self.response_cache.get(cache_prompt, template_name)
+            if cached is not None:
+                response = cached.replace(STRATEGY_NAME_PLACEHOLDER, strategy_name)
+            else:
+                # 调用GPT接口
+                response = self.gpt_interface.generate_code(prompt)
+
+                if not response:
+                    return False, "GPT生成策略失败", None
+
+                self.response_cache.set(
+                    cache_prompt,
+                    re.sub(rf"\b{re.escape(strategy_name)}\b", STRATEGY_NAME_PLACEHOLDER, response),
+                    template_name,
+                )
 
             # 保存生成的策略
             file_path = os.path.join(
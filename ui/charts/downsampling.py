@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+"""
+图表数据降采样
+
+图表只有几百到几千像素宽，把数百万个数据点交给渲染器只会浪费序列化和绘制时间。
+本模块提供向量化的LTTB和按桶最小/最大值抽取（折线），以及K线的OHLC聚合；
+多分辨率金字塔预先计算好各级抽取结果并按策略缓存，缩放时只处理可见范围内的点。
+"""
+
+import math
+import threading
+from collections import OrderedDict
+from numbers import Number
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 金字塔相邻两级之间的抽取倍数
+PYRAMID_FACTOR = 4
+# 金字塔最粗一级保留的桶数
+PYRAMID_MIN_BUCKETS = 256
+
+
+def lttb_indices(x: Sequence[float], y: Sequence[float], n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets 降采样
+
+    参数:
+        x: 横坐标（递增）
+        y: 纵坐标
+        n_out: 输出点数
+
+    返回:
+        选中点的下标（递增，包含首尾两点）
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n <= 2:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1][:max(n_out, 0)], dtype=np.int64)
+
+    n_buckets = n_out - 2
+    # 中间的点均分为 n_buckets 个桶，首尾两点单独成桶
+    edges = (np.arange(n_buckets + 1) * ((n - 2) / n_buckets)).astype(np.int64) + 1
+    edges[-1] = n - 1
+
+    # 每个桶的下一个桶的平均点，最后一个桶的下一个桶是终点
+    cum_x = np.concatenate(([0.0], np.cumsum(x)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y)))
+    counts = edges[1:] - edges[:-1]
+    avg_x = (cum_x[edges[1:]] - cum_x[edges[:-1]]) / counts
+    avg_y = (cum_y[edges[1:]] - cum_y[edges[:-1]]) / counts
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_buckets):
+        start, end = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        # 以上一个选中点和下一个桶的平均点为底，选三角形面积最大的点
+        area = np.abs((ax - next_x[i]) * (y[start:end] - ay) - (ax - x[start:end]) * (next_y[i] - ay))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y: Sequence[float], n_buckets: int) -> np.ndarray:
+    """
+    按桶最小/最大值抽取，保留每个桶的极值，不会漏掉尖峰
+
+    参数:
+        y: 纵坐标
+        n_buckets: 桶数（输出最多 2 * n_buckets + 2 个点）
+
+    返回:
+        选中点的下标（递增，包含首尾两点）
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n == 0:
+        return np.arange(0)
+    if n_buckets <= 0 or 2 * n_buckets + 2 >= n:
+        return np.arange(n)
+
+    size = math.ceil(n / n_buckets)
+    n_full = n // size
+    rows = y[:n_full * size].reshape(n_full, size)
+    mins = [np.argmin(rows, axis=1) + np.arange(n_full) * size]
+    maxs = [np.argmax(rows, axis=1) + np.arange(n_full) * size]
+    if n_full * size < n:
+        tail = y[n_full * size:]
+        mins.append([n_full * size + int(np.argmin(tail))])
+        maxs.append([n_full * size + int(np.argmax(tail))])
+    mins = np.concatenate(mins)
+    maxs = np.concatenate(maxs)
+
+    # 每个桶内按位置先后排列两个极值，整体自然有序，无需排序
+    pairs = np.column_stack((np.minimum(mins, maxs), np.maximum(mins, maxs)))
+    keep = np.ones(pairs.shape, dtype=bool)
+    keep[:, 1] = pairs[:, 1] != pairs[:, 0]
+    selected = pairs[keep]
+    if selected[0] != 0:
+        selected = np.concatenate(([0], selected))
+    if selected[-1] != n - 1:
+        selected = np.append(selected, n - 1)
+    return selected
+
+
+def aggregate_ohlc(candles: Dict[str, np.ndarray], size: int) -> Dict[str, np.ndarray]:
+    """
+    把连续 size 根K线合并为一根
+
+    参数:
+        candles: 包含 time、open、high、low、close（可选 volume）的数组
+        size: 每根合并K线包含的原始K线数
+
+    返回:
+        合并后的K线数组
+    """
+    n = len(candles["close"])
+    if size <= 1 or n == 0:
+        return dict(candles)
+    starts = np.arange(0, n, size)
+    ends = np.append(starts[1:], n) - 1
+    merged = {
+        "time": np.asarray(candles["time"])[starts],
+        "open": np.asarray(candles["open"])[starts],
+        "high": np.maximum.reduceat(np.asarray(candles["high"]), starts),
+        "low": np.minimum.reduceat(np.asarray(candles["low"]), starts),
+        "close": np.asarray(candles["close"])[ends],
+    }
+    if "volume" in candles:
+        merged["volume"] = np.add.reduceat(np.asarray(candles["volume"], dtype=np.float64), starts)
+    return merged
+
+
+class SeriesPyramid:
+    """
+    折线数据的多分辨率金字塔
+
+    第 k 级保存原始数据每 PYRAMID_FACTOR**k 个点一桶的最小/最大值下标。查询时选择可见点数
+    不超过预算的最细一级，只对该级可见范围内的点做最终降采样，耗时与可见点数成正比。
+    """
+
+    def __init__(self, x: Sequence[float], y: Sequence[float],
+                 factor: int = PYRAMID_FACTOR, min_buckets: int = PYRAMID_MIN_BUCKETS):
+        """
+        参数:
+            x: 横坐标（递增）
+            y: 纵坐标
+            factor: 相邻两级的抽取倍数
+            min_buckets: 最粗一级保留的桶数
+        """
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        n = len(self.y)
+        # 第0级是原始数据
+        self.levels: List[np.ndarray] = [np.arange(n)]
+        self._level_x: List[np.ndarray] = [self.x]
+        size = factor
+        while n / size >= min_buckets:
+            level = minmax_indices(self.y, math.ceil(n / size))
+            self.levels.append(level)
+            self._level_x.append(self.x[level])
+            size *= factor
+
+    def __len__(self) -> int:
+        return len(self.y)
+
+    def query(self, pixel_width: Optional[int] = None,
+              x_start: Optional[float] = None, x_end: Optional[float] = None,
+              method: str = "minmax", oversample: int = 4) -> np.ndarray:
+        """
+        取可见范围内降采样后的点
+
+        参数:
+            pixel_width: 图表宽度（像素），None表示不降采样
+            x_start: 可见范围起点，None表示从头开始
+            x_end: 可见范围终点，None表示到末尾
+            method: "minmax"（每像素保留最小/最大值）或 "lttb"
+            oversample: 选择金字塔级别时每像素允许的点数
+
+        返回:
+            原始数据中选中点的下标（递增）
+        """
+        lo_x = -np.inf if x_start is None else x_start
+        hi_x = np.inf if x_end is None else x_end
+        budget = None if pixel_width is None else max(pixel_width, 1) * oversample
+
+        visible = self.levels[0][:0]
+        for level, level_x in zip(self.levels, self._level_x):
+            lo = np.searchsorted(level_x, lo_x, side="left")
+            hi = np.searchsorted(level_x, hi_x, side="right")
+            visible = level[lo:hi]
+            if budget is None or hi - lo <= budget:
+                break
+
+        if pixel_width is None or len(visible) == 0:
+            return visible
+        if method == "lttb":
+            selected = lttb_indices(self.x[visible], self.y[visible], max(pixel_width, 3))
+        else:
+            selected = minmax_indices(self.y[visible], pixel_width)
+        return visible[selected]
+
+
+class CandlePyramid:
+    """
+    K线的多分辨率金字塔
+
+    第 k 级把每 factor**k 根原始K线合并为一根；查询时选择可见K线数不超过
+    图表宽度 / 每根K线最小像素数 的最细一级。
+    """
+
+    def __init__(self, candles: Dict[str, Sequence[float]], factor: int = 2,
+                 min_candles: int = PYRAMID_MIN_BUCKETS):
+        """
+        参数:
+            candles: 包含 time、open、high、low、close（可选 volume）的序列，time为数值
+            factor: 相邻两级的合并倍数
+            min_candles: 最粗一级保留的K线数
+        """
+        base = {key: np.asarray(values, dtype=np.float64) for key, values in candles.items()}
+        self.levels: List[Dict[str, np.ndarray]] = [base]
+        while len(self.levels[-1]["close"]) / factor >= min_candles:
+            self.levels.append(aggregate_ohlc(self.levels[-1], factor))
+
+    def query(self, pixel_width: Optional[int] = None,
+              t_start: Optional[float] = None, t_end: Optional[float] = None,
+              min_candle_px: int = 3) -> Dict[str, np.ndarray]:
+        """
+        取可见范围内合适分辨率的K线
+
+        参数:
+            pixel_width: 图表宽度（像素），None表示使用原始K线
+            t_start: 可见范围起点
+            t_end: 可见范围终点
+            min_candle_px: 每根K线至少占用的像素数
+
+        返回:
+            K线数组
+        """
+        budget = None if pixel_width is None else max(pixel_width // max(min_candle_px, 1), 1)
+        for level in self.levels:
+            times = level["time"]
+            lo = 0 if t_start is None else np.searchsorted(times, t_start, side="right") - 1
+            lo = max(lo, 0)
+            hi = len(times) if t_end is None else np.searchsorted(times, t_end, side="right")
+            if budget is None or hi - lo <= budget or level is self.levels[-1]:
+                visible = {key: values[lo:hi] for key, values in level.items()}
+                break
+        if budget is not None and len(visible["close"]) > budget:
+            # 最粗一级仍然太多时再合并可见部分
+            visible = aggregate_ohlc(visible, math.ceil(len(visible["close"]) / budget))
+        return visible
+
+
+class PyramidCache:
+    """
+    按键（如策略ID和序列名）缓存的金字塔，数据版本变化时重建，超过容量时淘汰最久未使用的
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[Hashable, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def get(self, key: Hashable, version: Hashable, build: Callable[[], Any]) -> Any:
+        """
+        取得金字塔
+
+        参数:
+            key: 缓存键
+            version: 数据版本（如点数和最后一个时间），变化时重建
+            build: 构建金字塔的函数，只在未命中时调用
+
+        返回:
+            金字塔
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        pyramid = build()
+        with self._lock:
+            self.builds += 1
+            self._entries[key] = (version, pyramid)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return pyramid
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """删除一个或全部金字塔"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+# 图表数据生产者共用的金字塔缓存
+CHART_CACHE = PyramidCache()
+
+
+def to_numeric_x(values: Sequence[Any]) -> np.ndarray:
+    """
+    把横坐标转为数值：数字原样使用，ISO时间字符串和datetime转为秒
+
+    参数:
+        values: 横坐标
+
+    返回:
+        float64数组；无法解析时返回下标
+    """
+    if len(values) and isinstance(values[0], Number):
+        return np.asarray(values, dtype=np.float64)
+    try:
+        if len(values) and isinstance(values[0], str):
+            values = [v[:-1] if v.endswith("Z") else v for v in values]
+        times = np.asarray(values, dtype="datetime64[us]")
+        return times.astype(np.int64) / 1e6
+    except (TypeError, ValueError):
+        return np.arange(len(values), dtype=np.float64)
+
+
+def downsample_records(records: List[Dict[str, Any]], y_field: str, pixel_width: Optional[int],
+                       x_field: Optional[str] = None, method: str = "lttb",
+                       cache_key: Optional[Hashable] = None,
+                       cache: Optional[PyramidCache] = None) -> List[Dict[str, Any]]:
+    """
+    对数据点字典列表降采样
+
+    参数:
+        records: 数据点列表
+        y_field: 纵坐标字段
+        pixel_width: 图表宽度（像素），None或点数不多时原样返回
+        x_field: 横坐标字段，None表示按下标
+        method: "lttb" 或 "minmax"
+        cache_key: 给出时使用按此键缓存的金字塔
+        cache: 金字塔缓存，默认 CHART_CACHE
+
+    返回:
+        选中的数据点（保持原顺序）
+    """
+    if not pixel_width or len(records) <= pixel_width:
+        return records
+
+    def series():
+        x = (np.arange(len(records), dtype=np.float64) if x_field is None
+             else to_numeric_x([r[x_field] for r in records]))
+        return x, np.asarray([r[y_field] for r in records], dtype=np.float64)
+
+    if cache_key is not None:
+        version = (len(records), records[-1].get(x_field) if x_field else None, records[-1].get(y_field))
+        pyramid = (cache or CHART_CACHE).get(cache_key, version, lambda: SeriesPyramid(*series()))
+        selected = pyramid.query(pixel_width, method=method)
+    else:
+        x, y = series()
+        selected = lttb_indices(x, y, max(pixel_width, 3)) if method == "lttb" else minmax_indices(y, pixel_width)
+    return [records[i] for i in selected]
@@ -0,0 +1,384 @@
+"""
+ui/strategy_aggregates.py
+功能描述: 策略监控的增量汇总层。交易和状态增量推送进来后以O(1)更新运行汇总，
+         仪表板指标只需遍历策略而不再遍历全部交易；状态快照按策略增量、去抖写入磁盘
+版本: 1.0.0
+创建日期: 2026-10-18
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Dict, Any, List, Optional, Iterable, Callable
+
+logger = logging.getLogger('strategy_monitor')
+
+
+class StrategyStats:
+    """单个策略的运行汇总"""
+
+    __slots__ = ("strategy_id", "name", "status", "trade_count", "winning_trades",
+                 "total_profit", "trade_profits")
+
+    def __init__(self, strategy_id: str, name: Optional[str] = None, status: Optional[str] = None):
+        self.strategy_id = strategy_id
+        self.name = name or strategy_id
+        self.status = status
+        self.trade_count = 0
+        self.winning_trades = 0
+        self.total_profit = 0.0
+        # 交易ID -> 盈亏，用于去重和交易更新
+        self.trade_profits: Dict[Any, float] = {}
+
+    @property
+    def avg_profit(self) -> float:
+        return self.total_profit / self.trade_count if self.trade_count else 0.0
+
+
+class StrategyAggregator:
+    """
+    策略汇总
+
+    维护每个策略以及全部策略的交易数、盈利交易数、总盈亏和状态计数。
+    新交易和交易更新都是O(1)；按交易ID去重，重复推送同一笔交易不会重复计数。
+    """
+
+    def __init__(self):
+        self._strategies: Dict[str, StrategyStats] = {}
+        self._status_counts: Counter = Counter()
+        self._lock = threading.RLock()
+        self.total_trades = 0
+        self.winning_trades = 0
+        self.total_profit = 0.0
+
+    def __contains__(self, strategy_id: str) -> bool:
+        return strategy_id in self._strategies
+
+    def get(self, strategy_id: str) -> Optional[StrategyStats]:
+        return self._strategies.get(strategy_id)
+
+    def _ensure(self, strategy_id: str) -> StrategyStats:
+        stats = self._strategies.get(strategy_id)
+        if stats is None:
+            stats = StrategyStats(strategy_id)
+            self._strategies[strategy_id] = stats
+            self._status_counts[stats.status] += 1
+        return stats
+
+    def register_strategy(self, strategy_id: str, strategy_data: Dict[str, Any]):
+        """
+        从完整的策略数据重建该策略的汇总（首次加载或数据被整体替换时使用）
+
+        Args:
+            strategy_id (str): 策略ID
+            strategy_data (Dict[str, Any]): 策略数据
+        """
+        with self._lock:
+            self.remove_strategy(strategy_id)
+            stats = self._ensure(strategy_id)
+            self.set_status(strategy_id, strategy_data.get("status"), strategy_data.get("name"))
+            for trade in strategy_data.get("trades", []):
+                self.apply_trade(strategy_id, trade)
+            return stats
+
+    def remove_strategy(self, strategy_id: str):
+        """
+        移除策略并从全局汇总中扣除
+
+        Args:
+            strategy_id (str): 策略ID
+        """
+        with self._lock:
+            stats = self._strategies.pop(strategy_id, None)
+            if stats is None:
+                return
+            self._status_counts[stats.status] -= 1
+            self.total_trades -= stats.trade_count
+            self.winning_trades -= stats.winning_trades
+            self.total_profit -= stats.total_profit
+
+    def set_status(self, strategy_id: str, status: Optional[str], name: Optional[str] = None):
+        """
+        更新策略状态
+
+        Args:
+            strategy_id (str): 策略ID
+            status (Optional[str]): 新状态
+            name (Optional[str], optional): 策略名称. Defaults to None.
+        """
+        with self._lock:
+            stats = self._ensure(strategy_id)
+            if name:
+                stats.name = name
+            if status != stats.status:
+                self._status_counts[stats.status] -= 1
+                self._status_counts[status] += 1
+                stats.status = status
+
+    def apply_trade(self, strategy_id: str, trade: Dict[str, Any]) -> bool:
+        """
+        加入一笔交易或更新已有交易的盈亏
+
+        Args:
+            strategy_id (str): 策略ID
+            trade (Dict[str, Any]): 交易数据
+
+        Returns:
+            bool: 是否为新交易
+        """
+        profit = trade.get("profit", 0) or 0
+        trade_id = trade.get("id")
+
+        with self._lock:
+            stats = self._ensure(strategy_id)
+            if trade_id is None:
+                trade_id = ("#", stats.trade_count)
+
+            if trade_id in stats.trade_profits:
+                self._update_profit(stats, trade_id, profit)
+                return False
+
+            stats.trade_profits[trade_id] = profit
+            stats.trade_count += 1
+            self.total_trades += 1
+            stats.total_profit += profit
+            self.total_profit += profit
+            if profit > 0:
+                stats.winning_trades += 1
+                self.winning_trades += 1
+            return True
+
+    def _update_profit(self, stats: StrategyStats, trade_id: Any, profit: float):
+        """已有交易更新：扣除旧盈亏，计入新盈亏"""
+        previous = stats.trade_profits[trade_id]
+        delta_wins = (profit > 0) - (previous > 0)
+        stats.winning_trades += delta_wins
+        self.winning_trades += delta_wins
+        stats.total_profit += profit - previous
+        self.total_profit += profit - previous
+        stats.trade_profits[trade_id] = profit
+
+    def sync_trades(self, strategy_id: str, trades: List[Dict[str, Any]]) -> int:
+        """
+        与一份完整的交易列表同步。已有交易按ID比较盈亏，变化的只计入差值，
+        末尾新增的交易直接加入；已有交易的ID或顺序变化（交易被删除或替换）时整体重建
+
+        Args:
+            strategy_id (str): 策略ID
+            trades (List[Dict[str, Any]]): 交易列表
+
+        Returns:
+            int: 新增和盈亏变化的交易数
+        """
+        with self._lock:
+            stats = self._ensure(strategy_id)
+            seen = stats.trade_count
+            keys = [
+                trade_id if trade_id is not None else ("#", i)
+                for i, trade_id in enumerate(trade.get("id") for trade in trades[:seen])
+            ]
+            if len(trades) < seen or keys != list(stats.trade_profits):
+                status, name = stats.status, stats.name
+                self.remove_strategy(strategy_id)
+                self.set_status(strategy_id, status, name)
+                seen = 0
+
+            changed = 0
+            if seen:
+                for key, trade in zip(keys, trades):
+                    profit = trade.get("profit", 0) or 0
+                    if profit != stats.trade_profits[key]:
+                        self._update_profit(stats, key, profit)
+                        changed += 1
+            for trade in trades[seen:]:
+                self.apply_trade(strategy_id, trade)
+            return changed + len(trades) - seen
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        仪表板汇总指标，只遍历策略
+
+        Returns:
+            Dict[str, Any]: 与逐笔交易计算结果一致的仪表板指标
+        """
+        with self._lock:
+            if not self._strategies:
+                return {
+                    "total_strategies": 0,
+                    "active_count": 0,
+                    "paused_count": 0,
+                    "total_trades": 0,
+                    "winning_trades": 0,
+                    "total_profit": 0,
+                    "best_strategy": None,
+                    "worst_strategy": None
+                }
+
+            best = worst = None
+            for stats in self._strategies.values():
+                if not stats.trade_count:
+                    continue
+                if best is None or stats.avg_profit > best.avg_profit:
+                    best = stats
+                if worst is None or stats.avg_profit < worst.avg_profit:
+                    worst = stats
+
+            return {
+                "total_strategies": len(self._strategies),
+                "active_count": self._status_counts["active"],
+                "paused_count": self._status_counts["paused"],
+                "total_trades": self.total_trades,
+                "winning_trades": self.winning_trades,
+                "win_rate": self.winning_trades / self.total_trades if self.total_trades > 0 else 0,
+                "total_profit": self.total_profit,
+                "best_strategy": self._performance(best),
+                "worst_strategy": self._performance(worst)
+            }
+
+    @staticmethod
+    def _performance(stats: Optional[StrategyStats]) -> Optional[Dict[str, Any]]:
+        if stats is None:
+            return None
+        return {
+            "id": stats.strategy_id,
+            "name": stats.name,
+            "profit": stats.total_profit,
+            "trade_count": stats.trade_count,
+            "avg_profit": stats.avg_profit
+        }
+
+
+class IncrementalSnapshot:
+    """
+    去抖的增量状态快照
+
+    每个策略保存为 <snapshot_dir>/<策略ID>.json；标记为已修改的策略在最后一次修改后
+    delay 秒（或最早修改后 max_delay 秒）统一写入，只写修改过的策略，写入使用临时文件原子替换。
+    """
+
+    def __init__(self,
+                 snapshot_dir: str,
+                 get_state: Callable[[str], Optional[Dict[str, Any]]],
+                 delay: float = 2.0,
+                 max_delay: float = 10.0):
+        """
+        Args:
+            snapshot_dir (str): 快照目录
+            get_state (Callable): 根据策略ID返回要保存的策略数据，返回None表示策略已删除；
+                在定时器线程中调用，返回的数据不能再被其他线程修改
+            delay (float, optional): 去抖延迟（秒）. Defaults to 2.0.
+            max_delay (float, optional): 最长延迟（秒）. Defaults to 10.0.
+        """
+        self.snapshot_dir = snapshot_dir
+        self.get_state = get_state
+        self.delay = delay
+        self.max_delay = max_delay
+        self._dirty: set = set()
+        self._first_dirty_time: Optional[float] = None
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self.files_written = 0
+        self.flushes = 0
+        os.makedirs(snapshot_dir, exist_ok=True)
+
+    def _path(self, strategy_id: str) -> str:
+        safe_id = "".join(c if c.isalnum() or c in "-_." else "_" for c in str(strategy_id))
+        return os.path.join(self.snapshot_dir, f"{safe_id}.json")
+
+    def mark_dirty(self, strategy_ids: Iterable[str]):
+        """
+        标记策略已修改，并安排去抖写入
+
+        Args:
+            strategy_ids (Iterable[str]): 策略ID
+        """
+        with self._lock:
+            self._dirty.update(strategy_ids)
+            if not self._dirty:
+                return
+            now = time.monotonic()
+            if self._first_dirty_time is None:
+                self._first_dirty_time = now
+            wait = min(self.delay, max(0.0, self._first_dirty_time + self.max_delay - now))
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(wait, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> int:
+        """
+        立即写入所有已修改的策略
+
+        Returns:
+            int: 写入（或删除）的文件数
+        """
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            self._first_dirty_time = None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        written = 0
+        failed = []
+        for strategy_id in dirty:
+            path = self._path(strategy_id)
+            temp_path = None
+            try:
+                state = self.get_state(strategy_id)
+                if state is None:
+                    if os.path.exists(path):
+                        os.remove(path)
+                        written += 1
+                    continue
+                fd, temp_path = tempfile.mkstemp(dir=self.snapshot_dir, prefix=".tmp-")
+                with os.fdopen(fd, 'w') as f:
+                    json.dump({"strategy_id": strategy_id, "data": state}, f)
+                os.replace(temp_path, path)
+                written += 1
+            except Exception as e:
+                logger.error(f"Failed to save snapshot for strategy {strategy_id}: {str(e)}")
+                if temp_path is not None and os.path.exists(temp_path):
+                    os.remove(temp_path)
+                failed.append(strategy_id)
+
+        self.files_written += written
+        self.flushes += 1
+        # 写入失败的策略重新标记，delay 秒后重试
+        if failed:
+            self.mark_dirty(failed)
+        return written
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """
+        读取全部策略快照
+
+        Returns:
+            Dict[str, Dict[str, Any]]: 策略ID -> 策略数据
+        """
+        strategies = {}
+        for filename in sorted(os.listdir(self.snapshot_dir)):
+            if not filename.endswith(".json") or filename.startswith("."):
+                continue
+            try:
+                with open(os.path.join(self.snapshot_dir, filename), 'r') as f:
+                    snapshot = json.load(f)
+                strategies[snapshot["strategy_id"]] = snapshot["data"]
+            except Exception as e:
+                logger.error(f"Failed to load snapshot {filename}: {str(e)}")
+        return strategies
+
+    @property
+    def pending(self) -> int:
+        """等待写入的策略数"""
+        with self._lock:
+            return len(self._dirty)
+
+    def close(self):
+        """写入剩余修改并停止计时器"""
+        self.flush()
@@ -12,6 +12,7 @@ ui/strategy_monitor.py
 """
 
 from api.modules.trading_api import get_strategy_data
+import copy
 import json
 import logging
 import time
@@ -20,14 +21,17 @@ from typing import Dict, Any, List, Optional, Tuple, Union
 import os
 import threading
 import asyncio
-import config.paths as pd
-import modules.nlp as np
+import pandas as pd
+import numpy as np
 from flask import Flask, jsonify, request, render_template, send_from_directory
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import plotly.express as px
 import plotly
 
+from ui.strategy_aggregates import StrategyAggregator, IncrementalSnapshot
+from ui.charts.downsampling import CHART_CACHE, SeriesPyramid, to_numeric_x
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -42,6 +46,9 @@ DEFAULT_DATA_PATH = os.path.join(os.path.dirname(__file__), "../data/monitor")
 DEFAULT_PORT = 5000
 DEFAULT_HOST = "0.0.0.0"
 REFRESH_INTERVAL = 60  # 秒
+SAVE_DEBOUNCE = 2.0  # 秒，状态修改后延迟写盘的时间
+MAX_PRICE_POINTS = 100
+MAX_EQUITY_POINTS = 365
 
 # 监控状态
 MONITOR_STATUS = {
@@ -52,9 +59,17 @@ MONITOR_STATUS = {
     "active_strategies": {},
     "last_error": None,
     "update_thread": None,
-    "running": False
+    "running": False,
+    "aggregator": None,
+    "snapshot": None
 }
 
+# 保护 active_strategies 的并发修改（推送接口、Flask请求线程和轮询线程）
+_STATE_LOCK = threading.RLock()
+
+# 策略更新监听函数 (strategy_id, strategy_data, delta)，如增量推送通道
+MONITOR_LISTENERS = []
+
 
 class MonitorInitError(Exception):
     """监控初始化异常"""
@@ -85,6 +100,8 @@ def initialize_monitor(config: Optional[Dict[str, Any]] = None) -> bool:
             "port": DEFAULT_PORT,
             "host": DEFAULT_HOST,
             "refresh_interval": REFRESH_INTERVAL,
+            "save_debounce": SAVE_DEBOUNCE,
+            "enable_polling": True,
             "debug": False
         }
 
@@ -104,6 +121,21 @@ def initialize_monitor(config: Optional[Dict[str, Any]] = None) -> bool:
             with open(strategies_path, 'r') as f:
                 MONITOR_STATUS["active_strategies"] = json.load(f)
 
+        # 按策略保存的增量快照比整体状态文件新
+        snapshot = IncrementalSnapshot(
+            os.path.join(config["data_path"], "strategies"),
+            get_state=_strategy_snapshot,
+            delay=config.get("save_debounce", SAVE_DEBOUNCE)
+        )
+        MONITOR_STATUS["active_strategies"].update(snapshot.load())
+        MONITOR_STATUS["snapshot"] = snapshot
+
+        # 建立运行汇总
+        aggregator = StrategyAggregator()
+        for s_id, strategy_data in MONITOR_STATUS["active_strategies"].items():
+            aggregator.register_strategy(s_id, strategy_data)
+        MONITOR_STATUS["aggregator"] = aggregator
+
         # 设置路由
         _setup_routes()
 
@@ -151,7 +183,8 @@ def _setup_routes():
     def get_strategy_performance(strategy_id):
         """获取指定策略性能数据"""
         timeframe = request.args.get('timeframe', '1d')
-        chart_data = generate_performance_chart(strategy_id, timeframe)
+        pixel_width = request.args.get('pixel_width', type=int)
+        chart_data = generate_performance_chart(strategy_id, timeframe, pixel_width)
         return jsonify(chart_data)
 
     @app.route('/api/dashboard/update', methods=['GET'])
@@ -167,21 +200,29 @@ def _setup_routes():
         metrics = _calculate_dashboard_metrics()
         return jsonify(metrics)
 
+    @app.route('/api/strategy/<strategy_id>/delta', methods=['POST'])
+    def post_strategy_delta(strategy_id):
+        """推送策略增量（新交易、状态、价格和权益点）"""
+        delta = request.get_json(silent=True)
+        if not isinstance(delta, dict):
+            return jsonify({"error": "Delta must be a JSON object"}), 400
+        return jsonify(push_strategy_update(strategy_id, delta))
+
+
+def _strategy_snapshot(strategy_id: str) -> Optional[Dict[str, Any]]:
+    """在状态锁内复制策略数据，供快照线程和推送通道在锁外读取"""
+    with _STATE_LOCK:
+        strategy_data = MONITOR_STATUS["active_strategies"].get(strategy_id)
+        return copy.deepcopy(strategy_data) if strategy_data is not None else None
 
 def _save_monitor_state():
-    """保存监控状态到磁盘"""
+    """立即把修改过的策略写入磁盘快照"""
     if not MONITOR_STATUS["initialized"]:
         return False
 
     try:
-        config = MONITOR_STATUS["config"]
-
-        # 保存活跃策略
-        strategies_path = os.path.join(
-            config["data_path"], "active_strategies.json")
-        with open(strategies_path, 'w') as f:
-            json.dump(MONITOR_STATUS["active_strategies"], f, indent=2)
-
+        with _STATE_LOCK:
+            MONITOR_STATUS["snapshot"].flush()
         return True
 
     except Exception as e:
@@ -189,21 +230,134 @@ def _save_monitor_state():
         return False
 
 
+def _mark_dirty(strategy_ids):
+    """标记策略已修改，快照在去抖延迟后增量写入"""
+    snapshot = MONITOR_STATUS.get("snapshot")
+    if snapshot is not None:
+        snapshot.mark_dirty(strategy_ids)
+
+
+def push_strategy_update(strategy_id: str, delta: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    推送策略增量
+
+    新交易追加到策略并以O(1)计入汇总（相同ID的交易视为更新）；价格点和权益点追加到末尾并保留最近的部分；
+    其他字段（如 status、name）直接覆盖。修改会在去抖延迟后增量写盘。
+
+    Args:
+        strategy_id (str): 策略ID
+        delta (Dict[str, Any]): 增量数据，可包含 trades、price_data、equity_curve 以及策略字段
+
+    Returns:
+        Dict[str, Any]: 处理结果
+    """
+    if not MONITOR_STATUS["initialized"]:
+        raise MonitorInitError("Monitor not initialized")
+
+    aggregator = MONITOR_STATUS["aggregator"]
+    update_time = datetime.now().isoformat()
+    added_trades = []
+    updated_trades = []
+
+    with _STATE_LOCK:
+        strategy_data = MONITOR_STATUS["active_strategies"].get(strategy_id)
+        if strategy_data is None:
+            strategy_data = {
+                "id": strategy_id,
+                "name": delta.get("name", f"Strategy {strategy_id}"),
+                "status": delta.get("status", "active"),
+                "created_date": update_time,
+                "price_data": [],
+                "trades": [],
+                "equity_curve": []
+            }
+            MONITOR_STATUS["active_strategies"][strategy_id] = strategy_data
+
+        for key, value in delta.items():
+            if key not in ("trades", "price_data", "equity_curve"):
+                strategy_data[key] = value
+
+        trades = strategy_data.setdefault("trades", [])
+        for trade in delta.get("trades", []):
+            if aggregator.apply_trade(strategy_id, trade):
+                trades.append(trade)
+                added_trades.append(trade)
+            else:
+                updated_trades.append(trade)
+                # 更新已有交易，新近的交易更可能被更新，从末尾查找
+                for i in range(len(trades) - 1, -1, -1):
+                    if trades[i].get("id") == trade.get("id"):
+                        trades[i] = trade
+                        break
+
+        for key, limit in (("price_data", MAX_PRICE_POINTS), ("equity_curve", MAX_EQUITY_POINTS)):
+            if delta.get(key):
+                points = strategy_data.setdefault(key, [])
+                points.extend(delta[key])
+                if len(points) > limit:
+                    del points[:-limit]
+
+        aggregator.set_status(strategy_id, strategy_data.get("status"), strategy_data.get("name"))
+        strategy_data["last_update"] = update_time
+
+        applied = dict(delta, trades=added_trades, updated_trades=updated_trades,
+                       last_update=update_time)
+        _notify_listeners(strategy_id, strategy_data, applied)
+
+    _mark_dirty([strategy_id])
+
+    return {
+        "update_time": update_time,
+        "strategy_id": strategy_id,
+        "new_trades": len(added_trades)
+    }
+
+
+def push_trade(strategy_id: str, trade: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    推送一笔新交易或交易更新
+
+    Args:
+        strategy_id (str): 策略ID
+        trade (Dict[str, Any]): 交易数据
+
+    Returns:
+        Dict[str, Any]: 处理结果
+    """
+    return push_strategy_update(strategy_id, {"trades": [trade]})
+
+
+def push_status(strategy_id: str, status: str) -> Dict[str, Any]:
+    """
+    推送策略状态变化
+
+    Args:
+        strategy_id (str): 策略ID
+        status (str): 新状态
+
+    Returns:
+        Dict[str, Any]: 处理结果
+    """
+    return push_strategy_update(strategy_id, {"status": status})
+
+
 def _start_update_thread():
     """启动自动更新线程"""
     if not MONITOR_STATUS["initialized"] or MONITOR_STATUS["running"]:
         return
 
+    # 所有数据都通过推送接口进入时不需要轮询
+    if not MONITOR_STATUS["config"].get("enable_polling", True):
+        logger.info("Polling disabled, waiting for pushed updates")
+        return
+
     def update_loop():
         MONITOR_STATUS["running"] = True
         while MONITOR_STATUS["running"]:
             try:
-                # 更新所有策略状态
+                # 更新所有策略状态（状态由快照去抖写盘）
                 update_strategy_dashboard()
 
-                # 保存状态
-                _save_monitor_state()
-
             except Exception as e:
                 logger.error(f"Error in update thread: {str(e)}")
 
@@ -248,8 +402,7 @@ def update_strategy_dashboard(strategy_id: Optional[str] = None) -> Dict[str, An
                 updated_data = _fetch_strategy_data(strategy_id)
 
                 if updated_data:
-                    strategy_data.update(updated_data)
-                    strategy_data["last_update"] = update_time
+                    _apply_polled_data(strategy_id, strategy_data, updated_data, update_time)
                     results["updated_strategies"].append(strategy_id)
             else:
                 results["error"] = f"Strategy {strategy_id} not found"
@@ -262,12 +415,11 @@ def update_strategy_dashboard(strategy_id: Optional[str] = None) -> Dict[str, An
                 updated_data = _fetch_strategy_data(s_id)
 
                 if updated_data:
-                    strategy_data.update(updated_data)
-                    strategy_data["last_update"] = update_time
+                    _apply_polled_data(s_id, strategy_data, updated_data, update_time)
                     results["updated_strategies"].append(s_id)
 
-        # 保存状态
-        _save_monitor_state()
+        # 标记修改，由快照去抖增量写盘
+        _mark_dirty(results["updated_strategies"])
 
         return results
 
@@ -277,6 +429,62 @@ def update_strategy_dashboard(strategy_id: Optional[str] = None) -> Dict[str, An
         return results
 
 
+def _apply_polled_data(strategy_id: str,
+                       strategy_data: Dict[str, Any],
+                       updated_data: Dict[str, Any],
+                       update_time: str):
+    """
+    合并轮询得到的策略数据并同步汇总（交易列表只追加时只计入新增交易）
+
+    Args:
+        strategy_id (str): 策略ID
+        strategy_data (Dict[str, Any]): 当前策略数据
+        updated_data (Dict[str, Any]): 轮询得到的数据
+        update_time (str): 更新时间
+    """
+    with _STATE_LOCK:
+        strategy_data.update(updated_data)
+        strategy_data["last_update"] = update_time
+
+        aggregator = MONITOR_STATUS["aggregator"]
+        aggregator.set_status(strategy_id, strategy_data.get("status"), strategy_data.get("name"))
+        aggregator.sync_trades(strategy_id, strategy_data.get("trades", []))
+
+        _notify_listeners(strategy_id, strategy_data, None)
+
+
+def add_update_listener(listener):
+    """
+    注册策略更新监听函数
+
+    Args:
+        listener (Callable): 参数为 (strategy_id, strategy_data, delta)；推送的修改传入实际生效的增量，
+            轮询得到的完整数据传入 None
+    """
+    if listener not in MONITOR_LISTENERS:
+        MONITOR_LISTENERS.append(listener)
+
+
+def remove_update_listener(listener):
+    """
+    移除策略更新监听函数
+
+    Args:
+        listener (Callable): 监听函数
+    """
+    if listener in MONITOR_LISTENERS:
+        MONITOR_LISTENERS.remove(listener)
+
+
+def _notify_listeners(strategy_id, strategy_data, delta):
+    """通知监听函数（调用方持有状态锁）"""
+    for listener in list(MONITOR_LISTENERS):
+        try:
+            listener(strategy_id, strategy_data, delta)
+        except Exception as e:
+            logger.error(f"Update listener failed for strategy {strategy_id}: {str(e)}")
+
+
 def _fetch_strategy_data(strategy_id: str) -> Dict[str, Any]:
     """
     从交易API获取策略数据
@@ -505,13 +713,54 @@ def _generate_dummy_data(strategy_id: str) -> Dict[str, Any]:
         return strategy_info
 
 
-def generate_performance_chart(strategy_id: str, timeframe: str = "1d") -> Dict[str, Any]:
+def _chart_points(strategy_id: str,
+                  points: List[Dict[str, Any]],
+                  series: str,
+                  value_field: str,
+                  start_time: datetime,
+                  pixel_width: Optional[int],
+                  method: str) -> List[Dict[str, Any]]:
+    """
+    取时间范围内（按图表宽度降采样后）的数据点
+
+    时间解析和多分辨率金字塔按策略缓存，数据没有变化时只需二分查找可见范围。
+
+    Args:
+        strategy_id (str): 策略ID
+        points (List[Dict[str, Any]]): 数据点，按时间递增
+        series (str): 序列名
+        value_field (str): 数值字段
+        start_time (datetime): 起始时间
+        pixel_width (Optional[int]): 图表宽度（像素），None表示不降采样
+        method (str): 降采样方法，"minmax" 或 "lttb"
+
+    Returns:
+        List[Dict[str, Any]]: 选中的数据点
+    """
+    if not points:
+        return []
+
+    version = (len(points), points[-1]["time"], points[-1][value_field])
+    pyramid = CHART_CACHE.get(
+        (strategy_id, series), version,
+        lambda: SeriesPyramid(to_numeric_x([p["time"] for p in points]),
+                              [p[value_field] for p in points]))
+    # 与数据点使用同样的方式换算，避免本地时区偏移
+    x_start = to_numeric_x([start_time.isoformat()])[0]
+    selected = pyramid.query(pixel_width, x_start=x_start, method=method)
+    return [points[i] for i in selected]
+
+
+def generate_performance_chart(strategy_id: str, timeframe: str = "1d",
+                               pixel_width: Optional[int] = None) -> Dict[str, Any]:
     """
     生成策略性能图表
     
     Args:
         strategy_id (str): 策略ID
         timeframe (str, optional): 时间周期. Defaults to "1d".
+        pixel_width (Optional[int], optional): 图表宽度（像素），给出时价格按每像素最小/最大值、
+            权益曲线按LTTB降采样. Defaults to None.
         
     Returns:
         Dict[str, Any]: 图表数据
@@ -545,13 +794,9 @@ def generate_performance_chart(strategy_id: str, timeframe: str = "1d") -> Dict[
         start_time = now - timedelta(days=30)  # 默认30天
 
     # 提取价格数据
-    price_data = strategy_data.get("price_data", [])
-    filtered_price_data = []
-
-    for point in price_data:
-        point_time = datetime.fromisoformat(point["time"])
-        if point_time >= start_time:
-            filtered_price_data.append(point)
+    filtered_price_data = _chart_points(
+        strategy_id, strategy_data.get("price_data", []), "price_data", "price",
+        start_time, pixel_width, "minmax")
 
     # 转换为DataFrame
     price_df = pd.DataFrame(filtered_price_data)
@@ -559,13 +804,9 @@ def generate_performance_chart(strategy_id: str, timeframe: str = "1d") -> Dict[
         price_df["time"] = pd.to_datetime(price_df["time"])
 
     # 提取权益曲线数据
-    equity_data = strategy_data.get("equity_curve", [])
-    filtered_equity_data = []
-
-    for point in equity_data:
-        point_time = datetime.fromisoformat(point["time"])
-        if point_time >= start_time:
-            filtered_equity_data.append(point)
+    filtered_equity_data = _chart_points(
+        strategy_id, strategy_data.get("equity_curve", []), "equity_curve", "equity",
+        start_time, pixel_width, "lttb")
 
     # 转换为DataFrame
     equity_df = pd.DataFrame(filtered_equity_data)
@@ -852,78 +1093,14 @@ def _calculate_dashboard_metrics() -> Dict[str, Any]:
     Returns:
         Dict[str, Any]: 仪表板指标
     """
-    active_strategies = MONITOR_STATUS["active_strategies"]
-
-    if not active_strategies:
-        return {
-            "total_strategies": 0,
-            "active_count": 0,
-            "paused_count": 0,
-            "total_trades": 0,
-            "winning_trades": 0,
-            "total_profit": 0,
-            "best_strategy": None,
-            "worst_strategy": None
-        }
-
-    # 基本计数
-    total_strategies = len(active_strategies)
-    active_count = sum(1 for s in active_strategies.values()
-                       if s.get("status") == "active")
-    paused_count = sum(1 for s in active_strategies.values()
-                       if s.get("status") == "paused")
+    aggregator = MONITOR_STATUS.get("aggregator")
+    if aggregator is None:
+        aggregator = StrategyAggregator()
+        for strategy_id, strategy in MONITOR_STATUS["active_strategies"].items():
+            aggregator.register_strategy(strategy_id, strategy)
 
-    # 交易统计
-    all_trades = []
-    for strategy in active_strategies.values():
-        all_trades.extend(strategy.get("trades", []))
-
-    total_trades = len(all_trades)
-    winning_trades = sum(
-        1 for trade in all_trades if trade.get("profit", 0) > 0)
-    total_profit = sum(trade.get("profit", 0) for trade in all_trades)
-
-    # 找出最佳和最差策略
-    strategy_performance = []
-
-    for strategy_id, strategy in active_strategies.items():
-        trades = strategy.get("trades", [])
-
-        if not trades:
-            continue
-
-        strategy_profit = sum(trade.get("profit", 0) for trade in trades)
-        strategy_trade_count = len(trades)
-
-        if strategy_trade_count > 0:
-            strategy_performance.append({
-                "id": strategy_id,
-                "name": strategy.get("name", strategy_id),
-                "profit": strategy_profit,
-                "trade_count": strategy_trade_count,
-                "avg_profit": strategy_profit / strategy_trade_count
-            })
-
-    best_strategy = None
-    worst_strategy = None
-
-    if strategy_performance:
-        best_strategy = max(strategy_performance,
-                            key=lambda x: x["avg_profit"])
-        worst_strategy = min(strategy_performance,
-                             key=lambda x: x["avg_profit"])
-
-    return {
-        "total_strategies": total_strategies,
-        "active_count": active_count,
-        "paused_count": paused_count,
-        "total_trades": total_trades,
-        "winning_trades": winning_trades,
-        "win_rate": winning_trades / total_trades if total_trades > 0 else 0,
-        "total_profit": total_profit,
-        "best_strategy": best_strategy,
-        "worst_strategy": worst_strategy
-    }
+    # 运行汇总由推送和轮询增量维护，这里只遍历策略
+    return aggregator.metrics()
 
 
 def run_server():
@@ -960,8 +1137,9 @@ def shutdown():
         # 停止更新线程
         MONITOR_STATUS["running"] = False
 
-        # 保存状态
+        # 写入剩余修改
         _save_monitor_state()
+        MONITOR_STATUS["snapshot"].close()
 
         # 重置状态
         MONITOR_STATUS = {
@@ -972,7 +1150,9 @@ def shutdown():
             "active_strategies": {},
             "last_error": None,
             "update_thread": None,
-            "running": False
+            "running": False,
+            "aggregator": None,
+            "snapshot": None
         }
 
         logger.info("Monitor system shutdown successfully")
@@ -9,6 +9,8 @@ import json
 from typing import Dict, List, Optional, Union, Any
 from datetime import datetime, timedelta
 
+from ui.charts.downsampling import downsample_records
+
 
 class PerformanceDashboard:
     """
@@ -163,10 +165,14 @@ class PerformanceDashboard:
             "avg_trade_duration": {"value": 14.3, "unit": "hours", "change": -1.2},
         }
 
-    def get_equity_curve_data(self) -> List[Dict[str, Any]]:
+    def get_equity_curve_data(self, pixel_width: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Get the equity curve data.
 
+        Args:
+            pixel_width: Optional chart width in pixels; the curve is reduced
+                with LTTB to about one point per pixel
+
         Returns:
             A list of data points for the equity curve
         """
@@ -199,7 +205,10 @@ class PerformanceDashboard:
                 }
             )
 
-        return data
+        return downsample_records(
+            data, "equity", pixel_width, x_field="timestamp",
+            cache_key=("performance", self.strategy_id, self.time_range),
+        )
 
     def get_monthly_performance(self) -> List[Dict[str, Any]]:
         """
@@ -326,10 +335,14 @@ class PerformanceDashboard:
             },
         }
 
-    def render(self) -> Dict[str, Any]:
+    def render(self, pixel_width: Optional[int] = None) -> Dict[str, Any]:
         """
         Render the performance dashboard.
 
+        Args:
+            pixel_width: Optional chart width in pixels used to downsample
+                the equity curve
+
         Returns:
             A dictionary with all the data needed to render the dashboard
         """
@@ -341,7 +354,7 @@ class PerformanceDashboard:
             "metrics": self.metrics,
             "layout": self.layout,
             "summary_metrics": self.get_summary_metrics(),
-            "equity_curve": self.get_equity_curve_data(),
+            "equity_curve": self.get_equity_curve_data(pixel_width),
             "monthly_performance": self.get_monthly_performance(),
             "drawdown_periods": self.get_drawdown_periods(),
             "trade_statistics": self.get_trade_statistics(),
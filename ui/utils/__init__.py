@@ -7,4 +7,4 @@ project_root = os.path.abspath(os.path.join(
 if project_root not in sys.path:
     pass
 sys.path.insert(0, project_root)
-﻿  # UI工具初始化
\ No newline at end of file
+  # UI工具初始化
\ No newline at end of file
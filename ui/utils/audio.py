@@ -1,4 +1,4 @@
-""""
+"""
 音效处理工具模块 - Audio Utilities
 
 这个模块提供了应用程序的音频处理和管理功能，负责界面音效、通知声音和背景音乐。
@@ -10,12 +10,13 @@
     - 通知声音管理
     - 背景音乐控制
     - 音频预加载和缓存
+    - 单线程软件混音播放界面音效（见 sound_engine）
     - 音量控制和静音设置
     - 无障碍声音支持
 
 作者: AI助手
 日期: 2025-04-19
-""""
+"""
 
 import os
 import time
@@ -32,6 +33,9 @@ import math
 import random
 import threading
 
+import numpy as np
+
+from .sound_engine import SoundEngine, Voice, default_sink
 
 # 尝试导入不同平台的音频库
 try:
@@ -132,18 +136,18 @@ class AudioMetadata:
 
 
 class AudioFile:
-    """"
+    """
     音频文件类
     
     表示一个音频文件及其属性和状态
-    """"
+    """
     
-def __init__(self,:
+    def __init__(self,
                  file_path: str,
                  properties: Optional[AudioProperties] = None,
                  category: AudioCategory = AudioCategory.UI_FEEDBACK,
                  metadata: Optional[AudioMetadata] = None):
-        """"
+        """
         初始化音频文件
         
         参数:
@@ -151,7 +155,7 @@ def __init__(self,:
             properties: 音频属性
             category: 音频类别
             metadata: 音频元数据
-        """"
+        """
         self.file_path = file_path
         self.properties = properties or AudioProperties()
         self.category = category
@@ -171,12 +175,12 @@ def __init__(self,:
         self.on_error_callbacks = []
     
     def load(self) -> bool:
-        """"
+        """
         加载音频文件
         
         返回:
             bool: 是否加载成功
-        """"
+        """
         try:
             self.state = AudioState.LOADING
             
@@ -305,12 +309,12 @@ def __init__(self,:
             logger.warning(f"加载WAV元数据时出错: {e}")
     
     def play(self) -> bool:
-        """"
+        """
         播放音频文件
         
         返回:
             bool: 是否成功开始播放
-        """"
+        """
         if self.state == AudioState.ERROR:
             logger.error(f"无法播放，音频处于错误状态: {self.file_path}")
             return False
@@ -422,12 +426,12 @@ def __init__(self,:
             self._trigger_error(str(e))
     
     def pause(self) -> bool:
-        """"
+        """
         暂停播放
         
         返回:
             bool: 是否成功暂停
-        """"
+        """
         if self.state != AudioState.PLAYING:
             return False
         
@@ -451,12 +455,12 @@ def __init__(self,:
             return False
     
     def resume(self) -> bool:
-        """"
+        """
         恢复播放
         
         返回:
             bool: 是否成功恢复
-        """"
+        """
         if self.state != AudioState.PAUSED:
             return False
         
@@ -479,12 +483,12 @@ def __init__(self,:
             return False
     
     def stop(self) -> bool:
-        """"
+        """
         停止播放
         
         返回:
             bool: 是否成功停止
-        """"
+        """
         if self.state not in [AudioState.PLAYING, AudioState.PAUSED]:
             return False
         
@@ -513,12 +517,12 @@ def __init__(self,:
             return False
     
     def set_volume(self, volume: float) -> None:
-        """"
+        """
         设置音量
         
         参数:
             volume: 音量值 (0.0-1.0)
-        """"
+        """
         # 限制音量范围
         volume = max(0.0, min(1.0, volume))
         
@@ -617,11 +621,11 @@ def __init__(self,:
 
 
 class AudioManager:
-    """"
+    """
     音频管理器
     
     管理应用程序中的所有音频资源和播放控制
-    """"
+    """
     
     # 默认音效路径
     DEFAULT_SOUNDS = {
@@ -643,13 +647,44 @@ class AudioManager:
         SoundType.MESSAGE: "sounds/notifications/message.wav"
     }
     
-    def __init__(self, sound_dir: Optional[str] = None):
-        """"
+    # 默认音效文件不存在时在内存中生成的音效
+    DEFAULT_SOUND_GENERATORS = {
+        SoundType.CLICK: lambda: click_sound_samples(),
+        SoundType.HOVER: lambda: hover_sound_samples(),
+        SoundType.TOGGLE: lambda: toggle_sound_samples(is_on=True),
+        SoundType.TYPING: lambda: typing_sound_samples(),
+        SoundType.POPUP_OPEN: lambda: popup_sound_samples(is_open=True),
+        SoundType.POPUP_CLOSE: lambda: popup_sound_samples(is_open=False),
+        SoundType.SUCCESS: lambda: success_sound_samples(),
+        SoundType.ERROR: lambda: error_sound_samples(),
+        SoundType.NOTIFICATION: lambda: notification_sound_samples(),
+    }
+    
+    # 混音声部已满时的抢占优先级，数值大的可以抢占数值小的
+    CATEGORY_PRIORITIES = {
+        AudioCategory.AMBIENT: 0,
+        AudioCategory.BACKGROUND: 0,
+        AudioCategory.UI_FEEDBACK: 1,
+        AudioCategory.SUCCESS: 2,
+        AudioCategory.NOTIFICATION: 2,
+        AudioCategory.ERROR: 3,
+        AudioCategory.ALERT: 3
+    }
+    
+    def __init__(self,
+                 sound_dir: Optional[str] = None,
+                 use_mixer: bool = True,
+                 sink=None,
+                 max_voices: int = 16):
+        """
         初始化音频管理器
         
         参数:
             sound_dir: 音效文件目录，如果为None则使用默认目录
-        """"
+            use_mixer: 是否使用软件混音引擎播放音效（需要可用的输出端）
+            sink: 混音输出端，为None时使用平台默认的流式输出端
+            max_voices: 混音引擎同时播放的最大声部数
+        """
         # 设置音效目录
         if sound_dir is None:
             # 默认使用当前目录下的 assets/sounds
@@ -683,6 +718,20 @@ class AudioManager:
         # 静音状态
         self.muted = False
         
+        # 软件混音引擎：所有音效解码一次后由单个混音线程播放
+        self.engine: Optional[SoundEngine] = None
+        self.sound_categories: Dict[str, AudioCategory] = {}
+        if use_mixer:
+            sink = sink if sink is not None else default_sink()
+            if sink is not None:
+                self.engine = SoundEngine(max_voices=max_voices, sink=sink)
+                # 共享类别音量字典，音量调整对正在播放的声部立即生效
+                self.engine.category_gains = self.category_volumes
+                self.engine.master_gain = self.master_volume
+                self.engine.start()
+            else:
+                logger.info("没有可用的流式音频输出，音效使用逐次播放")
+        
         # 初始化音频系统
         self._init_audio_system()
         
@@ -715,6 +764,10 @@ class AudioManager:
     
     def _preload_default_sounds(self) -> None:
         """预加载默认音效"""
+        if self.engine is not None:
+            self._preload_default_sounds_to_bank()
+            return
+        
         for sound_type, rel_path in self.DEFAULT_SOUNDS.items():
             # 构建完整路径
             full_path = os.path.join(self.sound_dir, rel_path)
@@ -737,72 +790,67 @@ class AudioManager:
                 logger.warning(f"默认音效文件不存在: {full_path}")
                 # self._generate_default_sound(sound_type)
     
-    def _generate_default_sound(self, sound_type: SoundType) -> None:
-        """"
-        生成默认音效
+    def _preload_default_sounds_to_bank(self) -> None:
+        """将默认音效解码到混音引擎的音效库，文件不存在的在内存中生成"""
+        for sound_type, rel_path in self.DEFAULT_SOUNDS.items():
+            full_path = os.path.join(self.sound_dir, rel_path)
+            try:
+                if os.path.exists(full_path):
+                    self.engine.bank.load(sound_type.value, full_path)
+                else:
+                    self.engine.bank.add(sound_type.value, self._default_sound_samples(sound_type))
+                self.sound_categories[sound_type.value] = AudioCategory.UI_FEEDBACK
+            except Exception as e:
+                logger.error(f"加载默认音效时出错: {sound_type.value}, 错误: {e}")
+    
+    def _default_sound_samples(self, sound_type: SoundType) -> np.ndarray:
+        """
+        生成默认音效的PCM数据
         
         参数:
             sound_type: 音效类型
-        """"
-        # 音效生成参数
-        duration = 0.1  # 秒
-        sample_rate = 44100
-        channels = 1
-        bit_depth = 16
-        
-        # 根据音效类型设置不同的生成参数
+        
+        返回:
+            np.ndarray: int16 PCM数据
+        """
+        generator = self.DEFAULT_SOUND_GENERATORS.get(sound_type)
+        if generator is not None:
+            return generator()
+        return tone_sound_samples(*self._default_tone_params(sound_type))
+    
+    @staticmethod
+    def _default_tone_params(sound_type: SoundType) -> Tuple[float, float, float]:
+        """默认提示音的 (频率, 音量, 时长)"""
         if sound_type == SoundType.CLICK:
-            frequency = 1000
-            volume = 0.5
-            duration = 0.05
+            return 1000, 0.5, 0.05
         elif sound_type == SoundType.HOVER:
-            frequency = 1200
-            volume = 0.3
-            duration = 0.03
+            return 1200, 0.3, 0.03
         elif sound_type == SoundType.TOGGLE:
-            frequency = 800
-            volume = 0.6
-            duration = 0.08
+            return 800, 0.6, 0.08
         elif sound_type == SoundType.SUCCESS:
-            frequency = 1500
-            volume = 0.7
-            duration = 0.2
+            return 1500, 0.7, 0.2
         elif sound_type == SoundType.ERROR:
-            frequency = 300
-            volume = 0.7
-            duration = 0.2
+            return 300, 0.7, 0.2
         elif sound_type == SoundType.NOTIFICATION:
-            frequency = 1800
-            volume = 0.8
-            duration = 0.15
-        else:
-            frequency = 1000
-            volume = 0.5
-        
-        # 生成音频数据
-        num_samples = int(duration * sample_rate)
-        buf = array.array('h', [0] * num_samples)
-        
-        # 生成正弦波
-        for i in range(num_samples):
-            t = i / sample_rate
-            val = int(32767 * volume * math.sin(2 * math.pi * frequency * t))
-            buf[i] = val
+            return 1800, 0.8, 0.15
+        return 1000, 0.5, 0.1
+    
+    def _generate_default_sound(self, sound_type: SoundType) -> None:
+        """
+        生成默认音效
         
-        # 应用衰减
-        for i in range(num_samples):
-            buf[i] = int(buf[i] * (1 - i / num_samples))
+        参数:
+            sound_type: 音效类型
+        """
+        # 根据音效类型生成线性衰减的提示音
+        samples = tone_sound_samples(*self._default_tone_params(sound_type))
         
         # 创建临时文件
         with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
             temp_path = temp_file.name
         
         # 写入WAV文件
-        with wave.open(temp_path, 'w') as wav_file:
-            wav_file.setnchannels(channels)
-            wav_file.setsampwidth(bit_depth // 8)
-            wav_file.setframerate(sample_rate)
-            wav_file.writeframes(buf.tobytes())
+        _write_wav(temp_path, samples)
         
         # 创建目标目录（如果不存在）
         rel_path = self.DEFAULT_SOUNDS[sound_type]
@@ -831,11 +879,11 @@ class AudioManager:
         except Exception as e:
             logger.error(f"复制生成的音效文件时出错: {e}")
     
-def play_sound(self,:
+    def play_sound(self,
                    sound_type: Union[SoundType, str],
                    volume: Optional[float] = None,
-                   loop: bool = False) -> Optional[AudioFile]:
-        """"
+                   loop: bool = False) -> Optional[Union[AudioFile, Voice]]:
+        """
         播放界面音效
         
         参数:
@@ -844,8 +892,8 @@ def play_sound(self,:
             loop: 是否循环播放
         
         返回:
-            Optional[AudioFile]: 音频文件对象，如果播放失败则返回None
-        """"
+            Optional[Union[AudioFile, Voice]]: 音频文件对象（使用混音引擎时为声部对象），如果播放失败则返回None
+        """
         # 如果静音，则不播放
         if self.muted:
             return None
@@ -853,6 +901,10 @@ def play_sound(self,:
         # 处理传入的音效类型
         sound_key = sound_type.value if isinstance(sound_type, SoundType) else sound_type
         
+        if self.engine is not None:
+            category = self.sound_categories.get(sound_key, AudioCategory.UI_FEEDBACK)
+            return self._play_with_engine(sound_type, sound_key, category, volume, loop)
+        
         # 检查是否已缓存
         audio_file = self.audio_cache.get(sound_key)
         
@@ -915,10 +967,10 @@ def play_sound(self,:
         else:
             return None
     
-def play_notification(self,:
+    def play_notification(self,
                          notification_type: Union[str, SoundType] = SoundType.NOTIFICATION,
-                         volume: Optional[float] = None) -> Optional[AudioFile]:
-        """"
+                         volume: Optional[float] = None) -> Optional[Union[AudioFile, Voice]]:
+        """
         播放通知音效
         
         参数:
@@ -926,8 +978,8 @@ def play_notification(self,:
             volume: 音量，如果为None则使用默认音量
         
         返回:
-            Optional[AudioFile]: 音频文件对象，如果播放失败则返回None
-        """"
+            Optional[Union[AudioFile, Voice]]: 音频文件对象（使用混音引擎时为声部对象），如果播放失败则返回None
+        """
         # 如果静音，则不播放
         if self.muted:
             return None
@@ -938,6 +990,9 @@ def play_notification(self,:
         else:
             sound_key = notification_type
         
+        if self.engine is not None:
+            return self._play_with_engine(notification_type, sound_key, AudioCategory.NOTIFICATION, volume)
+        
         # 检查是否已缓存
         audio_file = self.audio_cache.get(sound_key)
         
@@ -994,12 +1049,72 @@ def play_notification(self,:
         else:
             return None
     
-def play_background_music(self,:
+    def _resolve_sound_path(self, sound: Union[SoundType, str]) -> Optional[str]:
+        """
+        解析音效对应的文件路径
+        
+        参数:
+            sound: 音效类型、音效名称或音频文件路径
+        
+        返回:
+            Optional[str]: 文件路径，无法解析时返回None
+        """
+        if isinstance(sound, str) and os.path.exists(sound):
+            return sound
+        if isinstance(sound, str) and os.path.exists(os.path.join(self.sound_dir, sound)):
+            return os.path.join(self.sound_dir, sound)
+        
+        if isinstance(sound, str):
+            sound = next((st for st in SoundType if st.value == sound), sound)
+        if isinstance(sound, SoundType) and sound in self.DEFAULT_SOUNDS:
+            return os.path.join(self.sound_dir, self.DEFAULT_SOUNDS[sound])
+        return None
+    
+    def _play_with_engine(self,
+                          sound: Union[SoundType, str],
+                          sound_key: str,
+                          category: AudioCategory,
+                          volume: Optional[float] = None,
+                          loop: bool = False) -> Optional[Voice]:
+        """
+        通过混音引擎播放音效，音效不在音效库中时先解码一次
+        
+        参数:
+            sound: 音效类型或音频文件路径
+            sound_key: 音效库中的名称
+            category: 音频类别
+            volume: 音量，如果为None则使用类别音量
+            loop: 是否循环播放
+        
+        返回:
+            Optional[Voice]: 声部对象，如果播放失败则返回None
+        """
+        if sound_key not in self.engine.bank:
+            file_path = self._resolve_sound_path(sound)
+            if file_path is None or not os.path.exists(file_path):
+                logger.error(f"无效的音效类型或文件路径: {sound}")
+                return None
+            try:
+                self.engine.bank.load(sound_key, file_path)
+            except Exception as e:
+                logger.error(f"无法加载音频文件: {file_path}, 错误: {e}")
+                return None
+        
+        # 指定音量时不再乘类别音量，与逐次播放的音量计算一致
+        return self.engine.play(
+            sound_key,
+            gain=1.0 if volume is None else volume,
+            priority=self.CATEGORY_PRIORITIES.get(category, 0),
+            category=category if volume is None else None,
+            loop=loop
+        )
+    
+    def play_background_music(self,
                              file_path: str,
                              volume: Optional[float] = None,
                              loop: bool = True,
                              fade_in: float = 1.0) -> Optional[AudioFile]:
-        """"
+        """
         播放背景音乐
         
         参数:
@@ -1010,7 +1125,7 @@ def play_background_music(self,:
         
         返回:
             Optional[AudioFile]: 音频文件对象，如果播放失败则返回None
-        """"
+        """
         # 如果静音，则不播放
         if self.muted:
             return None
@@ -1060,7 +1175,7 @@ def play_background_music(self,:
             return None
     
     def stop_background_music(self, fade_out: float = 1.0) -> bool:
-        """"
+        """
         停止背景音乐
         
         参数:
@@ -1068,7 +1183,7 @@ def play_background_music(self,:
         
         返回:
             bool: 是否成功停止
-        """"
+        """
         if self.current_background is None:
             return False
         
@@ -1084,36 +1199,36 @@ def play_background_music(self,:
         return success
     
     def pause_background_music(self) -> bool:
-        """"
+        """
         暂停背景音乐
         
         返回:
             bool: 是否成功暂停
-        """"
+        """
         if self.current_background is None:
             return False
         
         return self.current_background.pause()
     
     def resume_background_music(self) -> bool:
-        """"
+        """
         恢复背景音乐
         
         返回:
             bool: 是否成功恢复
-        """"
+        """
         if self.current_background is None:
             return False
         
         return self.current_background.resume()
     
     def set_master_volume(self, volume: float) -> None:
-        """"
+        """
         设置主音量
         
         参数:
             volume: 音量值 (0.0-1.0)
-        """"
+        """
         # 限制音量范围
         volume = max(0.0, min(1.0, volume))
         
@@ -1123,6 +1238,8 @@ def play_background_music(self,:
         
         # 更新主音量
         self.master_volume = volume
+        if self.engine is not None:
+            self.engine.master_gain = volume
         
         # 更新所有正在播放的音频音量
         for audio_file in self.audio_cache.values():
@@ -1138,13 +1255,13 @@ def play_background_music(self,:
         logger.debug(f"设置主音量: {volume}")
     
     def set_category_volume(self, category: AudioCategory, volume: float) -> None:
-        """"
+        """
         设置音频类别音量
         
         参数:
             category: 音频类别
             volume: 音量值 (0.0-1.0)
-        """"
+        """
         # 限制音量范围
         volume = max(0.0, min(1.0, volume))
         
@@ -1167,16 +1284,18 @@ def play_background_music(self,:
         logger.debug(f"设置{category.value}类别音量: {volume}")
     
     def toggle_mute(self) -> bool:
-        """"
+        """
         切换静音状态
         
         返回:
             bool: 当前是否静音
-        """"
+        """
         self.muted = not self.muted
         
         if self.muted:
             # 停止所有正在播放的音频
+            if self.engine is not None:
+                self.engine.stop_all()
             for audio_file in self.audio_cache.values():
                 if audio_file.state == AudioState.PLAYING:
                     audio_file.pause()
@@ -1196,22 +1315,22 @@ def play_background_music(self,:
         return self.muted
     
     def set_mute(self, mute: bool) -> None:
-        """"
+        """
         设置静音状态
         
         参数:
             mute: 是否静音
-        """"
+        """
         if self.muted == mute:
             return
         
         self.toggle_mute()
     
-def preload_sound(self,:
+    def preload_sound(self,
                      file_path: str, 
                      sound_id: Optional[str] = None,
                      category: AudioCategory = AudioCategory.UI_FEEDBACK) -> bool:
-        """"
+        """
         预加载音效
         
         参数:
@@ -1221,7 +1340,7 @@ def preload_sound(self,:
         
         返回:
             bool: 是否成功加载
-        """"
+        """
         # 检查文件是否存在
         if not os.path.exists(file_path) and not os.path.exists(os.path.join(self.sound_dir, file_path)):
             logger.error(f"音频文件不存在: {file_path}")
@@ -1237,6 +1356,19 @@ def preload_sound(self,:
         if sound_id is None:
             sound_id = file_path
         
+        # 混音引擎：解码到音效库
+        if self.engine is not None:
+            if sound_id in self.engine.bank:
+                return True
+            try:
+                self.engine.bank.load(sound_id, full_path)
+            except Exception as e:
+                logger.error(f"无法加载音频文件: {full_path}, 错误: {e}")
+                return False
+            self.sound_categories[sound_id] = category
+            logger.debug(f"预加载音效: {sound_id} ({full_path})")
+            return True
+        
         # 如果已经加载，直接返回成功
         if sound_id in self.audio_cache:
             return True
@@ -1260,7 +1392,7 @@ def preload_sound(self,:
             return False
     
     def preload_sounds(self, sound_files: Dict[str, str], category: AudioCategory = AudioCategory.UI_FEEDBACK) -> int:
-        """"
+        """
         批量预加载音效
         
         参数:
@@ -1269,7 +1401,7 @@ def preload_sound(self,:
         
         返回:
             int: 成功加载的音效数量
-        """"
+        """
         success_count = 0
         
         for sound_id, file_path in sound_files.items():
@@ -1278,11 +1410,11 @@ def preload_sound(self,:
         
         return success_count
     
-def play_preloaded_sound(self,:
+    def play_preloaded_sound(self,
                             sound_id: str, 
                             volume: Optional[float] = None,
-                            loop: bool = False) -> Optional[AudioFile]:
-        """"
+                            loop: bool = False) -> Optional[Union[AudioFile, Voice]]:
+        """
         播放预加载的音效
         
         参数:
@@ -1291,12 +1423,19 @@ def play_preloaded_sound(self,:
             loop: 是否循环播放
         
         返回:
-            Optional[AudioFile]: 音频文件对象，如果播放失败则返回None
-        """"
+            Optional[Union[AudioFile, Voice]]: 音频文件对象（使用混音引擎时为声部对象），如果播放失败则返回None
+        """
         # 如果静音，则不播放
         if self.muted:
             return None
         
+        if self.engine is not None:
+            if sound_id not in self.engine.bank:
+                logger.error(f"未找到预加载的音效: {sound_id}")
+                return None
+            category = self.sound_categories.get(sound_id, AudioCategory.UI_FEEDBACK)
+            return self._play_with_engine(sound_id, sound_id, category, volume, loop)
+        
         # 检查是否已加载
         if sound_id not in self.audio_cache:
             logger.error(f"未找到预加载的音效: {sound_id}")
@@ -1322,6 +1461,9 @@ def play_preloaded_sound(self,:
     
     def stop_all_sounds(self) -> None:
         """停止所有音效和音乐"""
+        if self.engine is not None:
+            self.engine.stop_all()
+        
         # 停止所有缓存的音效
         for audio_file in self.audio_cache.values():
             if audio_file.state in [AudioState.PLAYING, AudioState.PAUSED]:
@@ -1342,6 +1484,11 @@ def play_preloaded_sound(self,:
         # 清空缓存
         self.audio_cache.clear()
         
+        # 关闭混音线程
+        if self.engine is not None:
+            self.engine.close()
+            self.engine = None
+        
         # 如果使用pygame，退出mixer
         if AUDIO_BACKEND == "pygame" and pygame.mixer.get_init():
             pygame.mixer.quit()
@@ -1354,9 +1501,285 @@ def play_preloaded_sound(self,:
 
 
 # 工具函数：生成简单的音效
+#
+# 波形全部用NumPy向量化生成；*_sound_samples 返回int16 PCM数组（可直接加入音效引擎的音效库），
+# generate_*_sound 将其写入WAV文件。每一步的截断与逐采样计算的 int() 一致。
+
+DEFAULT_SAMPLE_RATE = 44100
+
+
+def _sample_times(duration: float, sample_rate: int) -> Tuple[np.ndarray, int]:
+    """采样时间轴和采样数"""
+    num_samples = int(duration * sample_rate)
+    return np.arange(num_samples) / sample_rate, num_samples
+
+
+def _to_pcm(values: np.ndarray) -> np.ndarray:
+    """截断为整数采样值"""
+    return np.trunc(values)
+
+
+def _write_wav(file_path: str, samples: np.ndarray, sample_rate: int = DEFAULT_SAMPLE_RATE) -> None:
+    """将单声道int16 PCM写入WAV文件"""
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with wave.open(file_path, 'w') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(samples.astype('<i2').tobytes())
+
+
+def tone_sound_samples(frequency: float,
+                       volume: float = 0.5,
+                       duration: float = 0.1,
+                       sample_rate: int = DEFAULT_SAMPLE_RATE) -> np.ndarray:
+    """
+    生成线性衰减的正弦提示音
+
+    参数:
+        frequency: 频率 (Hz)
+        volume: 音量 (0.0-1.0)
+        duration: 时长 (秒)
+        sample_rate: 采样率
+
+    返回:
+        np.ndarray: int16 PCM数据
+    """
+    t, num_samples = _sample_times(duration, sample_rate)
+    buf = _to_pcm(32767 * volume * np.sin(2 * np.pi * frequency * t))
+    buf = _to_pcm(buf * (1 - np.arange(num_samples) / num_samples))
+    return buf.astype(np.int16)
+
+
+def click_sound_samples(volume: float = 0.7,
+                        frequency: float = 1000,
+                        sample_rate: int = DEFAULT_SAMPLE_RATE) -> np.ndarray:
+    """
+    生成点击音效的PCM数据
+
+    参数:
+        volume: 音量 (0.0-1.0)
+        frequency: 频率 (Hz)
+        sample_rate: 采样率
+
+    返回:
+        np.ndarray: int16 PCM数据
+    """
+    t, num_samples = _sample_times(0.05, sample_rate)
+
+    # 正弦波 + 指数衰减
+    buf = _to_pcm(32767 * volume * np.sin(2 * np.pi * frequency * t))
+    buf = _to_pcm(buf * np.exp(-5 * np.arange(num_samples) / num_samples))
+    return buf.astype(np.int16)
+
+
+def notification_sound_samples(volume: float = 0.8, sample_rate: int = DEFAULT_SAMPLE_RATE) -> np.ndarray:
+    """
+    生成通知音效的PCM数据
+
+    参数:
+        volume: 音量 (0.0-1.0)
+        sample_rate: 采样率
+
+    返回:
+        np.ndarray: int16 PCM数据
+    """
+    duration = 0.3
+    t, num_samples = _sample_times(duration, sample_rate)
+
+    # 两个频率之间先上升后下降的扫频
+    freq1 = 1800
+    freq2 = 2200
+    half = duration / 2
+    rising = np.sin(2 * np.pi * (freq1 + (freq2 - freq1) * t / half) * t)
+    falling = np.sin(2 * np.pi * (freq2 - (freq2 - freq1) * (t - half) / half) * t)
+    buf = _to_pcm(32767 * volume * np.where(t < half, rising, falling))
+
+    # 振幅包络：快速上升，缓慢下降
+    progress = np.arange(num_samples) / num_samples
+    envelope = np.where(progress < 0.1, progress / 0.1, 1.0 - (progress - 0.1) / 0.9)
+    return _to_pcm(buf * envelope).astype(np.int16)
+
+
+def success_sound_samples(volume: float = 0.7, sample_rate: int = DEFAULT_SAMPLE_RATE) -> np.ndarray:
+    """
+    生成成功提示音效的PCM数据
+
+    参数:
+        volume: 音量 (0.0-1.0)
+        sample_rate: 采样率
+
+    返回:
+        np.ndarray: int16 PCM数据
+    """
+    t, num_samples = _sample_times(0.6, sample_rate)
+
+    # 大三和弦: A4, C#5, E5
+    wave1 = np.sin(2 * np.pi * 440.0 * t)
+    wave2 = np.sin(2 * np.pi * 554.37 * t)
+    wave3 = np.sin(2 * np.pi * 659.25 * t)
+    buf = _to_pcm(32767 * volume * ((wave1 + wave2 * 0.8 + wave3 * 0.6) / 3.0))
+
+    progress = np.arange(num_samples) / num_samples
+    envelope = np.where(progress < 0.1, progress / 0.1, 1.0 * np.exp(-3 * (progress - 0.1)))
+    return _to_pcm(buf * envelope).astype(np.int16)
+
+
+def error_sound_samples(volume: float = 0.7, sample_rate: int = DEFAULT_SAMPLE_RATE) -> np.ndarray:
+    """
+    生成错误提示音效的PCM数据
+
+    参数:
+        volume: 音量 (0.0-1.0)
+        sample_rate: 采样率
+
+    返回:
+        np.ndarray: int16 PCM数据
+    """
+    t, _ = _sample_times(0.5, sample_rate)
+
+    # 两个不和谐频率，两次短促的声音
+    wave1 = np.sin(2 * np.pi * 277.18 * t)
+    wave2 = np.sin(2 * np.pi * 370.0 * t)
+    audible = (t < 0.15) | ((0.25 < t) & (t < 0.4))
+    val = np.where(audible, (wave1 * 0.7 + wave2 * 0.8) / 2.0, 0.0)
+    return _to_pcm(32767 * volume * val).astype(np.int16)
+
+
+def hover_sound_samples(volume: float = 0.3, sample_rate: int = DEFAULT_SAMPLE_RATE) -> np.ndarray:
+    """
+    生成按钮悬停音效的PCM数据
+
+    参数:
+        volume: 音量 (0.0-1.0)
+        sample_rate: 采样率
+
+    返回:
+        np.ndarray: int16 PCM数据
+    """
+    duration = 0.08
+    t, num_samples = _sample_times(duration, sample_rate)
+
+    # 从高频到低频的线性扫频
+    freq = 2000 + (1500 - 2000) * (t / duration)
+    buf = _to_pcm(32767 * volume * np.sin(2 * np.pi * freq * t))
+
+    # 20ms淡入淡出
+    fade_samples = min(int(0.02 * sample_rate), num_samples)
+    ramp = np.arange(fade_samples) / fade_samples
+    buf[:fade_samples] = _to_pcm(buf[:fade_samples] * ramp)
+    buf[num_samples - fade_samples:] = _to_pcm(buf[num_samples - fade_samples:] * ramp[::-1])
+    return buf.astype(np.int16)
+
+
+def toggle_sound_samples(volume: float = 0.6,
+                         is_on: bool = True,
+                         sample_rate: int = DEFAULT_SAMPLE_RATE) -> np.ndarray:
+    """
+    生成开关切换音效的PCM数据
+
+    参数:
+        volume: 音量 (0.0-1.0)
+        is_on: 是否是打开状态的音效
+        sample_rate: 采样率
+
+    返回:
+        np.ndarray: int16 PCM数据
+    """
+    duration = 0.15
+    t, num_samples = _sample_times(duration, sample_rate)
+
+    # 打开从低到高，关闭从高到低，非线性频率变化
+    freq_start, freq_end = (700, 1200) if is_on else (1200, 700)
+    freq = freq_start + (freq_end - freq_start) * np.power(t / duration, 1.5)
+    val = np.sin(2 * np.pi * freq * t)
+
+    # 轻微噪声模拟机械感
+    noise = (np.random.random(num_samples) * 2 - 1) * 0.1
+    buf = _to_pcm(32767 * volume * (val * 0.9 + noise * 0.1))
+
+    progress = np.arange(num_samples) / num_samples
+    if is_on:
+        # 快速上升，慢速下降
+        envelope = np.where(progress < 0.2, progress / 0.2, 1.0 - (progress - 0.2) / 0.8)
+    else:
+        # 慢速上升，快速下降
+        envelope = np.where(progress < 0.6, progress / 0.6, 1.0 - (progress - 0.6) / 0.4)
+    return _to_pcm(buf * envelope).astype(np.int16)
+
+
+def typing_sound_samples(volume: float = 0.4, sample_rate: int = DEFAULT_SAMPLE_RATE) -> np.ndarray:
+    """
+    生成打字音效的PCM数据
+
+    参数:
+        volume: 音量 (0.0-1.0)
+        sample_rate: 采样率
+
+    返回:
+        np.ndarray: int16 PCM数据
+    """
+    t, num_samples = _sample_times(0.03, sample_rate)
+
+    # 随机基频增加变化，高频噪声模拟按键声
+    base_freq = random.uniform(1200, 1600)
+    tone = np.sin(2 * np.pi * base_freq * t)
+    noise = (np.random.random(num_samples) * 2 - 1) * 0.3
+    buf = _to_pcm(32767 * volume * (tone * 0.7 + noise * 0.3))
+
+    # 快速衰减
+    envelope = np.exp(-10 * (np.arange(num_samples) / num_samples))
+    return _to_pcm(buf * envelope).astype(np.int16)
+
+
+def popup_sound_samples(volume: float = 0.6,
+                        is_open: bool = True,
+                        sample_rate: int = DEFAULT_SAMPLE_RATE) -> np.ndarray:
+    """
+    生成弹窗打开/关闭音效的PCM数据
+
+    参数:
+        volume: 音量 (0.0-1.0)
+        is_open: 是否是打开状态的音效
+        sample_rate: 采样率
+
+    返回:
+        np.ndarray: int16 PCM数据
+    """
+    duration = 0.3 if is_open else 0.25
+    t, num_samples = _sample_times(duration, sample_rate)
+    progress = t / duration
+
+    if is_open:
+        # 打开：较长，从低到高，开始快速上升之后慢速上升，带二次泛音
+        freq = 300 + (800 - 300) * (1 - np.exp(-5 * progress))
+        val = np.sin(2 * np.pi * freq * t) + 0.3 * np.sin(2 * np.pi * freq * 2 * t)
+        envelope_peak = 0.3
+    else:
+        # 关闭：较短，从高到低快速下降，带1.5次泛音
+        freq = 700 + (300 - 700) * (np.exp(-2 * progress) - 0.1 * progress)
+        val = np.sin(2 * np.pi * freq * t) + 0.2 * np.sin(2 * np.pi * freq * 1.5 * t)
+        envelope_peak = 0.1
+    buf = _to_pcm(32767 * volume * (val / 1.3))
+
+    # 振幅包络
+    position = np.arange(num_samples) / num_samples
+    if is_open:
+        # 快速上升，达到峰值后轻微振荡
+        decay = (position - envelope_peak) / (1 - envelope_peak)
+        tail = (1 - decay) * (1 + 0.1 * np.sin(20 * np.pi * decay))
+    else:
+        # 快速达到峰值，然后快速衰减
+        tail = (1 - position) / (1 - envelope_peak)
+    envelope = np.where(position < envelope_peak, position / envelope_peak, tail)
+    return _to_pcm(buf * np.clip(envelope, 0, 1)).astype(np.int16)
+
 
 def generate_click_sound(file_path: str, volume: float = 0.7, frequency: float = 1000) -> bool:
-    """"
+    """
     生成点击音效
     
     参数:
@@ -1366,38 +1789,9 @@ def generate_click_sound(file_path: str, volume: float = 0.7, frequency: float =
     
     返回:
         bool: 是否成功生成
-    """"
+    """
     try:
-        # 音效参数
-        duration = 0.05  # 秒
-        sample_rate = 44100
-        channels = 1
-        bit_depth = 16
-        
-        # 生成音频数据
-        num_samples = int(duration * sample_rate)
-        buf = array.array('h', [0] * num_samples)
-        
-        # 生成正弦波
-        for i in range(num_samples):
-            t = i / sample_rate
-            val = int(32767 * volume * math.sin(2 * math.pi * frequency * t))
-            buf[i] = val
-        
-        # 应用指数衰减
-        for i in range(num_samples):
-            buf[i] = int(buf[i] * math.exp(-5 * i / num_samples))
-        
-        # 创建目标目录（如果不存在）
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        
-        # 写入WAV文件
-        with wave.open(file_path, 'w') as wav_file:
-            wav_file.setnchannels(channels)
-            wav_file.setsampwidth(bit_depth // 8)
-            wav_file.setframerate(sample_rate)
-            wav_file.writeframes(buf.tobytes())
-        
+        _write_wav(file_path, click_sound_samples(volume, frequency))
         logger.info(f"生成点击音效: {file_path}")
         return True
         
@@ -1407,7 +1801,7 @@ def generate_click_sound(file_path: str, volume: float = 0.7, frequency: float =
 
 
 def generate_notification_sound(file_path: str, volume: float = 0.8) -> bool:
-    """"
+    """
     生成通知音效
     
     参数:
@@ -1416,55 +1810,9 @@ def generate_notification_sound(file_path: str, volume: float = 0.8) -> bool:
     
     返回:
         bool: 是否成功生成
-    """"
+    """
     try:
-        # 音效参数
-        duration = 0.3  # 秒
-        sample_rate = 44100
-        channels = 1
-        bit_depth = 16
-        
-        # 生成音频数据
-        num_samples = int(duration * sample_rate)
-        buf = array.array('h', [0] * num_samples)
-        
-        # 生成两个频率的正弦波组合
-        freq1 = 1800  # 第一个频率
-        freq2 = 2200  # 第二个频率
-        
-        for i in range(num_samples):
-            t = i / sample_rate
-            
-            # 第一部分是上升音调
-            if t < duration / 2:
-                val = math.sin(2 * math.pi * (freq1 + (freq2 - freq1) * t / (duration / 2)) * t)
-            # 第二部分是下降音调
-            else:
-                val = math.sin(2 * math.pi * (freq2 - (freq2 - freq1) * (t - duration / 2) / (duration / 2)) * t)
-            
-            buf[i] = int(32767 * volume * val)
-        
-        # 应用振幅包络
-        for i in range(num_samples):
-            t = i / num_samples
-            # 快速上升，缓慢下降
-            if t < 0.1:
-                envelope = t / 0.1
-            else:
-                envelope = 1.0 - (t - 0.1) / 0.9
-            
-            buf[i] = int(buf[i] * envelope)
-        
-        # 创建目标目录（如果不存在）
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        
-        # 写入WAV文件
-        with wave.open(file_path, 'w') as wav_file:
-            wav_file.setnchannels(channels)
-            wav_file.setsampwidth(bit_depth // 8)
-            wav_file.setframerate(sample_rate)
-            wav_file.writeframes(buf.tobytes())
-        
+        _write_wav(file_path, notification_sound_samples(volume))
         logger.info(f"生成通知音效: {file_path}")
         return True
         
@@ -1474,7 +1822,7 @@ def generate_notification_sound(file_path: str, volume: float = 0.8) -> bool:
 
 
 def generate_success_sound(file_path: str, volume: float = 0.7) -> bool:
-    """"
+    """
     生成成功提示音效
     
     参数:
@@ -1483,59 +1831,9 @@ def generate_success_sound(file_path: str, volume: float = 0.7) -> bool:
     
     返回:
         bool: 是否成功生成
-    """"
+    """
     try:
-        # 音效参数
-        duration = 0.6  # 秒
-        sample_rate = 44100
-        channels = 1
-        bit_depth = 16
-        
-        # 生成音频数据
-        num_samples = int(duration * sample_rate)
-        buf = array.array('h', [0] * num_samples)
-        
-        # 生成和弦音效 - 简单的三和弦
-        freq_base = 440.0  # A4
-        freq_major_third = 554.37  # C#5
-        freq_fifth = 659.25  # E5
-        
-        for i in range(num_samples):
-            t = i / sample_rate
-            
-            # 基音
-            wave1 = math.sin(2 * math.pi * freq_base * t)
-            # 大三度
-            wave2 = math.sin(2 * math.pi * freq_major_third * t)
-            # 纯五度
-            wave3 = math.sin(2 * math.pi * freq_fifth * t)
-            
-            # 混合三个波形
-            val = (wave1 + wave2 * 0.8 + wave3 * 0.6) / 3.0
-            
-            buf[i] = int(32767 * volume * val)
-        
-        # 应用渐变
-        for i in range(num_samples):
-            t = i / num_samples
-            # 快速上升，缓慢下降
-            if t < 0.1:
-                envelope = t / 0.1
-            else:
-                envelope = 1.0 * math.exp(-3 * (t - 0.1))
-            
-            buf[i] = int(buf[i] * envelope)
-        
-        # 创建目标目录（如果不存在）
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        
-        # 写入WAV文件
-        with wave.open(file_path, 'w') as wav_file:
-            wav_file.setnchannels(channels)
-            wav_file.setsampwidth(bit_depth // 8)
-            wav_file.setframerate(sample_rate)
-            wav_file.writeframes(buf.tobytes())
-        
+        _write_wav(file_path, success_sound_samples(volume))
         logger.info(f"生成成功音效: {file_path}")
         return True
         
@@ -1545,7 +1843,7 @@ def generate_success_sound(file_path: str, volume: float = 0.7) -> bool:
 
 
 def generate_error_sound(file_path: str, volume: float = 0.7) -> bool:
-    """"
+    """
     生成错误提示音效
     
     参数:
@@ -1554,47 +1852,9 @@ def generate_error_sound(file_path: str, volume: float = 0.7) -> bool:
     
     返回:
         bool: 是否成功生成
-    """"
+    """
     try:
-        # 音效参数
-        duration = 0.5  # 秒
-        sample_rate = 44100
-        channels = 1
-        bit_depth = 16
-        
-        # 生成音频数据
-        num_samples = int(duration * sample_rate)
-        buf = array.array('h', [0] * num_samples)
-        
-        # 生成和弦音效 - 不和谐的和弦
-        freq1 = 277.18  # C#4
-        freq2 = 370.0   # F#4
-        
-        for i in range(num_samples):
-            t = i / sample_rate
-            
-            # 两个不和谐频率
-            wave1 = math.sin(2 * math.pi * freq1 * t)
-            wave2 = math.sin(2 * math.pi * freq2 * t)
-            
-            # 两次短促的声音
-            if t < 0.15 or (0.25 < t < 0.4):
-                val = (wave1 * 0.7 + wave2 * 0.8) / 2.0
-            else:
-                val = 0
-            
-            buf[i] = int(32767 * volume * val)
-        
-        # 创建目标目录（如果不存在）
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        
-        # 写入WAV文件
-        with wave.open(file_path, 'w') as wav_file:
-            wav_file.setnchannels(channels)
-            wav_file.setsampwidth(bit_depth // 8)
-            wav_file.setframerate(sample_rate)
-            wav_file.writeframes(buf.tobytes())
-        
+        _write_wav(file_path, error_sound_samples(volume))
         logger.info(f"生成错误音效: {file_path}")
         return True
         
@@ -1604,7 +1864,7 @@ def generate_error_sound(file_path: str, volume: float = 0.7) -> bool:
 
 
 def generate_button_hover_sound(file_path: str, volume: float = 0.3) -> bool:
-    """"
+    """
     生成按钮悬停音效
     
     参数:
@@ -1613,49 +1873,9 @@ def generate_button_hover_sound(file_path: str, volume: float = 0.3) -> bool:
     
     返回:
         bool: 是否成功生成
-    """"
+    """
     try:
-        # 音效参数
-        duration = 0.08  # 秒
-        sample_rate = 44100
-        channels = 1
-        bit_depth = 16
-        
-        # 生成音频数据
-        num_samples = int(duration * sample_rate)
-        buf = array.array('h', [0] * num_samples)
-        
-        # 生成扫频音效（从高频到低频）
-        freq_start = 2000
-        freq_end = 1500
-        
-        for i in range(num_samples):
-            t = i / sample_rate
-            # 线性频率变化
-            freq = freq_start + (freq_end - freq_start) * (t / duration)
-            val = math.sin(2 * math.pi * freq * t)
-            
-            buf[i] = int(32767 * volume * val)
-        
-        # 应用淡入淡出
-        fade_samples = int(0.02 * sample_rate)  # 20ms淡入淡出
-        for i in range(fade_samples):
-            # 淡入
-            buf[i] = int(buf[i] * (i / fade_samples))
-            # 淡出
-            if i < fade_samples and (num_samples - i - 1) >= 0:
-                buf[num_samples - i - 1] = int(buf[num_samples - i - 1] * (i / fade_samples))
-        
-        # 创建目标目录（如果不存在）
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        
-        # 写入WAV文件
-        with wave.open(file_path, 'w') as wav_file:
-            wav_file.setnchannels(channels)
-            wav_file.setsampwidth(bit_depth // 8)
-            wav_file.setframerate(sample_rate)
-            wav_file.writeframes(buf.tobytes())
-        
+        _write_wav(file_path, hover_sound_samples(volume))
         logger.info(f"生成按钮悬停音效: {file_path}")
         return True
         
@@ -1665,7 +1885,7 @@ def generate_button_hover_sound(file_path: str, volume: float = 0.3) -> bool:
 
 
 def generate_toggle_sound(file_path: str, volume: float = 0.6, is_on: bool = True) -> bool:
-    """"
+    """
     生成开关切换音效
     
     参数:
@@ -1675,69 +1895,9 @@ def generate_toggle_sound(file_path: str, volume: float = 0.6, is_on: bool = Tru
     
     返回:
         bool: 是否成功生成
-    """"
+    """
     try:
-        # 音效参数
-        duration = 0.15  # 秒
-        sample_rate = 44100
-        channels = 1
-        bit_depth = 16
-        
-        # 生成音频数据
-        num_samples = int(duration * sample_rate)
-        buf = array.array('h', [0] * num_samples)
-        
-        # 根据开关状态调整频率
-        if is_on:
-            # 打开：从低到高
-            freq_start = 700
-            freq_end = 1200
-        else:
-            # 关闭：从高到低
-            freq_start = 1200
-            freq_end = 700
-        
-        for i in range(num_samples):
-            t = i / sample_rate
-            # 非线性频率变化
-            progress = math.pow(t / duration, 1.5)
-            freq = freq_start + (freq_end - freq_start) * progress
-            val = math.sin(2 * math.pi * freq * t)
-            
-            # 添加轻微噪声模拟机械感
-            noise = (random.random() * 2 - 1) * 0.1
-            combined = val * 0.9 + noise * 0.1
-            
-            buf[i] = int(32767 * volume * combined)
-        
-        # 应用振幅包络
-        for i in range(num_samples):
-            t = i / num_samples
-            # 开启时快速上升，慢速下降
-            if is_on:
-                if t < 0.2:
-                    envelope = t / 0.2
-                else:
-                    envelope = 1.0 - (t - 0.2) / 0.8
-            # 关闭时慢速上升，快速下降
-            else:
-                if t < 0.6:
-                    envelope = t / 0.6
-                else:
-                    envelope = 1.0 - (t - 0.6) / 0.4
-            
-            buf[i] = int(buf[i] * envelope)
-        
-        # 创建目标目录（如果不存在）
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        
-        # 写入WAV文件
-        with wave.open(file_path, 'w') as wav_file:
-            wav_file.setnchannels(channels)
-            wav_file.setsampwidth(bit_depth // 8)
-            wav_file.setframerate(sample_rate)
-            wav_file.writeframes(buf.tobytes())
-        
+        _write_wav(file_path, toggle_sound_samples(volume, is_on))
         logger.info(f"生成开关{('打开' if is_on else '关闭')}音效: {file_path}")
         return True
         
@@ -1747,7 +1907,7 @@ def generate_toggle_sound(file_path: str, volume: float = 0.6, is_on: bool = Tru
 
 
 def generate_typing_sound(file_path: str, volume: float = 0.4) -> bool:
-    """"
+    """
     生成打字音效
     
     参数:
@@ -1756,51 +1916,9 @@ def generate_typing_sound(file_path: str, volume: float = 0.4) -> bool:
     
     返回:
         bool: 是否成功生成
-    """"
+    """
     try:
-        # 音效参数
-        duration = 0.03  # 秒
-        sample_rate = 44100
-        channels = 1
-        bit_depth = 16
-        
-        # 生成音频数据
-        num_samples = int(duration * sample_rate)
-        buf = array.array('h', [0] * num_samples)
-        
-        # 随机选择基频以增加变化
-        base_freq = random.uniform(1200, 1600)
-        
-        for i in range(num_samples):
-            t = i / sample_rate
-            
-            # 基础音调
-            wave = math.sin(2 * math.pi * base_freq * t)
-            
-            # 添加一些高频噪声模拟按键声
-            noise = (random.random() * 2 - 1) * 0.3
-            
-            # 混合声音
-            val = wave * 0.7 + noise * 0.3
-            
-            buf[i] = int(32767 * volume * val)
-        
-        # 应用快速衰减
-        for i in range(num_samples):
-            t = i / num_samples
-            envelope = math.exp(-10 * t)
-            buf[i] = int(buf[i] * envelope)
-        
-        # 创建目标目录（如果不存在）
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        
-        # 写入WAV文件
-        with wave.open(file_path, 'w') as wav_file:
-            wav_file.setnchannels(channels)
-            wav_file.setsampwidth(bit_depth // 8)
-            wav_file.setframerate(sample_rate)
-            wav_file.writeframes(buf.tobytes())
-        
+        _write_wav(file_path, typing_sound_samples(volume))
         logger.info(f"生成打字音效: {file_path}")
         return True
         
@@ -1810,7 +1928,7 @@ def generate_typing_sound(file_path: str, volume: float = 0.4) -> bool:
 
 
 def generate_popup_sound(file_path: str, volume: float = 0.6, is_open: bool = True) -> bool:
-    """"
+    """
     生成弹窗打开/关闭音效
     
     参数:
@@ -1820,88 +1938,9 @@ def generate_popup_sound(file_path: str, volume: float = 0.6, is_open: bool = Tr
     
     返回:
         bool: 是否成功生成
-    """"
+    """
     try:
-        # 音效参数
-        duration = 0.3 if is_open else 0.25  # 秒
-        sample_rate = 44100
-        channels = 1
-        bit_depth = 16
-        
-        # 生成音频数据
-        num_samples = int(duration * sample_rate)
-        buf = array.array('h', [0] * num_samples)
-        
-        # 根据状态调整参数
-        if is_open:
-            # 打开：较长，从低到高，有弹性
-            freq_start = 300
-            freq_end = 800
-            envelope_peak = 0.3  # 音量峰值位置
-        else:
-            # 关闭：较短，从高到低，快速衰减
-            freq_start = 700
-            freq_end = 300
-            envelope_peak = 0.1  # 音量峰值位置
-        
-        for i in range(num_samples):
-            t = i / sample_rate
-            progress = t / duration
-            
-            # 非线性频率变化
-            if is_open:
-                # 开始快速上升，之后慢速上升
-                freq_progress = 1 - math.exp(-5 * progress)
-            else:
-                # 快速下降
-                freq_progress = math.exp(-2 * progress) - 0.1 * progress
-            
-            freq = freq_start + (freq_end - freq_start) * freq_progress
-            
-            # 基础波形
-            val = math.sin(2 * math.pi * freq * t)
-            
-            # 添加和谐泛音
-            if is_open:
-                val += 0.3 * math.sin(2 * math.pi * freq * 2 * t)  # 二次泛音
-            else:
-                val += 0.2 * math.sin(2 * math.pi * freq * 1.5 * t)  # 1.5次泛音
-            
-            val = val / 1.3  # 归一化
-            
-            buf[i] = int(32767 * volume * val)
-        
-        # 应用振幅包络
-        for i in range(num_samples):
-            t = i / num_samples
-            
-            if is_open:
-                # 打开：先快速上升，达到峰值后有轻微的振荡
-                if t < envelope_peak:
-                    envelope = t / envelope_peak
-                else:
-                    # 添加轻微振荡效果
-                    decay = (t - envelope_peak) / (1 - envelope_peak)
-                    envelope = (1 - decay) * (1 + 0.1 * math.sin(20 * math.pi * decay))
-            else:
-                # 关闭：快速达到峰值，然后快速衰减
-                if t < envelope_peak:
-                    envelope = t / envelope_peak
-                else:
-                    envelope = (1 - t) / (1 - envelope_peak)
-            
-            buf[i] = int(buf[i] * max(0, min(1, envelope)))
-        
-        # 创建目标目录（如果不存在）
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        
-        # 写入WAV文件
-        with wave.open(file_path, 'w') as wav_file:
-            wav_file.setnchannels(channels)
-            wav_file.setsampwidth(bit_depth // 8)
-            wav_file.setframerate(sample_rate)
-            wav_file.writeframes(buf.tobytes())
-        
+        _write_wav(file_path, popup_sound_samples(volume, is_open))
         logger.info(f"生成弹窗{('打开' if is_open else '关闭')}音效: {file_path}")
         return True
         
@@ -1911,7 +1950,7 @@ def generate_popup_sound(file_path: str, volume: float = 0.6, is_open: bool = Tr
 
 
 def generate_all_default_sounds(output_dir: str) -> int:
-    """"
+    """
     生成所有默认音效
     
     参数:
@@ -1919,7 +1958,7 @@ def generate_all_default_sounds(output_dir: str) -> int:
     
     返回:
         int: 成功生成的音效数量
-    """"
+    """
     success_count = 0
     
     # 创建目录结构
@@ -2004,5 +2043,3 @@ def example_usage():
 if __name__ == "__main__":
     # 如果直接运行该模块，展示使用示例
     example_usage()
-
-            wave1 =
\ No newline at end of file
@@ -0,0 +1,628 @@
+"""
+软件混音音效引擎 - Sound Engine
+
+这个模块为界面音效提供常驻的软件混音器。所有音效在加载时一次性解码为NumPy PCM缓冲区，
+播放请求只是向混音器登记一个声部，由唯一的混音线程把活动声部向量化地混合到固定大小的输出环中，
+再交给输出端播放。快速连续的界面事件（打字、悬停、交易通知）不会再为每次播放创建线程。
+
+主要功能:
+    - 音效库：WAV一次性解码、重采样和声道转换
+    - 单线程混音：向量化增益、淡入淡出和主音量/类别音量
+    - 声部数量限制和按优先级抢占
+    - 可替换的输出端（pygame流式输出、用于无界面测试的空输出）
+
+日期: 2026-10-18
+"""
+
+import time
+import wave
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+try:
+    import pygame
+    PYGAME_AVAILABLE = True
+except ImportError:
+    PYGAME_AVAILABLE = False
+
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 被抢占或静音停止的声部使用的短淡出，避免爆音
+STEAL_FADE_SECONDS = 0.005
+
+
+@dataclass
+class SoundClip:
+    """已解码的音效"""
+    name: str
+    samples: np.ndarray             # float32 PCM，形状为 (帧数, 声道数)，取值范围 -1.0 到 1.0
+    sample_rate: int
+
+    @property
+    def duration(self) -> float:
+        """时长（秒）"""
+        return len(self.samples) / self.sample_rate
+
+
+def decode_wav(file_path: str) -> Any:
+    """
+    解码WAV文件
+
+    参数:
+        file_path: WAV文件路径
+
+    返回:
+        (float32 PCM数组, 采样率)，数组形状为 (帧数, 声道数)
+    """
+    with wave.open(file_path, 'rb') as wav_file:
+        channels = wav_file.getnchannels()
+        sample_width = wav_file.getsampwidth()
+        sample_rate = wav_file.getframerate()
+        data = wav_file.readframes(wav_file.getnframes())
+
+    if sample_width == 1:
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        samples = np.frombuffer(data, dtype='<i2').astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        ints = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8)
+                | (raw[:, 2].astype(np.int32) << 16))
+        ints = np.where(ints >= 1 << 23, ints - (1 << 24), ints)
+        samples = ints.astype(np.float32) / float(1 << 23)
+    elif sample_width == 4:
+        samples = np.frombuffer(data, dtype='<i4').astype(np.float32) / float(1 << 31)
+    else:
+        raise ValueError(f"不支持的采样宽度: {sample_width}")
+
+    return samples.reshape(-1, channels), sample_rate
+
+
+class SoundBank:
+    """
+    音效库
+
+    音效在加入时转换为引擎的采样率和声道数，播放时不再做任何解码或格式转换
+    """
+
+    def __init__(self, sample_rate: int = 44100, channels: int = 2):
+        """
+        初始化音效库
+
+        参数:
+            sample_rate: 引擎采样率
+            channels: 引擎声道数（1或2）
+        """
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.clips: Dict[str, SoundClip] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, samples: np.ndarray, sample_rate: Optional[int] = None) -> SoundClip:
+        """
+        加入PCM数据
+
+        参数:
+            name: 音效名称
+            samples: PCM数据，int16数组或取值在-1.0到1.0之间的浮点数组，一维（单声道）或 (帧数, 声道数)
+            sample_rate: 数据的采样率，默认与引擎一致
+
+        返回:
+            SoundClip: 转换后的音效
+        """
+        samples = np.asarray(samples)
+        if samples.dtype == np.int16:
+            samples = samples.astype(np.float32) / 32768.0
+        else:
+            samples = samples.astype(np.float32, copy=False)
+        if samples.ndim == 1:
+            samples = samples[:, None]
+
+        # 重采样
+        sample_rate = sample_rate or self.sample_rate
+        if sample_rate != self.sample_rate and len(samples) > 1:
+            target_frames = int(round(len(samples) * self.sample_rate / sample_rate))
+            source_times = np.arange(len(samples)) / sample_rate
+            target_times = np.arange(target_frames) / self.sample_rate
+            samples = np.stack([np.interp(target_times, source_times, samples[:, ch])
+                                for ch in range(samples.shape[1])], axis=1).astype(np.float32)
+
+        # 声道转换
+        if samples.shape[1] != self.channels:
+            if samples.shape[1] == 1:
+                samples = np.repeat(samples, self.channels, axis=1)
+            else:
+                mono = samples.mean(axis=1, keepdims=True)
+                samples = mono if self.channels == 1 else np.repeat(mono, self.channels, axis=1)
+
+        clip = SoundClip(name=name, samples=np.ascontiguousarray(samples), sample_rate=self.sample_rate)
+        with self._lock:
+            self.clips[name] = clip
+        return clip
+
+    def load(self, name: str, file_path: str) -> SoundClip:
+        """
+        解码音频文件并加入音效库
+
+        参数:
+            name: 音效名称
+            file_path: 音频文件路径，WAV直接解码，其他格式需要pygame
+
+        返回:
+            SoundClip: 转换后的音效
+        """
+        try:
+            samples, sample_rate = decode_wav(file_path)
+        except wave.Error:
+            if not PYGAME_AVAILABLE:
+                raise
+            if not pygame.mixer.get_init():
+                pygame.mixer.init(frequency=self.sample_rate, size=-16, channels=self.channels)
+            sound = pygame.mixer.Sound(file_path)
+            sample_rate = pygame.mixer.get_init()[0]
+            samples = pygame.sndarray.array(sound)
+        return self.add(name, samples, sample_rate)
+
+    def get(self, name: str) -> Optional[SoundClip]:
+        """获取音效"""
+        return self.clips.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.clips
+
+
+class Voice:
+    """混音器中的一个播放声部"""
+
+    def __init__(self,
+                 engine: "SoundEngine",
+                 voice_id: int,
+                 clip: SoundClip,
+                 gain: float,
+                 priority: int,
+                 category: Any,
+                 loop: bool,
+                 fade_in: int,
+                 fade_out: int):
+        self.engine = engine
+        self.id = voice_id
+        self.clip = clip
+        self.gain = gain
+        self.priority = priority
+        self.category = category
+        self.loop = loop
+        self.fade_in = fade_in            # 淡入帧数
+        self.fade_out = fade_out          # 停止时的淡出帧数
+        self.position = 0                 # 在音效中的读取位置
+        self.played = 0                   # 已输出的帧数
+        self.stop_at: Optional[int] = None
+        self.finished = False
+        self.stolen = False
+
+    @property
+    def is_playing(self) -> bool:
+        """是否仍在播放"""
+        return not self.finished
+
+    @property
+    def stopping(self) -> bool:
+        """是否正在淡出"""
+        return self.stop_at is not None
+
+    def stop(self, fade_out: Optional[float] = None) -> None:
+        """
+        停止播放
+
+        参数:
+            fade_out: 淡出时间（秒），为None时使用播放时设置的淡出时间
+        """
+        self.engine.stop(self, fade_out)
+
+    def set_gain(self, gain: float) -> None:
+        """设置增益，下一个混音块生效"""
+        self.gain = max(0.0, gain)
+
+
+class NullSink:
+    """
+    空输出端
+
+    丢弃（或保留）混音结果，用于无界面测试和基准测试
+    """
+
+    def __init__(self, realtime: bool = False, keep_blocks: bool = False):
+        """
+        参数:
+            realtime: 是否按音频时长节流，模拟实际声卡的消耗速度
+            keep_blocks: 是否保留输出的每个混音块
+        """
+        self.realtime = realtime
+        self.keep_blocks = keep_blocks
+        self.blocks: List[np.ndarray] = []
+        self.frames_written = 0
+        self._sample_rate = 44100
+        self._next_time = None
+
+    def open(self, sample_rate: int, channels: int, block_size: int) -> None:
+        self._sample_rate = sample_rate
+        self._next_time = None
+
+    def write(self, block: np.ndarray) -> None:
+        self.frames_written += len(block)
+        if self.keep_blocks:
+            self.blocks.append(block.copy())
+        if self.realtime:
+            now = time.perf_counter()
+            if self._next_time is None or self._next_time < now:
+                self._next_time = now
+            self._next_time += len(block) / self._sample_rate
+            time.sleep(max(0.0, self._next_time - now))
+
+    def output(self) -> np.ndarray:
+        """保留的全部输出"""
+        return np.concatenate(self.blocks) if self.blocks else np.zeros((0, 1), dtype=np.int16)
+
+    def close(self) -> None:
+        pass
+
+
+class PygameSink:
+    """pygame流式输出端：把混音块排入同一个混音通道的播放队列"""
+
+    def __init__(self):
+        if not PYGAME_AVAILABLE:
+            raise RuntimeError("pygame未安装，无法使用流式输出")
+        self.channel = None
+
+    def open(self, sample_rate: int, channels: int, block_size: int) -> None:
+        if not pygame.mixer.get_init():
+            pygame.mixer.init(frequency=sample_rate, size=-16, channels=channels, buffer=block_size)
+        self.channel = pygame.mixer.Channel(0)
+
+    def write(self, block: np.ndarray) -> None:
+        sound = pygame.mixer.Sound(buffer=block.tobytes())
+        if not self.channel.get_busy():
+            self.channel.play(sound)
+            return
+        # 队列只能容纳一个待播放块，等待上一个块开始播放
+        while self.channel.get_queue() is not None:
+            time.sleep(0.001)
+        self.channel.queue(sound)
+
+    def close(self) -> None:
+        if self.channel is not None:
+            self.channel.stop()
+
+
+def default_sink() -> Optional[Any]:
+    """当前平台可用的流式输出端，没有时返回None"""
+    return PygameSink() if PYGAME_AVAILABLE else None
+
+
+class SoundEngine:
+    """
+    软件混音音效引擎
+
+    唯一的混音线程每次混合 block_size 帧：逐个声部取出PCM切片，乘以向量化的增益/淡入淡出包络后累加，
+    再乘主音量、限幅并转换为int16写入预分配的输出环，随后交给输出端。
+    声部数超过 max_voices 时，新声部抢占优先级不高于它的最早声部，否则被拒绝。
+    """
+
+    def __init__(self,
+                 sample_rate: int = 44100,
+                 channels: int = 2,
+                 block_size: int = 512,
+                 max_voices: int = 16,
+                 max_instances: int = 4,
+                 ring_blocks: int = 4,
+                 sink: Optional[Any] = None):
+        """
+        初始化音效引擎
+
+        参数:
+            sample_rate: 采样率
+            channels: 声道数
+            block_size: 每个混音块的帧数
+            max_voices: 同时播放的最大声部数
+            max_instances: 同一音效同时播放的最大实例数，超过时停止该音效最早的实例
+            ring_blocks: 输出环的块数
+            sink: 输出端，为None时使用空输出端
+        """
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.block_size = block_size
+        self.max_voices = max_voices
+        self.max_instances = max_instances
+        self.sink = sink if sink is not None else NullSink()
+        self.bank = SoundBank(sample_rate, channels)
+
+        self.master_gain = 1.0
+        self.category_gains: Dict[Any, float] = {}
+
+        self._voices: List[Voice] = []
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+        # 预分配的混音缓冲区
+        self._ring = np.zeros((ring_blocks, block_size, channels), dtype=np.int16)
+        self._ring_index = 0
+        self._mix = np.zeros((block_size, channels), dtype=np.float32)
+        self._scratch = np.zeros((block_size, channels), dtype=np.float32)
+        self._ramp = np.arange(block_size, dtype=np.float32)
+        self._envelope = np.zeros(block_size, dtype=np.float32)
+        self._fade = np.zeros(block_size, dtype=np.float32)
+
+        # 统计
+        self.voices_started = 0
+        self.voices_stolen = 0
+        self.voices_rejected = 0
+        self.peak_voices = 0
+        self.blocks_mixed = 0
+        self.mix_time = 0.0
+
+    # ---- 生命周期 ----
+
+    def start(self) -> None:
+        """启动混音线程"""
+        if self._thread is not None:
+            return
+        self.sink.open(self.sample_rate, self.channels, self.block_size)
+        self._running = True
+        self._thread = threading.Thread(target=self._mixer_loop, name="sound-mixer", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        """停止混音线程并关闭输出端"""
+        with self._lock:
+            self._running = False
+            self._wakeup.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+            self.sink.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    # ---- 播放控制 ----
+
+    def _seconds_to_frames(self, seconds: float) -> int:
+        return max(0, int(round(seconds * self.sample_rate)))
+
+    def play(self,
+             name: str,
+             gain: float = 1.0,
+             priority: int = 0,
+             category: Any = None,
+             loop: bool = False,
+             fade_in: float = 0.0,
+             fade_out: float = 0.0) -> Optional[Voice]:
+        """
+        播放音效库中的音效
+
+        参数:
+            name: 音效名称
+            gain: 增益
+            priority: 优先级，声部已满时只能抢占优先级不高于它的声部
+            category: 音频类别，混音时乘以 category_gains 中对应的增益
+            loop: 是否循环播放
+            fade_in: 淡入时间（秒）
+            fade_out: 停止时的淡出时间（秒）
+
+        返回:
+            Optional[Voice]: 声部对象，音效不存在或被拒绝时返回None
+        """
+        clip = self.bank.get(name)
+        if clip is None or len(clip.samples) == 0:
+            logger.error(f"音效库中没有音效: {name}")
+            return None
+
+        with self._lock:
+            active = [voice for voice in self._voices if not voice.stopping]
+
+            # 同一音效的实例数限制：停止最早的实例
+            same = [voice for voice in active if voice.clip.name == name]
+            if self.max_instances and len(same) >= self.max_instances:
+                self._steal(same[0])
+                active.remove(same[0])
+
+            # 总声部数限制：抢占优先级最低（相同则最早）的声部
+            if len(active) >= self.max_voices:
+                victim = min(active, key=lambda voice: voice.priority)
+                if victim.priority > priority:
+                    self.voices_rejected += 1
+                    return None
+                self._steal(victim)
+
+            voice = Voice(self, self._next_id, clip, gain, priority, category, loop,
+                          self._seconds_to_frames(fade_in), self._seconds_to_frames(fade_out))
+            self._next_id += 1
+            self._voices.append(voice)
+            self.voices_started += 1
+            self.peak_voices = max(self.peak_voices, len(active) + 1)
+            self._wakeup.notify()
+            return voice
+
+    def _steal(self, voice: Voice) -> None:
+        """以短淡出停止被抢占的声部（调用方持有锁）"""
+        voice.stolen = True
+        self.voices_stolen += 1
+        voice.fade_out = self._seconds_to_frames(STEAL_FADE_SECONDS)
+        voice.stop_at = voice.played
+
+    def stop(self, voice: Voice, fade_out: Optional[float] = None) -> None:
+        """
+        停止声部
+
+        参数:
+            voice: 声部对象
+            fade_out: 淡出时间（秒），为None时使用声部的淡出时间
+        """
+        with self._lock:
+            if voice.finished or voice.stopping:
+                return
+            if fade_out is not None:
+                voice.fade_out = self._seconds_to_frames(fade_out)
+            voice.stop_at = voice.played
+
+    def stop_all(self, fade_out: float = STEAL_FADE_SECONDS) -> None:
+        """以短淡出停止所有声部"""
+        with self._lock:
+            for voice in self._voices:
+                if not voice.stopping:
+                    voice.fade_out = self._seconds_to_frames(fade_out)
+                    voice.stop_at = voice.played
+
+    @property
+    def active_voices(self) -> int:
+        """正在播放（包括淡出中）的声部数"""
+        with self._lock:
+            return len(self._voices)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待所有声部播放结束
+
+        返回:
+            bool: 是否在超时前结束
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while self.active_voices:
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
+            time.sleep(0.002)
+        return True
+
+    # ---- 混音 ----
+
+    def _mix_voice(self, voice: Voice, mix: np.ndarray) -> None:
+        """把一个声部的下一个混音块累加到 mix（调用方持有锁）"""
+        samples = voice.clip.samples
+        frames = len(mix)
+        offset = 0
+        gain = voice.gain * self.category_gains.get(voice.category, 1.0)
+
+        while offset < frames and not voice.finished:
+            n = min(frames - offset, len(samples) - voice.position)
+            if voice.stopping:
+                n = min(n, voice.stop_at + voice.fade_out - voice.played)
+            if n <= 0:
+                if voice.stopping or not voice.loop:
+                    voice.finished = True
+                else:
+                    voice.position = 0
+                continue
+
+            # 包络 = 增益 × 淡入 × 淡出，全部向量化计算
+            envelope = self._envelope[:n]
+            envelope.fill(gain)
+            if voice.fade_in and voice.played < voice.fade_in:
+                fade = self._fade[:n]
+                np.add(self._ramp[:n], voice.played, out=fade)
+                np.multiply(fade, 1.0 / voice.fade_in, out=fade)
+                np.minimum(fade, 1.0, out=fade)
+                envelope *= fade
+            if voice.stopping:
+                fade = self._fade[:n]
+                if voice.fade_out:
+                    np.add(self._ramp[:n], voice.played - voice.stop_at, out=fade)
+                    np.multiply(fade, -1.0 / voice.fade_out, out=fade)
+                    np.add(fade, 1.0, out=fade)
+                    np.maximum(fade, 0.0, out=fade)
+                    envelope *= fade
+                else:
+                    envelope.fill(0.0)
+
+            scratch = self._scratch[:n]
+            np.multiply(samples[voice.position:voice.position + n], envelope[:, None], out=scratch)
+            target = mix[offset:offset + n]
+            np.add(target, scratch, out=target)
+
+            voice.position += n
+            voice.played += n
+            offset += n
+
+    def _render_block(self, frames: Optional[int] = None) -> np.ndarray:
+        """混合下一个块并写入输出环，返回环中的块"""
+        start = time.perf_counter()
+        frames = frames or self.block_size
+        mix = self._mix[:frames]
+        mix.fill(0.0)
+
+        with self._lock:
+            for voice in self._voices:
+                self._mix_voice(voice, mix)
+            self._voices = [voice for voice in self._voices if not voice.finished]
+            master_gain = self.master_gain
+
+        np.multiply(mix, master_gain * 32767.0, out=mix)
+        np.clip(mix, -32768.0, 32767.0, out=mix)
+        block = self._ring[self._ring_index, :frames]
+        np.copyto(block, mix, casting='unsafe')
+        self._ring_index = (self._ring_index + 1) % len(self._ring)
+
+        self.blocks_mixed += 1
+        self.mix_time += time.perf_counter() - start
+        return block
+
+    def render(self, frames: int) -> np.ndarray:
+        """
+        同步渲染指定帧数（不启动混音线程时使用，如离线测试）
+
+        参数:
+            frames: 帧数
+
+        返回:
+            int16数组，形状为 (帧数, 声道数)
+        """
+        if self._thread is not None:
+            raise RuntimeError("混音线程运行时不能同步渲染")
+        output = np.empty((frames, self.channels), dtype=np.int16)
+        for start in range(0, frames, self.block_size):
+            n = min(self.block_size, frames - start)
+            output[start:start + n] = self._render_block(n)
+        return output
+
+    def _mixer_loop(self) -> None:
+        """混音线程：没有声部时等待，有声部时持续混音并写入输出端"""
+        while True:
+            with self._lock:
+                while self._running and not self._voices:
+                    self._wakeup.wait()
+                if not self._running:
+                    break
+            try:
+                self.sink.write(self._render_block())
+            except Exception as e:
+                logger.error(f"音效输出出错: {e}")
+                time.sleep(self.block_size / self.sample_rate)
+
+    def get_stats(self) -> Dict[str, Union[int, float]]:
+        """
+        获取混音统计
+
+        返回:
+            Dict: 声部和混音耗时统计
+        """
+        return {
+            "active_voices": self.active_voices,
+            "peak_voices": self.peak_voices,
+            "voices_started": self.voices_started,
+            "voices_stolen": self.voices_stolen,
+            "voices_rejected": self.voices_rejected,
+            "blocks_mixed": self.blocks_mixed,
+            "avg_mix_ms": self.mix_time / self.blocks_mixed * 1000 if self.blocks_mixed else 0.0,
+        }
@@ -9,6 +9,7 @@ import datetime
 import random
 import math
 from . import BaseView
+from ui.charts.downsampling import downsample_records
 
 
 class AnalyticsView(BaseView):
@@ -510,6 +511,10 @@ class AnalyticsView(BaseView):
         if not filtered_data:
             return
 
+        # 每像素最多一个点，超出部分画不出来
+        filtered_data = downsample_records(
+            filtered_data, "value", max(int(chart_width), 3))
+
         # 找到数值范围
         min_value = min(point["value"] for point in filtered_data)
         max_value = max(point["value"] for point in filtered_data)
@@ -0,0 +1,426 @@
+"""
+聊天AI回复的后台流水线
+
+Socket.IO处理函数只负责保存用户消息并提交任务，AI回复在有界线程池中生成，
+生成的文本按时间间隔合并后推送到聊天室；客户端离开聊天时取消对应任务。
+对话上下文保存在每个聊天的内存环形缓冲中，AI消息由后台批量写入数据库。
+"""
+
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# 提供给模型的历史消息条数
+CHAT_CONTEXT_SIZE = 10
+
+
+class ChatHistory:
+    """每个聊天最近若干条消息的环形缓冲，首次使用时从数据库加载"""
+
+    def __init__(self, maxlen: int = CHAT_CONTEXT_SIZE, max_chats: int = 1024):
+        """
+        参数:
+            maxlen: 每个聊天保留的消息数
+            max_chats: 内存中保留的聊天数，超过时淘汰最久未使用的
+        """
+        self.maxlen = maxlen
+        self.max_chats = max_chats
+        self._chats: "OrderedDict[Any, deque]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def context(self, chat_id: Any,
+                loader: Optional[Callable[[], List[Dict[str, str]]]] = None) -> List[Dict[str, str]]:
+        """
+        获取聊天上下文
+
+        参数:
+            chat_id: 聊天ID
+            loader: 缓冲中没有该聊天时加载历史消息的函数
+
+        返回:
+            按时间顺序的消息列表，每条为 {"role", "content"}
+        """
+        with self._lock:
+            ring = self._chats.get(chat_id)
+            if ring is not None:
+                self._chats.move_to_end(chat_id)
+                return list(ring)
+        if loader is None:
+            return []
+
+        history = loader()
+        with self._lock:
+            ring = self._chats.get(chat_id)
+            if ring is None:
+                ring = deque(history, maxlen=self.maxlen)
+                self._chats[chat_id] = ring
+                self.loads += 1
+                while len(self._chats) > self.max_chats:
+                    self._chats.popitem(last=False)
+            return list(ring)
+
+    def append(self, chat_id: Any, role: str, content: str):
+        """
+        追加一条消息（只更新已加载的聊天）
+
+        参数:
+            chat_id: 聊天ID
+            role: "user" 或 "assistant"
+            content: 消息内容
+        """
+        with self._lock:
+            ring = self._chats.get(chat_id)
+            if ring is not None:
+                ring.append({"role": role, "content": content})
+
+    def drop(self, chat_id: Any):
+        """删除聊天的缓冲"""
+        with self._lock:
+            self._chats.pop(chat_id, None)
+
+
+class BatchWriter:
+    """
+    后台批量写入
+
+    记录先放入队列，攒够 max_batch 条或距第一条超过 interval 秒时一次交给 persist 写入，
+    一个事务写多条消息。
+    """
+
+    def __init__(self, persist: Callable[[List[Any]], None],
+                 max_batch: int = 50, interval: float = 0.2):
+        """
+        参数:
+            persist: 写入一批记录的函数
+            max_batch: 每批最多记录数
+            interval: 最长等待时间（秒）
+        """
+        self.persist = persist
+        self.max_batch = max_batch
+        self.interval = interval
+        self._queue: List[Any] = []
+        self._condition = threading.Condition()
+        self._running = True
+        self.batches = 0
+        self.records = 0
+        self._thread = threading.Thread(target=self._loop, name="chat-batch-writer", daemon=True)
+        self._thread.start()
+
+    def add(self, record: Any):
+        """加入一条待写入的记录"""
+        with self._condition:
+            self._queue.append(record)
+            if len(self._queue) == 1 or len(self._queue) >= self.max_batch:
+                self._condition.notify()
+
+    def _take(self) -> List[Any]:
+        """等待并取出一批记录"""
+        with self._condition:
+            while self._running and not self._queue:
+                self._condition.wait()
+            deadline = time.monotonic() + self.interval
+            while self._running and len(self._queue) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+            return batch
+
+    def _write(self, batch: List[Any]):
+        if not batch:
+            return
+        try:
+            self.persist(batch)
+            self.batches += 1
+            self.records += len(batch)
+        except Exception as e:
+            logger.error(f"批量写入 {len(batch)} 条记录失败: {str(e)}")
+
+    def _loop(self):
+        while self._running:
+            self._write(self._take())
+
+    def flush(self):
+        """立即写入队列中的全部记录"""
+        while True:
+            with self._condition:
+                batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+            if not batch:
+                return
+            self._write(batch)
+
+    def close(self):
+        """停止后台线程并写入剩余记录"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        self._thread.join(timeout=self.interval * 5 + 1)
+        self.flush()
+
+
+class ChatJob:
+    """一次AI回复任务"""
+
+    def __init__(self, job_id: int, chat_id: Any, content: str, context: List[Dict[str, str]]):
+        self.job_id = job_id
+        self.chat_id = chat_id
+        self.content = content
+        self.context = context
+        self.status = "queued"
+        self.text = ""
+        self.cancel_event = threading.Event()
+        self.future = None
+        self.submitted_at = time.monotonic()
+        self.first_token_at = None
+        self.finished_at = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+
+class ChatJobPipeline:
+    """
+    AI回复任务流水线
+
+    最多 max_workers 个回复同时生成，另外最多 max_pending 个排队；超过时 submit 返回None，
+    由调用方告知用户稍后再试，而不是占住Socket.IO工作线程。generate 返回字符串或逐段产出
+    文本的迭代器；文本片段按 token_interval 合并后交给 on_token。
+    """
+
+    def __init__(self,
+                 generate: Callable[[str, List[Dict[str, str]]], Union[str, Iterable[str]]],
+                 on_token: Callable[[ChatJob, str], None],
+                 on_complete: Callable[[ChatJob, str], None],
+                 on_error: Optional[Callable[[ChatJob, Exception], None]] = None,
+                 max_workers: int = 8,
+                 max_pending: int = 32,
+                 token_interval: float = 0.05):
+        """
+        参数:
+            generate: 生成回复的函数，参数为用户消息和上下文
+            on_token: 推送新生成文本的回调
+            on_complete: 回复完成的回调（被取消的任务不会调用）
+            on_error: 生成出错的回调
+            max_workers: 同时生成的回复数
+            max_pending: 排队的回复数上限
+            token_interval: 合并文本片段的时间间隔（秒）
+        """
+        self.generate = generate
+        self.on_token = on_token
+        self.on_complete = on_complete
+        self.on_error = on_error
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.token_interval = token_interval
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chat-ai")
+        self._jobs: Dict[int, ChatJob] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.cancelled = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def submit(self, chat_id: Any, content: str, context: List[Dict[str, str]]) -> Optional[ChatJob]:
+        """
+        提交回复任务，立即返回
+
+        参数:
+            chat_id: 聊天ID
+            content: 用户消息
+            context: 对话上下文
+
+        返回:
+            任务；流水线已满时返回None
+        """
+        with self._lock:
+            if len(self._jobs) >= self.max_workers + self.max_pending:
+                self.rejected += 1
+                return None
+            job = ChatJob(next(self._ids), chat_id, content, context)
+            self._jobs[job.job_id] = job
+        job.future = self._executor.submit(self._run, job)
+        return job
+
+    def cancel_chat(self, chat_id: Any) -> int:
+        """
+        取消聊天的全部任务（排队的直接移除，生成中的在下一个文本片段处停止）
+
+        参数:
+            chat_id: 聊天ID
+
+        返回:
+            取消的任务数
+        """
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.chat_id == chat_id]
+        for job in jobs:
+            job.cancel_event.set()
+            if job.future is not None and job.future.cancel():
+                self._finish(job, "cancelled")
+        return len(jobs)
+
+    def _finish(self, job: ChatJob, status: str):
+        with self._lock:
+            if self._jobs.pop(job.job_id, None) is None:
+                return
+            job.status = status
+            job.finished_at = time.monotonic()
+            if status == "completed":
+                self.completed += 1
+            elif status == "cancelled":
+                self.cancelled += 1
+            else:
+                self.failed += 1
+
+    def _run(self, job: ChatJob):
+        if job.cancelled:
+            self._finish(job, "cancelled")
+            return
+        job.status = "running"
+        parts: List[str] = []
+        buffer: List[str] = []
+        last_emit = time.monotonic()
+        chunks = None
+        try:
+            result = self.generate(job.content, job.context)
+            chunks = [result] if isinstance(result, str) else result
+            for chunk in chunks:
+                if job.cancelled:
+                    break
+                if not chunk:
+                    continue
+                if job.first_token_at is None:
+                    job.first_token_at = time.monotonic()
+                parts.append(chunk)
+                buffer.append(chunk)
+                now = time.monotonic()
+                if now - last_emit >= self.token_interval:
+                    self.on_token(job, "".join(buffer))
+                    buffer = []
+                    last_emit = now
+
+            if job.cancelled:
+                if hasattr(chunks, "close"):
+                    chunks.close()
+                self._finish(job, "cancelled")
+                return
+            if buffer:
+                self.on_token(job, "".join(buffer))
+            job.text = "".join(parts)
+            self.on_complete(job, job.text)
+            self._finish(job, "completed")
+        except Exception as e:
+            logger.error(f"生成AI回复失败 (聊天 {job.chat_id}): {str(e)}")
+            self._finish(job, "failed")
+            if self.on_error is not None:
+                self.on_error(job, e)
+
+    @property
+    def active(self) -> int:
+        """排队和生成中的任务数"""
+        with self._lock:
+            return len(self._jobs)
+
+    def close(self, wait: bool = True):
+        """停止流水线"""
+        self._executor.shutdown(wait=wait)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取流水线统计"""
+        with self._lock:
+            return {
+                "active": len(self._jobs),
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending
+            }
+
+
+def stub_model(latency: float = 0.5, n_tokens: int = 20) -> Callable[[str, List[Dict[str, str]]], Iterable[str]]:
+    """
+    本地假模型：总耗时 latency 秒，均匀产出 n_tokens 个文本片段
+
+    参数:
+        latency: 每次回复的总耗时（秒）
+        n_tokens: 文本片段数
+
+    返回:
+        生成函数
+    """
+    def generate(content, context):
+        for i in range(n_tokens):
+            time.sleep(latency / n_tokens)
+            yield f"t{i} "
+    return generate
+
+
+def benchmark_chat_pipeline(n_chats: int = 64,
+                            latency: float = 0.5,
+                            n_tokens: int = 20,
+                            max_workers: int = 16,
+                            max_pending: int = 64) -> Dict[str, Any]:
+    """
+    并发聊天负载测试：n_chats 个聊天同时发送消息
+
+    参数:
+        n_chats: 同时发送消息的聊天数
+        latency: 假模型每次回复的耗时（秒）
+        n_tokens: 每次回复的文本片段数
+        max_workers: 同时生成的回复数
+        max_pending: 排队上限
+
+    返回:
+        提交耗时、总耗时、首个片段延迟、吞吐量以及同步处理同样负载所需的时间
+    """
+    token_events = []
+    done = threading.Semaphore(0)
+    writer = BatchWriter(lambda batch: None, interval=0.05)
+    pipeline = ChatJobPipeline(
+        stub_model(latency, n_tokens),
+        on_token=lambda job, text: token_events.append(job.job_id),
+        on_complete=lambda job, text: (writer.add((job.chat_id, text)), done.release()),
+        max_workers=max_workers,
+        max_pending=max_pending
+    )
+
+    start = time.perf_counter()
+    jobs = [pipeline.submit(chat_id, "hello", []) for chat_id in range(n_chats)]
+    submit_time = time.perf_counter() - start
+    accepted = [job for job in jobs if job is not None]
+    for _ in accepted:
+        done.acquire()
+    wall_time = time.perf_counter() - start
+    pipeline.close()
+    writer.close()
+
+    first_token = sorted(job.first_token_at - job.submitted_at for job in accepted)
+    return {
+        "chats": n_chats,
+        "accepted": len(accepted),
+        "rejected": n_chats - len(accepted),
+        "submit_time": submit_time,
+        "wall_time": wall_time,
+        "sequential_time": len(accepted) * latency,
+        "replies_per_second": len(accepted) / wall_time if wall_time else 0.0,
+        "median_first_token": first_token[len(first_token) // 2] if first_token else None,
+        "token_messages": len(token_events),
+        "db_batches": writer.batches
+    }
+
+
+if __name__ == "__main__":
+    for workers in (1, 8, 32):
+        print(workers, benchmark_chat_pipeline(n_chats=64, latency=0.2, max_workers=workers, max_pending=64))
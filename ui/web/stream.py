@@ -0,0 +1,487 @@
+"""
+仪表板增量推送通道
+
+客户端订阅一个主题（策略、绩效仪表板或指标集）后先收到一次快照，之后只收到增量：
+新增的K线、交易和权益点以及变化了的字段。同一主题在一个帧间隔内的修改合并成一条消息，
+每个主题每帧只编码一次后广播到房间，数值列以二进制（整数列为小端int64，其余为小端float64）传输。
+"""
+
+import copy
+import logging
+import threading
+import time
+from numbers import Integral, Number
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 每帧合并修改的时间间隔（秒）
+FRAME_INTERVAL = 0.1
+
+
+def pack_records(records: List[Any]) -> Any:
+    """
+    把字典列表编码为列式结构，数值列编码为小端float64字节；整数列（如ID）编码为小端int64字节，
+    并在 $types 中标明，避免大整数经float64失去精度
+
+    参数:
+        records: 数据点或交易列表
+
+    返回:
+        列式结构；无法按列编码时原样返回
+    """
+    if not records or not all(isinstance(r, dict) for r in records):
+        return records
+    fields = list(records[0])
+    if any(len(r) != len(fields) for r in records):
+        return records
+
+    columns = {}
+    types = {}
+    for field in fields:
+        try:
+            values = [r[field] for r in records]
+        except KeyError:
+            return records
+        if all(isinstance(v, Integral) and not isinstance(v, bool) for v in values):
+            try:
+                columns[field] = np.asarray(values, dtype="<i8").tobytes()
+                types[field] = "<i8"
+                continue
+            except OverflowError:
+                pass
+        if all(isinstance(v, Number) and not isinstance(v, bool) for v in values):
+            columns[field] = np.asarray(values, dtype="<f8").tobytes()
+        else:
+            columns[field] = values
+    packed = {"$columns": columns, "length": len(records)}
+    if types:
+        packed["$types"] = types
+    return packed
+
+
+def unpack_records(packed: Any) -> Any:
+    """
+    还原 pack_records 编码的数据
+
+    参数:
+        packed: 编码后的数据
+
+    返回:
+        字典列表（整数列还原为int，其余数值列还原为float）
+    """
+    if not isinstance(packed, dict) or "$columns" not in packed:
+        return packed
+    types = packed.get("$types", {})
+    columns = {}
+    for field, values in packed["$columns"].items():
+        if isinstance(values, (bytes, bytearray)):
+            values = np.frombuffer(values, dtype=types.get(field, "<f8")).tolist()
+        columns[field] = values
+    return [{field: columns[field][i] for field in columns} for i in range(packed["length"])]
+
+
+def _tail_offset(old: List[Any], new: List[Any]) -> Optional[int]:
+    """
+    新列表中旧列表最后一个元素之后的位置，从尾部查找，新增越少越快
+
+    两个列表在该位置前重叠的部分必须逐项相同（只允许任一方头部截断和末尾追加），
+    已有元素被修改、插入或删除时返回None
+    """
+    if not old:
+        return 0
+    last = old[-1]
+    for i in range(len(new) - 1, -1, -1):
+        if new[i] == last:
+            start = i + 1
+            overlap = min(start, len(old))
+            if new[start - overlap:start] == old[len(old) - overlap:]:
+                return start
+    return None
+
+
+def _copy_items(items: List[Any]) -> List[Any]:
+    """复制列表和其中的字典元素，调用方原地修改数据点后仍能与保存的状态比较出变化"""
+    return [dict(item) if isinstance(item, dict) else item for item in items]
+
+
+def _pack_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: pack_records(list(value)) if isinstance(value, list) else value
+            for key, value in state.items()}
+
+
+class StreamTopic:
+    """单个订阅主题的当前状态和本帧待发送的增量"""
+
+    def __init__(self, name: str, state: Optional[Dict[str, Any]] = None,
+                 max_lengths: Optional[Dict[str, int]] = None):
+        self.name = name
+        self.state: Dict[str, Any] = {}
+        self.max_lengths = max_lengths or {}
+        self.seq = 0
+        self.subscribers: set = set()
+        self.stale = False
+        self._pending_set: Dict[str, Any] = {}
+        self._pending_append: Dict[str, List[Any]] = {}
+        self._append_keys: Dict[str, str] = {}
+        self._snapshot_cache = None
+        for key, value in (state or {}).items():
+            self.state[key] = _copy_items(value) if isinstance(value, list) else value
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(self._pending_set or self._pending_append)
+
+    def set_fields(self, fields: Dict[str, Any]):
+        """修改字段；字典字段只记录变化了的子键"""
+        for key, value in fields.items():
+            old = self.state.get(key)
+            if isinstance(value, list):
+                self.state[key] = _copy_items(value)
+                self._pending_append.pop(key, None)
+                self._pending_set[key] = list(self.state[key])
+            elif isinstance(value, dict) and isinstance(old, dict):
+                changed = {k: v for k, v in value.items() if old.get(k) != v}
+                removed = [k for k in old if k not in value]
+                if not changed and not removed:
+                    continue
+                self.state[key] = copy.deepcopy(value)
+                pending = self._pending_set.get(key)
+                merging = isinstance(pending, dict) and "$merge" in pending
+                if removed or (key in self._pending_set and not merging):
+                    self._pending_set[key] = self.state[key]
+                elif merging:
+                    pending["$merge"].update(copy.deepcopy(changed))
+                else:
+                    self._pending_set[key] = {"$merge": copy.deepcopy(changed)}
+            elif old != value or key not in self.state:
+                self.state[key] = copy.deepcopy(value) if isinstance(value, dict) else value
+                self._pending_set[key] = self.state[key]
+
+    def append(self, key: str, items: List[Any], key_field: Optional[str] = None):
+        """追加数据点；key_field 与最后一个数据点相同时替换（如未收盘K线的更新）"""
+        series = self.state.setdefault(key, [])
+        if key in self._pending_set:
+            # 本帧已整体替换，继续修改替换值即可
+            pending = None
+        else:
+            pending = self._pending_append.setdefault(key, [])
+            if key_field is not None:
+                self._append_keys[key] = key_field
+        for item in _copy_items(items):
+            replace = (key_field is not None and series and isinstance(item, dict)
+                       and isinstance(series[-1], dict) and item.get(key_field) is not None
+                       and series[-1].get(key_field) == item.get(key_field))
+            if replace:
+                series[-1] = item
+            else:
+                series.append(item)
+            if pending is None:
+                continue
+            if replace and pending and pending[-1].get(key_field) == item.get(key_field):
+                pending[-1] = item
+            else:
+                pending.append(item)
+        if key in self._pending_set:
+            self._pending_set[key] = list(series)
+
+        limit = self.max_lengths.get(key)
+        if limit and len(series) > limit:
+            del series[:-limit]
+
+    def sync(self, new_state: Dict[str, Any]):
+        """
+        与一份完整状态同步：列表在末尾追加时只发送新增部分（头部被截断也可以），
+        已有元素有变化时整体发送该列表，其他变化按字段发送
+        """
+        for key, value in new_state.items():
+            old = self.state.get(key)
+            if isinstance(value, list) and isinstance(old, list):
+                start = _tail_offset(old, value)
+                if start is None:
+                    self.set_fields({key: value})
+                elif start < len(value):
+                    self.append(key, value[start:])
+            else:
+                self.set_fields({key: value})
+
+    def take_delta(self) -> Optional[Dict[str, Any]]:
+        """取出本帧的增量消息"""
+        if not self.has_pending:
+            return None
+        self.seq += 1
+        self._snapshot_cache = None
+        message = {"topic": self.name, "seq": self.seq}
+        if self._pending_set:
+            message["set"] = _pack_state(self._pending_set)
+        if self._pending_append:
+            message["append"] = {key: pack_records(items)
+                                 for key, items in self._pending_append.items() if items}
+            if self._append_keys:
+                # 客户端遇到与最后一个数据点该字段相同的数据点时替换而不是追加
+                message["replace_on"] = self._append_keys
+        self._pending_set = {}
+        self._pending_append = {}
+        self._append_keys = {}
+        return message
+
+    def snapshot(self) -> Dict[str, Any]:
+        """完整快照，只在没有待发送增量时调用（同一序号只编码一次）"""
+        if self._snapshot_cache is None or self._snapshot_cache["seq"] != self.seq:
+            self._snapshot_cache = {"topic": self.name, "seq": self.seq,
+                                    "limits": self.max_lengths,
+                                    "state": _pack_state(self.state)}
+        return self._snapshot_cache
+
+
+class StreamHub:
+    """
+    增量推送中心
+
+    数据源推送修改（update/append/sync）或标记主题过期（invalidate），后台线程每帧调用一次
+    flush，把每个主题合并后的增量交给 send 广播。订阅时先发出该主题待发送的增量再生成快照，
+    所以快照正好对应其序号；订阅者应先加入房间再订阅，并丢弃序号不大于快照序号的增量。
+    只保存有订阅者的主题：没有订阅者的主题忽略修改，最后一个订阅者离开时删除，再次订阅时从数据源加载。
+    """
+
+    def __init__(self, send: Callable[[str, Dict[str, Any]], None],
+                 frame_interval: float = FRAME_INTERVAL):
+        """
+        参数:
+            send: 广播函数，参数为主题名和消息
+            frame_interval: 帧间隔（秒）
+        """
+        self.send = send
+        self.frame_interval = frame_interval
+        self._topics: Dict[str, StreamTopic] = {}
+        self._sources: Dict[str, Callable[[str], Optional[Dict[str, Any]]]] = {}
+        self._max_lengths: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.RLock()
+        self._thread = None
+        self._running = False
+        self.messages_sent = 0
+
+    def register_source(self, prefix: str,
+                        source: Callable[[str], Optional[Dict[str, Any]]],
+                        max_lengths: Optional[Dict[str, int]] = None):
+        """
+        注册快照数据源，主题名为 "<前缀>:<键>"（或只有前缀）
+
+        参数:
+            prefix: 主题前缀，如 strategy、performance
+            source: 根据键返回完整状态的函数，返回None表示主题不存在
+            max_lengths: 各列表字段保留的最大长度
+        """
+        self._sources[prefix] = source
+        if max_lengths:
+            self._max_lengths[prefix] = max_lengths
+
+    def _load(self, topic: str) -> Optional[StreamTopic]:
+        """取得主题，不存在时从数据源加载（调用方持有锁）"""
+        stream = self._topics.get(topic)
+        if stream is not None:
+            return stream
+        prefix, _, key = topic.partition(":")
+        source = self._sources.get(prefix)
+        if source is None:
+            return None
+        state = source(key)
+        if state is None:
+            return None
+        stream = StreamTopic(topic, state, self._max_lengths.get(prefix))
+        self._topics[topic] = stream
+        return stream
+
+    def _subscribed(self, topic: str) -> Optional[StreamTopic]:
+        """取得有订阅者的主题，没有时返回None（调用方持有锁）"""
+        stream = self._topics.get(topic)
+        if stream is None or not stream.subscribers:
+            return None
+        return stream
+
+    def _take_delta(self, stream: StreamTopic) -> Optional[Dict[str, Any]]:
+        """刷新过期主题并取出增量（调用方持有锁）"""
+        if stream.stale:
+            stream.stale = False
+            prefix, _, key = stream.name.partition(":")
+            source = self._sources.get(prefix)
+            state = source(key) if source is not None else None
+            if state is not None:
+                stream.sync(state)
+        return stream.take_delta()
+
+    def _send(self, messages):
+        for name, message in messages:
+            try:
+                self.send(name, message)
+                self.messages_sent += 1
+            except Exception as e:
+                logger.error(f"推送增量失败 {name}: {str(e)}")
+
+    def subscribe(self, topic: str, subscriber_id: Any) -> Optional[Dict[str, Any]]:
+        """
+        订阅主题
+
+        参数:
+            topic: 主题名
+            subscriber_id: 订阅者标识（如Socket.IO会话ID）
+
+        返回:
+            快照消息，主题不存在时返回None
+        """
+        messages = []
+        with self._lock:
+            stream = self._load(topic)
+            if stream is None:
+                return None
+            message = self._take_delta(stream)
+            if message is not None and stream.subscribers:
+                messages.append((topic, message))
+            stream.subscribers.add(subscriber_id)
+            snapshot = stream.snapshot()
+        self._send(messages)
+        return snapshot
+
+    def unsubscribe(self, topic: str, subscriber_id: Any):
+        """取消订阅，最后一个订阅者离开时删除主题"""
+        with self._lock:
+            stream = self._topics.get(topic)
+            if stream is not None:
+                stream.subscribers.discard(subscriber_id)
+                if not stream.subscribers:
+                    del self._topics[topic]
+
+    def unsubscribe_all(self, subscriber_id: Any):
+        """取消一个订阅者的全部订阅（连接断开时调用）"""
+        with self._lock:
+            for name, stream in list(self._topics.items()):
+                stream.subscribers.discard(subscriber_id)
+                if not stream.subscribers:
+                    del self._topics[name]
+
+    def update(self, topic: str, fields: Dict[str, Any]):
+        """修改主题字段，主题没有订阅者时忽略"""
+        with self._lock:
+            stream = self._subscribed(topic)
+            if stream is not None:
+                stream.set_fields(fields)
+
+    def append(self, topic: str, key: str, items: List[Any], key_field: Optional[str] = None):
+        """向主题的列表字段追加数据点，主题没有订阅者时忽略"""
+        with self._lock:
+            stream = self._subscribed(topic)
+            if stream is not None:
+                stream.append(key, items, key_field)
+
+    def sync(self, topic: str, state: Dict[str, Any]):
+        """与完整状态同步，只发送变化的部分；主题没有订阅者时忽略"""
+        with self._lock:
+            stream = self._subscribed(topic)
+            if stream is not None:
+                stream.sync(state)
+
+    def invalidate(self, topic: str):
+        """标记主题过期，下一帧从数据源重新读取并只发送变化"""
+        with self._lock:
+            stream = self._topics.get(topic)
+            if stream is not None:
+                stream.stale = True
+
+    def invalidate_prefix(self, prefix: str):
+        """标记某一前缀的全部主题过期"""
+        with self._lock:
+            for name, stream in self._topics.items():
+                if name.partition(":")[0] == prefix:
+                    stream.stale = True
+
+    def remove(self, topic: str):
+        """删除主题"""
+        with self._lock:
+            self._topics.pop(topic, None)
+
+    def flush(self) -> int:
+        """
+        发送本帧合并后的增量
+
+        返回:
+            发送的消息数
+        """
+        messages = []
+        with self._lock:
+            for name, stream in list(self._topics.items()):
+                message = self._take_delta(stream)
+                if message is not None and stream.subscribers:
+                    messages.append((name, message))
+        self._send(messages)
+        return len(messages)
+
+    def start(self):
+        """启动后台帧循环"""
+        if self._running:
+            return
+        self._running = True
+
+        def loop():
+            while self._running:
+                started = time.monotonic()
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.error(f"增量推送循环出错: {str(e)}")
+                time.sleep(max(0.0, self.frame_interval - (time.monotonic() - started)))
+
+        self._thread = threading.Thread(target=loop, name="stream-hub", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台帧循环并发送剩余增量"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=self.frame_interval * 5)
+            self._thread = None
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取推送统计"""
+        with self._lock:
+            return {
+                "topics": len(self._topics),
+                "subscribers": sum(len(s.subscribers) for s in self._topics.values()),
+                "messages_sent": self.messages_sent
+            }
+
+
+def strategy_listener(hub: StreamHub, prefix: str = "strategy",
+                      dashboard_topic: Optional[str] = "dashboard") -> Callable:
+    """
+    生成策略监控的更新监听函数，把策略修改转为增量推送
+
+    参数:
+        hub: 推送中心
+        prefix: 策略主题前缀
+        dashboard_topic: 汇总指标主题，策略修改后标记过期
+
+    返回:
+        监听函数 (strategy_id, strategy_data, delta)；delta为None时按完整状态同步
+    """
+    def listener(strategy_id: str, strategy_data: Dict[str, Any], delta: Optional[Dict[str, Any]]):
+        topic = f"{prefix}:{strategy_id}"
+        if delta is None:
+            hub.sync(topic, strategy_data)
+        else:
+            fields = {k: v for k, v in delta.items() if not isinstance(v, list)}
+            if delta.get("updated_trades"):
+                # 修改了已有交易时整体替换交易列表（少见）
+                fields["trades"] = strategy_data.get("trades", [])
+            if fields:
+                hub.update(topic, fields)
+            for key, items in delta.items():
+                if key in fields or key == "updated_trades" or not isinstance(items, list) or not items:
+                    continue
+                hub.append(topic, key, items, key_field="id" if key == "trades" else "time")
+        if dashboard_topic:
+            hub.invalidate(dashboard_topic)
+
+    return listener
@@ -5,12 +5,34 @@ from ..models.chat import Chat, Message
 from ..database import db
 from ..auth.utils import get_current_user
 from ..ai.assistant import generate_response
+from .stream import StreamHub, strategy_listener
+from .chat_pipeline import BatchWriter, ChatHistory, ChatJobPipeline, CHAT_CONTEXT_SIZE
 import json
+import logging
 import time
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 socketio = SocketIO()
 
+# 每个聊天最近消息的内存缓冲，AI回复的上下文不再每次查询数据库
+chat_history = ChatHistory(maxlen=CHAT_CONTEXT_SIZE)
+
+# AI回复流水线和AI消息批量写入，在 init_app 中创建
+chat_pipeline = None
+message_writer = None
+_app_ref = {"app": None}
+
+# 每个连接加入的聊天和每个聊天加入的连接，最后一个连接离开聊天时取消它的AI回复
+_session_chats = {}
+_chat_sessions = {}
+
+# 仪表板增量推送：每个主题每帧编码一次，广播到 stream_<主题> 房间
+stream_hub = StreamHub(
+    lambda topic, message: socketio.emit("stream_delta", message, room=f"stream_{topic}")
+)
+
 
 @socketio.on("connect")
 def handle_connect():
@@ -29,6 +51,9 @@ def handle_connect():
 @socketio.on("disconnect")
 def handle_disconnect():
     """处理客户端断开连接"""
+    stream_hub.unsubscribe_all(request.sid)
+    for chat_id in _session_chats.pop(request.sid, set()):
+        _leave_chat_session(request.sid, chat_id)
     user = get_current_user()
     if user:
         leave_room(f"user_{user.id}")
@@ -55,6 +80,8 @@ def handle_join_chat(data):
 
     # 加入聊天室
     join_room(f"chat_{chat_id}")
+    _session_chats.setdefault(request.sid, set()).add(chat_id)
+    _chat_sessions.setdefault(chat_id, set()).add(request.sid)
     emit("chat_joined", {"chat_id": chat_id, "title": chat.title})
 
 
@@ -64,12 +91,25 @@ def handle_leave_chat(data):
     chat_id = data.get("chat_id")
     if chat_id:
         leave_room(f"chat_{chat_id}")
+        _session_chats.get(request.sid, set()).discard(chat_id)
+        _leave_chat_session(request.sid, chat_id)
         emit("chat_left", {"chat_id": chat_id})
 
 
+def _leave_chat_session(sid, chat_id):
+    """连接离开聊天，没有连接留在聊天中时取消还在生成的AI回复"""
+    sessions = _chat_sessions.get(chat_id)
+    if sessions is None:
+        return
+    sessions.discard(sid)
+    if not sessions:
+        del _chat_sessions[chat_id]
+        chat_pipeline.cancel_chat(chat_id)
+
+
 @socketio.on("send_message")
 def handle_send_message(data):
-    """处理用户发送的消息"""
+    """处理用户发送的消息，AI回复提交到后台流水线生成"""
     user = get_current_user()
     chat_id = data.get("chat_id")
     content = data.get("content")
@@ -84,6 +124,9 @@ def handle_send_message(data):
         emit("error", {"message": "聊天不存在或无权访问"})
         return
 
+    # 先取上下文：缓冲中没有该聊天时从数据库加载一次
+    chat_history.context(chat_id, loader=lambda: _load_chat_context(chat_id))
+
     # 创建用户消息
     user_message = Message(
         chat_id=chat_id, sender_id=user.id, content=content, is_from_ai=False
@@ -93,6 +136,12 @@ def handle_send_message(data):
     # 更新聊天最后活动时间
     chat.updated_at = datetime.utcnow()
 
+    # 如果是第一条消息，更新聊天标题
+    if chat.title == "新对话" and len(content) < 30:
+        chat.title = content
+    elif chat.title == "新对话":
+        chat.title = content[:30] + "..."
+
     # 提交用户消息到数据库
     db.session.commit()
 
@@ -112,108 +161,104 @@ def handle_send_message(data):
         room=f"chat_{chat_id}",
     )
 
-    # 异步生成AI响应
-    emit("ai_typing", {"chat_id": chat_id}, room=f"chat_{chat_id}")
+    chat_history.append(chat_id, "user", content)
+    context = chat_history.context(chat_id)
+
+    # 提交AI回复任务，处理函数立即返回
+    job = chat_pipeline.submit(chat_id, content, context)
+    if job is None:
+        emit("error", {"message": "AI助手繁忙，请稍后再试"})
+        return
 
-    # 获取历史消息以提供上下文
+    emit("ai_typing", {"chat_id": chat_id, "job_id": job.job_id}, room=f"chat_{chat_id}")
+
+
+def _load_chat_context(chat_id):
+    """从数据库加载聊天最近的消息"""
     recent_messages = (
         Message.query.filter_by(chat_id=chat_id)
         .order_by(Message.created_at.desc())
-        .limit(10)
+        .limit(CHAT_CONTEXT_SIZE)
         .all()
     )
-    context = [
+    return [
         {"role": "user" if not msg.is_from_ai else "assistant", "content": msg.content}
         for msg in reversed(recent_messages)
     ]
 
-    # 生成AI响应
-    ai_response = generate_response(content, context)
 
-    # 创建AI消息
-    ai_message = Message(
-        chat_id=chat_id,
-        sender_id=None,  # AI没有用户ID
-        content=ai_response,
-        is_from_ai=True,
+def _emit_ai_token(job, text):
+    """推送AI回复新生成的文本"""
+    socketio.emit(
+        "ai_token",
+        {"chat_id": job.chat_id, "job_id": job.job_id, "token": text},
+        room=f"chat_{job.chat_id}",
     )
-    db.session.add(ai_message)
-
-    # 更新聊天最后活动时间
-    chat.updated_at = datetime.utcnow()
 
-    # 如果是第一条消息，更新聊天标题
-    if chat.title == "新对话" and len(content) < 30:
-        chat.title = content
-    elif chat.title == "新对话":
-        chat.title = content[:30] + "..."
 
-    db.session.commit()
+def _complete_ai_response(job, ai_response):
+    """AI回复完成：更新上下文、广播完整回复并排队写入数据库"""
+    chat_history.append(job.chat_id, "assistant", ai_response)
+    message_writer.add({"chat_id": job.chat_id, "job_id": job.job_id, "content": ai_response})
 
-    # 广播AI响应到聊天室
-    emit(
+    # 广播AI响应到聊天室，数据库ID写入后通过 message_saved 补发
+    socketio.emit(
         "new_message",
         {
-            "id": ai_message.id,
-            "chat_id": chat_id,
+            "id": None,
+            "job_id": job.job_id,
+            "chat_id": job.chat_id,
             "content": ai_response,
             "is_from_ai": True,
             "timestamp": int(time.time()),
             "play_sound": "ai_response",  # 添加这行
         },
-        room=f"chat_{chat_id}",
+        room=f"chat_{job.chat_id}",
     )
 
-    # 异步生成AI响应
-    emit("ai_typing", {"chat_id": chat_id}, room=f"chat_{chat_id}")
 
-    # 获取历史消息以提供上下文
-    recent_messages = (
-        Message.query.filter_by(chat_id=chat_id)
-        .order_by(Message.created_at.desc())
-        .limit(10)
-        .all()
-    )
-    context = [
-        {"role": "user" if not msg.is_from_ai else "assistant", "content": msg.content}
-        for msg in reversed(recent_messages)
-    ]
-
-    # 生成AI响应
-    ai_response = generate_response(content, context)
-
-    # 创建AI消息
-    ai_message = Message(
-        chat_id=chat_id,
-        sender_id=None,  # AI没有用户ID
-        content=ai_response,
-        is_from_ai=True,
+def _fail_ai_response(job, error):
+    """AI回复生成失败"""
+    socketio.emit(
+        "ai_error",
+        {"chat_id": job.chat_id, "job_id": job.job_id, "message": "AI回复生成失败"},
+        room=f"chat_{job.chat_id}",
     )
-    db.session.add(ai_message)
 
-    # 更新聊天最后活动时间
-    chat.updated_at = datetime.utcnow()
 
-    # 如果是第一条消息，更新聊天标题
-    if chat.title == "新对话" and len(content) < 30:
-        chat.title = content
-    elif chat.title == "新对话":
-        chat.title = content[:30] + "..."
-
-    db.session.commit()
-
-    # 广播AI响应到聊天室
-    emit(
-        "new_message",
-        {
-            "id": ai_message.id,
-            "chat_id": chat_id,
-            "content": ai_response,
-            "is_from_ai": True,
-            "timestamp": int(time.time()),
-        },
-        room=f"chat_{chat_id}",
-    )
+def _persist_ai_messages(records):
+    """在一个事务中写入一批AI消息"""
+    with _app_ref["app"].app_context():
+        try:
+            saved = []
+            for record in records:
+                ai_message = Message(
+                    chat_id=record["chat_id"],
+                    sender_id=None,  # AI没有用户ID
+                    content=record["content"],
+                    is_from_ai=True,
+                )
+                db.session.add(ai_message)
+                saved.append((record, ai_message))
+
+            # 更新聊天最后活动时间
+            chat_ids = {record["chat_id"] for record in records}
+            Chat.query.filter(Chat.id.in_(chat_ids)).update(
+                {"updated_at": datetime.utcnow()}, synchronize_session=False
+            )
+            db.session.commit()
+            # 会话在应用上下文结束时移除，ID要在上下文内读取
+            saved = [(record, ai_message.id) for record, ai_message in saved]
+        except Exception:
+            db.session.rollback()
+            raise
+
+    for record, message_id in saved:
+        socketio.emit(
+            "message_saved",
+            {"chat_id": record["chat_id"], "job_id": record["job_id"], "id": message_id},
+            room=f"chat_{record['chat_id']}",
+        )
 
 
 @socketio.on("rename_chat")
@@ -265,6 +310,8 @@ def handle_delete_chat(data):
         return
 
     # 删除聊天及关联消息
+    chat_pipeline.cancel_chat(chat_id)
+    chat_history.drop(chat_id)
     try:
         Message.query.filter_by(chat_id=chat_id).delete()
         db.session.delete(chat)
@@ -279,6 +326,37 @@ def handle_delete_chat(data):
         emit("error", {"message": f"删除失败: {str(e)}"})
 
 
+@socketio.on("stream_subscribe")
+def handle_stream_subscribe(data):
+    """订阅仪表板主题：先返回一次快照，之后只推送增量"""
+    user = get_current_user()
+    topic = data.get("topic")
+
+    if not user or not topic:
+        emit("error", {"message": "未授权或缺少订阅主题"})
+        return
+
+    # 先加入房间再取快照，客户端丢弃序号不大于快照序号的增量
+    join_room(f"stream_{topic}")
+    snapshot = stream_hub.subscribe(topic, request.sid)
+    if snapshot is None:
+        leave_room(f"stream_{topic}")
+        emit("error", {"message": "订阅主题不存在"})
+        return
+
+    emit("stream_snapshot", snapshot)
+
+
+@socketio.on("stream_unsubscribe")
+def handle_stream_unsubscribe(data):
+    """取消订阅仪表板主题"""
+    topic = data.get("topic")
+    if topic:
+        leave_room(f"stream_{topic}")
+        stream_hub.unsubscribe(topic, request.sid)
+        emit("stream_unsubscribed", {"topic": topic})
+
+
 @socketio.on("notification")
 def handle_notification(data):
     """处理系统通知"""
@@ -313,6 +391,56 @@ def broadcast_announcement(message, level="info"):
     )
 
 
+def register_stream_sources():
+    """注册仪表板数据源：strategy:<ID>、dashboard、performance:<ID>、viewer:<ID>"""
+    from ..trading.components.performance_dashboard import PerformanceDashboard
+    from ..trading.components.strategy_viewer import StrategyViewer
+
+    stream_hub.register_source(
+        "performance", lambda key: PerformanceDashboard(key or None).render())
+    stream_hub.register_source(
+        "viewer", lambda key: StrategyViewer(key or None).render())
+
+    try:
+        from .. import strategy_monitor
+    except ImportError as e:
+        logger.warning(f"策略监控不可用，跳过策略主题: {str(e)}")
+        return
+
+    stream_hub.register_source(
+        "strategy",
+        strategy_monitor._strategy_snapshot,
+        max_lengths={
+            "price_data": strategy_monitor.MAX_PRICE_POINTS,
+            "equity_curve": strategy_monitor.MAX_EQUITY_POINTS,
+        },
+    )
+    stream_hub.register_source(
+        "dashboard", lambda key: strategy_monitor._calculate_dashboard_metrics())
+    strategy_monitor.add_update_listener(strategy_listener(stream_hub))
+
+
+def refresh_stream(prefix):
+    """通知某类仪表板数据已变化，下一帧重新读取并只推送变化部分"""
+    stream_hub.invalidate_prefix(prefix)
+
+
 def init_app(app):
     """初始化SocketIO到Flask应用"""
-    socketio.init_app(app, cors_allowed_origins="*")
\ No newline at end of file
+    global chat_pipeline, message_writer
+
+    socketio.init_app(app, cors_allowed_origins="*")
+
+    _app_ref["app"] = app
+    chat_pipeline = ChatJobPipeline(
+        generate_response,
+        on_token=_emit_ai_token,
+        on_complete=_complete_ai_response,
+        on_error=_fail_ai_response,
+        max_workers=app.config.get("AI_CHAT_WORKERS", 8),
+        max_pending=app.config.get("AI_CHAT_MAX_PENDING", 32),
+    )
+    message_writer = BatchWriter(_persist_ai_messages)
+
+    register_stream_sources()
+    stream_hub.start()
\ No newline at end of file
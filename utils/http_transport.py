@@ -0,0 +1,810 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP传输模块: http_transport
+功能描述: 模型和交易所连接器共用的HTTP传输层。提供限定大小的长连接池(同步requests和
+         异步aiohttp两种实现)、按提供方的令牌桶限速、带抖动并遵守Retry-After的指数退避重试
+         (默认只重试幂等读请求)、
+         熔断器、幂等读请求的对冲请求，以及按端点的延迟直方图
+版本: 1.0
+创建日期: 2026-10-18
+"""
+
+import asyncio
+import bisect
+import email.utils
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 尝试导入可选依赖
+try:
+    import aiohttp
+
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+# 配置日志记录器
+logger = logging.getLogger(__name__)
+
+# 可以对冲、默认可以重试的幂等读方法
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# 延迟直方图的桶上界(毫秒)
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+
+# 按延迟分位数对冲前，端点至少需要的样本数
+HEDGE_MIN_SAMPLES = 20
+
+
+class TransportError(Exception):
+    """传输失败：连接错误、超时或重试后仍然失败"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class CircuitOpenError(TransportError):
+    """提供方的熔断器处于打开状态，请求未发送"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析Retry-After响应头
+
+    Args:
+        value: 秒数或HTTP日期
+
+    Returns:
+        需要等待的秒数，无法解析时返回None
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """令牌桶：按固定速率补充令牌，允许不超过容量的突发请求"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, clock=time.monotonic):
+        """
+        初始化令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 桶容量(最大突发请求数)，默认为max(1, rate)
+            clock: 时间函数
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self.clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        预订令牌，令牌不足时记为欠额，后来的请求排在其后
+
+        Args:
+            tokens: 令牌数
+
+        Returns:
+            取得令牌前需要等待的秒数
+        """
+        with self._lock:
+            self._refill(self.clock())
+            self._tokens -= tokens
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """
+        立即取得令牌，不足时不等待
+
+        Args:
+            tokens: 令牌数
+
+        Returns:
+            是否取得令牌
+        """
+        with self._lock:
+            self._refill(self.clock())
+            if self._tokens < tokens:
+                return False
+            self._tokens -= tokens
+            return True
+
+    def defer(self, seconds: float):
+        """服务端要求等待时(如429)，在指定秒数内不再发放令牌"""
+        with self._lock:
+            self._refill(self.clock())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    连续失败达到阈值后打开，拒绝请求；经过恢复时间后进入半开状态，只放行一个试探请求，
+    成功则关闭，失败则重新打开；试探请求被取消或没有结果时调用 release 让出试探名额
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 clock=time.monotonic):
+        """
+        初始化熔断器
+
+        Args:
+            failure_threshold: 打开熔断器的连续失败次数
+            recovery_timeout: 打开后进入半开状态前的等待时间(秒)
+            clock: 时间函数
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_owner = None
+        self._lock = threading.Lock()
+
+    def allow(self, owner: Any = None) -> bool:
+        """
+        判断是否放行请求
+
+        Args:
+            owner: 请求的标识，半开状态下放行的试探请求只能由同一标识 release
+
+        Returns:
+            是否放行
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                if self.clock() - self._opened_at < self.recovery_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+                self._trial_owner = owner
+            return True
+
+    def release(self, owner: Any = None):
+        """
+        放行的请求没有结果(被取消或抛出未预期的异常)时调用，不计成功或失败；
+        若它是半开状态的试探请求，让下一个请求重新试探
+
+        Args:
+            owner: 与 allow 相同的请求标识
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN and self._trial_in_flight and self._trial_owner is owner:
+                self._trial_in_flight = False
+                self._trial_owner = None
+
+    def record_success(self):
+        """记录一次成功"""
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """记录一次失败"""
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"熔断器打开，连续失败 {self.failures} 次")
+                self.state = self.OPEN
+                self._opened_at = self.clock()
+
+
+class LatencyHistogram:
+    """固定分桶的延迟直方图"""
+
+    def __init__(self, bounds_ms: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        """
+        初始化直方图
+
+        Args:
+            bounds_ms: 各桶上界(毫秒)，升序
+        """
+        self.bounds_ms = tuple(bounds_ms)
+        self.counts = [0] * (len(self.bounds_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        """记录一次请求耗时(秒)"""
+        ms = seconds * 1000.0
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds_ms, ms)] += 1
+            self.count += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """
+        估算延迟分位数
+
+        Args:
+            p: 百分位(0-100)
+
+        Returns:
+            分位数所在桶的上界(秒)，没有样本时返回None
+        """
+        with self._lock:
+            if not self.count:
+                return None
+            rank = max(1, int(round(self.count * p / 100.0)))
+            seen = 0
+            for index, n in enumerate(self.counts):
+                seen += n
+                if seen >= rank:
+                    break
+            upper = self.bounds_ms[index] if index < len(self.bounds_ms) else self.max_ms
+            return min(upper, self.max_ms) / 1000.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        获取直方图快照
+
+        Returns:
+            请求数、平均和最大耗时、p50/p95/p99(毫秒)以及各桶计数
+        """
+        p50, p95, p99 = (self.percentile(p) for p in (50, 95, 99))
+        with self._lock:
+            labels = [f"<={b}ms" for b in self.bounds_ms] + ["+inf"]
+            return {
+                "count": self.count,
+                "mean_ms": self.total_ms / self.count if self.count else 0.0,
+                "max_ms": self.max_ms,
+                "p50_ms": p50 * 1000.0 if p50 is not None else None,
+                "p95_ms": p95 * 1000.0 if p95 is not None else None,
+                "p99_ms": p99 * 1000.0 if p99 is not None else None,
+                "buckets": dict(zip(labels, self.counts)),
+            }
+
+
+class RetryPolicy:
+    """带完全抖动的指数退避重试策略"""
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 30.0,
+                 retry_statuses=(429, 500, 502, 503, 504)):
+        """
+        初始化重试策略
+
+        Args:
+            max_retries: 最大重试次数
+            base_delay: 首次重试的退避上限(秒)，之后每次翻倍
+            max_delay: 单次等待上限(秒)
+            retry_statuses: 需要重试的HTTP状态码
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_statuses = frozenset(retry_statuses)
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """
+        计算第attempt次失败后的等待时间
+
+        Args:
+            attempt: 已失败的次数减一(从0开始)
+            retry_after: 服务端要求的等待时间(秒)
+
+        Returns:
+            等待秒数；服务端要求的等待超过max_delay时返回None，表示不再重试
+        """
+        if retry_after is not None and retry_after > self.max_delay:
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(delay, retry_after) if retry_after is not None else delay
+
+
+class _TransportPolicy:
+    """同步和异步传输共用的限速、熔断、重试和统计逻辑"""
+
+    def __init__(
+        self,
+        timeout: float = 60.0,
+        connect_timeout: float = 10.0,
+        retry: Optional[RetryPolicy] = None,
+        rate_limits: Optional[Dict[str, Union[float, Tuple[float, float]]]] = None,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        hedge_after: Optional[float] = None,
+        hedge_percentile: Optional[float] = 95.0,
+    ):
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.retry = retry or RetryPolicy()
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.hedge_after = hedge_after
+        self.hedge_percentile = hedge_percentile
+
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "errors": 0, "hedged": 0,
+                      "hedge_wins": 0, "circuit_rejections": 0, "throttled_seconds": 0.0}
+
+        for provider, limit in (rate_limits or {}).items():
+            rate, burst = limit if isinstance(limit, (tuple, list)) else (limit, None)
+            self.set_rate_limit(provider, rate, burst)
+
+    def set_rate_limit(self, provider: str, rate: float, burst: Optional[float] = None):
+        """
+        设置提供方的客户端限速
+
+        Args:
+            provider: 提供方名称
+            rate: 每秒请求数
+            burst: 最大突发请求数
+        """
+        with self._lock:
+            self._buckets[provider] = TokenBucket(rate, burst)
+
+    def circuit(self, provider: str) -> CircuitBreaker:
+        """获取提供方的熔断器"""
+        with self._lock:
+            breaker = self._breakers.get(provider)
+            if breaker is None:
+                breaker = self._breakers[provider] = CircuitBreaker(
+                    self.failure_threshold, self.recovery_timeout)
+            return breaker
+
+    def get_latency_histograms(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各端点的延迟直方图
+
+        Returns:
+            端点("方法 主机路径") -> 直方图快照
+        """
+        with self._lock:
+            histograms = dict(self._histograms)
+        return {endpoint: h.snapshot() for endpoint, h in histograms.items()}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取传输统计
+
+        Returns:
+            请求、重试、对冲和熔断计数，各提供方的熔断器状态和限速，以及延迟直方图
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats["circuits"] = {p: b.state for p, b in self._breakers.items()}
+            stats["rate_limits"] = {p: b.rate for p, b in self._buckets.items()}
+        stats["latency"] = self.get_latency_histograms()
+        return stats
+
+    def _count(self, name: str, value: float = 1):
+        with self._lock:
+            self.stats[name] += value
+
+    @staticmethod
+    def _endpoint(method: str, url: str) -> str:
+        parts = urlsplit(url)
+        return f"{method} {parts.netloc}{parts.path or '/'}"
+
+    def _observe(self, endpoint: str, seconds: float):
+        histogram = self._histograms.get(endpoint)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(endpoint, LatencyHistogram())
+        histogram.observe(seconds)
+
+    def _attempts(self, method: str, retry: bool, retry_non_idempotent: bool) -> int:
+        """最多发送的次数，非幂等方法重试可能重复执行写操作，需要显式开启"""
+        if retry and (method in READ_METHODS or retry_non_idempotent):
+            return self.retry.max_retries + 1
+        return 1
+
+    def _admit(self, provider: str, owner: Any = None) -> float:
+        """检查熔断器并预订令牌，返回需要等待的秒数"""
+        if not self.circuit(provider).allow(owner):
+            self._count("circuit_rejections")
+            raise CircuitOpenError(f"{provider} 熔断器已打开，暂停发送请求")
+        self._count("requests")
+        bucket = self._buckets.get(provider)
+        delay = bucket.reserve() if bucket else 0.0
+        if delay:
+            self._count("throttled_seconds", delay)
+        return delay
+
+    def _try_admit_hedge(self, provider: str) -> bool:
+        """对冲请求只在有空闲令牌时发送，不为其排队"""
+        bucket = self._buckets.get(provider)
+        if bucket is not None and not bucket.try_acquire():
+            return False
+        self._count("hedged")
+        return True
+
+    def _hedge_delay(self, method: str, endpoint: str, hedge: Optional[bool]) -> Optional[float]:
+        """读请求发出多久仍未返回时发送对冲请求，None表示不对冲"""
+        if hedge is False or (hedge is None and method not in READ_METHODS):
+            return None
+        if self.hedge_after is not None:
+            return self.hedge_after
+        histogram = self._histograms.get(endpoint)
+        if self.hedge_percentile is None or histogram is None or histogram.count < HEDGE_MIN_SAMPLES:
+            return None
+        return histogram.percentile(self.hedge_percentile)
+
+    def _after_response(self, provider: str, status: int, retry_after: Optional[str],
+                        attempt: int) -> Optional[float]:
+        """记录响应结果，需要重试时返回等待秒数"""
+        breaker = self.circuit(provider)
+        if status >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if status not in self.retry.retry_statuses:
+            return None
+        seconds = parse_retry_after(retry_after)
+        if status == 429 and seconds and provider in self._buckets:
+            # 同一提供方的其他请求也一起等待
+            self._buckets[provider].defer(seconds)
+        return self.retry.backoff(attempt, seconds)
+
+    def _after_error(self, provider: str, attempt: int, error: Exception) -> Optional[float]:
+        """记录连接错误或超时，返回重试前的等待秒数"""
+        logger.warning(f"{provider} 请求失败(第{attempt + 1}次): {error}")
+        self._count("errors")
+        self.circuit(provider).record_failure()
+        return self.retry.backoff(attempt)
+
+
+class HTTPTransport(_TransportPolicy):
+    """基于requests连接池的同步传输"""
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 32, **policy):
+        """
+        初始化同步传输
+
+        Args:
+            pool_connections: 缓存连接池的主机数
+            pool_maxsize: 每个主机的最大长连接数，连接用尽时请求等待空闲连接
+            **policy: timeout、connect_timeout、retry、rate_limits、failure_threshold、
+                      recovery_timeout、hedge_after、hedge_percentile
+        """
+        super().__init__(**policy)
+        self.pool_maxsize = pool_maxsize
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                              max_retries=0, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = None
+
+    def request(self, method: str, url: str, provider: Optional[str] = None,
+                hedge: Optional[bool] = None, retry: bool = True,
+                retry_non_idempotent: bool = False, **kwargs) -> requests.Response:
+        """
+        发送请求
+
+        Args:
+            method: HTTP方法
+            url: 请求地址
+            provider: 提供方名称，用于限速和熔断，默认为主机名
+            hedge: 是否对冲，默认只对冲GET/HEAD/OPTIONS
+            retry: 是否重试，默认只重试GET/HEAD/OPTIONS
+            retry_non_idempotent: 是否也重试POST/PUT/DELETE等方法，只应在重复发送不会产生
+                额外副作用时(如模型推理请求)开启
+            **kwargs: 传给requests的参数(headers、json、params、timeout等)
+
+        Returns:
+            最后一次请求的响应(可能是重试后仍失败的错误状态)
+
+        Raises:
+            CircuitOpenError: 熔断器打开
+            TransportError: 重试后仍然无法连接或超时
+        """
+        method = method.upper()
+        provider = provider or urlsplit(url).netloc
+        endpoint = self._endpoint(method, url)
+        kwargs.setdefault("timeout", (self.connect_timeout, self.timeout))
+        attempts = self._attempts(method, retry, retry_non_idempotent)
+
+        response, error = None, None
+        for attempt in range(attempts):
+            owner = object()
+            delay = self._admit(provider, owner)
+            try:
+                if delay:
+                    time.sleep(delay)
+                try:
+                    response, error = self._send_hedged(method, url, provider, endpoint, hedge, kwargs), None
+                except requests.RequestException as e:
+                    response, error = None, e
+                    delay = self._after_error(provider, attempt, e)
+                else:
+                    delay = self._after_response(provider, response.status_code,
+                                                 response.headers.get("Retry-After"), attempt)
+            except BaseException:
+                # 请求被中断或抛出未预期的异常，没有结果可记录，让出半开状态的试探名额
+                self.circuit(provider).release(owner)
+                raise
+            if error is None and delay is None:
+                return response
+            if delay is None or attempt + 1 >= attempts:
+                break
+            if response is not None:
+                response.close()
+            self._count("retries")
+            time.sleep(delay)
+
+        if response is not None:
+            return response
+        raise TransportError(f"{method} {url} 请求失败: {error}") from error
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """发送GET请求"""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """发送POST请求"""
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        """关闭连接池"""
+        self.session.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def _send(self, method: str, url: str, endpoint: str, kwargs: Dict[str, Any]) -> requests.Response:
+        start = time.perf_counter()
+        try:
+            return self.session.request(method, url, **kwargs)
+        finally:
+            self._observe(endpoint, time.perf_counter() - start)
+
+    def _send_hedged(self, method, url, provider, endpoint, hedge, kwargs) -> requests.Response:
+        """请求超过对冲延迟仍未返回时再发一个相同请求，采用先成功返回的结果"""
+        delay = self._hedge_delay(method, endpoint, hedge)
+        if delay is None:
+            return self._send(method, url, endpoint, kwargs)
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.pool_maxsize,
+                                                    thread_name_prefix="http-hedge")
+        primary = self._executor.submit(self._send, method, url, endpoint, kwargs)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._try_admit_hedge(provider):
+            return primary.result()
+
+        hedged = self._executor.submit(self._send, method, url, endpoint, kwargs)
+        pending = {primary, hedged}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedged:
+                        self._count("hedge_wins")
+                    # 落后的请求完成后释放连接
+                    for other in pending:
+                        other.add_done_callback(
+                            lambda f: f.exception() is None and f.result().close())
+                    return future.result()
+                error = future.exception()
+        raise error
+
+
+class TransportResponse:
+    """异步传输的响应，正文已读取完毕，连接已归还连接池"""
+
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes, url: str):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.url = url
+
+    @property
+    def status_code(self) -> int:
+        return self.status
+
+    def text(self, encoding: str = "utf-8") -> str:
+        return self.body.decode(encoding, errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+    def raise_for_status(self):
+        """状态码为4xx/5xx时抛出TransportError"""
+        if self.status >= 400:
+            raise TransportError(f"HTTP {self.status}: {self.url}", status=self.status)
+
+
+class AsyncHTTPTransport(_TransportPolicy):
+    """基于aiohttp连接池的异步传输，会话在首次请求时在当前事件循环中创建"""
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 32,
+                 keepalive_timeout: float = 30.0, **policy):
+        """
+        初始化异步传输
+
+        Args:
+            limit: 连接总数上限
+            limit_per_host: 每个主机的连接数上限
+            keepalive_timeout: 空闲长连接的保留时间(秒)
+            **policy: 与HTTPTransport相同的策略参数
+        """
+        if not AIOHTTP_AVAILABLE:
+            raise ImportError("aiohttp库未安装，无法使用异步传输")
+        super().__init__(**policy)
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._session = None
+        self._loop = None
+
+    async def __aenter__(self) -> "AsyncHTTPTransport":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            # 会话绑定事件循环，换了事件循环(如多次asyncio.run)时重新创建
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host,
+                                               keepalive_timeout=self.keepalive_timeout),
+                timeout=aiohttp.ClientTimeout(total=self.timeout, connect=self.connect_timeout),
+            )
+            self._loop = loop
+        return self._session
+
+    async def request(self, method: str, url: str, provider: Optional[str] = None,
+                      hedge: Optional[bool] = None, retry: bool = True,
+                      retry_non_idempotent: bool = False, **kwargs) -> TransportResponse:
+        """
+        发送请求，参数和重试、限速、熔断、对冲行为与HTTPTransport.request相同
+
+        Args:
+            method: HTTP方法
+            url: 请求地址
+            provider: 提供方名称
+            hedge: 是否对冲
+            retry: 是否重试
+            retry_non_idempotent: 是否也重试非幂等方法
+            **kwargs: 传给aiohttp的参数，timeout可以是秒数
+
+        Returns:
+            已读取正文的响应
+        """
+        method = method.upper()
+        provider = provider or urlsplit(url).netloc
+        endpoint = self._endpoint(method, url)
+        if isinstance(kwargs.get("timeout"), (int, float)):
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=kwargs["timeout"],
+                                                      connect=self.connect_timeout)
+        attempts = self._attempts(method, retry, retry_non_idempotent)
+
+        response, error = None, None
+        for attempt in range(attempts):
+            owner = object()
+            delay = self._admit(provider, owner)
+            try:
+                if delay:
+                    await asyncio.sleep(delay)
+                try:
+                    response, error = await self._send_hedged(method, url, provider, endpoint, hedge, kwargs), None
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    response, error = None, e
+                    delay = self._after_error(provider, attempt, e)
+                else:
+                    delay = self._after_response(provider, response.status,
+                                                 response.headers.get("Retry-After"), attempt)
+            except BaseException:
+                # 任务被取消或抛出未预期的异常，没有结果可记录，让出半开状态的试探名额
+                self.circuit(provider).release(owner)
+                raise
+            if error is None and delay is None:
+                return response
+            if delay is None or attempt + 1 >= attempts:
+                break
+            self._count("retries")
+            await asyncio.sleep(delay)
+
+        if response is not None:
+            return response
+        raise TransportError(f"{method} {url} 请求失败: {error!r}") from error
+
+    async def close(self):
+        """关闭会话和连接池"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _send(self, method, url, endpoint, kwargs) -> TransportResponse:
+        start = time.perf_counter()
+        try:
+            async with self._get_session().request(method, url, **kwargs) as response:
+                body = await response.read()
+                return TransportResponse(response.status, dict(response.headers), body, url)
+        finally:
+            self._observe(endpoint, time.perf_counter() - start)
+
+    async def _send_hedged(self, method, url, provider, endpoint, hedge, kwargs) -> TransportResponse:
+        delay = self._hedge_delay(method, endpoint, hedge)
+        if delay is None:
+            return await self._send(method, url, endpoint, kwargs)
+
+        primary = asyncio.ensure_future(self._send(method, url, endpoint, kwargs))
+        done, _ = await asyncio.wait([primary], timeout=delay)
+        if done or not self._try_admit_hedge(provider):
+            return await primary
+
+        hedged = asyncio.ensure_future(self._send(method, url, endpoint, kwargs))
+        pending = {primary, hedged}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedged:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+_default_transport = None
+_default_lock = threading.Lock()
+
+
+def get_transport() -> HTTPTransport:
+    """
+    获取进程共享的同步传输，各连接器默认复用它的连接池、限速和熔断状态
+
+    Returns:
+        共享的HTTPTransport
+    """
+    global _default_transport
+    if _default_transport is None:
+        with _default_lock:
+            if _default_transport is None:
+                _default_transport = HTTPTransport()
+    return _default_transport
@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+"""
+模型响应缓存模块: response_cache
+功能描述: 为GPT/Claude等模型调用提供响应缓存。先按规范化提示词的哈希精确匹配，
+         可选地按提示词嵌入向量的余弦相似度语义匹配；支持TTL、字节预算(LRU淘汰)
+         和追加写入的持久化文件
+版本: 1.0
+创建日期: 2026-10-18
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+# 配置日志记录器
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: Any) -> str:
+    """
+    规范化提示词：结构化提示按键排序序列化，文本合并连续空白
+
+    Args:
+        prompt: 提示词文本，或消息列表/字典等结构化提示
+
+    Returns:
+        规范化后的文本
+    """
+    if not isinstance(prompt, str):
+        prompt = json.dumps(prompt, sort_keys=True, ensure_ascii=False)
+    return _WHITESPACE.sub(" ", prompt).strip()
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class _Entry:
+    """缓存条目"""
+
+    __slots__ = ("key", "context", "value", "size", "expires_at", "row", "text")
+
+    def __init__(self, key, context, value, size, expires_at, text):
+        self.key = key
+        self.context = context
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+        self.text = text
+        self.row = None
+
+
+class ResponseCache:
+    """
+    模型响应缓存
+
+    同一上下文(模型、温度、系统提示等)内，规范化提示词完全相同时精确命中；
+    提供embed函数时，相似度不低于阈值的提示词语义命中。
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = 3600.0,
+        max_bytes: int = 32 * 1024 * 1024,
+        embed: Optional[Callable[[str], Any]] = None,
+        similarity_threshold: float = 0.95,
+        persist_path: Optional[str] = None,
+    ):
+        """
+        初始化响应缓存
+
+        Args:
+            ttl: 默认有效期(秒)，None表示不过期
+            max_bytes: 缓存值序列化后的总字节上限，超出时淘汰最久未使用的条目
+            embed: 文本嵌入函数，为None时只做精确匹配
+            similarity_threshold: 语义命中的最低余弦相似度
+            persist_path: 持久化文件路径(JSON Lines)，为None时只保存在内存
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.embed = embed
+        self.similarity_threshold = similarity_threshold
+        self.persist_path = persist_path
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._persisted_records = 0
+        self._lock = threading.RLock()
+
+        # 语义匹配：归一化嵌入矩阵，每行对应一个条目
+        self._matrix = None
+        self._row_keys = []
+        self._row_contexts = []
+        self._free_rows = []
+
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0,
+                      "sets": 0, "evictions": 0, "expired": 0}
+
+        if persist_path:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _context_key(context: Any) -> str:
+        return _hash(normalize_prompt(context if context is not None else ""))
+
+    def _key(self, text: str, context_key: str) -> str:
+        return _hash(f"{context_key}\n{text}")
+
+    def get(self, prompt: Any, context: Any = None) -> Optional[Any]:
+        """
+        查找缓存的响应
+
+        Args:
+            prompt: 提示词
+            context: 影响响应的其他请求参数，如模型名和温度
+
+        Returns:
+            缓存的响应，未命中时返回None
+        """
+        text = normalize_prompt(prompt)
+        context_key = self._context_key(context)
+        key = self._key(text, context_key)
+        now = time.time()
+
+        with self._lock:
+            entry = self._live_entry(key, now)
+            if entry is not None:
+                self.stats["exact_hits"] += 1
+                return entry.value
+
+        if self.embed is not None and self._matrix is not None:
+            query = self._embed(text)
+            with self._lock:
+                entry = self._nearest(query, context_key, now)
+                if entry is not None:
+                    self.stats["semantic_hits"] += 1
+                    return entry.value
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def set(self, prompt: Any, value: Any, context: Any = None, ttl: Optional[float] = None):
+        """
+        缓存响应
+
+        Args:
+            prompt: 提示词
+            value: 响应(需可JSON序列化)
+            context: 影响响应的其他请求参数
+            ttl: 有效期(秒)，默认使用缓存的ttl
+        """
+        text = normalize_prompt(prompt)
+        context_key = self._context_key(context)
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+        vector = self._embed(text) if self.embed is not None else None
+
+        with self._lock:
+            self._insert(self._key(text, context_key), context_key, value,
+                         expires_at, text, vector)
+            self.stats["sets"] += 1
+        if self.persist_path:
+            self._append_record(self._key(text, context_key), context_key, value,
+                                expires_at, text)
+
+    def get_or_call(self, prompt: Any, call: Callable[[], Any], context: Any = None,
+                    cacheable: Callable[[Any], bool] = None) -> Any:
+        """
+        命中缓存时直接返回，否则调用模型并缓存结果
+
+        Args:
+            prompt: 提示词
+            call: 无参数的模型调用函数
+            context: 影响响应的其他请求参数
+            cacheable: 判断响应是否可以缓存的函数，默认缓存所有非空响应
+
+        Returns:
+            响应
+        """
+        cached = self.get(prompt, context)
+        if cached is not None:
+            return cached
+        value = call()
+        if value is not None and (cacheable is None or cacheable(value)):
+            self.set(prompt, value, context)
+        return value
+
+    def delete(self, prompt: Any, context: Any = None) -> bool:
+        """
+        删除缓存的响应
+
+        Args:
+            prompt: 提示词
+            context: 请求参数
+
+        Returns:
+            是否删除了条目
+        """
+        key = self._key(normalize_prompt(prompt), self._context_key(context))
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+        return True
+
+    def clear(self):
+        """清空缓存和持久化文件"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._matrix = None
+            self._row_keys, self._row_contexts, self._free_rows = [], [], []
+            self._persisted_records = 0
+            if self.persist_path and os.path.exists(self.persist_path):
+                os.remove(self.persist_path)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+
+        Returns:
+            命中次数、未命中次数、命中率、条目数和占用字节数
+        """
+        with self._lock:
+            hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+            lookups = hits + self.stats["misses"]
+            return dict(
+                self.stats,
+                hits=hits,
+                hit_rate=hits / lookups if lookups else 0.0,
+                entries=len(self._entries),
+                bytes=self._bytes,
+                max_bytes=self.max_bytes,
+                semantic=self.embed is not None,
+            )
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.asarray(self.embed(text), dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _live_entry(self, key: str, now: float) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at is not None and entry.expires_at <= now:
+            self._remove(key)
+            self.stats["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _nearest(self, query: np.ndarray, context_key: str, now: float) -> Optional[_Entry]:
+        """在同一上下文的条目中查找相似度最高且不低于阈值的条目"""
+        if self._matrix is None or query.shape[0] != self._matrix.shape[1]:
+            return None
+        scores = self._matrix[:len(self._row_keys)] @ query
+        mask = np.fromiter((c != context_key for c in self._row_contexts),
+                           dtype=bool, count=len(self._row_contexts))
+        scores[mask] = -np.inf
+        while True:
+            row = int(np.argmax(scores))
+            if scores[row] < self.similarity_threshold:
+                return None
+            entry = self._live_entry(self._row_keys[row], now)
+            if entry is not None:
+                return entry
+            scores[row] = -np.inf
+
+    def _insert(self, key, context_key, value, expires_at, text, vector=None):
+        size = len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+        if key in self._entries:
+            self._remove(key)
+        if size > self.max_bytes:
+            return
+        entry = _Entry(key, context_key, value, size, expires_at, text)
+        self._entries[key] = entry
+        self._bytes += size
+
+        if vector is not None:
+            if self._matrix is None:
+                self._matrix = np.zeros((0, vector.shape[0]), dtype=np.float32)
+            if vector.shape[0] == self._matrix.shape[1]:
+                if self._free_rows:
+                    row = self._free_rows.pop()
+                    self._matrix[row] = vector
+                    self._row_keys[row] = key
+                    self._row_contexts[row] = context_key
+                else:
+                    row = len(self._row_keys)
+                    if row >= self._matrix.shape[0]:
+                        grown = np.zeros((max(16, row * 2), vector.shape[0]), dtype=np.float32)
+                        grown[:row] = self._matrix[:row]
+                        self._matrix = grown
+                    self._matrix[row] = vector
+                    self._row_keys.append(key)
+                    self._row_contexts.append(context_key)
+                entry.row = row
+
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        if entry.row is not None:
+            self._matrix[entry.row] = 0.0
+            self._row_contexts[entry.row] = None
+            self._free_rows.append(entry.row)
+
+    def _append_record(self, key, context_key, value, expires_at, text):
+        """追加一条持久化记录"""
+        record = {"key": key, "context": context_key, "value": value,
+                  "expires_at": expires_at, "text": text}
+        try:
+            directory = os.path.dirname(self.persist_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._lock:
+                with open(self.persist_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                self._persisted_records += 1
+                # 文件中失效的记录过多时重写
+                if self._persisted_records > 2 * len(self._entries) + 100:
+                    self._compact()
+        except OSError as e:
+            logger.warning(f"写入响应缓存文件失败: {e}")
+
+    def _load(self):
+        """从持久化文件恢复未过期的条目，并压缩文件中已失效的记录"""
+        if not os.path.exists(self.persist_path):
+            return
+        now = time.time()
+        lines = 0
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if record["expires_at"] is not None and record["expires_at"] <= now:
+                        continue
+                    vector = self._embed(record["text"]) if self.embed is not None else None
+                    self._insert(record["key"], record["context"], record["value"],
+                                 record["expires_at"], record["text"], vector)
+        except OSError as e:
+            logger.warning(f"读取响应缓存文件失败: {e}")
+            return
+
+        self._persisted_records = lines
+        if lines > len(self._entries):
+            self._compact()
+        logger.info(f"从 {self.persist_path} 恢复了 {len(self._entries)} 条响应缓存")
+
+    def _compact(self):
+        """只保留当前条目重写持久化文件"""
+        temp_path = f"{self.persist_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for entry in self._entries.values():
+                record = {"key": entry.key, "context": entry.context, "value": entry.value,
+                          "expires_at": entry.expires_at, "text": entry.text}
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        os.replace(temp_path, self.persist_path)
+        self._persisted_records = len(self._entries)